@@ -0,0 +1,232 @@
+"""
+lesson_bundle.py -- Compiled, memory-mapped lesson bundle.
+
+Build step (run at image build time, or any time lessons change):
+
+    python -m content.lesson_bundle [--lessons-dir DIR] [--output FILE]
+
+compiles every lesson JSON into one file:
+
+    b"PYMBNDL1" | u64 index length | index (JSON) | lesson blobs
+
+Each blob is the lesson pre-serialized exactly as the API would send it
+(compact separators, UTF-8). The index records each blob's offset/length,
+the source file's size/mtime (so stale entries are ignored) and the byte
+spans of every per-language story/title variant inside the blob, which lets
+get_lesson personalise a lesson by splicing bytes instead of parsing and
+re-serialising the whole document.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from content.lesson_catalog import LESSONS_DIR, LessonCatalog
+
+MAGIC = b"PYMBNDL1"
+_HEADER = struct.Struct("<Q")
+
+LESSON_BUNDLE_PATH = Path(os.getenv("LESSON_BUNDLE_PATH", str(LESSONS_DIR / "lessons.bundle")))
+
+# Lesson fields whose {language: text} variants get their own byte spans
+_VARIANT_FIELDS = ("story_variants", "title")
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def encode_lesson(lesson: dict) -> tuple[bytes, dict]:
+    """
+    Serialise a lesson to compact JSON, recording the byte span of each
+    variant in _VARIANT_FIELDS. Output is byte-identical to
+    json.dumps(lesson, ensure_ascii=False, separators=(",", ":")).
+    """
+    out = bytearray(b"{")
+    spans: dict = {}
+    for i, (key, value) in enumerate(lesson.items()):
+        if i:
+            out += b","
+        out += _dumps(key).encode("utf-8") + b":"
+        if key in _VARIANT_FIELDS and isinstance(value, dict):
+            field_spans = spans[key] = {}
+            out += b"{"
+            for j, (lang, text) in enumerate(value.items()):
+                if j:
+                    out += b","
+                out += _dumps(lang).encode("utf-8") + b":"
+                encoded = _dumps(text).encode("utf-8")
+                field_spans[lang] = [len(out), len(encoded)]
+                out += encoded
+            out += b"}"
+        else:
+            encoded = _dumps(value).encode("utf-8")
+            if key in _VARIANT_FIELDS:
+                spans[key] = [len(out), len(encoded)]
+            out += encoded
+    out += b"}"
+    return bytes(out), spans
+
+
+def _needs_parse(lesson: dict) -> bool:
+    """
+    True when get_lesson must parse the lesson to personalise it: it has
+    adaptation_points to annotate, or already carries a key that byte-level
+    personalisation would otherwise append a second time.
+    """
+    if lesson.get("adaptation_points"):
+        return True
+    return any(key in lesson for key in ("active_story", "active_title", "speed_multiplier"))
+
+
+def build_bundle(lessons_dir: Path | str = LESSONS_DIR,
+                 output: Path | str = LESSON_BUNDLE_PATH) -> int:
+    """Compile every lesson under lessons_dir into `output`. Returns lesson count."""
+    catalog = LessonCatalog(lessons_dir, recheck_seconds=float("inf"))
+    base = Path(lessons_dir).resolve()
+    index = {}
+    blobs = []
+    offset = 0
+    for entry in catalog.entries():
+        path = entry.path
+        with open(path, "r", encoding="utf-8") as f:
+            lesson = json.load(f)
+        blob, spans = encode_lesson(lesson)
+        index[entry.lookup_id] = {
+            "offset": offset,
+            "length": len(blob),
+            "source": str(path.resolve().relative_to(base)),
+            "size": entry.size,
+            "mtime_ns": entry.mtime_ns,
+            "spans": spans,
+            "adaptive": _needs_parse(lesson),
+        }
+        blobs.append(blob)
+        offset += len(blob)
+
+    index_bytes = _dumps({"version": 1, "lessons": index}).encode("utf-8")
+    output = Path(output)
+    tmp = output.with_suffix(output.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER.pack(len(index_bytes)))
+        f.write(index_bytes)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp, output)
+    return len(index)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+@dataclass
+class BundledLesson:
+    """A lesson served straight out of the mapped bundle."""
+
+    data: bytes
+    spans: dict
+    adaptive: bool
+
+    def variant(self, field: str, lang: str) -> Optional[bytes]:
+        """Encoded JSON value of field[lang] (or of field itself if it is not a dict)."""
+        span = self.spans.get(field)
+        if span is None:
+            return None
+        if isinstance(span, dict):
+            span = span.get(lang)
+            if span is None:
+                return None
+        start, length = span
+        return self.data[start:start + length]
+
+
+class LessonBundle:
+    """Read-only, memory-mapped view over a compiled lesson bundle."""
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a lesson bundle")
+        (index_len,) = _HEADER.unpack_from(self._mm, len(MAGIC))
+        index_start = len(MAGIC) + _HEADER.size
+        self._data_start = index_start + index_len
+        self._index = json.loads(self._mm[index_start:self._data_start])["lessons"]
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, lesson_id: str) -> bool:
+        return lesson_id in self._index
+
+    def get(self, lesson_id: str, size: int = None, mtime_ns: int = None) -> Optional[BundledLesson]:
+        """
+        Slice a lesson out of the bundle. When size/mtime_ns of the current
+        source file are given, a bundle entry built from a different version
+        of the file is treated as missing.
+        """
+        meta = self._index.get(lesson_id)
+        if meta is None:
+            return None
+        if size is not None and (meta["size"] != size or meta["mtime_ns"] != mtime_ns):
+            return None
+        start = self._data_start + meta["offset"]
+        return BundledLesson(
+            data=self._mm[start:start + meta["length"]],
+            spans=meta["spans"],
+            adaptive=meta["adaptive"],
+        )
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+
+_bundle: Optional[LessonBundle] = None
+_bundle_loaded = False
+_bundle_lock = threading.Lock()
+
+
+def get_bundle() -> Optional[LessonBundle]:
+    """The process-wide bundle at LESSON_BUNDLE_PATH, or None if not built."""
+    global _bundle, _bundle_loaded
+    if not _bundle_loaded:
+        with _bundle_lock:
+            if not _bundle_loaded:
+                try:
+                    _bundle = LessonBundle(LESSON_BUNDLE_PATH)
+                except (OSError, ValueError) as e:
+                    if LESSON_BUNDLE_PATH.exists():
+                        print(f"Warning: lesson bundle unusable, serving from JSON files: {e}")
+                    _bundle = None
+                _bundle_loaded = True
+    return _bundle
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile lesson JSON files into a bundle.")
+    parser.add_argument("--lessons-dir", default=str(LESSONS_DIR))
+    parser.add_argument("--output", default=str(LESSON_BUNDLE_PATH))
+    args = parser.parse_args()
+    count = build_bundle(args.lessons_dir, args.output)
+    print(f"Bundled {count} lessons into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+lesson_catalog.py -- In-memory index of the static lesson library.
+
+The classroom used to walk every track directory and json.load all ~266
+lesson files on each /api/classroom/lessons call. LessonCatalog scans the
+directory once, keeps an id -> file/metadata map, per-track ordered lists
+and the lightweight listing projection, and afterwards only re-reads files
+whose mtime/size changed (checked at most every LESSON_CATALOG_RECHECK_SECONDS).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+LESSONS_DIR = Path(__file__).parent.parent / "lessons"
+
+# 0 re-stats the directory on every call (useful while authoring lessons).
+LESSON_CATALOG_RECHECK_SECONDS = float(os.getenv("LESSON_CATALOG_RECHECK_SECONDS", "10"))
+
+_SKIP_FILES = {"schema.json"}
+_SKIP_DIRS = {"__pycache__"}
+
+
+@dataclass
+class LessonEntry:
+    """Index record for one lesson file."""
+
+    lookup_id: str          # file stem — what /lesson/{id} resolves against
+    path: Path
+    track: Optional[str]    # directory name; None for legacy root-level files
+    mtime_ns: int
+    size: int
+    summary: Optional[dict]  # listing projection; None for root-level files
+
+
+def _summarize(data: dict, stem: str) -> dict:
+    return {
+        "id": data.get("id", stem),
+        "title": data.get("title", {}),
+        "description": data.get("description", {}),
+        "xp_reward": data.get("xp_reward"),
+        "topic": data.get("topic"),
+        "track": data.get("track"),
+        "module": data.get("module"),
+        "order": data.get("order", 0),
+    }
+
+
+class LessonCatalog:
+    """Index of lesson JSON files under a lessons directory."""
+
+    def __init__(self, lessons_dir: Path | str = LESSONS_DIR,
+                 recheck_seconds: float = LESSON_CATALOG_RECHECK_SECONDS):
+        self.lessons_dir = Path(lessons_dir)
+        self.recheck_seconds = recheck_seconds
+        self._lock = threading.Lock()
+        self._files: dict[Path, LessonEntry] = {}
+        self._by_id: dict[str, LessonEntry] = {}
+        self._by_track: dict[str, list[LessonEntry]] = {}
+        self._listing: list[dict] = []
+        self._checked_at = 0.0
+        self.generation = 0  # bumped whenever the index contents change
+        self.refresh(force=True)
+
+    # -- Indexing ------------------------------------------------------------
+
+    def _scan(self) -> list[tuple[Path, Optional[str]]]:
+        """(path, track) pairs in listing order: tracks first, then root files."""
+        if not self.lessons_dir.is_dir():
+            return []
+        found = []
+        root_files = []
+        for entry in sorted(self.lessons_dir.iterdir()):
+            if entry.is_dir():
+                if entry.name in _SKIP_DIRS:
+                    continue
+                for lesson_file in sorted(entry.glob("*.json")):
+                    if lesson_file.name not in _SKIP_FILES:
+                        found.append((lesson_file, entry.name))
+            elif entry.suffix == ".json" and entry.name not in _SKIP_FILES:
+                root_files.append((entry, None))
+        return found + root_files
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Re-stat the directory and reload only added/changed files.
+        Returns True if the index changed.
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.recheck_seconds:
+            return False
+
+        with self._lock:
+            if not force and now - self._checked_at < self.recheck_seconds:
+                return False
+
+            changed = False
+            files: dict[Path, LessonEntry] = {}
+            order: list[LessonEntry] = []
+            for path, track in self._scan():
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                entry = self._files.get(path)
+                if entry is None or entry.mtime_ns != st.st_mtime_ns or entry.size != st.st_size:
+                    entry = self._load_entry(path, track, st)
+                    changed = True
+                    if entry is None:
+                        continue
+                files[path] = entry
+                order.append(entry)
+
+            if changed or files.keys() != self._files.keys():
+                self._rebuild(files, order)
+                changed = True
+            self._checked_at = time.monotonic()
+            return changed
+
+    def _load_entry(self, path: Path, track: Optional[str], st: os.stat_result) -> Optional[LessonEntry]:
+        summary = None
+        if track is not None:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    summary = _summarize(json.load(f), path.stem)
+            except Exception as e:
+                print(f"Warning: Failed to load lesson {path}: {e}")
+                return None
+        return LessonEntry(
+            lookup_id=path.stem,
+            path=path,
+            track=track,
+            mtime_ns=st.st_mtime_ns,
+            size=st.st_size,
+            summary=summary,
+        )
+
+    def _rebuild(self, files: dict[Path, LessonEntry], order: list[LessonEntry]):
+        by_id: dict[str, LessonEntry] = {}
+        by_track: dict[str, list[LessonEntry]] = {}
+        listing = []
+        for entry in order:
+            # First track (alphabetical) wins, root-level files are the fallback
+            by_id.setdefault(entry.lookup_id, entry)
+            if entry.track is not None:
+                by_track.setdefault(entry.track, []).append(entry)
+                listing.append(entry.summary)
+        for entries in by_track.values():
+            entries.sort(key=lambda e: e.summary.get("order") or 0)
+        self._files = files
+        self._by_id = by_id
+        self._by_track = by_track
+        self._listing = listing
+        self.generation += 1
+
+    # -- Lookups -------------------------------------------------------------
+
+    def get(self, lesson_id: str) -> Optional[LessonEntry]:
+        """O(1) lookup of a lesson by id (file stem)."""
+        self.refresh()
+        return self._by_id.get(lesson_id)
+
+    def load(self, lesson_id: str) -> Optional[dict]:
+        """Read the full lesson body for lesson_id, or None if unknown."""
+        entry = self.get(lesson_id)
+        if entry is None:
+            return None
+        try:
+            with open(entry.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except OSError:
+            return None
+
+    def entries(self) -> list[LessonEntry]:
+        """Every addressable lesson file (one per lookup id)."""
+        self.refresh()
+        return list(self._by_id.values())
+
+    def listing(self) -> list[dict]:
+        """Listing projection for every track lesson, as fresh dicts."""
+        self.refresh()
+        return [dict(summary) for summary in self._listing]
+
+    def tracks(self) -> list[str]:
+        self.refresh()
+        return sorted(self._by_track)
+
+    def track(self, track: str) -> list[LessonEntry]:
+        """Entries for one track, ordered by the lessons' `order` field."""
+        self.refresh()
+        return list(self._by_track.get(track, []))
+
+    def __len__(self) -> int:
+        return len(self._listing)
+
+
+_catalogs: dict[Path, LessonCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(lessons_dir: Path | str | None = None) -> LessonCatalog:
+    """Process-wide catalog for lessons_dir (default: backend/lessons)."""
+    base = Path(lessons_dir).resolve() if lessons_dir else LESSONS_DIR.resolve()
+    catalog = _catalogs.get(base)
+    if catalog is None:
+        with _catalogs_lock:
+            catalog = _catalogs.get(base)
+            if catalog is None:
+                catalog = _catalogs[base] = LessonCatalog(base)
+    return catalog
@@ -0,0 +1,209 @@
+"""
+lesson_ordering.py -- Precomputed personalised lesson ordering.
+
+The classroom listing orders and flags the static lessons purely from the
+student's skill level and motivation bucket (hobby / ai_ml / career /
+general). That is ~16 combinations, so each one is computed once per lesson
+catalog generation and cached; a request then only merges in the student's
+generated lessons.
+
+Routing rules (see list_lessons):
+- hobby / automation / games  → fun_automation track first, then python_fundamentals
+- ai_ml / data_science        → AI tracks prioritised
+- career_switch / work / web  → python_fundamentals first (solid foundation)
+- student / unknown           → python_fundamentals first, all tracks visible
+"""
+
+from __future__ import annotations
+
+import heapq
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from content.lesson_catalog import LessonCatalog
+
+# Track order per motivation bucket: (primary_tracks, secondary_tracks)
+TRACK_PLANS: dict[str, tuple[list[str], list[str]]] = {
+    # Fun/automation users see fun_automation first, then fundamentals
+    "hobby": (
+        ["fun_automation", "python_fundamentals", "python_modern"],
+        ["python_intermediate", "ai_ml_foundations", "deep_learning",
+         "web_development", "dsa", "ai_fundamentals",
+         "machine_learning", "deep_learning_complete", "testing_devops",
+         "ai_agents", "ai_engineering"],
+    ),
+    # AI/ML users see fundamentals → AI Agents → AI Engineering → Deep Learning
+    "ai_ml": (
+        ["python_fundamentals", "ai_agents", "ai_engineering",
+         "ai_ml_foundations", "ai_fundamentals",
+         "machine_learning", "deep_learning", "deep_learning_complete"],
+        ["python_intermediate", "python_modern", "fun_automation",
+         "web_development", "dsa", "testing_devops"],
+    ),
+    # Career-focused: solid fundamentals first, then modern Python + AI
+    "career": (
+        ["python_fundamentals", "python_intermediate",
+         "python_modern", "web_development"],
+        ["ai_agents", "ai_engineering", "fun_automation",
+         "ai_ml_foundations", "deep_learning",
+         "dsa", "ai_fundamentals", "machine_learning",
+         "deep_learning_complete", "testing_devops"],
+    ),
+    # Student / unknown: balanced view — fundamentals first, new tracks visible
+    "general": (
+        ["python_fundamentals", "python_intermediate",
+         "python_modern", "fun_automation"],
+        ["ai_agents", "ai_engineering", "ai_ml_foundations",
+         "deep_learning", "web_development",
+         "dsa", "ai_fundamentals", "machine_learning",
+         "deep_learning_complete", "testing_devops"],
+    ),
+}
+
+# Tracks shown as recommended for each skill level (primary tracks are always added)
+SKILL_VISIBLE: dict[str, frozenset[str]] = {
+    "beginner": frozenset({"python_fundamentals", "fun_automation"}),
+    "intermediate": frozenset({"python_fundamentals", "fun_automation", "python_intermediate",
+                               "ai_ml_foundations", "web_development", "dsa", "testing_devops",
+                               "python_modern"}),
+    "advanced": frozenset({"python_fundamentals", "fun_automation", "python_intermediate",
+                           "ai_ml_foundations", "deep_learning", "web_development", "dsa",
+                           "ai_fundamentals", "machine_learning", "deep_learning_complete",
+                           "testing_devops", "ai_agents", "python_modern", "ai_engineering"}),
+}
+_DEFAULT_VISIBLE = SKILL_VISIBLE["beginner"]
+
+MIN_RECOMMENDED = 3
+_UNKNOWN_TRACK_PRIORITY = 99
+
+
+def _split(value: Optional[str]) -> set[str]:
+    """Parse a comma-separated multi-select value."""
+    return {v.strip() for v in (value or "").split(",") if v.strip()}
+
+
+def profile_hint(goal: Optional[str], motivation: Optional[str]) -> str:
+    """Motivation bucket for a profile: "hobby", "ai_ml", "career" or "general"."""
+    goals = _split(goal)
+    motivations = _split(motivation)
+    if motivations & {"hobby"} or goals & {"automation", "games"}:
+        return "hobby"
+    if motivations & {"ai_ml", "data_science"} or goals & {"ai_ml", "data_science"}:
+        return "ai_ml"
+    if motivations & {"career_switch", "work"} or goals & {"web"}:
+        return "career"
+    return "general"
+
+
+@dataclass
+class OrderedListing:
+    """The static lesson listing ordered and flagged for one profile bucket."""
+
+    primary_tracks: list[str]
+    lessons: list[dict]          # sorted, each carrying "recommended"
+    recommended_count: int
+    fallback: list[int]          # indices into `lessons` the MIN_RECOMMENDED rule may promote
+    track_priority: dict[str, int]
+
+    def sort_key(self, lesson: dict) -> tuple:
+        return (
+            0 if lesson.get("recommended") else 1,
+            self.track_priority.get(lesson.get("track", ""), _UNKNOWN_TRACK_PRIORITY),
+            lesson.get("order", 0),
+        )
+
+    def merge(self, generated: list[dict]) -> list[dict]:
+        """
+        Final listing with the student's generated lessons merged in.
+        Generated lessons are always recommended; the cached lesson dicts are
+        shared between requests and must not be mutated by callers.
+        """
+        generated = [{**lesson, "recommended": True} for lesson in generated]
+        missing = MIN_RECOMMENDED - self.recommended_count - len(generated)
+        if missing <= 0:
+            generated.sort(key=self.sort_key)
+            return list(heapq.merge(self.lessons, generated, key=self.sort_key))
+
+        # Rare: too few recommended lessons — promote fallbacks, then re-sort
+        lessons = list(self.lessons)
+        for index in self.fallback[:missing]:
+            lessons[index] = {**lessons[index], "recommended": True}
+        lessons.extend(generated)
+        lessons.sort(key=self.sort_key)
+        return lessons
+
+
+def build_ordered_listing(listing: list[dict], skill_level: str, hint: str) -> OrderedListing:
+    """Order and flag the catalog listing for (skill_level, hint)."""
+    primary_tracks, secondary_tracks = TRACK_PLANS[hint]
+    visible_tracks = set(SKILL_VISIBLE.get(skill_level, _DEFAULT_VISIBLE)) | set(primary_tracks)
+
+    lessons = []
+    for summary in listing:
+        track = summary.get("track", "")
+        recommended = track in visible_tracks or track == "generated"
+        lessons.append({**summary, "recommended": recommended})
+
+    # Lessons the "at least MIN_RECOMMENDED" rule would promote, in promotion order
+    fallback_ids = []
+    for fallback_track in primary_tracks + secondary_tracks:
+        fallback_ids.extend(
+            id(lesson) for lesson in lessons
+            if lesson.get("track") == fallback_track and not lesson["recommended"]
+        )
+        if len(fallback_ids) >= MIN_RECOMMENDED:
+            break
+
+    all_ordered_tracks = primary_tracks + secondary_tracks + ["generated"]
+    ordered = OrderedListing(
+        primary_tracks=list(primary_tracks),
+        lessons=lessons,
+        recommended_count=sum(1 for lesson in lessons if lesson["recommended"]),
+        fallback=[],
+        track_priority={t: i for i, t in enumerate(all_ordered_tracks)},
+    )
+    lessons.sort(key=ordered.sort_key)
+    position = {id(lesson): i for i, lesson in enumerate(lessons)}
+    ordered.fallback = [position[lesson_id] for lesson_id in fallback_ids[:MIN_RECOMMENDED]]
+    return ordered
+
+
+class OrderedListingCache:
+    """Per-bucket OrderedListings, rebuilt when the catalog generation changes."""
+
+    def __init__(self, catalog: LessonCatalog):
+        self.catalog = catalog
+        self._generation = None
+        self._listings: dict[tuple[str, str], OrderedListing] = {}
+        self._lock = threading.Lock()
+
+    def get(self, skill_level: str, hint: str) -> OrderedListing:
+        self.catalog.refresh()
+        if skill_level not in SKILL_VISIBLE:
+            skill_level = ""
+        key = (skill_level, hint)
+        with self._lock:
+            if self._generation != self.catalog.generation:
+                self._listings.clear()
+                self._generation = self.catalog.generation
+            ordered = self._listings.get(key)
+            if ordered is None:
+                ordered = build_ordered_listing(self.catalog.listing(), skill_level, hint)
+                self._listings[key] = ordered
+            return ordered
+
+
+_caches: dict[int, OrderedListingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_ordered_listing(catalog: LessonCatalog, skill_level: str, hint: str) -> OrderedListing:
+    """Cached OrderedListing for a catalog and profile bucket."""
+    cache = _caches.get(id(catalog))
+    if cache is None or cache.catalog is not catalog:
+        with _caches_lock:
+            cache = _caches.get(id(catalog))
+            if cache is None or cache.catalog is not catalog:
+                cache = _caches[id(catalog)] = OrderedListingCache(catalog)
+    return cache.get(skill_level, hint)
@@ -0,0 +1,229 @@
+"""
+database.py — Shared SQLite access for routers and services.
+
+Every caller that used to do ``sqlite3.connect(DB_PATH)`` goes through
+``connect()`` instead. Connections are pooled per thread and per database
+file, configured once with WAL journaling and the cache/mmap pragmas, and
+returned to the pool when the caller calls ``close()`` — so existing
+``conn = connect(...) ... conn.close()`` code keeps working unchanged while
+the open/pragma/page-cache warmup cost is paid once per worker thread.
+
+``transaction()`` groups several such helpers into one transaction without
+changing them: inside the block, their connect/commit/close calls share a
+single connection that commits once at the end.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# Idle connections kept per (thread, database file). Nested helpers that open
+# a second connection while the first is still checked out get their own.
+POOL_SIZE_PER_THREAD = int(os.getenv("SQLITE_POOL_SIZE_PER_THREAD", "4"))
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+    f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+    f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+_local = threading.local()
+
+
+def get_db_path() -> str:
+    return os.getenv("DB_PATH", os.path.abspath("pymasters.db"))
+
+
+# ---------------------------------------------------------------------------
+# Pooled connection
+# ---------------------------------------------------------------------------
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3.Connection whose close() hands the connection back to the
+    calling thread's pool instead of closing the file.
+
+    Any transaction left open is rolled back and row_factory is reset, so the
+    next borrower sees exactly what a fresh ``sqlite3.connect`` would give.
+    """
+
+    _pool_key = None
+    _file_id = None
+
+    def close(self):
+        key = self._pool_key
+        if key is None:
+            super().close()
+            return
+        try:
+            if self.in_transaction:
+                self.rollback()
+            self.row_factory = None
+            self.text_factory = str
+        except sqlite3.Error:
+            super().close()
+            return
+        idle = _idle_pool().setdefault(key, [])
+        if len(idle) < POOL_SIZE_PER_THREAD and self not in idle:
+            idle.append(self)
+        else:
+            super().close()
+
+    def discard(self):
+        """Close the underlying file handle for real."""
+        self._pool_key = None
+        super().close()
+
+
+def _idle_pool() -> dict:
+    pool = getattr(_local, "idle", None)
+    if pool is None:
+        pool = _local.idle = {}
+    return pool
+
+
+def _file_identity(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
+def _open(path: str) -> PooledConnection:
+    conn = sqlite3.connect(path, factory=PooledConnection)
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def connect(db_path: str = None) -> sqlite3.Connection:
+    """
+    Borrow a configured connection for the current thread.
+
+    Drop-in replacement for ``sqlite3.connect(db_path)``: call ``close()``
+    when done to return it to the pool. In-memory databases are never pooled.
+    """
+    path = db_path or get_db_path()
+    if path == ":memory:" or path.startswith("file:"):
+        return _open(path)
+
+    key = os.path.abspath(path)
+    shared = _shared_connections().get(key)
+    if shared is not None:
+        return _SharedConnection(shared)
+    idle = _idle_pool().get(key)
+    file_id = _file_identity(key)
+    while idle:
+        conn = idle.pop()
+        # The file was deleted or replaced underneath us (tests, restores):
+        # the cached handle would point at the old inode.
+        if conn._file_id is None or conn._file_id != file_id:
+            conn.discard()
+            continue
+        return conn
+
+    conn = _open(key)
+    conn._pool_key = key
+    conn._file_id = _file_identity(key)
+    return conn
+
+
+def close_all():
+    """Close every idle pooled connection owned by the current thread."""
+    pool = _idle_pool()
+    for conns in pool.values():
+        for conn in conns:
+            conn.discard()
+    pool.clear()
+
+
+# ---------------------------------------------------------------------------
+# Shared transactions
+# ---------------------------------------------------------------------------
+
+def _shared_connections() -> dict:
+    shared = getattr(_local, "shared", None)
+    if shared is None:
+        shared = _local.shared = {}
+    return shared
+
+
+class _SharedConnection:
+    """
+    What connect() hands out inside transaction(): the block's connection,
+    with commit() and close() deferred to the end of the block. A rollback()
+    marks the whole transaction to be rolled back.
+    """
+
+    def __init__(self, conn: PooledConnection):
+        object.__setattr__(self, "_conn", conn)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self._conn._rollback_requested = True
+
+    def close(self):
+        # Like a pooled close: the next borrower starts with the defaults
+        self._conn.row_factory = None
+        self._conn.text_factory = str
+
+
+@contextmanager
+def transaction(db_path: str = None):
+    """
+    Run the block as one write transaction on this thread: every connect()
+    to the same database inside it shares the block's connection, and their
+    commits take effect together when the block exits (rolled back if it
+    raises). Nested blocks join the outer transaction.
+    """
+    path = db_path or get_db_path()
+    key = os.path.abspath(path)
+    shared = _shared_connections()
+    if key in shared:
+        yield _SharedConnection(shared[key])
+        return
+
+    conn = connect(path)
+    conn._rollback_requested = False
+    conn.execute("BEGIN IMMEDIATE")
+    shared[key] = conn
+    try:
+        yield _SharedConnection(conn)
+    except BaseException:
+        del shared[key]
+        conn.rollback()
+        conn.close()
+        raise
+    del shared[key]
+    try:
+        if conn._rollback_requested:
+            conn.rollback()
+        else:
+            conn.commit()
+    finally:
+        conn.close()
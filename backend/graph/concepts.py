@@ -3,7 +3,7 @@ Knowledge graph seed data for PyMasters.
 ~300 concepts across 10 categories and ~213 edges defining prerequisite relationships.
 """
 
-import sqlite3
+import database
 
 # ---------------------------------------------------------------------------
 # CONCEPTS  (id, name, category, difficulty, description)
@@ -594,7 +594,7 @@ CONCEPT_EDGES = [
 
 def seed_concepts(db_path: str):
     """Insert all concepts and edges into the SQLite database."""
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     cursor = conn.cursor()
     cursor.executemany(
         "INSERT OR IGNORE INTO concepts (id, name, category, difficulty, description) VALUES (?, ?, ?, ?, ?)",
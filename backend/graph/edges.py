@@ -3,11 +3,12 @@ graph/edges.py — Edge management and prerequisite queries.
 """
 
 import sqlite3
+import database
 
 
 def get_prerequisites(db_path: str, concept_id: str) -> list[dict]:
     """Get all prerequisite concepts for a given concept."""
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     conn.row_factory = sqlite3.Row
     rows = conn.execute(
         """
@@ -25,7 +26,7 @@ def get_prerequisites(db_path: str, concept_id: str) -> list[dict]:
 
 def get_dependents(db_path: str, concept_id: str) -> list[dict]:
     """Get all concepts that depend on a given concept."""
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     conn.row_factory = sqlite3.Row
     rows = conn.execute(
         """
@@ -43,7 +44,7 @@ def get_dependents(db_path: str, concept_id: str) -> list[dict]:
 
 def get_lessons_for_concept(db_path: str, concept_id: str) -> list[dict]:
     """Get all lessons that teach, require, or reinforce a concept."""
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     conn.row_factory = sqlite3.Row
     rows = conn.execute(
         "SELECT lesson_id, role, depth FROM lesson_concepts WHERE concept_id = ?",
@@ -9,6 +9,7 @@ Usage:
 import json
 import os
 import sqlite3
+import database
 from pathlib import Path
 
 # ---------------------------------------------------------------------------
@@ -532,7 +533,7 @@ def main():
 
     # Open DB connection
     db_exists = os.path.exists(DB_PATH)
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
 
     if not db_exists:
         print(f"[WARN] Database not found at {DB_PATH}. Creating tables...")
@@ -3,11 +3,12 @@ graph/queries.py — Graph traversal: learning frontier, gap detection, recommen
 """
 
 import sqlite3
+import database
 
 
 def get_user_mastery_map(db_path: str, user_id: str) -> dict[str, float]:
     """Return {concept_id: mastery_level} for a user, including 0.0 for untouched concepts."""
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     conn.row_factory = sqlite3.Row
 
     all_concepts = conn.execute("SELECT id FROM concepts").fetchall()
@@ -39,7 +40,7 @@ def get_learning_frontier(db_path: str, user_id: str, limit: int = 5) -> list[di
     2. The concept itself has mastery < 0.5
     Sorted by: number of dependents (most impactful first)
     """
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     conn.row_factory = sqlite3.Row
 
     mastery_map = get_user_mastery_map(db_path, user_id)
@@ -88,7 +89,7 @@ def detect_knowledge_gaps(db_path: str, user_id: str, target_concept: str) -> li
     Find prerequisite concepts the user hasn't mastered yet for a target concept.
     Returns a list of gap concepts sorted by depth (deepest prereqs first).
     """
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     conn.row_factory = sqlite3.Row
 
     mastery_map = get_user_mastery_map(db_path, user_id)
@@ -128,7 +129,7 @@ def get_full_knowledge_map(db_path: str, user_id: str) -> dict:
     Return the full knowledge graph with user mastery overlaid.
     Used for the frontend KnowledgeMap visualization.
     """
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     conn.row_factory = sqlite3.Row
 
     mastery_map = get_user_mastery_map(db_path, user_id)
@@ -0,0 +1,209 @@
+"""
+http_cache.py — ETags, conditional GET and precompressed bodies for static content.
+
+Lessons, reference cards, trending categories and the legacy content modules
+only change between deploys, yet were re-serialised and sent in full on every
+request. Routes wrap such payloads in a PrecompressedBody — serialised once,
+hashed into a strong ETag and compressed once with gzip (and brotli when the
+optional `brotli` package is installed) — cached in a bounded in-memory LRU
+keyed by whatever identifies the content version (e.g. lesson file mtime).
+
+static_response() then answers a request from that body:
+    - If-None-Match matching the ETag  → 304 with no body
+    - Accept-Encoding br / gzip        → the precompressed variant
+    - otherwise                        → the identity bytes
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip-only when brotli is not installed
+    brotli = None
+
+STATIC_CACHE_CONTROL = os.getenv("STATIC_CACHE_CONTROL", "public, no-cache")
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+STATIC_CACHE_MAX_ENTRIES = int(os.getenv("STATIC_CACHE_MAX_ENTRIES", "2048"))
+# Bodies smaller than this are not worth a Content-Encoding round-trip
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "512"))
+
+_ENCODING_SUFFIX = {"br": "-br", "gzip": "-gz"}
+
+
+def dumps_json(payload) -> bytes:
+    """Serialise exactly like FastAPI's default JSONResponse."""
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+@dataclass(frozen=True)
+class PrecompressedBody:
+    """One serialised payload with its ETag and compressed variants."""
+
+    body: bytes
+    etag: str
+    gzip: Optional[bytes] = None
+    br: Optional[bytes] = None
+    media_type: str = "application/json"
+
+    @classmethod
+    def from_bytes(cls, body: bytes, media_type: str = "application/json",
+                   compress: bool = True) -> "PrecompressedBody":
+        gz = br = None
+        if compress and len(body) >= COMPRESS_MIN_BYTES:
+            gz = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                br = brotli.compress(body, quality=11)
+        return cls(body=body, etag=make_etag(body), gzip=gz, br=br, media_type=media_type)
+
+    @classmethod
+    def from_json(cls, payload) -> "PrecompressedBody":
+        return cls.from_bytes(dumps_json(payload))
+
+    def variant(self, encoding: Optional[str]) -> tuple[bytes, str]:
+        """(body, etag) for a content-coding chosen by negotiate()."""
+        data = getattr(self, encoding) if encoding else None
+        if data is None:
+            return self.body, self.etag
+        return data, self.etag[:-1] + _ENCODING_SUFFIX[encoding] + '"'
+
+
+class StaticResponseCache:
+    """Thread-safe LRU of PrecompressedBody objects keyed by content version."""
+
+    def __init__(self, max_entries: int = STATIC_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build: Callable[[], PrecompressedBody]) -> PrecompressedBody:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        # Built outside the lock; a concurrent duplicate build is harmless
+        entry = build()
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+static_cache = StaticResponseCache()
+
+
+# ---------------------------------------------------------------------------
+# Request handling
+# ---------------------------------------------------------------------------
+
+def _parse_accept_encoding(header: str) -> dict[str, float]:
+    prefs = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        prefs[token] = q
+    return prefs
+
+
+def negotiate(body: PrecompressedBody, accept_encoding: str) -> Optional[str]:
+    """Pick "br", "gzip" or None (identity) for this body and request."""
+    if not accept_encoding:
+        return None
+    prefs = _parse_accept_encoding(accept_encoding)
+    wildcard = prefs.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in ("br", "gzip"):
+        if getattr(body, encoding) is None:
+            continue
+        q = prefs.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of If-None-Match against the body's ETag (any coding)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        for suffix in _ENCODING_SUFFIX.values():
+            if candidate.endswith(suffix):
+                candidate = candidate[:-len(suffix)]
+                break
+        if candidate == opaque:
+            return True
+    return False
+
+
+def static_response(request: Request, body: PrecompressedBody,
+                    cache_control: str = STATIC_CACHE_CONTROL) -> Response:
+    """Serve a PrecompressedBody, honouring If-None-Match and Accept-Encoding."""
+    encoding = negotiate(body, request.headers.get("accept-encoding", ""))
+    data, etag = body.variant(encoding)
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+    if etag_matches(request.headers.get("if-none-match", ""), body.etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=data, media_type=body.media_type, headers=headers)
+
+
+def cached_json_response(request: Request, key, build: Callable[[], object],
+                         cache_control: str = STATIC_CACHE_CONTROL) -> Response:
+    """static_response() for a JSON payload built (once per key) by build()."""
+    body = static_cache.get_or_build(key, lambda: PrecompressedBody.from_json(build()))
+    return static_response(request, body, cache_control)
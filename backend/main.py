@@ -1,8 +1,7 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List
-import sqlite3
 import uvicorn
 from contextlib import asynccontextmanager
 import time
@@ -16,6 +15,9 @@ import requests
 from dotenv import load_dotenv
 load_dotenv()
 DB_PATH = os.getenv("DB_PATH", os.path.abspath("pymasters.db"))
+import database
+from vaathiyaar.profile_cache import invalidate_profile
+from http_cache import cached_json_response
 
 # --- Route imports ---
 from routes.language import router as language_router
@@ -86,7 +88,7 @@ CONTENT_MAP = {
 
 def init_db():
     print(f"Initializing Database at: {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     try:
         cursor = conn.cursor()
 
@@ -184,6 +186,7 @@ def init_db():
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_signals_user_time ON learning_signals(user_id, created_at DESC)")
 
         # Create user_mastery table
         cursor.execute("""
@@ -322,6 +325,7 @@ def init_db():
                 PRIMARY KEY (user_id, lesson_id)
             )
         """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_completions_user_time ON lesson_completions(user_id, completed_at DESC)")
 
         # ── Knowledge Graph tables ────────────────────────────────────
         cursor.execute("""
@@ -552,6 +556,9 @@ def init_db():
                 [str(uuid.uuid4()), "admin", hashed, "Administrator", json.dumps(["module_1"]), "en", 0]
             )
 
+        # Seeders borrow their own pooled connection — release our write lock first
+        conn.commit()
+
         # Seed knowledge graph concepts
         try:
             from graph.concepts import seed_concepts
@@ -577,8 +584,23 @@ def init_db():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     import threading
-    t = threading.Thread(target=init_db, daemon=True)
+    from content.lesson_catalog import get_catalog
+    from vaathiyaar.interpreter_pool import get_pool
+    from task_queue import task_queue
+
+    def init_db_then_drain_tasks():
+        init_db()
+        # Side effects queued before a restart are applied once the schema is ready
+        task_queue.start()
+
+    t = threading.Thread(target=init_db_then_drain_tasks, daemon=True)
     t.start()
+    # Index the lesson library once, off the event loop
+    threading.Thread(target=get_catalog, daemon=True).start()
+    # Start the warm code-execution interpreters before the first Run
+    pool = get_pool()
+    if pool is not None:
+        threading.Thread(target=pool.warm, daemon=True).start()
     yield
 
 app = FastAPI(title="PyMasters API", lifespan=lifespan)
@@ -645,10 +667,22 @@ def hash_pw(password: str) -> str:
 def read_root():
     return {"status": "online", "message": "PyMasters Backend is running"}
 
+@app.get("/api/status/llm")
+async def llm_status():
+    """Model routing (per-tier latency, tokens, breakers and hedging), limiter and call coalescing."""
+    from vaathiyaar.concurrency import llm_limiter
+    from vaathiyaar.engine import model_router
+    from vaathiyaar.single_flight import llm_flights
+    return {
+        "routing": model_router.stats(),
+        "limiter": llm_limiter.stats(),
+        "single_flight": llm_flights.stats(),
+    }
+
 @app.post("/api/auth/register")
 def register(user: UserRegister):
     print(f"Register request for: {user.username}")
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     try:
         cursor = conn.cursor()
         cursor.execute("SELECT id FROM users WHERE username = ?", [user.username])
@@ -674,7 +708,7 @@ def register(user: UserRegister):
 @app.post("/api/auth/login")
 def login(user: UserLogin):
     print(f"Login request for: {user.username}")
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     try:
         cursor = conn.cursor()
         hashed = hash_pw(user.password)
@@ -722,8 +756,12 @@ def login(user: UserLogin):
         conn.close()
 
 @app.get("/api/content/modules")
-def get_modules():
+def get_modules(request: Request):
     """Return all available modules (lightweight metadata)."""
+    return cached_json_response(request, ("content", "modules"), _modules_payload)
+
+
+def _modules_payload() -> list:
     return [
         {
             "id": k, 
@@ -749,7 +787,7 @@ def complete_module(sub: QuizSubmission):
 
     module = CONTENT_MAP[sub.module_id]
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     try:
         cursor = conn.cursor()
         # Get current state
@@ -792,6 +830,7 @@ def complete_module(sub: QuizSubmission):
             )
 
         conn.commit()
+        invalidate_profile(sub.user_id)
 
         return {
             "success": True,
@@ -807,7 +846,7 @@ def complete_module(sub: QuizSubmission):
 @app.get("/api/content/completions/{user_id}")
 def get_completions(user_id: str):
     """Return all completed lesson/module IDs for a user."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     try:
         rows = conn.execute(
             "SELECT lesson_id, completed_at, xp_awarded FROM lesson_completions WHERE user_id = ? ORDER BY completed_at DESC",
@@ -3,9 +3,9 @@
 import json
 import re
 import uuid
-import sqlite3
 import os
 from datetime import datetime
+import database
 from vaathiyaar.engine import call_vaathiyaar
 from vaathiyaar.profiler import get_student_profile
 from modules.templates import CONCEPT_TEMPLATES, get_template_for_topic
@@ -17,7 +17,7 @@ def _get_db_path():
 
 
 def _update_job_status(job_id, status, stage_data=None, error=None):
-    conn = sqlite3.connect(_get_db_path())
+    conn = database.connect(_get_db_path())
     conn.execute(
         "UPDATE module_generation_jobs SET status = ?, current_stage_data = ?, error_message = ?, updated_at = ? WHERE id = ?",
         [status, json.dumps(stage_data) if stage_data else None, error, datetime.utcnow().isoformat(), job_id],
@@ -399,7 +399,7 @@ def stage_5_assembly(job_id, user_id, topic, outline, narrative, animation, chal
     }
 
     db_path = _get_db_path()
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         # Fetch trigger info from the job row so we can store it alongside the lesson
         job_row = conn.execute(
@@ -5,7 +5,7 @@ Analyzes learning signals to detect:
 - Interest signals (3+ chat questions about a topic)
 """
 
-import sqlite3
+import database
 import json
 import uuid
 import os
@@ -27,7 +27,7 @@ def _run_pipeline_safe(job_id: str, user_id: int, topic: str):
 
 def check_triggers(user_id: int, signal_type: str, topic: str, value: dict) -> dict:
     """Check if a learning signal should trigger module generation."""
-    conn = sqlite3.connect(_get_db_path())
+    conn = database.connect(_get_db_path())
 
     # Check for existing job
     existing = conn.execute(
@@ -1,4 +1,5 @@
 import sqlite3
+import database
 import json
 import os
 from datetime import datetime
@@ -17,7 +18,7 @@ def create_notification(
     metadata: dict = None,
 ) -> int:
     """Create an in-app notification and queue external deliveries."""
-    conn = sqlite3.connect(_get_db_path())
+    conn = database.connect(_get_db_path())
     cursor = conn.execute(
         """INSERT INTO notifications (user_id, type, title, message, link, metadata)
            VALUES (?, ?, ?, ?, ?, ?)""",
@@ -68,7 +69,7 @@ from notifications.whatsapp_sender import send_whatsapp, build_whatsapp_message
 
 def process_pending_deliveries():
     """Process all pending notification deliveries (email/whatsapp)."""
-    conn = sqlite3.connect(_get_db_path())
+    conn = database.connect(_get_db_path())
     conn.row_factory = sqlite3.Row
 
     pending = conn.execute(
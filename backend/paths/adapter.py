@@ -4,8 +4,11 @@ Decisions: SKIP, INSERT, REORDER, BRANCH, GENERATE
 """
 import os
 import sqlite3
+import database
 import json
 
+from vaathiyaar.profile_cache import invalidate_profile
+
 DB_PATH = os.getenv("DB_PATH", os.path.abspath("pymasters.db"))
 
 
@@ -16,7 +19,7 @@ def adapt_path(user_id: str, completed_lesson_id: str):
 
     Returns dict with any changes made.
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
 
     # Get active path
@@ -142,4 +145,5 @@ def adapt_path(user_id: str, completed_lesson_id: str):
 
     conn.commit()
     conn.close()
+    invalidate_profile(user_id)
     return {"changes": changes, "path_id": path_id}
@@ -6,7 +6,7 @@ Call ``seed_paths(db_path)`` at startup to populate the table (INSERT OR IGNORE)
 """
 
 import json
-import sqlite3
+import database
 
 # ── Helper to build the tuple expected by the INSERT statement ───────────
 
@@ -366,8 +366,7 @@ PATH_DEFINITIONS = [
 
 def seed_paths(db_path: str):
     """Insert all 15 path definitions into learning_paths (idempotent)."""
-    conn = sqlite3.connect(db_path)
-    conn.execute("PRAGMA journal_mode=WAL")
+    conn = database.connect(db_path)
     cursor = conn.cursor()
     for p in PATH_DEFINITIONS:
         cursor.execute(
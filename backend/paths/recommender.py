@@ -3,6 +3,7 @@ Path recommendation based on user's onboarding profile.
 """
 import os
 import sqlite3
+import database
 
 DB_PATH = os.getenv("DB_PATH", os.path.abspath("pymasters.db"))
 
@@ -26,7 +27,7 @@ GOAL_TO_PATH = {
 
 def recommend_path(user_id: str) -> dict | None:
     """Recommend a learning path based on user's onboarding profile."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
 
     profile = conn.execute(
@@ -8,13 +8,17 @@ solution submission, and a leaderboard of top completions.
 """
 
 import os
-import sqlite3
+import database
 import datetime
 from typing import List, Optional
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
+from vaathiyaar.batch_runner import entry_point_for, run_test_cases
+from vaathiyaar.execution_queue import ExecutionBusyError
+from vaathiyaar.profile_cache import invalidate_profile
+
 router = APIRouter(prefix="/api/challenges", tags=["challenges"])
 
 
@@ -56,7 +60,7 @@ def _get_db_path() -> str:
 
 def _ensure_challenges_table(db_path: str):
     """Create the challenge_submissions table if it does not exist."""
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         conn.execute("""
             CREATE TABLE IF NOT EXISTS challenge_submissions (
@@ -561,7 +565,7 @@ def submit_solution(req: SubmitSolutionRequest):
     db_path = _get_db_path()
     _ensure_challenges_table(db_path)
 
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         cursor = conn.cursor()
 
@@ -571,19 +575,35 @@ def submit_solution(req: SubmitSolutionRequest):
             [req.user_id, req.challenge_id],
         )
         existing = cursor.fetchone()
+    finally:
+        conn.close()
 
-        if existing and existing[1] == 1:
-            return {
-                "status": "already_completed",
-                "message": "You have already completed this challenge.",
-                "xp_awarded": 0,
-            }
-
-        # For now, mark as passed (actual code execution/validation
-        # would be handled by a sandboxed runner in production).
-        passed = 1
-        xp = challenge["xp_reward"] if passed else 0
+    if existing and existing[1] == 1:
+        return {
+            "status": "already_completed",
+            "message": "You have already completed this challenge.",
+            "xp_awarded": 0,
+        }
 
+    # Load the solution once and run every test case against it (no DB
+    # connection is held while student code runs)
+    try:
+        test_run = run_test_cases(
+            req.code,
+            challenge.get("test_cases", []),
+            entry_point=entry_point_for(challenge.get("starter_code", "")),
+            user_id=req.user_id,
+        )
+    except ExecutionBusyError as exc:
+        raise HTTPException(status_code=429, detail=str(exc),
+                            headers={"Retry-After": str(exc.retry_after)})
+    # Challenges without gradable test cases are accepted as before
+    passed = 1 if test_run["passed"] or test_run["total"] == 0 else 0
+    xp = challenge["xp_reward"] if passed else 0
+
+    conn = database.connect(db_path)
+    try:
+        cursor = conn.cursor()
         if existing:
             cursor.execute(
                 "UPDATE challenge_submissions SET code = ?, passed = ?, xp_awarded = ?, submitted_at = datetime('now') "
@@ -605,15 +625,22 @@ def submit_solution(req: SubmitSolutionRequest):
             )
 
         conn.commit()
-
-        return {
-            "status": "passed" if passed else "failed",
-            "message": "Challenge completed! XP awarded." if passed else "Some test cases failed.",
-            "xp_awarded": xp,
-            "challenge_id": req.challenge_id,
-        }
     finally:
         conn.close()
+    if passed:
+        invalidate_profile(req.user_id)
+
+    return {
+        "status": "passed" if passed else "failed",
+        "message": "Challenge completed! XP awarded." if passed else "Some test cases failed.",
+        "xp_awarded": xp,
+        "challenge_id": req.challenge_id,
+        "passed_count": test_run["passed_count"],
+        "total": test_run["total"],
+        "load_error": test_run["load_error"],
+        "results": test_run["results"],
+        "time_ms": test_run["time_ms"],
+    }
 
 
 @router.get("/leaderboard")
@@ -622,7 +649,7 @@ def get_leaderboard(limit: int = 20):
     db_path = _get_db_path()
     _ensure_challenges_table(db_path)
 
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         cursor = conn.cursor()
         cursor.execute("""
@@ -7,25 +7,44 @@ Prefix: /api/classroom
 import json
 import os
 import sqlite3
-from pathlib import Path
-from typing import Optional
-
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import StreamingResponse
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
-from vaathiyaar.engine import call_vaathiyaar, evaluate_code, get_ollama_client, OLLAMA_MODEL
+import database
+from sse import sse_response
+from task_queue import task_queue
+from vaathiyaar.concurrency import VaathiyaarBusyError
+from vaathiyaar.llm_client import VaathiyaarUnavailableError
+from vaathiyaar.engine import (
+    acall_vaathiyaar, astream_vaathiyaar, evaluate_code, evaluation_feedback, evaluation_response,
+    complete_vaathiyaar_response, fallback_feedback, feedback_kind, feedback_prompt, run_evaluation,
+)
+from vaathiyaar.execution_queue import ExecutionBusyError
 from vaathiyaar.modelfile import build_system_prompt
-from vaathiyaar.profiler import get_student_profile, record_signal, update_mastery
+from vaathiyaar.profiler import get_profile_snapshot, get_student_profile, record_signal, update_mastery
+from vaathiyaar.profile_cache import invalidate_profile
+from vaathiyaar.stage_timing import StageTimer, evaluate_latency
+from vaathiyaar.stream_parser import ResponseStreamParser
 from vaathiyaar.training_data import record_training_pair
 from modules.trigger_engine import check_triggers
 from paths.adapter import adapt_path
+from content.lesson_catalog import LESSONS_DIR, get_catalog
+from content.lesson_bundle import BundledLesson, get_bundle
+from content.lesson_ordering import get_ordered_listing, profile_hint
+from http_cache import (
+    PRIVATE_CACHE_CONTROL, PrecompressedBody, dumps_json, static_cache, static_response,
+)
 
 router = APIRouter(prefix="/api/classroom", tags=["classroom"])
 
-# Directory where lesson JSON files live (created by Task 5)
-LESSONS_DIR = Path(__file__).parent.parent / "lessons"
-
 # Speed multiplier map keyed on skill_level
 SPEED_MULTIPLIER = {
     "beginner": 1.5,
@@ -79,6 +98,10 @@ class EvaluateRequest(BaseModel):
     expected_output: Optional[str] = ""
     lesson_id: Optional[str] = None
     topic: Optional[str] = None
+    # "inline": wait for Vaathiyaar's feedback; "defer": return the result at
+    # once with a feedback_stream URL to stream it from; "none": no feedback
+    feedback: Literal["inline", "defer", "none"] = "inline"
+    debug: bool = False  # include per-stage timings in the response body
 
 
 class DiagnosticRequest(BaseModel):
@@ -95,25 +118,61 @@ def _get_db_path() -> str:
     return os.getenv("DB_PATH", os.path.abspath("pymasters.db"))
 
 
+def _bundled_lesson(lesson_id: str) -> BundledLesson | None:
+    """Lesson bytes from the compiled bundle, if built and current for this file."""
+    bundle = get_bundle()
+    if bundle is None:
+        return None
+    entry = get_catalog().get(lesson_id)
+    if entry is None:
+        return None
+    return bundle.get(lesson_id, size=entry.size, mtime_ns=entry.mtime_ns)
+
+
+def _personalize_bundled(bundled: BundledLesson, profile: dict) -> bytes:
+    """
+    Byte-level equivalent of get_lesson's personalisation for lessons without
+    adaptation_points: append active_story / active_title / speed_multiplier
+    to the pre-serialised lesson using the bundle's variant spans.
+    """
+    preferred_lang = profile.get("preferred_language") or "en"
+    skill_level = profile.get("skill_level") or "beginner"
+
+    extra = []
+    if isinstance(bundled.spans.get("story_variants"), dict):
+        story = (bundled.variant("story_variants", preferred_lang)
+                 or bundled.variant("story_variants", "en"))
+        if story is not None:
+            extra.append(b'"active_story":' + story)
+
+    if isinstance(bundled.spans.get("title"), dict):
+        title = (bundled.variant("title", preferred_lang)
+                 or bundled.variant("title", "en")
+                 or b'""')
+    else:
+        title = bundled.variant("title", preferred_lang) or b'""'
+    extra.append(b'"active_title":' + title)
+    extra.append(b'"speed_multiplier":' + json.dumps(SPEED_MULTIPLIER.get(skill_level, 1.0)).encode())
+
+    body = bundled.data[:-1]
+    separator = b"," if len(body) > 1 else b""
+    return body + separator + b",".join(extra) + b"}"
+
+
 def _load_lesson_from_dir(lesson_id: str, lessons_dir: str = None) -> dict | None:
-    """Load a lesson by ID, searching across all track subdirectories."""
-    base = Path(lessons_dir) if lessons_dir else LESSONS_DIR
-    # Search track subdirectories
-    for track_dir in sorted(base.iterdir()):
-        if track_dir.is_dir():
-            lesson_file = track_dir / f"{lesson_id}.json"
-            if lesson_file.exists():
-                with open(lesson_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-    # Fallback: check root directory (backward compat)
-    root_file = base / f"{lesson_id}.json"
-    if root_file.exists():
-        with open(root_file, "r", encoding="utf-8") as f:
-            return json.load(f)
+    """Load a lesson by ID via the lesson catalog, falling back to generated lessons."""
+    if lessons_dir is None:
+        bundled = _bundled_lesson(lesson_id)
+        if bundled is not None:
+            return json.loads(bundled.data)
+
+    lesson = get_catalog(lessons_dir or LESSONS_DIR).load(lesson_id)
+    if lesson is not None:
+        return lesson
 
     # Check generated lessons in database
     try:
-        conn = sqlite3.connect(_get_db_path())
+        conn = database.connect(_get_db_path())
         row = conn.execute(
             "SELECT lesson_data FROM generated_lessons WHERE id = ?", [lesson_id]
         ).fetchone()
@@ -127,55 +186,37 @@ def _load_lesson_from_dir(lesson_id: str, lessons_dir: str = None) -> dict | Non
 
 def _list_all_lessons(lessons_dir: str = None, user_id: str = None) -> list[dict]:
     """List all lessons across all track subdirectories."""
-    base = Path(lessons_dir) if lessons_dir else LESSONS_DIR
-    lessons = []
-    for track_dir in sorted(base.iterdir()):
-        if track_dir.is_dir() and track_dir.name != "__pycache__":
-            for lesson_file in sorted(track_dir.glob("*.json")):
-                if lesson_file.name == "schema.json":
-                    continue
-                try:
-                    with open(lesson_file, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                        lessons.append({
-                            "id": data.get("id", lesson_file.stem),
-                            "title": data.get("title", {}),
-                            "description": data.get("description", {}),
-                            "xp_reward": data.get("xp_reward"),
-                            "topic": data.get("topic"),
-                            "track": data.get("track"),
-                            "module": data.get("module"),
-                            "order": data.get("order", 0),
-                        })
-                except Exception as e:
-                    print(f"Warning: Failed to load lesson {lesson_file}: {e}")
-                    continue
-
-    # Generated lessons from database
+    lessons = get_catalog(lessons_dir or LESSONS_DIR).listing()
     if user_id:
-        try:
-            conn = sqlite3.connect(_get_db_path())
-            conn.row_factory = sqlite3.Row
-            rows = conn.execute(
-                "SELECT lesson_data FROM generated_lessons WHERE user_id = ?", [user_id]
-            ).fetchall()
-            conn.close()
-            for row in rows:
-                data = json.loads(row["lesson_data"])
-                lessons.append({
-                    "id": data.get("id"),
-                    "title": data.get("title", {}),
-                    "description": data.get("description", {}),
-                    "xp_reward": data.get("xp_reward", 50),
-                    "topic": data.get("topic"),
-                    "track": "generated",
-                    "module": data.get("module"),
-                    "order": 0,
-                    "generated": True,
-                })
-        except Exception:
-            pass
+        lessons.extend(_generated_lesson_summaries(user_id))
+    return lessons
+
 
+def _generated_lesson_summaries(user_id: str) -> list[dict]:
+    """Listing entries for the user's generated lessons from the database."""
+    lessons = []
+    try:
+        conn = database.connect(_get_db_path())
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            "SELECT lesson_data FROM generated_lessons WHERE user_id = ?", [user_id]
+        ).fetchall()
+        conn.close()
+        for row in rows:
+            data = json.loads(row["lesson_data"])
+            lessons.append({
+                "id": data.get("id"),
+                "title": data.get("title", {}),
+                "description": data.get("description", {}),
+                "xp_reward": data.get("xp_reward", 50),
+                "topic": data.get("topic"),
+                "track": "generated",
+                "module": data.get("module"),
+                "order": 0,
+                "generated": True,
+            })
+    except Exception:
+        pass
     return lessons
 
 
@@ -184,21 +225,13 @@ def _list_all_lessons(lessons_dir: str = None, user_id: str = None) -> list[dict
 # ---------------------------------------------------------------------------
 
 @router.post("/chat")
-def chat(request: ChatRequest):
+async def chat(request: ChatRequest):
     """
     Send a message to Vaathiyaar within a lesson context.
     Auto-records profile_update signal if the AI response includes one.
     """
     db_path = _get_db_path()
-    profile = get_student_profile(db_path, request.user_id)
-    if request.username and profile is not None:
-        profile["username"] = request.username
-
-    lesson_context = request.lesson_context or {}
-    if request.phase:
-        lesson_context["phase"] = request.phase
-    if request.language:
-        lesson_context["language"] = request.language
+    profile, lesson_context = await run_in_threadpool(_chat_context, db_path, request)
 
     history_context = ""
     if request.history:
@@ -209,14 +242,48 @@ def chat(request: ChatRequest):
         ) + "\n\n"
 
     try:
-        response = call_vaathiyaar(
+        response, cached = await acall_vaathiyaar(
             user_message=history_context + request.message,
             student_profile=profile,
             lesson_context=lesson_context,
+            user_id=request.user_id,
+            # Stand-alone questions are shared across students; follow-ups are not
+            cache=not request.history,
+            kind="chat",
+            return_cached=True,
         )
+    except VaathiyaarBusyError as exc:
+        raise HTTPException(status_code=429, detail=str(exc))
+    except VaathiyaarUnavailableError as exc:
+        # Breaker open or deadline passed: tell the client when to retry
+        raise HTTPException(status_code=503, detail=str(exc),
+                            headers={"Retry-After": str(max(1, exc.retry_after))})
     except Exception as exc:
         raise HTTPException(status_code=502, detail=f"Vaathiyaar AI error: {exc}")
 
+    if not cached:
+        # A cached answer was another student's turn: nothing to learn from or signal
+        await run_in_threadpool(_record_chat_turn, db_path, request, response, profile, lesson_context)
+    return response
+
+
+def _chat_context(db_path: str, request: ChatRequest) -> tuple[Optional[dict], dict]:
+    """Student profile and lesson context for a classroom chat turn."""
+    profile = get_student_profile(db_path, request.user_id)
+    if request.username and profile is not None:
+        profile["username"] = request.username
+
+    lesson_context = request.lesson_context or {}
+    if request.phase:
+        lesson_context["phase"] = request.phase
+    if request.language:
+        lesson_context["language"] = request.language
+    return profile, lesson_context
+
+
+def _record_chat_turn(db_path: str, request: ChatRequest, response: dict,
+                      profile: Optional[dict], lesson_context: dict):
+    """Training pair + profile_update signal for a completed chat turn (best effort)."""
     # Record interaction for future fine-tuning
     try:
         record_training_pair(
@@ -243,70 +310,48 @@ def chat(request: ChatRequest):
         except Exception:
             pass  # Best-effort; don't fail the request
 
-    return response
-
 
 @router.post("/chat/stream")
-def chat_stream(request: ChatRequest):
-    """Stream Vaathiyaar's response token by token using SSE."""
+async def chat_stream(request: ChatRequest):
+    """Stream Vaathiyaar's response as it is generated, using SSE (see sse.py)."""
     db_path = _get_db_path()
-    profile = get_student_profile(db_path, request.user_id)
-    if request.username and profile is not None:
-        profile["username"] = request.username
-
-    lesson_context = request.lesson_context or {}
-    if request.phase:
-        lesson_context["phase"] = request.phase
-    if request.language:
-        lesson_context["language"] = request.language
+    profile, lesson_context = await run_in_threadpool(_chat_context, db_path, request)
 
     system_prompt = build_system_prompt(profile, lesson_context)
-    client = get_ollama_client()
-
-    def generate():
-        full_response = ""
+    messages = [
+        {"role": "system", "content": system_prompt},
+        *([{"role": m.get("role", "user"), "content": m.get("content", "")} for m in (request.history or [])[-5:]]),
+        {"role": "user", "content": request.message},
+    ]
+
+    async def generate():
+        # Vaathiyaar returns JSON with message, phase, animation, etc.: stream
+        # the message text as it arrives and each other field once it closes
+        parser = ResponseStreamParser()
         try:
-            for chunk in client.chat(
-                model=OLLAMA_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    *([{"role": m.get("role", "user"), "content": m.get("content", "")} for m in (request.history or [])[-5:]]),
-                    {"role": "user", "content": request.message},
-                ],
-                stream=True,
-            ):
-                token = chunk.get("message", {}).get("content", "")
-                if token:
-                    full_response += token
-                    yield f"data: {json.dumps({'token': token})}\n\n"
-
-            # Parse the full response — extract just the message field
-            # Vaathiyaar returns JSON with message, phase, animation, etc.
-            clean_message = full_response
-            parsed_response = None
-            try:
-                # Strip markdown code fences if present
-                cleaned = full_response.strip()
-                if cleaned.startswith("```json"):
-                    cleaned = cleaned[7:]
-                elif cleaned.startswith("```"):
-                    cleaned = cleaned[3:]
-                if cleaned.endswith("```"):
-                    cleaned = cleaned[:-3]
-                cleaned = cleaned.strip()
-
-                parsed_response = json.loads(cleaned)
-                if isinstance(parsed_response, dict) and "message" in parsed_response:
-                    clean_message = parsed_response["message"]
-            except (json.JSONDecodeError, KeyError):
+            async for token in astream_vaathiyaar(messages, user_id=request.user_id):
+                for event in parser.feed(token):
+                    yield event
+
+            full_response = parser.text
+            parsed_response = parser.result()
+            if parsed_response is not None and "message" in parsed_response:
+                clean_message = parsed_response["message"]
+            else:
                 # If not valid JSON, use the raw text as the message
                 clean_message = full_response
 
-            yield f"data: {json.dumps({'done': True, 'message': clean_message, 'phase': parsed_response.get('phase') if parsed_response else 'chat', 'full_response': full_response})}\n\n"
+            yield {
+                "done": True,
+                "message": clean_message,
+                "phase": parsed_response.get("phase") if parsed_response else "chat",
+                "full_response": full_response,
+            }
 
             # Record training data (best effort)
             try:
-                record_training_pair(
+                await run_in_threadpool(
+                    record_training_pair,
                     db_path=db_path,
                     user_message=request.message,
                     vaathiyaar_response=parsed_response or {"message": full_response},
@@ -316,9 +361,9 @@ def chat_stream(request: ChatRequest):
             except Exception:
                 pass
         except Exception as exc:
-            yield f"data: {json.dumps({'error': str(exc)})}\n\n"
+            yield {"error": str(exc)}
 
-    return StreamingResponse(generate(), media_type="text/event-stream")
+    return sse_response(generate())
 
 
 @router.get("/lessons")
@@ -336,203 +381,87 @@ async def list_lessons(user_id: str = None):
     - beginner    → only beginner-friendly tracks shown as recommended
     - intermediate → most tracks visible
     - advanced    → everything visible
+
+    The static part of the ordering is precomputed per (skill level,
+    motivation bucket) in content.lesson_ordering; per request only the
+    student's generated lessons and active path are merged in.
     """
     if not LESSONS_DIR.exists():
         return {"lessons": []}
 
     try:
-        lessons = _list_all_lessons(user_id=user_id)
-
         if user_id:
             try:
-                conn = sqlite3.connect(_get_db_path())
-                conn.row_factory = sqlite3.Row
-                profile = conn.execute(
-                    "SELECT skill_level, goal, motivation FROM user_profiles WHERE user_id = ?",
-                    [user_id],
-                ).fetchone()
-                conn.close()
-
+                profile = get_profile_snapshot(_get_db_path(), user_id)
                 if profile:
-                    skill_level = profile["skill_level"] or "beginner"
-                    goal = profile["goal"] or ""
-                    motivation = profile["motivation"] or ""
-
-                    # Parse comma-separated multi-select values
-                    goals = set(g.strip() for g in goal.split(",") if g.strip())
-                    motivations = set(m.strip() for m in motivation.split(",") if m.strip())
-
-                    # ── Determine primary track order based on motivation + goal ──
-
-                    # Check if user is hobby/fun/automation oriented
-                    is_hobby = bool(
-                        motivations & {"hobby"}
-                        or goals & {"automation", "games"}
-                    )
-                    # Check if user is AI/ML/Data Science oriented
-                    is_ai_ml = bool(
-                        motivations & {"ai_ml", "data_science"}
-                        or goals & {"ai_ml", "data_science"}
-                    )
-                    # Check if user is career/work oriented
-                    is_career = bool(
-                        motivations & {"career_switch", "work"}
-                        or goals & {"web"}
-                    )
-
-                    # Build prioritized track list based on profile
-                    if is_hobby:
-                        # Fun/automation users see fun_automation first, then fundamentals
-                        primary_tracks = ["fun_automation", "python_fundamentals", "python_modern"]
-                        secondary_tracks = ["python_intermediate", "ai_ml_foundations", "deep_learning",
-                                            "web_development", "dsa", "ai_fundamentals",
-                                            "machine_learning", "deep_learning_complete", "testing_devops",
-                                            "ai_agents", "ai_engineering"]
-                    elif is_ai_ml:
-                        # AI/ML users see fundamentals → AI Agents → AI Engineering → Deep Learning
-                        primary_tracks = ["python_fundamentals", "ai_agents", "ai_engineering",
-                                          "ai_ml_foundations", "ai_fundamentals",
-                                          "machine_learning", "deep_learning", "deep_learning_complete"]
-                        secondary_tracks = ["python_intermediate", "python_modern", "fun_automation",
-                                            "web_development", "dsa", "testing_devops"]
-                    elif is_career:
-                        # Career-focused: solid fundamentals first, then modern Python + AI
-                        primary_tracks = ["python_fundamentals", "python_intermediate",
-                                          "python_modern", "web_development"]
-                        secondary_tracks = ["ai_agents", "ai_engineering", "fun_automation",
-                                            "ai_ml_foundations", "deep_learning",
-                                            "dsa", "ai_fundamentals", "machine_learning",
-                                            "deep_learning_complete", "testing_devops"]
-                    else:
-                        # Student / unknown: balanced view — fundamentals first, new tracks visible
-                        primary_tracks = ["python_fundamentals", "python_intermediate",
-                                          "python_modern", "fun_automation"]
-                        secondary_tracks = ["ai_agents", "ai_engineering", "ai_ml_foundations",
-                                            "deep_learning", "web_development",
-                                            "dsa", "ai_fundamentals", "machine_learning",
-                                            "deep_learning_complete", "testing_devops"]
-
-                    # ── Apply skill level visibility filter ──
-
-                    skill_visible = {
-                        "beginner": {"python_fundamentals", "fun_automation"},
-                        "intermediate": {"python_fundamentals", "fun_automation", "python_intermediate",
-                                         "ai_ml_foundations", "web_development", "dsa", "testing_devops",
-                                         "python_modern"},
-                        "advanced": {"python_fundamentals", "fun_automation", "python_intermediate",
-                                     "ai_ml_foundations", "deep_learning", "web_development", "dsa",
-                                     "ai_fundamentals", "machine_learning", "deep_learning_complete",
-                                     "testing_devops", "ai_agents", "python_modern", "ai_engineering"},
-                    }
-                    visible_tracks = skill_visible.get(skill_level, {"python_fundamentals", "fun_automation"})
-
-                    # Always add primary tracks to visible (so hobby beginners see fun_automation)
-                    for t in primary_tracks:
-                        visible_tracks.add(t)
-
-                    # ── Mark recommended / locked ──
-
-                    for lesson in lessons:
-                        track = lesson.get("track", "")
-                        if track in visible_tracks or track == "generated":
-                            lesson["recommended"] = True
-                        else:
-                            lesson["recommended"] = False
-
-                    # Guarantee at least 3 recommended lessons
-                    MIN_RECOMMENDED = 3
-                    recommended_count = sum(1 for l in lessons if l.get("recommended"))
-                    if recommended_count < MIN_RECOMMENDED:
-                        all_tracks_fallback = primary_tracks + secondary_tracks
-                        for fallback_track in all_tracks_fallback:
-                            if recommended_count >= MIN_RECOMMENDED:
-                                break
-                            for lesson in lessons:
-                                if recommended_count >= MIN_RECOMMENDED:
-                                    break
-                                if lesson.get("track") == fallback_track and not lesson.get("recommended"):
-                                    lesson["recommended"] = True
-                                    recommended_count += 1
-
-                    # ── Sort: recommended first, primary tracks first, then order ──
-
-                    all_ordered_tracks = primary_tracks + secondary_tracks + ["generated"]
-                    track_priority = {t: i for i, t in enumerate(all_ordered_tracks)}
-
-                    lessons.sort(key=lambda l: (
-                        0 if l.get("recommended") else 1,
-                        track_priority.get(l.get("track", ""), 99),
-                        l.get("order", 0),
-                    ))
-
-                    # ── Add profile_hint for frontend personalization ──
-                    profile_hint = "general"
-                    if is_hobby:
-                        profile_hint = "hobby"
-                    elif is_ai_ml:
-                        profile_hint = "ai_ml"
-                    elif is_career:
-                        profile_hint = "career"
-
-                    # ── Fetch active learning path info ──
-                    path_info = {}
-                    try:
-                        path_conn = sqlite3.connect(_get_db_path())
-                        path_conn.row_factory = sqlite3.Row
-                        active_path_row = path_conn.execute(
-                            """SELECT ulp.path_id, ulp.current_position, ulp.adapted_sequence,
-                                      lp.lesson_sequence, lp.name as path_name
-                               FROM user_learning_paths ulp
-                               JOIN learning_paths lp ON ulp.path_id = lp.id
-                               WHERE ulp.user_id = ? AND ulp.status = 'active'
-                               ORDER BY ulp.last_activity DESC LIMIT 1""",
-                            [user_id],
-                        ).fetchone()
-                        if active_path_row:
-                            seq = json.loads(active_path_row["adapted_sequence"]) if active_path_row["adapted_sequence"] else json.loads(active_path_row["lesson_sequence"])
-                            pos = active_path_row["current_position"] or 0
-                            next_lesson = seq[pos] if pos < len(seq) else None
-                            # Count completed lessons in path
-                            if seq:
-                                placeholders = ",".join("?" * len(seq))
-                                done_count = path_conn.execute(
-                                    f"SELECT COUNT(*) as cnt FROM lesson_completions WHERE user_id = ? AND lesson_id IN ({placeholders})",
-                                    [user_id] + seq,
-                                ).fetchone()["cnt"]
-                            else:
-                                done_count = 0
-                            path_info = {
-                                "active_path": active_path_row["path_id"],
-                                "active_path_name": active_path_row["path_name"],
-                                "next_in_path": next_lesson,
-                                "path_progress": {
-                                    "current_position": pos,
-                                    "total": len(seq),
-                                    "completed": done_count,
-                                    "pct": round(done_count / len(seq) * 100, 1) if seq else 0,
-                                },
-                            }
-                        path_conn.close()
-                    except Exception:
-                        pass
+                    skill_level = profile.skill_level or "beginner"
+                    hint = profile_hint(profile.goal, profile.motivation)
+                    ordered = get_ordered_listing(get_catalog(), skill_level, hint)
+                    lessons = ordered.merge(_generated_lesson_summaries(user_id))
 
                     return {
                         "lessons": lessons,
-                        "profile_hint": profile_hint,
-                        "primary_tracks": primary_tracks,
-                        **path_info,
+                        "profile_hint": hint,
+                        "primary_tracks": list(ordered.primary_tracks),
+                        **_active_path_info(user_id),
                     }
             except Exception as e:
                 print(f"Profile lookup failed: {e}")
 
-        return {"lessons": lessons}
+        return {"lessons": _list_all_lessons(user_id=user_id)}
     except Exception:
         return {"lessons": []}
 
 
+def _active_path_info(user_id: str) -> dict:
+    """Active learning path summary merged into the personalised listing."""
+    path_info = {}
+    try:
+        path_conn = database.connect(_get_db_path())
+        path_conn.row_factory = sqlite3.Row
+        active_path_row = path_conn.execute(
+            """SELECT ulp.path_id, ulp.current_position, ulp.adapted_sequence,
+                      lp.lesson_sequence, lp.name as path_name
+               FROM user_learning_paths ulp
+               JOIN learning_paths lp ON ulp.path_id = lp.id
+               WHERE ulp.user_id = ? AND ulp.status = 'active'
+               ORDER BY ulp.last_activity DESC LIMIT 1""",
+            [user_id],
+        ).fetchone()
+        if active_path_row:
+            seq = json.loads(active_path_row["adapted_sequence"]) if active_path_row["adapted_sequence"] else json.loads(active_path_row["lesson_sequence"])
+            pos = active_path_row["current_position"] or 0
+            next_lesson = seq[pos] if pos < len(seq) else None
+            # Count completed lessons in path
+            if seq:
+                placeholders = ",".join("?" * len(seq))
+                done_count = path_conn.execute(
+                    f"SELECT COUNT(*) as cnt FROM lesson_completions WHERE user_id = ? AND lesson_id IN ({placeholders})",
+                    [user_id] + seq,
+                ).fetchone()["cnt"]
+            else:
+                done_count = 0
+            path_info = {
+                "active_path": active_path_row["path_id"],
+                "active_path_name": active_path_row["path_name"],
+                "next_in_path": next_lesson,
+                "path_progress": {
+                    "current_position": pos,
+                    "total": len(seq),
+                    "completed": done_count,
+                    "pct": round(done_count / len(seq) * 100, 1) if seq else 0,
+                },
+            }
+        path_conn.close()
+    except Exception:
+        pass
+    return path_info
+
+
 @router.get("/lesson/{lesson_id}")
 def get_lesson(
     lesson_id: str,
+    request: Request,
     user_id: Optional[str] = Query(default=None),
 ):
     """
@@ -542,19 +471,28 @@ def get_lesson(
     - set active_title
     - set speed_multiplier based on skill level
     - check adaptation_points against mastery
-    """
-    lesson = _load_lesson_from_dir(lesson_id)
-    if lesson is None:
-        raise HTTPException(status_code=404, detail=f"Lesson '{lesson_id}' not found.")
 
-    if not user_id:
-        return lesson
+    Lessons present in the compiled bundle are served by slicing bytes;
+    only lessons with adaptation_points are parsed for personalisation.
+    Responses carry an ETag and honour If-None-Match; the unpersonalised
+    lesson is precompressed once per file version.
+    """
+    bundled = _bundled_lesson(lesson_id)
+    lesson = None
+    if bundled is None:
+        lesson = _load_lesson_from_dir(lesson_id)
+        if lesson is None:
+            raise HTTPException(status_code=404, detail=f"Lesson '{lesson_id}' not found.")
 
-    db_path = _get_db_path()
-    profile = get_student_profile(db_path, user_id)
+    profile = get_student_profile(_get_db_path(), user_id) if user_id else None
 
     if not profile:
-        return lesson
+        return _static_lesson_response(request, lesson_id, bundled, lesson)
+
+    if bundled is not None:
+        if not bundled.adaptive:
+            return _personal_response(request, _personalize_bundled(bundled, profile))
+        lesson = json.loads(bundled.data)
 
     preferred_lang = profile.get("preferred_language") or "en"
     skill_level = profile.get("skill_level") or "beginner"
@@ -592,108 +530,308 @@ def get_lesson(
     if adapted:
         lesson["adaptation_points"] = adapted
 
-    return lesson
+    return _personal_response(request, dumps_json(lesson))
+
+
+def _static_lesson_response(request: Request, lesson_id: str,
+                            bundled: BundledLesson | None, lesson: dict | None) -> Response:
+    """Unpersonalised lesson: precompressed once per lesson file version."""
+    def build() -> PrecompressedBody:
+        if bundled is not None:
+            return PrecompressedBody.from_bytes(bundled.data)
+        return PrecompressedBody.from_json(lesson)
+
+    entry = get_catalog().get(lesson_id)
+    if entry is None:
+        # Generated lesson from the database — not a static file, ETag only
+        return _personal_response(request, dumps_json(lesson))
+    key = ("lesson", str(entry.path), entry.size, entry.mtime_ns)
+    return static_response(request, static_cache.get_or_build(key, build))
+
+
+def _personal_response(request: Request, body: bytes) -> Response:
+    """Per-student lesson bytes: ETag / 304 without caching the compressed form."""
+    return static_response(
+        request, PrecompressedBody.from_bytes(body, compress=False), PRIVATE_CACHE_CONTROL,
+    )
+
+
+def _busy(exc: ExecutionBusyError) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(exc),
+                         headers={"Retry-After": str(exc.retry_after)})
+
+
+# Feedback contexts waiting for their /evaluate/feedback stream, by token.
+# Kept in memory: the stream is requested right after /evaluate returns.
+DEFERRED_FEEDBACK_TTL_SECONDS = float(os.getenv("DEFERRED_FEEDBACK_TTL_SECONDS", "300"))
+DEFERRED_FEEDBACK_MAX = int(os.getenv("DEFERRED_FEEDBACK_MAX", "1000"))
+_deferred_feedback: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+_deferred_lock = threading.Lock()
+
+
+def _defer_feedback(context: dict) -> str:
+    token = uuid.uuid4().hex
+    now = time.monotonic()
+    with _deferred_lock:
+        while _deferred_feedback:
+            oldest_token, (created, _) = next(iter(_deferred_feedback.items()))
+            if now - created < DEFERRED_FEEDBACK_TTL_SECONDS and len(_deferred_feedback) < DEFERRED_FEEDBACK_MAX:
+                break
+            del _deferred_feedback[oldest_token]
+        _deferred_feedback[token] = (now, context)
+    return token
+
+
+def _take_deferred_feedback(token: str) -> Optional[dict]:
+    with _deferred_lock:
+        entry = _deferred_feedback.pop(token, None)
+    if entry is None or time.monotonic() - entry[0] >= DEFERRED_FEEDBACK_TTL_SECONDS:
+        return None
+    return entry[1]
 
 
 @router.post("/evaluate")
-def evaluate(request: EvaluateRequest):
+def evaluate(request: EvaluateRequest, response: Response):
     """
     Evaluate student code against expected output.
-    Records a learning signal and updates mastery.
+
+    The learning signal, XP, mastery, trigger and path updates are queued as
+    one background task ("effects_task"; see /evaluate/effects/{task_id})
+    so the response waits only for the run (and inline feedback, if asked).
+
+    Each stage's duration is returned in a Server-Timing header (and as
+    "timings" when debug is set) and aggregated for /evaluate/timings.
+    With feedback="defer" the result is returned without waiting for the
+    LLM; Vaathiyaar's commentary is then streamed from "feedback_stream".
     """
+    timer = StageTimer()
     db_path = _get_db_path()
-    profile = get_student_profile(db_path, request.user_id)
-
     lesson_context = {"lesson_id": request.lesson_id, "topic": request.topic}
 
-    result = evaluate_code(
-        student_code=request.code,
-        expected_output=request.expected_output,
-        student_profile=profile,
-        lesson_context=lesson_context,
-    )
-
-    # Record the evaluation as a learning signal
     try:
-        record_signal(
-            db_path,
-            user_id=request.user_id,
-            signal_type="code_evaluation",
-            topic=request.topic,
-            value={
-                "success": result["success"],
+        evaluation = run_evaluation(request.code, request.expected_output, user_id=request.user_id,
+                                    timer=timer)
+    except ExecutionBusyError as exc:
+        raise _busy(exc)
+
+    if request.feedback == "inline":
+        with timer.stage("profile_load"):
+            profile = get_student_profile(db_path, request.user_id)
+        with timer.stage("llm_feedback"):
+            feedback = evaluation_feedback(evaluation, request.code, request.expected_output,
+                                           profile, lesson_context)
+        result = evaluation_response(evaluation, feedback)
+    else:
+        result = evaluation_response(evaluation, None)
+        if request.feedback == "defer":
+            prompt, feedback_context = feedback_prompt(evaluation, request.code,
+                                                       request.expected_output, lesson_context)
+            token = _defer_feedback({
+                "user_id": request.user_id,
+                "prompt": prompt,
+                "lesson_context": feedback_context,
+                "evaluation": evaluation,
+            })
+            result["feedback_stream"] = f"{router.prefix}/evaluate/feedback/{token}"
+
+    with timer.stage("enqueue_effects"):
+        try:
+            result["effects_task"] = task_queue.enqueue("evaluation_effects", {
+                "user_id": request.user_id,
                 "lesson_id": request.lesson_id,
+                "topic": request.topic,
+                "success": result["success"],
                 "error": result.get("error", ""),
-            },
-        )
-    except Exception:
-        pass
+            })
+        except Exception as e:
+            print(f"Warning: could not queue evaluation side effects: {e}")
+
+    timer.observe(evaluate_latency)
+    response.headers["Server-Timing"] = timer.header()
+    if request.debug:
+        result["timings"] = timer.as_dict()
+    return result
 
-    # Award XP when student completes a challenge successfully
-    if result["success"] and request.topic:
-        lesson = _load_lesson_from_dir(request.lesson_id) if request.lesson_id else None
-        xp_reward = lesson.get("xp_reward", 25) if lesson else 25
 
-        # Use lesson_id for deduplication; fall back to topic when no lesson_id
-        lesson_id_for_completion = request.lesson_id or request.topic
+@task_queue.handler("evaluation_effects")
+def _apply_evaluation_effects(db_path: str, effects: dict) -> dict:
+    """
+    Background half of /evaluate: learning signal, XP, mastery and path
+    updates in one transaction, then the trigger check (which may start a
+    generation job that must see its row committed).
 
+    The transaction also records the task as applied, so a redelivery (the
+    process died before the queue marked the task done) does not write the
+    signal or the mastery delta again.
+
+    Returns {"xp_earned"?, "path_adaptation"?} for /evaluate/effects.
+    """
+    timer = StageTimer()
+    user_id, topic, success = effects["user_id"], effects["topic"], effects["success"]
+
+    with database.transaction(db_path) as conn:
+        applied = task_queue.applied_result(conn)
+        if applied is None:
+            applied = _write_evaluation_effects(db_path, conn, effects, timer)
+            task_queue.mark_applied(conn, applied)
+
+    # Check triggers for AI-inferred module generation
+    with timer.stage("trigger_check"):
         try:
-            conn = sqlite3.connect(db_path)
+            check_triggers(
+                user_id=user_id,
+                signal_type="code_evaluation",
+                topic=topic,
+                value={"success": success},
+            )
+        except Exception:
+            pass  # Trigger check should never block evaluation
 
-            # Check if already completed — only award XP once per lesson
-            existing = conn.execute(
-                "SELECT 1 FROM lesson_completions WHERE user_id = ? AND lesson_id = ?",
-                [request.user_id, lesson_id_for_completion],
-            ).fetchone()
+    invalidate_profile(user_id)
+    timer.observe(evaluate_latency, prefix="effects.")
+    return applied
 
-            if not existing:
-                conn.execute("UPDATE users SET points = points + ? WHERE id = ?", [xp_reward, request.user_id])
-                conn.execute(
-                    "INSERT INTO lesson_completions (user_id, lesson_id, xp_awarded) VALUES (?, ?, ?)",
-                    [request.user_id, lesson_id_for_completion, xp_reward],
-                )
-                xp_earned = xp_reward
-            else:
-                xp_earned = 0
 
-            conn.commit()
-            conn.close()
+def _write_evaluation_effects(db_path: str, conn, effects: dict, timer: StageTimer) -> dict:
+    """The transactional part of _apply_evaluation_effects."""
+    user_id, topic, success = effects["user_id"], effects["topic"], effects["success"]
+    applied: dict = {}
+
+    # Record the evaluation as a learning signal
+    with timer.stage("signal_write"):
+        try:
+            record_signal(
+                db_path,
+                user_id=user_id,
+                signal_type="code_evaluation",
+                topic=topic,
+                value={
+                    "success": success,
+                    "lesson_id": effects["lesson_id"],
+                    "error": effects["error"],
+                },
+            )
         except Exception:
-            xp_earned = 0
+            pass
 
-        result["xp_earned"] = xp_earned
+    # Award XP when student completes a challenge successfully
+    if success and topic:
+        with timer.stage("xp_transaction"):
+            applied["xp_earned"] = _award_lesson_xp(db_path, user_id, effects["lesson_id"], topic)
 
     # Update mastery based on success
-    mastery_delta = 0.1 if result["success"] else -0.05
-    try:
-        existing_mastery = profile.get("mastery", {}).get(request.topic, 0.0) if profile else 0.0
-        new_mastery = max(0.0, min(1.0, existing_mastery + mastery_delta))
-        update_mastery(db_path, request.user_id, request.topic, new_mastery)
-    except Exception:
-        pass
+    mastery_delta = 0.1 if success else -0.05
+    with timer.stage("mastery_update"):
+        try:
+            row = conn.execute(
+                "SELECT mastery_level FROM user_mastery WHERE user_id = ? AND topic = ?",
+                [user_id, topic],
+            ).fetchone()
+            existing_mastery = row[0] if row and row[0] is not None else 0.0
+            new_mastery = max(0.0, min(1.0, existing_mastery + mastery_delta))
+            update_mastery(db_path, user_id, topic, new_mastery)
+        except Exception:
+            pass
+
+    # Adapt learning path after lesson completion
+    lesson_id_for_adapt = effects["lesson_id"] or topic
+    if lesson_id_for_adapt:
+        with timer.stage("path_adaptation"):
+            try:
+                adaptation = adapt_path(user_id, lesson_id_for_adapt)
+                if adaptation and adaptation.get("changes"):
+                    applied["path_adaptation"] = adaptation
+            except Exception:
+                pass  # Path adaptation should never block evaluation
+    return applied
+
+
+def _award_lesson_xp(db_path: str, user_id: str, lesson_id: Optional[str], topic: str) -> int:
+    """XP for completing the lesson — only awarded once per lesson."""
+    lesson = _load_lesson_from_dir(lesson_id) if lesson_id else None
+    xp_reward = lesson.get("xp_reward", 25) if lesson else 25
+
+    # Use lesson_id for deduplication; fall back to topic when no lesson_id
+    lesson_id_for_completion = lesson_id or topic
 
-    # Check triggers for AI-inferred module generation
     try:
-        check_triggers(
-            user_id=request.user_id,
-            signal_type="code_evaluation",
-            topic=request.topic,
-            value={"success": result.get("success", False)},
-        )
+        conn = database.connect(db_path)
+
+        # Check if already completed — only award XP once per lesson
+        existing = conn.execute(
+            "SELECT 1 FROM lesson_completions WHERE user_id = ? AND lesson_id = ?",
+            [user_id, lesson_id_for_completion],
+        ).fetchone()
+
+        if not existing:
+            conn.execute("UPDATE users SET points = points + ? WHERE id = ?", [xp_reward, user_id])
+            conn.execute(
+                "INSERT INTO lesson_completions (user_id, lesson_id, xp_awarded) VALUES (?, ?, ?)",
+                [user_id, lesson_id_for_completion, xp_reward],
+            )
+            xp_earned = xp_reward
+        else:
+            xp_earned = 0
+
+        conn.commit()
+        conn.close()
+        invalidate_profile(user_id)
     except Exception:
-        pass  # Trigger check should never block evaluation
+        xp_earned = 0
+    return xp_earned
 
-    # Adapt learning path after lesson completion
-    lesson_id_for_adapt = request.lesson_id or request.topic
-    if lesson_id_for_adapt:
+
+@router.get("/evaluate/effects/{task_id}")
+def evaluate_effects(task_id: str):
+    """Status of an /evaluate call's queued side effects, with their results once done."""
+    task = task_queue.get(task_id)
+    if task is None or task["kind"] != "evaluation_effects":
+        raise HTTPException(status_code=404, detail="Task not found")
+    return {"status": task["status"], **(task["result"] or {})}
+
+
+@router.get("/evaluate/feedback/{token}")
+async def evaluate_feedback_stream(token: str):
+    """
+    Stream Vaathiyaar's feedback for a deferred /evaluate call (SSE), in the
+    same event format as /chat/stream; the final event carries the whole
+    feedback dict. The token is single-use.
+    """
+    context = _take_deferred_feedback(token)
+    if context is None:
+        raise HTTPException(status_code=404, detail="Feedback not found or expired")
+
+    profile = await run_in_threadpool(get_student_profile, _get_db_path(), context["user_id"])
+    messages = [
+        {"role": "system", "content": build_system_prompt(profile, context["lesson_context"])},
+        {"role": "user", "content": context["prompt"]},
+    ]
+
+    async def generate():
+        timer = StageTimer()
+        parser = ResponseStreamParser()
         try:
-            adaptation = adapt_path(request.user_id, lesson_id_for_adapt)
-            if adaptation and adaptation.get("changes"):
-                result["path_adaptation"] = adaptation
+            with timer.stage("llm_feedback"):
+                async for token_text in astream_vaathiyaar(
+                    messages, user_id=context["user_id"],
+                    kind=feedback_kind(context["evaluation"], context["lesson_context"]),
+                ):
+                    for event in parser.feed(token_text):
+                        yield event
+            feedback = complete_vaathiyaar_response(parser.result(), parser.text)
         except Exception:
-            pass  # Path adaptation should never block evaluation
+            # If API is unreachable, fall back like inline feedback does
+            feedback = fallback_feedback(context["evaluation"])
+        evaluate_latency.observe("llm_feedback", timer.stages["llm_feedback"])
+        yield {"done": True, "message": feedback.get("message", ""), "feedback": feedback}
 
-    return result
+    return sse_response(generate())
+
+
+@router.get("/evaluate/timings")
+def evaluate_timings():
+    """Latency histograms (ms) of each /evaluate stage since startup."""
+    return {"stages": evaluate_latency.snapshot()}
 
 
 @router.post("/diagnostic")
@@ -719,12 +857,16 @@ def diagnostic(request: DiagnosticRequest):
         "difficulty": challenge["difficulty"],
     }
 
-    result = evaluate_code(
-        student_code=request.code,
-        expected_output=challenge["expected_output"],
-        student_profile=profile,
-        lesson_context=lesson_context,
-    )
+    try:
+        result = evaluate_code(
+            student_code=request.code,
+            expected_output=challenge["expected_output"],
+            student_profile=profile,
+            lesson_context=lesson_context,
+            user_id=request.user_id,
+        )
+    except ExecutionBusyError as exc:
+        raise _busy(exc)
 
     # Record diagnostic signal
     try:
@@ -5,6 +5,7 @@ Prefix: /api/graph
 
 import os
 import sqlite3
+import database
 from fastapi import APIRouter, HTTPException
 
 router = APIRouter(prefix="/api/graph", tags=["graph"])
@@ -15,7 +16,7 @@ DB_PATH = os.getenv("DB_PATH", os.path.abspath("pymasters.db"))
 @router.get("/concepts")
 def list_concepts():
     """List all concepts with category and difficulty."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     rows = conn.execute("SELECT id, name, category, difficulty, description FROM concepts ORDER BY category, difficulty").fetchall()
     conn.close()
@@ -25,7 +26,7 @@ def list_concepts():
 @router.get("/concepts/{concept_id}")
 def get_concept(concept_id: str):
     """Get a concept with its edges and related lessons."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     concept = conn.execute("SELECT * FROM concepts WHERE id = ?", [concept_id]).fetchone()
     conn.close()
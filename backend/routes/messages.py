@@ -5,6 +5,7 @@ Prefix: /api/messages
 
 import os
 import sqlite3
+import database
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
@@ -16,7 +17,7 @@ DB_PATH = os.getenv("DB_PATH", os.path.abspath("pymasters.db"))
 @router.get("/pending/{user_id}")
 def get_pending_messages(user_id: str):
     """Get all undelivered, undismissed proactive messages for a user."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     rows = conn.execute(
         """
@@ -43,7 +44,7 @@ def get_pending_messages(user_id: str):
 @router.post("/{message_id}/dismiss")
 def dismiss_message(message_id: int):
     """Mark a proactive message as dismissed."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     result = conn.execute(
         "UPDATE pending_vaathiyaar_messages SET dismissed = 1 WHERE id = ?", [message_id]
     )
@@ -61,7 +62,7 @@ class MessageAction(BaseModel):
 @router.post("/{message_id}/action")
 def message_action(message_id: int, body: MessageAction):
     """Record that user took an action on a proactive message."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     msg = conn.execute(
         "SELECT * FROM pending_vaathiyaar_messages WHERE id = ?", [message_id]
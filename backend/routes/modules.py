@@ -4,6 +4,7 @@ import uuid
 import json
 import os
 import threading
+import database
 from modules.models import ModuleRequest, JobStatus
 from modules.pipeline import run_pipeline
 
@@ -17,7 +18,7 @@ def _get_db_path():
 @router.post("/request")
 async def request_module(data: ModuleRequest):
     job_id = str(uuid.uuid4())
-    conn = sqlite3.connect(_get_db_path())
+    conn = database.connect(_get_db_path())
     conn.execute(
         """INSERT INTO module_generation_jobs (id, user_id, topic, trigger, trigger_detail, status, priority)
            VALUES (?, ?, ?, 'user_request', ?, 'queued', 1)""",
@@ -39,7 +40,7 @@ async def request_module(data: ModuleRequest):
 
 @router.get("/status/{job_id}")
 async def get_job_status(job_id: str):
-    conn = sqlite3.connect(_get_db_path())
+    conn = database.connect(_get_db_path())
     conn.row_factory = sqlite3.Row
     row = conn.execute(
         "SELECT * FROM module_generation_jobs WHERE id = ?", [job_id]
@@ -64,7 +65,7 @@ async def get_job_status(job_id: str):
 
 @router.get("/generated/{user_id}")
 async def list_generated_modules(user_id: str):
-    conn = sqlite3.connect(_get_db_path())
+    conn = database.connect(_get_db_path())
     conn.row_factory = sqlite3.Row
     rows = conn.execute(
         "SELECT id, topic, trigger, trigger_detail, created_at FROM generated_lessons WHERE user_id = ? ORDER BY created_at DESC",
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Optional
 import sqlite3
+import database
 import os
 import json
 
@@ -28,7 +29,7 @@ async def get_notifications(
     limit: int = Query(20),
     offset: int = Query(0),
 ):
-    conn = sqlite3.connect(_get_db_path())
+    conn = database.connect(_get_db_path())
     conn.row_factory = sqlite3.Row
 
     where = "WHERE user_id = ?"
@@ -66,7 +67,7 @@ async def get_notifications(
 
 @router.put("/{notification_id}/read")
 async def mark_read(notification_id: str, user_id: str = Query(...)):
-    conn = sqlite3.connect(_get_db_path())
+    conn = database.connect(_get_db_path())
     cursor = conn.execute(
         "UPDATE notifications SET read = 1 WHERE id = ? AND user_id = ?",
         [notification_id, user_id],
@@ -81,7 +82,7 @@ async def mark_read(notification_id: str, user_id: str = Query(...)):
 
 @router.patch("/read-all")
 async def mark_all_read(user_id: str = Query(...)):
-    conn = sqlite3.connect(_get_db_path())
+    conn = database.connect(_get_db_path())
     conn.execute(
         "UPDATE notifications SET read = 1 WHERE user_id = ? AND read = 0",
         [user_id],
@@ -93,7 +94,7 @@ async def mark_all_read(user_id: str = Query(...)):
 
 @router.get("/preferences")
 async def get_preferences(user_id: str = Query(...)):
-    conn = sqlite3.connect(_get_db_path())
+    conn = database.connect(_get_db_path())
     conn.row_factory = sqlite3.Row
     rows = conn.execute(
         "SELECT * FROM notification_preferences WHERE user_id = ?",
@@ -106,7 +107,7 @@ async def get_preferences(user_id: str = Query(...)):
 
 @router.put("/preferences")
 async def update_preferences(data: PreferenceUpdate):
-    conn = sqlite3.connect(_get_db_path())
+    conn = database.connect(_get_db_path())
     conn.execute(
         """INSERT INTO notification_preferences (user_id, channel, type, enabled, quiet_hours_start, quiet_hours_end)
            VALUES (?, ?, ?, ?, ?, ?)
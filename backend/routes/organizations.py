@@ -5,6 +5,7 @@ Prefix: /api/org
 
 import os
 import sqlite3
+import database
 import uuid
 import secrets
 from datetime import datetime, timedelta
@@ -21,7 +22,7 @@ ROLE_LEVELS = {"super_admin": 4, "admin": 3, "manager": 2, "member": 1}
 
 def require_org_role(db_path, org_id, user_id, min_role="member"):
     """Check user has at least min_role in org. Returns member row or raises 403."""
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     row = conn.execute(
         "SELECT role, department FROM org_members WHERE org_id = ? AND user_id = ?",
         [org_id, user_id]
@@ -75,7 +76,7 @@ class JoinOrgRequest(BaseModel):
 def create_org(data: CreateOrgRequest):
     """Create a new organization. Creator becomes super_admin."""
     org_id = str(uuid.uuid4())
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     try:
         now = datetime.utcnow().isoformat()
         conn.execute(
@@ -100,7 +101,7 @@ def create_org(data: CreateOrgRequest):
 @router.get("/my")
 def my_orgs(user_id: str = Query(...)):
     """List all organizations the user belongs to."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     rows = conn.execute("""
         SELECT o.id, o.name, o.type, o.domain, o.logo_url, o.plan,
                om.role, om.department, om.joined_at,
@@ -126,7 +127,7 @@ def my_orgs(user_id: str = Query(...)):
 @router.post("/join/{token}")
 def join_org(token: str, data: JoinOrgRequest):
     """Accept an invite using the token."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     try:
         invite = conn.execute(
             "SELECT id, org_id, email, role, expires_at, used FROM org_invites WHERE token = ?",
@@ -174,7 +175,7 @@ def join_org(token: str, data: JoinOrgRequest):
 def get_org(org_id: str, user_id: str = Query(...)):
     """Get organization details. Requires membership."""
     member_info = require_org_role(DB_PATH, org_id, user_id)
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     org = conn.execute(
         "SELECT id, name, type, domain, logo_url, description, settings, plan, created_at FROM organizations WHERE id = ?",
         [org_id]
@@ -213,7 +214,7 @@ def get_org(org_id: str, user_id: str = Query(...)):
 def update_org(org_id: str, data: UpdateOrgRequest):
     """Update organization. Requires admin+."""
     require_org_role(DB_PATH, org_id, data.user_id, "admin")
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     updates = []
     values = []
     for field in ["name", "type", "domain", "logo_url", "description", "plan"]:
@@ -235,7 +236,7 @@ def update_org(org_id: str, data: UpdateOrgRequest):
 def list_members(org_id: str, user_id: str = Query(...), role: Optional[str] = None, department: Optional[str] = None):
     """List org members. Requires membership."""
     require_org_role(DB_PATH, org_id, user_id, "member")
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     query = """
         SELECT u.id, u.username, u.name, u.email, u.points, u.linkedin_url, u.github_url,
                om.role, om.department, om.joined_at
@@ -273,7 +274,7 @@ def invite_member(org_id: str, data: InviteRequest):
     invite_id = str(uuid.uuid4())
     token = secrets.token_urlsafe(32)
     expires = (datetime.utcnow() + timedelta(days=7)).isoformat()
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     conn.execute(
         "INSERT INTO org_invites (id, org_id, email, role, token, created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
         [invite_id, org_id, data.email, data.role, token, datetime.utcnow().isoformat(), expires]
@@ -289,7 +290,7 @@ def bulk_invite(org_id: str, data: BulkInviteRequest):
     require_org_role(DB_PATH, org_id, data.user_id, "admin")
     if data.role not in ROLE_LEVELS:
         raise HTTPException(status_code=400, detail=f"Invalid role: {data.role}")
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     invites = []
     now = datetime.utcnow().isoformat()
     expires = (datetime.utcnow() + timedelta(days=7)).isoformat()
@@ -315,7 +316,7 @@ def change_role(org_id: str, member_id: str, data: RoleChangeRequest):
     require_org_role(DB_PATH, org_id, data.user_id, "super_admin")
     if data.new_role not in ROLE_LEVELS:
         raise HTTPException(status_code=400, detail=f"Invalid role: {data.new_role}")
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     # Guard: can't demote last super_admin
     if data.new_role != "super_admin":
         admins = conn.execute(
@@ -342,7 +343,7 @@ def change_role(org_id: str, member_id: str, data: RoleChangeRequest):
 def remove_member(org_id: str, member_id: str, user_id: str = Query(...)):
     """Remove a member. Requires admin+. Cannot remove last super_admin."""
     require_org_role(DB_PATH, org_id, user_id, "admin")
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     current = conn.execute(
         "SELECT role FROM org_members WHERE org_id = ? AND user_id = ?",
         [org_id, member_id]
@@ -368,7 +369,7 @@ def remove_member(org_id: str, member_id: str, user_id: str = Query(...)):
 def org_analytics(org_id: str, user_id: str = Query(...)):
     """Aggregated org stats. Requires manager+."""
     member = require_org_role(DB_PATH, org_id, user_id, "manager")
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
 
     # Member count
     total = conn.execute("SELECT COUNT(*) FROM org_members WHERE org_id = ?", [org_id]).fetchone()[0]
@@ -434,7 +435,7 @@ def delete_organization(org_id: str, user_id: str = None):
     if not user_id:
         raise HTTPException(status_code=400, detail="user_id is required")
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     try:
         cursor = conn.cursor()
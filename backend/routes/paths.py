@@ -13,7 +13,9 @@ from typing import Optional
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
+import database
 from paths.recommender import recommend_path
+from vaathiyaar.profile_cache import invalidate_profile
 
 router = APIRouter(prefix="/api/paths", tags=["paths"])
 
@@ -37,7 +39,7 @@ class SwitchPathRequest(BaseModel):
 # ---------------------------------------------------------------------------
 
 def _get_conn():
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -161,6 +163,7 @@ def start_path(path_id: str, body: StartPathRequest):
             )
             conn.commit()
             conn.close()
+            invalidate_profile(body.user_id)
             return {"message": "Path resumed.", "path_id": path_id, "status": "active"}
 
     # Create new entry
@@ -171,6 +174,7 @@ def start_path(path_id: str, body: StartPathRequest):
     )
     conn.commit()
     conn.close()
+    invalidate_profile(body.user_id)
     return {"message": "Path started.", "path_id": path_id, "status": "active"}
 
 
@@ -259,4 +263,5 @@ def switch_path(path_id: str, body: SwitchPathRequest):
 
     conn.commit()
     conn.close()
+    invalidate_profile(body.user_id)
     return {"message": "Switched path.", "path_id": path_id, "status": "active"}
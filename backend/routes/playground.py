@@ -4,19 +4,23 @@ playground.py — FastAPI APIRouter for the XP-based Playground chat.
 Prefix: /api/playground
 """
 
-import json
 import os
-import sqlite3
 import uuid
 from typing import Optional, List
 
 from fastapi import APIRouter, Body, HTTPException
-from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
-from vaathiyaar.engine import call_vaathiyaar, get_ollama_client, OLLAMA_MODEL
+import database
+from sse import sse_response
+from vaathiyaar.concurrency import VaathiyaarBusyError
+from vaathiyaar.llm_client import VaathiyaarUnavailableError
+from vaathiyaar.engine import acall_vaathiyaar, astream_vaathiyaar
 from vaathiyaar.modelfile import build_system_prompt
 from vaathiyaar.profiler import get_student_profile
+from vaathiyaar.profile_cache import invalidate_profile
+from vaathiyaar.stream_parser import ResponseStreamParser
 
 router = APIRouter(prefix="/api/playground", tags=["playground"])
 
@@ -42,7 +46,7 @@ def _get_db_path() -> str:
 
 def _get_user_credits(db_path: str, user_id: str) -> dict:
     """Return XP, total prompts, used prompts, remaining prompts for a user."""
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         cursor = conn.cursor()
         cursor.execute(
@@ -70,7 +74,7 @@ def _get_user_credits(db_path: str, user_id: str) -> dict:
 
 def _get_or_create_conversation(db_path: str, user_id: str, conversation_id: Optional[str] = None) -> str:
     """Get existing conversation or create a new one. Returns conversation_id."""
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         cursor = conn.cursor()
         if conversation_id:
@@ -88,6 +92,7 @@ def _get_or_create_conversation(db_path: str, user_id: str, conversation_id: Opt
             [new_id, user_id],
         )
         conn.commit()
+        invalidate_profile(user_id)
         return new_id
     finally:
         conn.close()
@@ -95,7 +100,7 @@ def _get_or_create_conversation(db_path: str, user_id: str, conversation_id: Opt
 
 def _save_message(db_path: str, conversation_id: str, role: str, content: str):
     """Save a message to the conversation history."""
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         conn.execute(
             "INSERT INTO playground_messages (conversation_id, role, content) VALUES (?, ?, ?)",
@@ -110,25 +115,26 @@ def _save_message(db_path: str, conversation_id: str, role: str, content: str):
         conn.close()
 
 
-def _update_conversation_title(db_path: str, conversation_id: str, first_message: str):
-    """Set conversation title from first user message (truncated)."""
+def _update_conversation_title(db_path: str, conversation_id: str, first_message: str) -> bool:
+    """Set conversation title from first user message (truncated). Returns True if it changed."""
     title = first_message[:80].strip()
     if len(first_message) > 80:
         title += "..."
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
-        conn.execute(
+        cursor = conn.execute(
             "UPDATE playground_conversations SET title = ? WHERE id = ? AND title = 'New conversation'",
             [title, conversation_id],
         )
         conn.commit()
+        return cursor.rowcount > 0
     finally:
         conn.close()
 
 
 def _get_conversation_history(db_path: str, conversation_id: str, limit: int = 20) -> list:
     """Get recent messages from a conversation for context."""
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         cursor = conn.cursor()
         cursor.execute(
@@ -156,7 +162,7 @@ def get_credits(user_id: str):
 def get_conversations(user_id: str):
     """Return the user's playground conversation list."""
     db_path = _get_db_path()
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         cursor = conn.cursor()
         cursor.execute(
@@ -176,7 +182,7 @@ def get_conversations(user_id: str):
 def get_conversation_messages(user_id: str, conversation_id: str):
     """Return all messages for a conversation."""
     db_path = _get_db_path()
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         cursor = conn.cursor()
         # Verify ownership
@@ -198,7 +204,7 @@ def get_conversation_messages(user_id: str, conversation_id: str):
 
 
 @router.post("/chat")
-def playground_chat(request: PlaygroundChatRequest):
+async def playground_chat(request: PlaygroundChatRequest):
     """
     Send a free-form message to Vaathiyaar in the Playground.
     Checks XP-based prompt allowance before responding.
@@ -206,16 +212,8 @@ def playground_chat(request: PlaygroundChatRequest):
     """
     db_path = _get_db_path()
 
-    # Check credits
-    credits = _get_user_credits(db_path, request.user_id)
-    if credits["remaining_prompts"] <= 0:
-        raise HTTPException(
-            status_code=403,
-            detail="You've used all your prompts! Complete more lessons to earn XP and unlock more.",
-        )
-
-    # Get student profile for personalisation
-    profile = get_student_profile(db_path, request.user_id)
+    # Check credits and get student profile for personalisation
+    profile = await run_in_threadpool(_playground_profile, db_path, request.user_id)
 
     # Call Vaathiyaar without lesson context (free-form playground)
     lesson_context = {
@@ -224,27 +222,27 @@ def playground_chat(request: PlaygroundChatRequest):
     }
 
     try:
-        response = call_vaathiyaar(
+        response = await acall_vaathiyaar(
             user_message=request.message,
             student_profile=profile,
             lesson_context=lesson_context,
+            user_id=request.user_id,
+            kind="chat",
         )
+    except VaathiyaarBusyError as exc:
+        raise HTTPException(status_code=429, detail=str(exc))
+    except VaathiyaarUnavailableError as exc:
+        # Breaker open or deadline passed: tell the client when to retry
+        raise HTTPException(status_code=503, detail=str(exc),
+                            headers={"Retry-After": str(max(1, exc.retry_after))})
     except Exception as exc:
         raise HTTPException(status_code=502, detail=f"Vaathiyaar AI error: {exc}")
 
     # Increment prompts used
-    conn = sqlite3.connect(db_path)
-    try:
-        conn.execute(
-            "UPDATE users SET playground_prompts_used = playground_prompts_used + 1 WHERE id = ?",
-            [request.user_id],
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    await run_in_threadpool(_increment_prompts_used, db_path, request.user_id)
 
     # Return response with updated credits
-    updated_credits = _get_user_credits(db_path, request.user_id)
+    updated_credits = await run_in_threadpool(_get_user_credits, db_path, request.user_id)
 
     # Handle both dict and string responses from call_vaathiyaar
     if isinstance(response, dict):
@@ -258,12 +256,32 @@ def playground_chat(request: PlaygroundChatRequest):
     }
 
 
-@router.post("/chat/stream")
-def playground_chat_stream(request: PlaygroundChatRequest):
-    """Stream a free-form Vaathiyaar response token by token using SSE."""
-    db_path = _get_db_path()
+def _playground_profile(db_path: str, user_id: str) -> Optional[dict]:
+    """Raise 403 if the user is out of prompts, else return their profile."""
+    credits = _get_user_credits(db_path, user_id)
+    if credits["remaining_prompts"] <= 0:
+        raise HTTPException(
+            status_code=403,
+            detail="You've used all your prompts! Complete more lessons to earn XP and unlock more.",
+        )
+    return get_student_profile(db_path, user_id)
+
+
+def _increment_prompts_used(db_path: str, user_id: str):
+    """Count one playground prompt against the user's allowance."""
+    conn = database.connect(db_path)
+    try:
+        conn.execute(
+            "UPDATE users SET playground_prompts_used = playground_prompts_used + 1 WHERE id = ?",
+            [user_id],
+        )
+        conn.commit()
+    finally:
+        conn.close()
 
-    # Check credits
+
+def _start_stream_turn(db_path: str, request: PlaygroundChatRequest) -> tuple[str, list, Optional[dict]]:
+    """Check credits, persist the user's message and load (conversation_id, history, profile)."""
     credits = _get_user_credits(db_path, request.user_id)
     if credits["remaining_prompts"] <= 0:
         raise HTTPException(
@@ -276,93 +294,91 @@ def playground_chat_stream(request: PlaygroundChatRequest):
 
     # Save user message
     _save_message(db_path, conversation_id, "user", request.message)
-    _update_conversation_title(db_path, conversation_id, request.message)
+    if _update_conversation_title(db_path, conversation_id, request.message):
+        invalidate_profile(request.user_id)
 
     # Load conversation history for context
     history = _get_conversation_history(db_path, conversation_id)
 
     profile = get_student_profile(db_path, request.user_id)
+    return conversation_id, history, profile
+
+
+@router.post("/chat/stream")
+async def playground_chat_stream(request: PlaygroundChatRequest):
+    """Stream a free-form Vaathiyaar response token by token using SSE."""
+    db_path = _get_db_path()
+    conversation_id, history, profile = await run_in_threadpool(_start_stream_turn, db_path, request)
+
     lesson_context = {
         "mode": "playground",
         "language": request.language or "en",
     }
 
     system_prompt = build_system_prompt(profile, lesson_context)
-    client = get_ollama_client()
 
     # Build messages with conversation history
     ollama_messages = [{"role": "system", "content": system_prompt}]
     ollama_messages.extend(history)
 
-    def generate():
-        full_response = ""
+    async def generate():
+        # Stream the message text as it arrives and each other field once it closes
+        parser = ResponseStreamParser()
         try:
-            for chunk in client.chat(
-                model=OLLAMA_MODEL,
-                messages=ollama_messages,
-                stream=True,
-            ):
-                token = chunk.get("message", {}).get("content", "")
-                if token:
-                    full_response += token
-                    yield f"data: {json.dumps({'token': token})}\n\n"
-
-            # Parse response and extract clean message
-            clean_message = full_response
-            try:
-                cleaned = full_response.strip()
-                if cleaned.startswith("```json"):
-                    cleaned = cleaned[7:]
-                elif cleaned.startswith("```"):
-                    cleaned = cleaned[3:]
-                if cleaned.endswith("```"):
-                    cleaned = cleaned[:-3]
-                cleaned = cleaned.strip()
-                parsed = json.loads(cleaned)
-                if isinstance(parsed, dict) and "message" in parsed:
-                    clean_message = parsed["message"]
-            except (json.JSONDecodeError, KeyError):
-                pass
+            async for token in astream_vaathiyaar(ollama_messages, user_id=request.user_id):
+                for event in parser.feed(token):
+                    yield event
+
+            full_response = parser.text
+            parsed = parser.result()
+            if parsed is not None and "message" in parsed:
+                clean_message = parsed["message"]
+            else:
+                clean_message = full_response
 
             # Save assistant response to conversation
             try:
-                _save_message(db_path, conversation_id, "assistant", clean_message)
+                await run_in_threadpool(_save_message, db_path, conversation_id, "assistant", clean_message)
             except Exception:
                 pass
 
-            yield f"data: {json.dumps({'done': True, 'message': clean_message, 'full_response': full_response, 'conversation_id': conversation_id})}\n\n"
+            yield {
+                "done": True,
+                "message": clean_message,
+                "full_response": full_response,
+                "conversation_id": conversation_id,
+            }
 
             # Increment prompts used (best effort)
             try:
-                conn = sqlite3.connect(db_path)
-                conn.execute(
-                    "UPDATE users SET playground_prompts_used = playground_prompts_used + 1 WHERE id = ?",
-                    [request.user_id],
-                )
-                conn.commit()
-                conn.close()
+                await run_in_threadpool(_increment_prompts_used, db_path, request.user_id)
             except Exception:
                 pass
         except Exception as exc:
-            yield f"data: {json.dumps({'error': str(exc)})}\n\n"
+            yield {"error": str(exc)}
 
-    return StreamingResponse(generate(), media_type="text/event-stream")
+    return sse_response(generate())
 
 
 @router.post("/execute")
-def execute_code(request: dict = Body(...)):
+async def execute_code(request: dict = Body(...)):
     """
     Execute Python code in a subprocess with real Python 3.12.
     Used by the Playground live terminal.
     More permissive than classroom evaluate — allows imports, file ops, etc.
     """
-    from vaathiyaar.execution import run_code_subprocess
+    from vaathiyaar.execution import arun_code_subprocess
+    from vaathiyaar.execution_queue import ExecutionBusyError
 
     code = request.get("code", "")
     if not code.strip():
         return {"output": "", "error": "No code provided.", "exit_code": 1}
 
-    result = run_code_subprocess(code)
+    try:
+        result = await arun_code_subprocess(code, user_id=request.get("user_id"), profile="playground")
+    except ExecutionBusyError as exc:
+        raise HTTPException(status_code=429, detail=str(exc),
+                            headers={"Retry-After": str(exc.retry_after)})
 
     output = result["output"]
     error = result["error"]
@@ -376,61 +392,73 @@ def execute_code(request: dict = Body(...)):
         "output": combined.strip() if combined else "(No output)",
         "error": error,
         "exit_code": result["exit_code"],
+        "queue_ms": result["queue_ms"],
     }
 
 
+@router.post("/execute/stream")
+async def execute_code_stream(request: dict = Body(...)):
+    """
+    Execute Python code like /execute, streaming stdout/stderr as SSE events
+    while the program runs so the live terminal fills in as output appears.
+
+    Events: {"stream": "stdout"|"stderr", "data": ...} for each chunk, then
+    {"done": true, "exit_code": ..., "timed_out": ..., "limit_exceeded": ...,
+    "queue_ms": ...}. A busy queue is answered with 429 before streaming.
+    """
+    from vaathiyaar.execution import stream_code_subprocess
+    from vaathiyaar.execution_queue import ExecutionBusyError
+
+    code = request.get("code", "")
+    if not code.strip():
+        raise HTTPException(status_code=400, detail="No code provided.")
+
+    try:
+        events = stream_code_subprocess(code, user_id=request.get("user_id"), profile="playground")
+    except ExecutionBusyError as exc:
+        raise HTTPException(status_code=429, detail=str(exc),
+                            headers={"Retry-After": str(exc.retry_after)})
+
+    async def generate():
+        try:
+            async for event in events:
+                yield event
+        except Exception as exc:
+            yield {"error": f"Execution failed: {exc}"}
+
+    return sse_response(generate())
+
+
 @router.post("/install-package")
 def install_package(request: dict = Body(...)):
     """
-    Install a Python package via pip for the playground.
+    Make an allowed package importable in the playground sandbox.
+
+    Packages come from the pre-built package layer (vaathiyaar/package_layer.py);
+    no pip or network access happens in the request.
     """
-    import subprocess
-    import os
+    from vaathiyaar.execution_cache import execution_cache
+    from vaathiyaar.package_layer import PackageUnavailableError, get_package_layer
 
     package = request.get("package", "").strip()
-    user_id = request.get("user_id", "")
 
     if not package:
         return {"success": False, "error": "No package name provided"}
 
-    # Whitelist common safe packages
-    ALLOWED_PACKAGES = {
-        "numpy", "pandas", "matplotlib", "seaborn", "scipy", "scikit-learn",
-        "requests", "beautifulsoup4", "flask", "fastapi", "django",
-        "pillow", "opencv-python", "torch", "tensorflow", "transformers",
-        "langchain", "openai", "anthropic", "chromadb", "faiss-cpu",
-        "pytest", "black", "isort", "rich", "typer", "click",
-        "pydantic", "sqlalchemy", "aiohttp", "httpx", "boto3",
-        "redis", "celery", "PyPDF2", "openpyxl", "python-dotenv",
-        "tiktoken", "nltk", "spacy", "networkx", "sympy",
-    }
-
-    # Normalize package name
-    pkg_normalized = package.lower().replace("-", "_").replace(".", "_")
-    allowed_normalized = {p.lower().replace("-", "_").replace(".", "_") for p in ALLOWED_PACKAGES}
-
-    if pkg_normalized not in allowed_normalized:
+    layer = get_package_layer()
+    if layer.canonical(package) is None:
         return {
             "success": False,
             "error": f"Package '{package}' is not in the allowed list. Contact support to request it.",
-            "allowed": sorted(ALLOWED_PACKAGES),
+            "allowed": layer.allowed,
         }
 
-    python_cmd = "python3" if os.name != "nt" else "python"
-
     try:
-        result = subprocess.run(
-            [python_cmd, "-m", "pip", "install", package],
-            capture_output=True,
-            text=True,
-            timeout=60,
-        )
-
-        if result.returncode == 0:
-            return {"success": True, "output": result.stdout}
-        else:
-            return {"success": False, "error": result.stderr}
-    except subprocess.TimeoutExpired:
-        return {"success": False, "error": "Installation timed out"}
-    except Exception as e:
+        result = layer.enable(package)
+    except PackageUnavailableError as e:
         return {"success": False, "error": str(e)}
+
+    if result["changed"]:
+        # Cached run results may depend on what was importable before
+        execution_cache.bump_generation()
+    return {"success": True, "output": f"{result['package']} is ready to import."}
@@ -13,7 +13,9 @@ from typing import List, Optional
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
+import database
 from vaathiyaar.profiler import save_onboarding, get_student_profile, record_signal
+from vaathiyaar.profile_cache import invalidate_profile
 
 DB_PATH = os.getenv("DB_PATH", os.path.abspath("pymasters.db"))
 
@@ -148,6 +150,7 @@ def org_onboarding(data: OrgOnboardingData):
         """, [data.user_id, data.preferred_language])
 
         conn.commit()
+        invalidate_profile(data.user_id)
         return {"onboarding_completed": True, "user_id": data.user_id}
     finally:
         conn.close()
@@ -257,6 +260,7 @@ def reset_progress(user_id: str):
             pass
 
         conn.commit()
+        invalidate_profile(user_id)
         return {"reset": True, "user_id": user_id}
     finally:
         conn.close()
@@ -340,6 +344,7 @@ def delete_account(user_id: str):
         # Finally delete the user record
         cursor.execute("DELETE FROM users WHERE id = ?", [user_id])
         conn.commit()
+        invalidate_profile(user_id)
 
         return {"deleted": True, "user_id": user_id}
     finally:
@@ -394,7 +399,7 @@ class UserSettingsUpdate(BaseModel):
 # ---------------------------------------------------------------------------
 
 def _get_conn():
-    conn = sqlite3.connect(DB_PATH)
+    conn = database.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -472,6 +477,7 @@ def update_user_settings(user_id: str, data: UserSettingsUpdate):
             )
 
         conn.commit()
+        invalidate_profile(user_id)
         return {"updated": True}
     finally:
         conn.close()
@@ -11,9 +11,11 @@ import os
 import sqlite3
 from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 
+from http_cache import cached_json_response
+
 router = APIRouter(prefix="/api/reference", tags=["reference"])
 
 
@@ -904,8 +906,12 @@ _CARD_LOOKUP: dict[str, dict] = {card["id"]: card for card in REFERENCE_CARDS}
 # ---------------------------------------------------------------------------
 
 @router.get("/topics")
-def list_topics():
+def list_topics(request: Request):
     """Return all available quick reference topics."""
+    return cached_json_response(request, ("reference", "topics"), _topics_payload)
+
+
+def _topics_payload() -> dict:
     topics = [
         {
             "id": card["id"],
@@ -919,7 +925,7 @@ def list_topics():
 
 
 @router.get("/{topic}")
-def get_reference_card(topic: str):
+def get_reference_card(topic: str, request: Request):
     """Return a specific reference card by topic ID."""
     card = _CARD_LOOKUP.get(topic)
     if not card:
@@ -928,4 +934,4 @@ def get_reference_card(topic: str):
             status_code=404,
             detail=f"Reference topic '{topic}' not found. Available: {available}",
         )
-    return card
+    return cached_json_response(request, ("reference", topic), lambda: card)
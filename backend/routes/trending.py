@@ -5,7 +5,7 @@ Prefix: /api/trending
 
 import os
 from datetime import date, datetime
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from typing import Optional
 
 # Import the trends engine
@@ -19,6 +19,7 @@ from content.daily_content import (
     generate_daily_tip, generate_daily_challenge, generate_daily_quiz, get_greeting
 )
 from vaathiyaar.profiler import get_student_profile
+from http_cache import cached_json_response
 
 DB_PATH = os.getenv("DB_PATH", os.path.abspath("pymasters.db"))
 
@@ -65,9 +66,11 @@ def trending_personalized(user_id: str):
 
 # ── 3. All available categories ───────────────────────────────────────────────
 @router.get("/categories")
-def trending_categories():
+def trending_categories(request: Request):
     """Return every category that has trending content."""
-    return {"categories": get_all_categories()}
+    return cached_json_response(
+        request, ("trending", "categories"), lambda: {"categories": get_all_categories()},
+    )
 
 
 # ── 4. Search trending topics ─────────────────────────────────────────────────
@@ -0,0 +1,166 @@
+"""
+sse.py — Coalescing Server-Sent Events writer for the streaming endpoints.
+
+The chat, feedback and execution streams produce one small event per model
+token or output chunk. Writing each as its own `data:` frame meant one
+json.dumps and one socket write per token. Routes now yield plain event
+dicts and return
+
+    sse_response(generate())
+
+which sends them as SSE with:
+
+    - coalescing: consecutive text events ({"delta"} and same-stream
+      {"stream", "data"}) are merged, and frames are written at most once
+      per SSE_FLUSH_MS (the first one at once) or as soon as
+      SSE_FLUSH_BYTES of text are pending;
+    - backpressure: events are read ahead into a bounded buffer only, so a
+      slow client stalls the producer instead of growing memory, and
+      whatever piled up meanwhile goes out as one write;
+    - heartbeats: a `: keep-alive` comment after SSE_HEARTBEAT_SECONDS of
+      silence keeps proxies from closing idle streams.
+
+Events that end or change the stream (done, error, fields) are never
+merged and flush immediately.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Optional
+
+from fastapi.responses import StreamingResponse
+
+SSE_FLUSH_MS = float(os.getenv("SSE_FLUSH_MS", "40"))
+SSE_FLUSH_BYTES = int(os.getenv("SSE_FLUSH_BYTES", "4096"))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+# Events read ahead of a slow client before the producer is paused
+SSE_MAX_PENDING = int(os.getenv("SSE_MAX_PENDING", "256"))
+
+HEARTBEAT = ": keep-alive\n\n"
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+_END = object()
+
+
+def sse_frame(event: dict) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+
+def _text_of(event: dict) -> Optional[tuple]:
+    """(merge key, text) for events that can be merged with their neighbours."""
+    if len(event) == 1 and "delta" in event:
+        return ("delta",), event["delta"]
+    if len(event) == 2 and "stream" in event and "data" in event:
+        return ("stream", event["stream"]), event["data"]
+    return None
+
+
+class _Batch:
+    """Events waiting to be written, with adjacent text events merged."""
+
+    def __init__(self):
+        self.events: list = []
+        self._text: list = []      # pieces of the last event's text, if mergeable
+        self._key = None
+        self.size = 0
+
+    def __bool__(self):
+        return bool(self.events) or bool(self._text)
+
+    def add(self, event: dict) -> bool:
+        """Queue an event; returns True if it should be written without waiting."""
+        mergeable = _text_of(event)
+        if mergeable is None:
+            self._close_text()
+            self.events.append(event)
+            return True
+        key, text = mergeable
+        if key != self._key:
+            self._close_text()
+            self._key = key
+        self._text.append(text)
+        self.size += len(text)
+        return False
+
+    def _close_text(self):
+        if self._text:
+            text = "".join(self._text)
+            key = self._key
+            self.events.append({"delta": text} if key == ("delta",) else {"stream": key[1], "data": text})
+        self._text = []
+        self._key = None
+
+    def flush(self) -> str:
+        self._close_text()
+        payload = "".join(sse_frame(event) for event in self.events)
+        self.events = []
+        self.size = 0
+        return payload
+
+
+async def coalesce_events(
+    events: AsyncIterator[dict],
+    flush_ms: float = SSE_FLUSH_MS,
+    flush_bytes: int = SSE_FLUSH_BYTES,
+    heartbeat_seconds: float = SSE_HEARTBEAT_SECONDS,
+    max_pending: int = SSE_MAX_PENDING,
+) -> AsyncIterator[str]:
+    """Turn a stream of event dicts into coalesced SSE writes (see the module docstring)."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+
+    async def pump():
+        try:
+            async for event in events:
+                await queue.put(event)
+            end = _END
+        except Exception as exc:
+            end = exc
+        await queue.put(end)
+
+    producer = asyncio.create_task(pump())
+    window = flush_ms / 1000
+    batch = _Batch()
+    last_write = float("-inf")
+    try:
+        while True:
+            if batch:
+                timeout = max(0.0, last_write + window - time.monotonic())
+            else:
+                timeout = heartbeat_seconds
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                last_write = time.monotonic()
+                yield batch.flush() if batch else HEARTBEAT
+                continue
+
+            # Take everything that is already waiting: the slower the client,
+            # the more each write carries
+            urgent = False
+            while True:
+                if item is _END or isinstance(item, Exception):
+                    if batch:
+                        yield batch.flush()
+                    if item is not _END:
+                        raise item
+                    return
+                urgent = batch.add(item) or urgent
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+
+            now = time.monotonic()
+            if urgent or batch.size >= flush_bytes or now - last_write >= window:
+                last_write = now
+                yield batch.flush()
+    finally:
+        producer.cancel()
+
+
+def sse_response(events: AsyncIterator[dict], **options) -> StreamingResponse:
+    """StreamingResponse sending the event dicts as coalesced SSE."""
+    return StreamingResponse(coalesce_events(events, **options), media_type="text/event-stream",
+                             headers=SSE_HEADERS)
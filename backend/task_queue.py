@@ -0,0 +1,328 @@
+"""
+task_queue.py — Durable in-process queue for deferred side effects.
+
+Request handlers hand off work that the response does not need to wait for
+(e.g. the learning signal, XP, mastery and path updates after /evaluate):
+
+    task_id = task_queue.enqueue("evaluation_effects", {...})
+
+Tasks are rows in the background_tasks table, so they survive restarts. A
+daemon worker thread per process claims them in order and runs the handler
+registered for their kind:
+
+    @task_queue.handler("evaluation_effects")
+    def apply(db_path: str, payload: dict) -> dict: ...
+
+A claim is a lease: a task left "running" by a crashed process is picked up
+again after TASK_LEASE_SECONDS, so several server processes can share one
+database. Failed tasks are retried with backoff, up to TASK_MAX_ATTEMPTS.
+The handler's return value is stored as the task's result (see get()).
+Finished tasks and their effects records are deleted TASK_RETENTION_SECONDS
+after they finish (prune(), run every TASK_PRUNE_EVERY claims).
+
+Delivery is at least once: a process can die, or fail to record the task as
+done, after the handler's writes were committed. Handlers whose effects must
+not be applied twice check and record them in the same transaction:
+
+    with database.transaction(db_path) as conn:
+        previous = task_queue.applied_result(conn)
+        if previous is None:
+            ...  # the effects
+            task_queue.mark_applied(conn, result)
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+import database
+
+TASK_POLL_SECONDS = float(os.getenv("TASK_POLL_SECONDS", "1"))
+TASK_LEASE_SECONDS = float(os.getenv("TASK_LEASE_SECONDS", "60"))
+TASK_MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "5"))
+# Delay before retry n is TASK_RETRY_BASE_SECONDS * 2 ** (n - 1)
+TASK_RETRY_BASE_SECONDS = float(os.getenv("TASK_RETRY_BASE_SECONDS", "2"))
+# Done / failed tasks older than this are deleted, checked every TASK_PRUNE_EVERY claims
+TASK_RETENTION_SECONDS = float(os.getenv("TASK_RETENTION_SECONDS", str(7 * 24 * 3600)))
+TASK_PRUNE_EVERY = int(os.getenv("TASK_PRUNE_EVERY", "100"))
+
+
+def _ensure_tasks_table(db_path: str):
+    """Create the background_tasks table if it does not exist."""
+    conn = database.connect(db_path)
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS background_tasks (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL UNIQUE,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                run_after REAL NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON background_tasks(status, run_after, seq)")
+        # Tasks whose effects were committed (see TaskQueue.mark_applied)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS background_task_effects (
+                task_id TEXT PRIMARY KEY,
+                result TEXT,
+                applied_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class TaskQueue:
+    """SQLite-backed task queue with one worker thread per process."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self._db_path = db_path
+        self._handlers: dict[str, Callable] = {}
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._ready_for: Optional[str] = None
+        self._current = threading.local()  # id of the task the worker is running
+        self._claims = 0
+        self.completed = 0
+        self.failed = 0
+        self.pruned = 0
+
+    @property
+    def db_path(self) -> str:
+        return self._db_path or database.get_db_path()
+
+    def _ready(self) -> str:
+        path = self.db_path
+        if self._ready_for != path:
+            _ensure_tasks_table(path)
+            self._ready_for = path
+        return path
+
+    # -- producers ------------------------------------------------------------
+
+    def handler(self, kind: str):
+        """Decorator registering fn(db_path, payload) -> result for a task kind."""
+        def register(fn: Callable) -> Callable:
+            self._handlers[kind] = fn
+            return fn
+        return register
+
+    def enqueue(self, kind: str, payload: dict) -> str:
+        """Persist a task and wake the worker; returns the task id."""
+        task_id = uuid.uuid4().hex
+        now = time.time()
+        conn = database.connect(self._ready())
+        try:
+            conn.execute(
+                "INSERT INTO background_tasks (id, kind, payload, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [task_id, kind, json.dumps(payload), now, now],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        self.start()
+        self._wake.set()
+        return task_id
+
+    def get(self, task_id: str) -> Optional[dict]:
+        """{id, kind, status, attempts, result, error} or None if unknown."""
+        conn = database.connect(self._ready())
+        try:
+            row = conn.execute(
+                "SELECT id, kind, status, attempts, result, error FROM background_tasks WHERE id = ?",
+                [task_id],
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "attempts": row[3],
+            "result": json.loads(row[4]) if row[4] else None,
+            "error": row[5],
+        }
+
+    # -- idempotent effects ---------------------------------------------------
+
+    def applied_result(self, conn) -> Optional[dict]:
+        """
+        From inside a handler's write transaction: the result recorded by
+        mark_applied() if an earlier delivery of the running task already
+        committed its effects, else None (also outside a task).
+        """
+        task_id = getattr(self._current, "task_id", None)
+        if task_id is None:
+            return None
+        row = conn.execute(
+            "SELECT result FROM background_task_effects WHERE task_id = ?", [task_id],
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]) if row[0] else {}
+
+    def mark_applied(self, conn, result=None):
+        """Record, in the handler's transaction, that the running task's effects are committed."""
+        task_id = getattr(self._current, "task_id", None)
+        if task_id is None:
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO background_task_effects (task_id, result, applied_at) VALUES (?, ?, ?)",
+            [task_id, json.dumps(result) if result is not None else None, time.time()],
+        )
+
+    # -- worker ---------------------------------------------------------------
+
+    def start(self):
+        """Start the worker thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._work, name="task-queue", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stopping = True
+        self._wake.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    def _claim(self) -> Optional[tuple]:
+        """Lease the next runnable task, or None."""
+        now = time.time()
+        conn = database.connect(self._ready())
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, kind, payload, attempts FROM background_tasks"
+                " WHERE (status = 'pending' AND run_after <= ?)"
+                "    OR (status = 'running' AND run_after <= ?)"
+                " ORDER BY seq LIMIT 1",
+                [now, now],
+            ).fetchone()
+            if row is None:
+                conn.commit()
+                return None
+            conn.execute(
+                "UPDATE background_tasks SET status = 'running', attempts = attempts + 1,"
+                " run_after = ?, updated_at = ? WHERE id = ?",
+                [now + TASK_LEASE_SECONDS, now, row[0]],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        return row[0], row[1], json.loads(row[2]), row[3] + 1
+
+    def _finish(self, task_id: str, status: str, result=None, error: Optional[str] = None,
+                run_after: float = 0):
+        conn = database.connect(self.db_path)
+        try:
+            conn.execute(
+                "UPDATE background_tasks SET status = ?, result = ?, error = ?, run_after = ?,"
+                " updated_at = ? WHERE id = ?",
+                [status, json.dumps(result) if result is not None else None, error, run_after,
+                 time.time(), task_id],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def prune(self) -> int:
+        """Delete done / failed tasks finished over TASK_RETENTION_SECONDS ago; returns how many."""
+        cutoff = time.time() - TASK_RETENTION_SECONDS
+        conn = database.connect(self._ready())
+        try:
+            deleted = conn.execute(
+                "DELETE FROM background_tasks WHERE status IN ('done', 'failed') AND updated_at < ?",
+                [cutoff],
+            ).rowcount
+            # Effects records are only read while their task can still be delivered
+            conn.execute(
+                "DELETE FROM background_task_effects"
+                " WHERE task_id NOT IN (SELECT id FROM background_tasks)"
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        self.pruned += deleted
+        return deleted
+
+    def run_pending(self) -> int:
+        """Run every task that is due now, in order; returns how many ran."""
+        ran = 0
+        while not self._stopping:
+            claimed = self._claim()
+            if claimed is None:
+                return ran
+            task_id, kind, payload, attempts = claimed
+            self._claims += 1
+            if TASK_PRUNE_EVERY > 0 and self._claims % TASK_PRUNE_EVERY == 0:
+                try:
+                    self.prune()
+                except Exception as e:
+                    print(f"Warning: pruning background tasks failed: {e}")
+            handler = self._handlers.get(kind)
+            try:
+                if handler is None:
+                    raise LookupError(f"no handler for task kind '{kind}'")
+                self._current.task_id = task_id
+                try:
+                    result = handler(self.db_path, payload)
+                finally:
+                    self._current.task_id = None
+            except Exception as exc:
+                error = f"{type(exc).__name__}: {exc}"
+                if attempts >= TASK_MAX_ATTEMPTS:
+                    print(f"Warning: background task {kind} {task_id} failed: {error}")
+                    self._finish(task_id, "failed", error=error)
+                    self.failed += 1
+                else:
+                    retry_at = time.time() + TASK_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+                    self._finish(task_id, "pending", error=error, run_after=retry_at)
+            else:
+                self._finish(task_id, "done", result=result)
+                self.completed += 1
+            ran += 1
+        return ran
+
+    def _work(self):
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                self.run_pending()
+            except Exception as e:
+                print(f"Warning: background task worker error: {e}")
+            self._wake.wait(TASK_POLL_SECONDS)
+
+    def stats(self) -> dict:
+        conn = database.connect(self._ready())
+        try:
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM background_tasks GROUP BY status"
+            ).fetchall())
+        finally:
+            conn.close()
+        return {"by_status": counts, "completed": self.completed, "failed": self.failed,
+                "pruned": self.pruned}
+
+
+task_queue = TaskQueue()
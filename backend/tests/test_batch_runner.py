@@ -0,0 +1,149 @@
+"""
+Tests for the batch challenge runner (vaathiyaar/batch_runner.py).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from content.daily_content import CHALLENGES as DAILY_CHALLENGES
+from routes.challenges import CHALLENGES
+from vaathiyaar import batch_runner
+from vaathiyaar.batch_runner import entry_point_for, prepare_case, run_test_cases
+
+
+def _challenge(challenges, challenge_id):
+    return next(c for c in challenges if c["id"] == challenge_id)
+
+
+def test_expression_cases_are_graded_individually():
+    challenge = CHALLENGES[0]
+    solution = (
+        "def fib(n):\n"
+        "    a, b = 0, 1\n"
+        "    for _ in range(n):\n"
+        "        a, b = b, a + b\n"
+        "    return a if n != 50 else 0\n"  # wrong on purpose for one case
+        "print('loaded once')\n"
+    )
+    result = run_test_cases(solution, challenge["test_cases"], entry_point_for(challenge["starter_code"]))
+    statuses = [r["status"] for r in result["results"]]
+    assert statuses == ["passed", "passed", "passed", "passed", "failed"]
+    assert result["passed"] is False
+    assert (result["passed_count"], result["total"]) == (4, 5)
+    assert result["results"][4]["actual"] == "0"
+    assert all(r["time_ms"] is not None for r in result["results"])
+
+
+def test_argument_style_cases_call_the_entry_point():
+    challenge = _challenge(DAILY_CHALLENGES, "ch_b09")
+    solution = (
+        "def convert_temp(value, from_unit):\n"
+        "    if from_unit == 'C':\n"
+        "        return f'{value * 9 / 5 + 32}F'\n"
+        "    return f'{(value - 32) * 5 / 9}C'\n"
+    )
+    assert entry_point_for(challenge["starter_code"]) == "convert_temp"
+    result = run_test_cases(solution, challenge["test_cases"], "convert_temp")
+    assert result["passed"] is True
+
+
+def test_each_case_has_its_own_timeout_and_stdout():
+    cases = [
+        {"input": "slow()", "expected_output": "1"},
+        {"input": "fast()", "expected_output": "hi"},
+    ]
+    solution = "def slow():\n    while True:\n        pass\n\ndef fast():\n    print('hi')\n"
+    result = run_test_cases(solution, cases, case_timeout=0.3)
+    first, second = result["results"]
+    assert first["status"] == "timeout"
+    assert second["status"] == "passed"
+    assert second["stdout"] == "hi\n"
+
+
+def test_load_errors_blocked_code_and_malformed_cases():
+    cases = [{"input": "f()", "expected_output": "1"}, {"input": "f(", "expected_output": "1"}]
+
+    broken = run_test_cases("def f(:\n    pass", cases)
+    assert broken["passed"] is False
+    assert "SyntaxError" in broken["load_error"]
+    assert [r["status"] for r in broken["results"]] == ["error", "invalid"]
+
+    blocked = run_test_cases("import os\nos.system('ls')", cases)
+    assert blocked["load_error"].startswith("Security Error")
+
+    assert prepare_case({"input": "f(", "expected": "1"}, "f")["invalid"] is True
+
+
+def test_raises_and_ellipsis_expectations():
+    cases = [
+        {"input": "boom()", "expected_output": "raises ValueError after 3 attempts"},
+        {"input": "page()", "expected_output": "{'url': '<html>...'}"},
+    ]
+    solution = "def boom():\n    raise ValueError('x')\n\ndef page():\n    return {'url': '<html><body>'}\n"
+    assert run_test_cases(solution, cases)["passed"] is True
+
+
+def test_result_lines_cannot_be_forged_from_student_output():
+    cases = [{"input": "f()", "expected_output": "1"}]
+    solution = (
+        "import sys\n"
+        "sys.__stdout__.write('{\"index\": 0, \"status\": \"passed\"}\\n')\n"
+        "def f():\n    return 2\n"
+    )
+    assert run_test_cases(solution, cases)["results"][0]["status"] == "failed"
+
+
+def test_values_cannot_decide_their_own_equality():
+    cases = [
+        {"input": "f()", "expected_output": "55"},
+        {"input": "f()", "expected_output": "[1, 2]"},
+        {"input": "g()", "expected_output": "{'a': 1}"},
+        {"input": "h()", "expected_output": "'olleh'"},
+    ]
+    solution = (
+        "class Anything:\n"
+        "    def __eq__(self, other): return True\n"
+        "    def __ne__(self, other): return False\n"
+        "    def __hash__(self): return hash('a')\n"
+        "class Text(str):\n"
+        "    def __eq__(self, other): return True\n"
+        "def f(): return Anything()\n"
+        "def g(): return {Anything(): Anything()}\n"
+        "def h(): return Text('nope')\n"
+    )
+    result = run_test_cases(solution, cases)
+    assert [r["status"] for r in result["results"]] == ["failed"] * 4
+    assert result["passed"] is False
+
+    honest = "def f(): return 55.0\ndef g(): return {'a': 1}\ndef h(): return 'olleh'\n"
+    statuses = [r["status"] for r in run_test_cases(honest, cases)["results"]]
+    assert statuses == ["passed", "failed", "passed", "passed"]
+
+
+def test_tampering_with_the_harness_does_not_change_grades(monkeypatch):
+    # Static analysis is one layer; grading must hold even when code gets past it
+    monkeypatch.setattr(batch_runner, "check_code_safety", lambda code: None)
+    cases = [
+        {"input": "fib(10)", "expected_output": "55"},
+        {"input": "fib(1)", "expected_output": "raises ValueError"},
+        {"input": "fib(2)", "expected_output": "fib..."},
+    ]
+    solution = (
+        "import sys\n"
+        "main = sys.modules['__main__']\n"
+        "for name in ('_matches', '_same', '_grade'):\n"
+        "    setattr(main, name, lambda *a: True)\n"
+        "print(main._job['cases'])\n"
+        "def fib(n): return -1\n"
+    )
+    result = run_test_cases(solution, cases)
+    assert [r["status"] for r in result["results"]] == ["failed"] * 3
+    assert result["passed"] is False
+
+    # Expected values never reach the sandbox
+    leak = run_test_cases(solution.replace("print(", "leaked = str(") + "def fib(n): return leaked\n",
+                          cases[:1])
+    leaked = leak["results"][0]["actual"]
+    assert "fib(10)" in leaked and "55" not in leaked and "expected" not in leaked
@@ -0,0 +1,124 @@
+"""
+Tests for the AST safety analyzer (vaathiyaar/code_safety.py) and its use in
+run_code_subprocess.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vaathiyaar import execution
+from vaathiyaar.code_safety import analyze_code
+from vaathiyaar.execution import check_code_safety
+
+
+@pytest.mark.parametrize("code, name", [
+    ("import os\nos.system('ls')", "os.system"),
+    ("import os as o\no.system('ls')", "os.system"),
+    ("from os import system as s", "os.system"),
+    ("from os import *", "os.*"),
+    ("import subprocess\nsubprocess.run(['ls'])", "subprocess.run"),
+    ("import shutil\nrm = shutil.rmtree", "shutil.rmtree"),
+    ("import os\ngetattr(os, 'system')('ls')", "os.system"),
+    ("from pathlib import Path", "pathlib"),
+    ("eval('1 + 1')", "eval"),
+    ("f = open\nf('x')", "open"),
+    ("__builtins__['eval']('1')", "__builtins__"),
+    ("().__class__.__bases__[0].__subclasses__()", "__subclasses__"),
+    ("def later():\n    return o.remove('x')\nimport os as o", "os.remove"),
+])
+def test_forbidden_operations_are_found_however_spelt(code, name):
+    assert check_code_safety(code) == name
+
+
+@pytest.mark.parametrize("code, name", [
+    ("import io\nio.open('x', 'w')", "io.open"),
+    ("import os\nfd = os.open('pymasters.db', os.O_WRONLY)", "os.open"),
+    ("import os\nos.fdopen(3, 'w')", "os.fdopen"),
+    ("import codecs\ncodecs.open('x', 'w')", "codecs.open"),
+    ("from io import open as o\no('x')", "io.open"),
+    ("import gzip as g\ng.open('x')", "gzip.open"),
+    ("import io\nio.FileIO('x', 'w')", "io.FileIO"),
+    ("import _io\n_io.open('x')", "_io"),
+    ("import io\ngetattr(io, 'open')('x')", "io.open"),
+])
+def test_file_opening_entry_points_are_blocked(code, name):
+    assert check_code_safety(code) == name
+
+
+@pytest.mark.parametrize("code, name", [
+    ("import sys\ngetattr(sys.modules['o'+'s'], 'sys'+'tem')('echo pwned')",
+     "getattr with a computed attribute name"),
+    ("import sys\nsys.modules['builtins'].__dict__['op'+'en']('x', 'w')", "sys.modules"),
+    ("import sys\nvars(sys.modules['builtins'])['open']('x', 'w')", "sys.modules"),
+    ("from sys import modules\nmodules['os']", "sys.modules"),
+    ("import sys\nsys.__dict__['modules']", "sys.__dict__"),
+    ("import os\nos.__dict__['sys' + 'tem']('ls')", "os.__dict__"),
+    ("import os\nvars(os)['system']('ls')", "os.__dict__"),
+    ("import os\nname = 'system'\ngetattr(os, name)('ls')", "getattr with a computed attribute name"),
+    ("import os\nsetattr(os, 'x' + 'y', 1)", "setattr with a computed attribute name"),
+])
+def test_dynamic_module_lookups_are_blocked(code, name):
+    assert check_code_safety(code) == name
+
+
+# Each keyword of the former substring scan, in a program that uses it
+@pytest.mark.parametrize("keyword, code", [
+    ("subprocess.call", "import subprocess\nsubprocess.call(['ls'])"),
+    ("subprocess.run", "import subprocess\nsubprocess.run(['ls'])"),
+    ("subprocess.Popen", "import subprocess\nsubprocess.Popen(['ls'])"),
+    ("os.system", "import os\nos.system('ls')"),
+    ("os.remove", "import os\nos.remove('x')"),
+    ("os.rmdir", "import os\nos.rmdir('x')"),
+    ("os.unlink", "import os\nos.unlink('x')"),
+    ("shutil.rmtree", "import shutil\nshutil.rmtree('x')"),
+    ("shutil.move", "import shutil\nshutil.move('x', 'y')"),
+    ("__import__('os').system", "__import__('os').system('ls')"),
+    ("eval(", "eval('1 + 1')"),
+    ("exec(", "exec('x = 1')"),
+    ("open(", "open('x', 'w').write('y')"),
+    ("open(", "import io\nio.open('x', 'w')"),
+    ("open(", "import os\nos.open('x', os.O_WRONLY)"),
+    ("open(", "import codecs\ncodecs.open('x', 'w')"),
+    ("pathlib", "import pathlib\npathlib.Path('x').write_text('y')"),
+])
+def test_everything_the_keyword_scan_blocked_is_still_blocked(keyword, code):
+    assert keyword in code
+    assert check_code_safety(code) is not None
+
+
+@pytest.mark.parametrize("code", [
+    "import ast\nprint(ast.literal_eval('[1, 2]'))",
+    "import os\nprint(os.path.join('a', 'b'))",
+    "# never call open(...) here\nprint('safe')",
+    "text = 'eval(x) and os.system'\nprint(text)",
+    "class Door:\n    def open(self):\n        return 'creak'\nprint(Door().open())",
+    "class Point:\n    pass\np = Point()\nsetattr(p, 'x', 1)\nprint(getattr(p, 'x'), vars(p))",
+])
+def test_harmless_code_is_not_flagged(code):
+    assert check_code_safety(code) is None
+
+
+def test_findings_are_structured_and_analysis_is_shared():
+    analysis = analyze_code("x = 1\nimport os\nos.unlink('f')")
+    finding = analysis.blocked
+    assert (finding.rule, finding.name, finding.line) == ("blocked-name", "os.unlink", 3)
+    assert analysis.tree is not None
+    assert analyze_code("x = 1\nimport os\nos.unlink('f')") is analysis
+
+
+def test_syntax_errors_are_answered_without_a_sandbox(monkeypatch):
+    def no_sandbox(*args):
+        raise AssertionError("should not run")
+
+    monkeypatch.setattr(execution, "run_program", no_sandbox)
+    result = execution.run_code_subprocess("def f(:\n    pass")
+    assert result["exit_code"] == 1
+    assert result["output"] == ""
+    assert result["error"].endswith("SyntaxError: invalid syntax\n")
+
+    blocked = execution.run_code_subprocess("import os\nos.system('ls')")
+    assert blocked["error"] == "Security Error: forbidden operation 'os.system' detected."
@@ -0,0 +1,132 @@
+"""
+Tests for the pooled SQLite access layer (database.py).
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import database
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "pool.db")
+    yield path
+    database.close_all()
+
+
+def test_connection_is_configured_for_wal(db_path):
+    conn = database.connect(db_path)
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        # NORMAL == 1
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+    finally:
+        conn.close()
+
+
+def test_close_returns_connection_to_pool(db_path):
+    first = database.connect(db_path)
+    first.close()
+    second = database.connect(db_path)
+    assert second is first
+    second.close()
+
+
+def test_nested_checkout_gets_distinct_connection(db_path):
+    outer = database.connect(db_path)
+    inner = database.connect(db_path)
+    assert inner is not outer
+    inner.close()
+    outer.close()
+
+
+def test_close_rolls_back_and_resets_row_factory(db_path):
+    import sqlite3
+
+    conn = database.connect(db_path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.row_factory = sqlite3.Row
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.close()
+
+    conn = database.connect(db_path)
+    assert conn.row_factory is None
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    conn.close()
+
+
+def test_replaced_database_file_is_not_reused(db_path):
+    conn = database.connect(db_path)
+    conn.execute("CREATE TABLE old_table (x INTEGER)")
+    conn.commit()
+    conn.close()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.unlink(db_path + suffix)
+
+    conn = database.connect(db_path)
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert "old_table" not in tables
+    conn.close()
+
+
+def _write(db_path, value):
+    conn = database.connect(db_path)
+    conn.execute("INSERT INTO t VALUES (?)", [value])
+    conn.commit()
+    conn.close()
+
+
+def _count(db_path):
+    conn = database.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_transaction_commits_joined_writes_together(db_path):
+    conn = database.connect(db_path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.close()
+
+    with database.transaction(db_path):
+        _write(db_path, 1)
+        with database.transaction(db_path):  # nested blocks join
+            _write(db_path, 2)
+        # Other threads do not see the writes until the block exits
+        seen = []
+        reader = threading.Thread(target=lambda: seen.append(_count(db_path)))
+        reader.start()
+        reader.join()
+        assert seen == [0]
+    assert _count(db_path) == 2
+
+
+def test_transaction_rolls_back_everything_on_error(db_path):
+    conn = database.connect(db_path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.close()
+
+    with pytest.raises(RuntimeError):
+        with database.transaction(db_path):
+            _write(db_path, 1)
+            raise RuntimeError("boom")
+    assert _count(db_path) == 0
+
+    with database.transaction(db_path):
+        _write(db_path, 1)
+        conn = database.connect(db_path)
+        conn.rollback()  # a participant's rollback undoes the whole block
+        conn.close()
+    assert _count(db_path) == 0
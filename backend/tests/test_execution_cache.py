@@ -0,0 +1,79 @@
+"""
+Tests for the execution result cache (vaathiyaar/execution_cache.py) in front
+of run_code_subprocess.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vaathiyaar import execution
+from vaathiyaar.execution_cache import ExecutionCache, code_key, nondeterminism_reason
+
+
+def test_keys_ignore_line_endings_and_trailing_blank_lines():
+    assert code_key("print(1)\r\nprint(2)\n\n") == code_key("print(1)\nprint(2)")
+    assert code_key("print(1)") != code_key("print(2)")
+    assert code_key("print(1)", generation=1) != code_key("print(1)")
+
+
+def test_nondeterministic_programs_are_detected():
+    assert nondeterminism_reason("x = [i * i for i in range(5)]\nprint(x)") is None
+    assert nondeterminism_reason("def f(:") is None
+    assert nondeterminism_reason("import random\nprint(random.random())") == "imports random"
+    assert nondeterminism_reason("from datetime import datetime") == "imports datetime"
+    assert nondeterminism_reason("print(id(object()))") == "uses id()"
+    assert nondeterminism_reason("print({'a', 'b'})") == "iterates a set"
+    assert nondeterminism_reason("d, e = {'a': 1}, {'b': 2}\nprint(list(d.keys() | e.keys()))") == "iterates a set"
+    assert nondeterminism_reason("d = {'a': 1}\nprint(d.items() - {('a', 1)})") == "iterates a set"
+    assert nondeterminism_reason("d = {'a': 1}\nprint(d | {'b': 2}, d.keys())") is None
+    assert nondeterminism_reason("import requests") == "imports requests"
+
+
+def test_repeat_runs_skip_the_sandbox(monkeypatch):
+    runs = []
+
+    def fake_run_program(code, timeout, user_id=None, profile=None):
+        runs.append(code)
+        return {"output": "4\n", "error": "", "exit_code": 0, "timed_out": False, "queue_ms": 0.0}
+
+    monkeypatch.setattr(execution, "run_program", fake_run_program)
+    monkeypatch.setattr(execution, "execution_cache", ExecutionCache())
+
+    first = execution.run_code_subprocess("print(2 + 2)")
+    second = execution.run_code_subprocess("print(2 + 2)\n\n")
+    assert first == second == {"output": "4\n", "error": "", "exit_code": 0, "queue_ms": 0.0}
+    assert len(runs) == 1
+
+    execution.run_code_subprocess("import random\nprint(4)")
+    execution.run_code_subprocess("import random\nprint(4)")
+    assert len(runs) == 3
+
+
+def test_timeouts_and_addresses_are_not_cached():
+    cache = ExecutionCache()
+    key = cache.key_for("print(object())")
+    cache.put(key, {"output": "<object object at 0x7f0a>\n", "error": "", "exit_code": 0})
+    assert cache.get(key) is None
+
+    key = cache.key_for("while True: pass")
+    cache.put(key, {"output": "", "error": "", "exit_code": 1, "timed_out": True})
+    assert cache.get(key) is None
+
+
+def test_lru_is_bounded_by_bytes_and_generation_invalidates():
+    cache = ExecutionCache(max_bytes=300, max_entry_bytes=200)
+    keys = [cache.key_for(f"print({i})") for i in range(4)]
+    for key in keys:
+        cache.put(key, {"output": "x" * 50, "error": "", "exit_code": 0})
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[3]) is not None
+    assert cache.stats()["bytes"] <= 300
+
+    cache.put(keys[0], {"output": "x" * 500, "error": "", "exit_code": 0})
+    assert cache.get(keys[0]) is None
+
+    cache.bump_generation()
+    assert cache.get(keys[3]) is None
+    assert cache.key_for("print(3)") != keys[3]
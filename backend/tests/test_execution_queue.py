@@ -0,0 +1,84 @@
+"""
+Tests for the execution scheduler (vaathiyaar/execution_queue.py) and the 429
+responses of the routes that use it.
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vaathiyaar import execution
+from vaathiyaar.execution_queue import ExecutionBusyError, ExecutionScheduler
+
+
+def _blocked_job(gate, order, label):
+    def job():
+        gate.wait(5)
+        order.append(label)
+        return label
+    return job
+
+
+def test_waiting_runs_are_served_round_robin_across_users():
+    scheduler = ExecutionScheduler(workers=1, max_queued=10, max_per_user=5)
+    gate, order = threading.Event(), []
+    first = scheduler.submit("busy", _blocked_job(gate, order, "busy-0"))
+    while scheduler.stats()["running"] == 0:
+        pass
+    futures = [scheduler.submit("busy", _blocked_job(gate, order, f"busy-{i}")) for i in (1, 2, 3)]
+    futures.append(scheduler.submit("other", _blocked_job(gate, order, "other-1")))
+    gate.set()
+    for future in [first] + futures:
+        future.result(5)
+    # "other" arrived last but is served right after busy's next run
+    assert order == ["busy-0", "busy-1", "other-1", "busy-2", "busy-3"]
+    result, queue_ms = futures[-1].result()
+    assert result == "other-1" and queue_ms >= 0
+
+
+def test_per_user_and_queue_limits_raise_busy_with_retry_after():
+    scheduler = ExecutionScheduler(workers=1, max_queued=2, max_per_user=2)
+    gate, order = threading.Event(), []
+    running = scheduler.submit("a", _blocked_job(gate, order, "a"))
+    while scheduler.stats()["running"] == 0:
+        pass
+    scheduler.submit("a", _blocked_job(gate, order, "a"))
+    with pytest.raises(ExecutionBusyError) as per_user:
+        scheduler.submit("a", _blocked_job(gate, order, "a"))
+    assert per_user.value.retry_after >= 1
+
+    scheduler.submit("b", _blocked_job(gate, order, "b"))
+    with pytest.raises(ExecutionBusyError):
+        scheduler.submit("c", _blocked_job(gate, order, "c"))
+    assert scheduler.stats()["rejected"] == 2
+
+    gate.set()
+    running.result(5)
+
+
+def test_playground_execute_returns_429_when_saturated(monkeypatch):
+    from routes.playground import router
+
+    class _Saturated:
+        async def run_async(self, *args):
+            raise ExecutionBusyError("The code runner is busy; please try again shortly.", 3)
+
+    monkeypatch.setattr(execution, "execution_scheduler", _Saturated())
+    app = FastAPI()
+    app.include_router(router)
+    response = TestClient(app).post("/api/playground/execute", json={"code": "print(41 + 1)", "user_id": "u1"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "3"
+
+
+def test_results_report_queue_wait(monkeypatch):
+    monkeypatch.setattr(execution, "execution_scheduler", ExecutionScheduler(workers=1))
+    result = execution.run_code_subprocess("print(sum([40, 2]))", user_id="u1")
+    assert result["output"] == "42\n"
+    assert isinstance(result["queue_ms"], float)
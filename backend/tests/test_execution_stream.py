@@ -0,0 +1,115 @@
+"""
+Tests for streamed execution (execution.stream_code_subprocess) and the
+playground /execute/stream SSE endpoint.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vaathiyaar import execution
+from vaathiyaar.execution_cache import ExecutionCache
+from vaathiyaar.execution_queue import ExecutionBusyError, ExecutionScheduler
+from vaathiyaar.interpreter_pool import InterpreterPool
+from vaathiyaar.sandbox_profiles import get_profile, truncation_marker
+
+TICKER = (
+    "import sys, time\n"
+    "for i in range(3):\n"
+    "    print('tick', i)\n"
+    "    time.sleep(0.2)\n"
+    "print('done', file=sys.stderr)\n"
+)
+
+
+@pytest.fixture(params=["pool", "fresh"])
+def runner(request, monkeypatch):
+    pool = InterpreterPool(size=1) if request.param == "pool" else None
+    if pool is not None and not pool.supported:
+        pytest.skip("the pool needs os.fork")
+    monkeypatch.setattr(execution, "get_pool", lambda: pool)
+    monkeypatch.setattr(execution, "execution_cache", ExecutionCache(max_bytes=0))
+    monkeypatch.setattr(execution, "execution_scheduler", ExecutionScheduler(workers=2, max_queued=8))
+    yield request.param
+    if pool is not None:
+        pool.close()
+
+
+def _collect(code, **kwargs):
+    """[(seconds since start, event)] for a streamed run."""
+    async def main():
+        started = time.monotonic()
+        events = []
+        async for event in execution.stream_code_subprocess(code, **kwargs):
+            events.append((time.monotonic() - started, event))
+        return events
+    return asyncio.run(main())
+
+
+def _text(events, stream):
+    return "".join(e["data"] for _, e in events if e.get("stream") == stream)
+
+
+def test_output_arrives_while_the_program_runs(runner):
+    events = _collect(TICKER, profile="playground")
+    assert _text(events, "stdout") == "tick 0\ntick 1\ntick 2\n"
+    assert _text(events, "stderr") == "done\n"
+
+    first_tick = next(t for t, e in events if e.get("stream") == "stdout")
+    finished, last = events[-1]
+    assert last["done"] is True and last["exit_code"] == 0
+    assert finished - first_tick > 0.3  # not delivered all at once at the end
+
+
+def test_limits_and_timeouts_are_reported_at_the_end(runner):
+    cap = get_profile("classroom").max_output_bytes
+    flood = _collect("while True:\n    print('x' * 100)")
+    assert _text(flood, "stdout").endswith(truncation_marker(cap))
+    assert len(_text(flood, "stdout")) == cap + len(truncation_marker(cap))
+    assert flood[-1][1]["limit_exceeded"] == "output"
+
+    slow = _collect("import time\nprint('before')\ntime.sleep(5)", timeout=0.5)
+    assert _text(slow, "stdout") == "before\n"
+    assert "Execution timed out after 0.5 seconds." in _text(slow, "stderr")
+    assert slow[-1][1]["timed_out"] is True and slow[-1][1]["exit_code"] == 1
+
+
+def test_prechecked_code_is_answered_without_running(monkeypatch):
+    monkeypatch.setattr(execution, "execution_scheduler", None)  # would fail if used
+    events = [e for _, e in _collect("import os\nos.system('ls')")]
+    assert "forbidden operation 'os.system'" in events[0]["data"]
+    assert events[-1]["exit_code"] == 1
+
+    events = [e for _, e in _collect("print((")]
+    assert "SyntaxError" in events[0]["data"]
+
+
+def test_stream_endpoint_sends_sse_events_and_429_when_busy(runner, monkeypatch):
+    from routes.playground import router
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    response = client.post("/api/playground/execute/stream", json={"code": "print(6 * 7)", "user_id": "u1"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line]
+    assert "".join(e["data"] for e in events if e.get("stream") == "stdout") == "42\n"
+    assert events[-1]["done"] is True and events[-1]["exit_code"] == 0
+
+    class _Saturated:
+        def submit(self, *args):
+            raise ExecutionBusyError("The code runner is busy; please try again shortly.", 4)
+
+    monkeypatch.setattr(execution, "execution_scheduler", _Saturated())
+    response = client.post("/api/playground/execute/stream", json={"code": "print(1)", "user_id": "u1"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "4"
@@ -0,0 +1,98 @@
+"""
+Tests for ETag / conditional GET and precompressed static responses
+(http_cache.py) and the routes that use them.
+"""
+
+import os
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from http_cache import PrecompressedBody, etag_matches, negotiate
+from routes.classroom import router as classroom_router
+from routes.reference import router as reference_router
+from routes.trending import router as trending_router
+
+app = FastAPI()
+app.include_router(classroom_router)
+app.include_router(reference_router)
+app.include_router(trending_router)
+
+client = TestClient(app)
+
+
+def test_negotiate_prefers_highest_q():
+    body = PrecompressedBody.from_bytes(b"x" * 2048)
+    assert negotiate(body, "gzip, deflate") == "gzip"
+    assert negotiate(body, "gzip;q=0") is None
+    assert negotiate(body, "") is None
+    if body.br is not None:
+        assert negotiate(body, "gzip;q=0.5, br") == "br"
+    # Small bodies are not compressed at all
+    assert negotiate(PrecompressedBody.from_bytes(b"{}"), "gzip") is None
+
+
+def test_etag_matches_any_coding_and_weak_form():
+    body = PrecompressedBody.from_bytes(b"x" * 2048)
+    _, gzip_etag = body.variant("gzip")
+    assert gzip_etag != body.etag
+    assert etag_matches(body.etag, body.etag)
+    assert etag_matches(gzip_etag, body.etag)
+    assert etag_matches('"other", W/' + body.etag, body.etag)
+    assert etag_matches("*", body.etag)
+    assert not etag_matches('"other"', body.etag)
+
+
+def test_reference_card_conditional_get():
+    first = client.get("/api/reference/python_basics", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.json()["id"] == "python_basics"
+    etag = first.headers["etag"]
+
+    again = client.get("/api/reference/python_basics",
+                       headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+
+def test_lesson_precompressed_body_matches_identity():
+    lesson_id = client.get("/api/classroom/lessons").json()["lessons"][0]["id"]
+    plain = client.get(f"/api/classroom/lesson/{lesson_id}", headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200
+    assert "content-encoding" not in plain.headers
+
+    compressed = client.get(f"/api/classroom/lesson/{lesson_id}", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.content == plain.content  # transparently decoded by the client
+
+    revalidated = client.get(f"/api/classroom/lesson/{lesson_id}",
+                             headers={"If-None-Match": compressed.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+def test_trending_categories_etag_is_stable():
+    first = client.get("/api/trending/categories")
+    second = client.get("/api/trending/categories")
+    assert first.status_code == second.status_code == 200
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.json() == second.json()
+
+
+def test_generated_lesson_gets_an_etag_without_compression(monkeypatch):
+    import routes.classroom as classroom
+
+    lesson = {"id": "gen_loops", "title": "Loops", "steps": ["x" * 4000]}
+    monkeypatch.setattr(classroom, "_load_lesson_from_dir", lambda lesson_id: lesson)
+
+    response = client.get("/api/classroom/lesson/gen_loops", headers={"Accept-Encoding": "gzip, br"})
+    assert response.status_code == 200 and response.json() == lesson
+    assert "content-encoding" not in response.headers
+    assert "private" in response.headers["cache-control"]
+
+    revalidated = client.get("/api/classroom/lesson/gen_loops", headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
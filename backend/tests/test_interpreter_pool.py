@@ -0,0 +1,120 @@
+"""
+Tests for the warm interpreter pool (vaathiyaar/interpreter_pool.py) behind
+run_code_subprocess.
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vaathiyaar import execution
+from vaathiyaar.execution_cache import ExecutionCache
+from vaathiyaar.execution_queue import ExecutionScheduler
+from vaathiyaar.interpreter_pool import InterpreterPool
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="pool needs os.fork")
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = InterpreterPool(size=2, max_jobs=5)
+    monkeypatch.setattr(execution, "get_pool", lambda: pool)
+    monkeypatch.setattr(execution, "execution_cache", ExecutionCache(max_bytes=0))
+    monkeypatch.setattr(execution, "execution_scheduler", ExecutionScheduler(workers=2, max_queued=32))
+    yield pool
+    pool.close()
+
+
+def test_output_and_exit_codes_match_a_plain_subprocess(pool):
+    programs = [
+        "print('hello')\nprint(sum(range(10)))",
+        "import sys\nprint('bye')\nsys.exit(3)",
+        "x = 1\nprint(x)\nraise ValueError('boom')",
+        "print(input())",
+        "if True print('x')",
+        "import atexit\natexit.register(lambda: print('done'))\nprint('start')",
+    ]
+    for code in programs:
+        pooled = execution.run_code_subprocess(code)
+        fresh = execution._run_code_fresh_process(code, 10)
+        assert pooled["output"] == fresh["output"], code
+        assert pooled["exit_code"] == fresh["exit_code"], code
+        assert pooled["error"].splitlines()[-1:] == fresh["error"].splitlines()[-1:], code
+    # The SyntaxError is answered by the static analyzer without a run
+    assert pool.stats()["jobs"] == len(programs) - 1
+
+
+def test_traceback_shows_the_failing_source_line(pool):
+    result = execution.run_code_subprocess("x = 1\ny = x / 0\n")
+    assert result["exit_code"] == 1
+    assert "y = x / 0" in result["error"]
+    assert "ZeroDivisionError" in result["error"]
+    assert "exec_worker" not in result["error"]
+
+
+def test_program_runs_as_a_real_main_module(pool):
+    tests = (
+        "import unittest\n"
+        "class T(unittest.TestCase):\n"
+        "    def test_a(self): self.assertEqual(1, 1)\n"
+        "    def test_b(self): self.assertTrue(True)\n"
+        "unittest.main()\n"
+    )
+    pickled = (
+        "import pickle\n"
+        "class Point:\n"
+        "    def __init__(self, x): self.x = x\n"
+        "print(pickle.loads(pickle.dumps(Point(3))).x)\n"
+    )
+    for code in (tests, pickled):
+        pooled = execution.run_code_subprocess(code)
+        fresh = execution._run_code_fresh_process(code, 10)
+        assert pooled["exit_code"] == fresh["exit_code"] == 0, pooled["error"]
+        assert pooled["output"] == fresh["output"]
+    assert "Ran 2 tests" in execution.run_code_subprocess(tests)["error"]
+    assert execution.run_code_subprocess(pickled)["output"] == "3\n"
+
+
+def test_runs_do_not_share_state(pool):
+    execution.run_code_subprocess("import json\njson.dumps = None\nleaked = 1")
+    result = execution.run_code_subprocess(
+        "import json\nprint(json.dumps([1]))\nprint('leaked' in globals())"
+    )
+    assert result["output"] == "[1]\nFalse\n"
+
+
+def test_timeout_keeps_the_original_message_and_worker_survives(pool):
+    result = execution.run_code_subprocess("while True:\n    pass", timeout=1)
+    result.pop("queue_ms")
+    assert result == {
+        "output": "",
+        "error": "Execution timed out after 1 seconds.",
+        "exit_code": 1,
+    }
+    assert execution.run_code_subprocess("print('ok')")["output"] == "ok\n"
+
+
+def test_workers_are_recycled_and_concurrent_runs_work(pool):
+    results = []
+
+    def run(i):
+        results.append(execution.run_code_subprocess(f"print({i} * 2)")["output"])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(results) == sorted(f"{i * 2}\n" for i in range(12))
+    stats = pool.stats()
+    assert stats["workers"] <= 2
+    assert stats["replaced"] >= 2  # max_jobs=5 over 12 runs
+
+
+def test_falls_back_to_a_fresh_process_without_a_pool(monkeypatch):
+    monkeypatch.setattr(execution, "get_pool", lambda: None)
+    assert execution.run_code_subprocess("print('fresh')")["output"] == "fresh\n"
@@ -48,3 +48,53 @@ def test_list_all_lessons_from_tracks(lessons_dir):
 def test_load_nonexistent_lesson(lessons_dir):
     lesson = _load_lesson_from_dir("nonexistent", str(lessons_dir))
     assert lesson is None
+
+
+def test_catalog_reloads_only_changed_files(lessons_dir):
+    from content.lesson_catalog import LessonCatalog
+
+    catalog = LessonCatalog(lessons_dir, recheck_seconds=0)
+    assert [l["id"] for l in catalog.listing()] == ["test_lesson"]
+    generation = catalog.generation
+
+    # Unchanged directory: no rebuild
+    assert catalog.refresh() is False
+    assert catalog.generation == generation
+
+    track_dir = lessons_dir / "python_fundamentals"
+    second = {"id": "second_lesson", "track": "python_fundamentals", "order": 0, "title": {"en": "Second"}}
+    (track_dir / "second_lesson.json").write_text(json.dumps(second))
+
+    assert catalog.refresh() is True
+    assert catalog.get("second_lesson").track == "python_fundamentals"
+    # Per-track list is ordered by the lesson's `order`, not by filename
+    assert [e.lookup_id for e in catalog.track("python_fundamentals")] == ["second_lesson", "test_lesson"]
+
+    (track_dir / "second_lesson.json").unlink()
+    assert catalog.refresh() is True
+    assert catalog.get("second_lesson") is None
+
+
+def test_lesson_bundle_round_trip(lessons_dir, tmp_path):
+    from content.lesson_bundle import LessonBundle, build_bundle, encode_lesson
+
+    lesson = json.loads((lessons_dir / "python_fundamentals" / "test_lesson.json").read_text())
+    lesson["title"]["ta"] = "சோதனை"
+    blob, spans = encode_lesson(lesson)
+    assert blob == json.dumps(lesson, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    start, length = spans["title"]["ta"]
+    assert json.loads(blob[start:start + length]) == "சோதனை"
+
+    bundle_path = tmp_path / "lessons.bundle"
+    assert build_bundle(lessons_dir, bundle_path) == 1
+    bundle = LessonBundle(bundle_path)
+    try:
+        st = (lessons_dir / "python_fundamentals" / "test_lesson.json").stat()
+        bundled = bundle.get("test_lesson", size=st.st_size, mtime_ns=st.st_mtime_ns)
+        assert json.loads(bundled.data)["id"] == "test_lesson"
+        assert json.loads(bundled.variant("story_variants", "en")) == "## Test\n\nHello"
+        assert bundled.variant("story_variants", "fr") is None
+        # A changed source file makes the bundle entry stale
+        assert bundle.get("test_lesson", size=st.st_size + 1, mtime_ns=st.st_mtime_ns) is None
+    finally:
+        bundle.close()
@@ -0,0 +1,61 @@
+"""
+Tests for the precomputed per-bucket lesson ordering (content/lesson_ordering.py).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from content.lesson_ordering import build_ordered_listing, profile_hint
+
+
+def _lesson(lesson_id, track, order):
+    return {"id": lesson_id, "track": track, "order": order}
+
+
+def test_profile_hint_precedence():
+    assert profile_hint("games", "ai_ml") == "hobby"
+    assert profile_hint("ai_ml, web", "") == "ai_ml"
+    assert profile_hint("web", None) == "career"
+    assert profile_hint(None, "student") == "general"
+
+
+def test_ordering_recommended_first_by_track_priority():
+    listing = [
+        _lesson("dl1", "deep_learning", 1),
+        _lesson("pf2", "python_fundamentals", 2),
+        _lesson("fun1", "fun_automation", 1),
+        _lesson("pf1", "python_fundamentals", 1),
+    ]
+    ordered = build_ordered_listing(listing, "beginner", "hobby")
+    assert [l["id"] for l in ordered.lessons] == ["fun1", "pf1", "pf2", "dl1"]
+    assert [l["recommended"] for l in ordered.lessons] == [True, True, True, False]
+
+    merged = ordered.merge([{"id": "gen1", "track": "generated", "order": 0}])
+    assert [l["id"] for l in merged] == ["fun1", "pf1", "pf2", "gen1", "dl1"]
+    # The cached listing is not modified by a merge
+    assert len(ordered.lessons) == 4
+
+
+def test_merge_promotes_fallbacks_when_too_few_recommended():
+    listing = [
+        _lesson("dsa1", "dsa", 1),
+        _lesson("ag1", "ai_agents", 1),
+        _lesson("ag2", "ai_agents", 2),
+        _lesson("pf1", "python_fundamentals", 1),
+    ]
+    ordered = build_ordered_listing(listing, "beginner", "career")
+    assert ordered.recommended_count == 1
+
+    merged = ordered.merge([])
+    assert [(l["id"], l["recommended"]) for l in merged] == [
+        ("pf1", True), ("ag1", True), ("ag2", True), ("dsa1", False),
+    ]
+
+    # A generated lesson counts towards the minimum, so only one fallback is promoted
+    merged = ordered.merge([{"id": "gen1", "track": "generated", "order": 0}])
+    assert [(l["id"], l["recommended"]) for l in merged] == [
+        ("pf1", True), ("ag1", True), ("gen1", True), ("ag2", False), ("dsa1", False),
+    ]
+    assert not any(l["recommended"] for l in ordered.lessons if l["id"] == "ag1")
@@ -0,0 +1,185 @@
+"""
+Tests for deadlines, circuit breaking and hedging of LLM calls (vaathiyaar/llm_client.py).
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vaathiyaar import engine
+from vaathiyaar.concurrency import VaathiyaarBusyError
+from vaathiyaar.llm_client import (
+    CircuitBreaker, LLMGuard, VaathiyaarTimeoutError, VaathiyaarUnavailableError,
+)
+from vaathiyaar.model_router import FLAGSHIP, ModelRouter, ModelTier
+from vaathiyaar.single_flight import SingleFlight
+
+
+def _breaker(name="primary", **overrides):
+    options = dict(window=10, min_calls=4, error_rate=0.5, slow_seconds=1.0, slow_rate=0.5, open_seconds=0.05)
+    options.update(overrides)
+    return CircuitBreaker(name, **options)
+
+
+def _route_through(monkeypatch, guard):
+    tier = ModelTier(FLAGSHIP, [("primary", "m"), None], guard)
+    monkeypatch.setattr(engine, "model_router", ModelRouter({FLAGSHIP: tier}, {}))
+
+
+def _fail():
+    raise ConnectionError("upstream 502")
+
+
+def test_breaker_trips_on_error_rate_then_probes():
+    guard = LLMGuard([_breaker(), _breaker("hedge")], timeout=1)
+    for _ in range(4):
+        with pytest.raises(ConnectionError):
+            guard.call([_fail])
+    primary = guard.breakers[0]
+    assert primary.state == "open" and primary.trips == 1
+
+    # Open: fails at once without calling upstream
+    calls = []
+    with pytest.raises(VaathiyaarUnavailableError) as exc:
+        guard.call([lambda: calls.append(1)])
+    assert calls == [] and exc.value.retry_after >= 1
+
+    time.sleep(0.06)
+    assert primary.state == "half_open"
+    with pytest.raises(ConnectionError):
+        guard.call([_fail])          # failed probe re-opens
+    assert primary.state == "open"
+
+    time.sleep(0.06)
+    assert guard.call([lambda: "ok"]) == "ok"   # good probe closes
+    assert primary.stats()["state"] == "closed"
+
+
+def test_breaker_trips_on_latency():
+    breaker = _breaker(slow_seconds=0.5)
+    for _ in range(4):
+        breaker.record(True, 0.6)
+    assert breaker.state == "open"
+
+
+def test_local_busy_errors_do_not_count():
+    guard = LLMGuard([_breaker()], timeout=1)
+
+    def busy():
+        raise VaathiyaarBusyError("user has too many calls")
+
+    for _ in range(6):
+        with pytest.raises(VaathiyaarBusyError):
+            guard.call([busy])
+    assert guard.breakers[0].stats()["recent_calls"] == 0
+
+
+def test_deadline_raises_timeout():
+    guard = LLMGuard([_breaker()], timeout=0.05)
+    started = time.monotonic()
+    with pytest.raises(VaathiyaarTimeoutError):
+        guard.call([lambda: time.sleep(0.5)])
+    assert time.monotonic() - started < 0.3
+    assert guard.timeouts == 1
+
+
+def test_slow_primary_is_hedged_to_the_secondary():
+    guard = LLMGuard([_breaker(), _breaker("hedge")], timeout=2, hedge_min_delay=0.05)
+
+    def slow_primary():
+        time.sleep(0.5)
+        return "primary"
+
+    started = time.monotonic()
+    assert guard.call([slow_primary, lambda: "hedge"]) == "hedge"
+    assert time.monotonic() - started < 0.4
+    assert guard.hedges == 1 and guard.hedge_wins == 1
+
+    # A fast primary never triggers the hedge
+    assert guard.call([lambda: "primary", lambda: "hedge"]) == "primary"
+    assert guard.hedges == 1
+
+    # A failing primary falls over to the secondary at once
+    assert guard.call([_fail, lambda: "hedge"]) == "hedge"
+
+
+def test_async_hedge_cancels_the_loser():
+    guard = LLMGuard([_breaker(), _breaker("hedge")], timeout=2, hedge_min_delay=0.02)
+    cancelled = []
+
+    async def slow_primary():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "primary"
+
+    async def hedge():
+        return "hedge"
+
+    async def scenario():
+        result = await guard.acall([slow_primary, hedge])
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()) == "hedge"
+    assert cancelled == [True]
+    # A cancelled loser is not a failure
+    assert guard.breakers[0].stats()["recent_errors"] == 0
+
+
+def test_async_deadline_counts_as_failure():
+    guard = LLMGuard([_breaker()], timeout=0.02)
+
+    async def hang():
+        await asyncio.sleep(1)
+
+    with pytest.raises(VaathiyaarTimeoutError):
+        asyncio.run(guard.acall([hang]))
+    assert guard.breakers[0].stats()["recent_errors"] == 1
+
+
+class _NoCallClient:
+    def chat(self, *args, **kwargs):
+        pytest.fail("upstream must not be called")
+
+
+def test_open_breaker_serves_evaluation_fallback_instantly(monkeypatch):
+    guard = LLMGuard([_breaker(open_seconds=60), _breaker("hedge")])
+    for _ in range(4):
+        guard.breakers[0].record(False)
+    _route_through(monkeypatch, guard)
+    monkeypatch.setattr(engine, "llm_flights", SingleFlight())
+    monkeypatch.setattr(engine, "get_ollama_client", lambda: _NoCallClient())
+
+    evaluation = {"success": True, "output": "42\n", "error": "", "queue_ms": 0.0, "blocked": None}
+    feedback = engine.evaluation_feedback(evaluation, "print(42)", "42")
+    assert feedback == engine.fallback_feedback(evaluation)
+
+
+class _StalledStreamClient:
+    async def chat(self, model, messages, stream=False):
+        async def chunks():
+            await asyncio.sleep(1)
+            yield {"message": {"content": "late"}}
+        return chunks()
+
+
+def test_stream_without_a_first_token_times_out(monkeypatch):
+    guard = LLMGuard([_breaker()])
+    _route_through(monkeypatch, guard)
+    monkeypatch.setattr(engine, "VAATHIYAAR_FIRST_TOKEN_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(engine, "get_async_ollama_client", lambda endpoint="primary": _StalledStreamClient())
+
+    async def collect():
+        return [t async for t in engine.astream_vaathiyaar([{"role": "user", "content": "hi"}], "u1")]
+
+    with pytest.raises(VaathiyaarTimeoutError):
+        asyncio.run(collect())
+    assert guard.breakers[0].stats()["recent_errors"] == 1
@@ -0,0 +1,87 @@
+"""
+Tests for the async Vaathiyaar path: the LLM concurrency limiter
+(vaathiyaar/concurrency.py) and the async streaming helper in engine.py.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vaathiyaar import engine
+from vaathiyaar.concurrency import LLMLimiter, VaathiyaarBusyError
+
+
+def test_per_user_limit_rejects_after_timeout():
+    limiter = LLMLimiter(max_concurrent=10, max_per_user=1, timeout=0.05)
+
+    async def scenario():
+        async with limiter.slot("u1"):
+            # A second call from the same student waits, then gives up
+            with pytest.raises(VaathiyaarBusyError):
+                async with limiter.slot("u1"):
+                    pass
+            # Other students are unaffected
+            async with limiter.slot("u2"):
+                assert limiter.stats()["active"] == 2
+        assert limiter.stats()["users"] == 0
+
+    asyncio.run(scenario())
+    assert limiter.rejected == 1
+
+
+def test_global_limit_queues_then_admits():
+    limiter = LLMLimiter(max_concurrent=2, max_per_user=5, timeout=1)
+    peak = 0
+
+    async def call(user):
+        nonlocal peak
+        async with limiter.slot(user):
+            peak = max(peak, limiter.stats()["active"])
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        await asyncio.gather(*(call(f"u{i}") for i in range(6)))
+
+    asyncio.run(scenario())
+    assert peak == 2
+    assert limiter.rejected == 0
+
+
+def test_cancelled_call_releases_its_slot():
+    limiter = LLMLimiter(max_concurrent=1, max_per_user=1, timeout=0.5)
+
+    async def hold():
+        async with limiter.slot("u1"):
+            await asyncio.sleep(10)
+
+    async def scenario():
+        task = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        async with limiter.slot("u1"):
+            pass
+
+    asyncio.run(scenario())
+
+
+class _FakeAsyncClient:
+    async def chat(self, model, messages, stream=False):
+        async def chunks():
+            for token in ("Hel", "", "lo"):
+                yield {"message": {"content": token}}
+        return chunks()
+
+
+def test_astream_vaathiyaar_yields_non_empty_tokens(monkeypatch):
+    monkeypatch.setattr(engine, "get_async_ollama_client", lambda endpoint="primary": _FakeAsyncClient())
+
+    async def collect():
+        return [t async for t in engine.astream_vaathiyaar([{"role": "user", "content": "hi"}], "u1")]
+
+    assert asyncio.run(collect()) == ["Hel", "lo"]
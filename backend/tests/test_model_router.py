@@ -0,0 +1,133 @@
+"""
+Tests for routing Vaathiyaar calls to model tiers (vaathiyaar/model_router.py).
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vaathiyaar import engine
+from vaathiyaar.llm_client import CircuitBreaker, LLMGuard
+from vaathiyaar.model_router import FLAGSHIP, LOCAL, ModelRouter, ModelTier, classify_call, parse_routes
+from vaathiyaar.single_flight import SingleFlight
+
+ROUTES = "diagnostic=local,pipeline=local,pipeline.narrative=flagship,bogus=nowhere"
+ANSWER = '{"message": "ok", "phase": "teach"}'
+
+
+def test_calls_are_classified_from_their_context():
+    assert classify_call(None) == "chat"
+    assert classify_call({"mode": "playground"}) == "chat"
+    assert classify_call({"pipeline_stage": "outline", "topic": "loops"}) == "pipeline.outline"
+    assert classify_call({"challenge_id": "d1", "code_evaluation": {}}) == "diagnostic"
+    assert classify_call({"lesson_id": "l1", "code_evaluation": {"success": True}}) == "feedback"
+
+
+def test_routes_fall_back_to_prefix_then_flagship():
+    flagship = ModelTier(FLAGSHIP, [("primary", "big")], None)
+    local = ModelTier(LOCAL, [("local", "small")], None)
+    router = ModelRouter({FLAGSHIP: flagship, LOCAL: local}, parse_routes(ROUTES + ",,junk"))
+
+    assert router.route("pipeline.outline") is local
+    assert router.route("pipeline.narrative") is flagship
+    assert router.route("diagnostic") is local
+    assert router.route("chat") is flagship and router.route("feedback") is flagship
+    assert router.route("bogus") is flagship  # unknown tier
+
+    # Without a local model every route ends on the flagship
+    assert ModelRouter({FLAGSHIP: flagship}, parse_routes(ROUTES)).route("diagnostic") is flagship
+
+
+class _Client:
+    def __init__(self, endpoint, calls, fail=False):
+        self.endpoint, self.calls, self.fail = endpoint, calls, fail
+
+    def chat(self, model, messages, stream=False):
+        self.calls.append((self.endpoint, model))
+        if self.fail:
+            raise ConnectionError("local model is down")
+        return {"message": {"content": ANSWER}, "prompt_eval_count": 100, "eval_count": 20}
+
+
+@pytest.fixture
+def tiers(monkeypatch):
+    calls = []
+    clients = {"primary": _Client("primary", calls), "local": _Client("local", calls)}
+    guards = {
+        FLAGSHIP: LLMGuard([CircuitBreaker("primary"), CircuitBreaker("hedge")], timeout=2),
+        LOCAL: LLMGuard([CircuitBreaker("local"), CircuitBreaker("primary")], timeout=2, hedge_min_delay=1),
+    }
+    router = ModelRouter({
+        FLAGSHIP: ModelTier(FLAGSHIP, [("primary", "big"), None], guards[FLAGSHIP]),
+        LOCAL: ModelTier(LOCAL, [("local", "small"), ("primary", "big")], guards[LOCAL]),
+    }, parse_routes(ROUTES))
+    monkeypatch.setattr(engine, "model_router", router)
+    monkeypatch.setattr(engine, "llm_flights", SingleFlight())
+    monkeypatch.setattr(engine, "_sync_client", lambda endpoint: clients[endpoint])
+    return router, clients, calls
+
+
+def test_cheap_calls_go_to_the_local_model(tiers):
+    router, _, calls = tiers
+    engine.call_vaathiyaar("outline loops", lesson_context={"pipeline_stage": "outline"})
+    engine.call_vaathiyaar("tell the story", lesson_context={"pipeline_stage": "narrative"})
+    engine.call_vaathiyaar("what is a loop?")
+    assert calls == [("local", "small"), ("primary", "big"), ("primary", "big")]
+
+    stats = router.stats()["tiers"]
+    assert stats[LOCAL]["calls"] == 1 and stats[FLAGSHIP]["calls"] == 2
+    assert stats[FLAGSHIP]["prompt_tokens"] == 200 and stats[FLAGSHIP]["completion_tokens"] == 40
+    assert stats[LOCAL]["p95_seconds"] is not None
+
+
+def test_forbidden_keyword_explanation_is_a_diagnostic(tiers):
+    _, _, calls = tiers
+    blocked = {"success": False, "output": "", "error": "", "queue_ms": 0.0, "blocked": "os"}
+    engine.evaluation_feedback(blocked, "import os", "", lesson_context={"lesson_id": "l1"})
+    ran = {**blocked, "success": True, "output": "1\n", "blocked": None}
+    engine.evaluation_feedback(ran, "print(1)", "1", lesson_context={"lesson_id": "l1"})
+    assert calls == [("local", "small"), ("primary", "big")]
+
+
+def test_failing_local_model_falls_back_to_the_flagship(tiers):
+    router, clients, calls = tiers
+    clients["local"].fail = True
+    answer = engine.call_vaathiyaar("outline loops", lesson_context={"pipeline_stage": "outline"})
+    assert answer["message"] == "ok"
+    assert calls == [("local", "small"), ("primary", "big")]
+    assert router.stats()["tiers"][LOCAL]["guard"]["breakers"]["local"]["recent_errors"] == 1
+
+
+class _StreamClient:
+    def __init__(self, endpoint, models):
+        self.endpoint, self.models = endpoint, models
+
+    async def chat(self, model, messages, stream=False):
+        self.models.append((self.endpoint, model))
+
+        async def chunks():
+            yield {"message": {"content": "Hi"}}
+            yield {"message": {"content": ""}, "done": True, "prompt_eval_count": 7, "eval_count": 3}
+        return chunks()
+
+
+def test_streams_skip_an_open_local_tier(tiers, monkeypatch):
+    router, _, _ = tiers
+    models = []
+    monkeypatch.setattr(engine, "get_async_ollama_client", lambda endpoint="primary": _StreamClient(endpoint, models))
+
+    async def collect():
+        return [t async for t in engine.astream_vaathiyaar([{"role": "user", "content": "x"}], "u1", kind="diagnostic")]
+
+    assert asyncio.run(collect()) == ["Hi"]
+    for _ in range(5):
+        router.tiers[LOCAL].guard.breakers[0].record(False)
+    assert asyncio.run(collect()) == ["Hi"]
+
+    assert models == [("local", "small"), ("primary", "big")]
+    stats = router.stats()["tiers"]
+    assert stats[LOCAL]["completion_tokens"] == 3 and stats[FLAGSHIP]["completion_tokens"] == 3
@@ -0,0 +1,111 @@
+"""
+Tests for the sandbox package layer (vaathiyaar/package_layer.py), using a
+local index with one hand-built wheel so no network is needed.
+"""
+
+import base64
+import hashlib
+import os
+import sys
+import zipfile
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vaathiyaar import execution, package_layer
+from vaathiyaar.execution_cache import ExecutionCache
+from vaathiyaar.execution_queue import ExecutionScheduler
+from vaathiyaar.interpreter_pool import InterpreterPool
+from vaathiyaar.package_layer import PackageLayer, PackageUnavailableError
+
+
+def _build_wheel(wheelhouse, name="demo_pkg", version="1.0", source="VALUE = 42\n"):
+    files = {
+        f"{name}/__init__.py": source,
+        f"{name}-{version}.dist-info/METADATA":
+            f"Metadata-Version: 2.1\nName: {name.replace('_', '-')}\nVersion: {version}\n",
+        f"{name}-{version}.dist-info/WHEEL":
+            "Wheel-Version: 1.0\nGenerator: tests\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+    }
+    record = []
+    for path, text in files.items():
+        digest = base64.urlsafe_b64encode(hashlib.sha256(text.encode()).digest()).rstrip(b"=").decode()
+        record.append(f"{path},sha256={digest},{len(text.encode())}")
+    record.append(f"{name}-{version}.dist-info/RECORD,,")
+    files[f"{name}-{version}.dist-info/RECORD"] = "\n".join(record) + "\n"
+
+    os.makedirs(wheelhouse, exist_ok=True)
+    with zipfile.ZipFile(os.path.join(wheelhouse, f"{name}-{version}-py3-none-any.whl"), "w") as wheel:
+        for path, text in files.items():
+            wheel.writestr(path, text)
+
+
+@pytest.fixture
+def layer(tmp_path, monkeypatch):
+    _build_wheel(str(tmp_path / "wheels"))
+    layer = PackageLayer(tmp_path, allowed={"demo-pkg", "numpy"})
+    monkeypatch.setattr(execution, "get_package_layer", lambda: layer)
+    monkeypatch.setattr(execution, "execution_cache", ExecutionCache(max_bytes=0))
+    monkeypatch.setattr(execution, "execution_scheduler", ExecutionScheduler(workers=1, max_queued=8))
+    return layer
+
+
+def test_enable_installs_once_from_the_local_index_then_is_constant_time(layer, tmp_path):
+    assert layer.canonical("Demo_Pkg") == "demo-pkg"
+    assert layer.canonical("left-pad") is None
+
+    first = layer.enable("Demo_Pkg")
+    assert first == {"package": "demo-pkg", "changed": True, "installed_now": True}
+    assert layer.sys_paths() == [str(tmp_path / "site" / "demo-pkg")]
+    if os.getuid() != 0:  # root ignores file modes
+        assert not os.access(tmp_path / "site" / "demo-pkg" / "demo_pkg" / "__init__.py", os.W_OK)
+
+    assert layer.enable("demo-pkg") == {"package": "demo-pkg", "changed": False, "installed_now": False}
+    # Enabled packages persist across restarts
+    assert PackageLayer(tmp_path, allowed={"demo-pkg"}).enabled() == ["demo-pkg"]
+
+    with pytest.raises(PackageUnavailableError):
+        layer.enable("numpy")  # allowed, but not in the local index
+    with pytest.raises(ValueError):
+        layer.enable("left-pad")
+
+    assert layer.disable("demo-pkg") and layer.sys_paths() == []
+
+
+@pytest.mark.parametrize("use_pool", [True, False])
+def test_enabled_packages_are_importable_in_the_sandbox(layer, monkeypatch, use_pool):
+    pool = InterpreterPool(size=1) if use_pool else None
+    if pool is not None and not pool.supported:
+        pytest.skip("the pool needs os.fork")
+    monkeypatch.setattr(execution, "get_pool", lambda: pool)
+    try:
+        before = execution.run_code_subprocess("import demo_pkg")
+        assert "ModuleNotFoundError" in before["error"]
+
+        layer.enable("demo-pkg")
+        after = execution.run_code_subprocess("import demo_pkg\nprint(demo_pkg.VALUE)")
+        assert after["output"] == "42\n"
+    finally:
+        if pool is not None:
+            pool.close()
+
+
+def test_install_package_endpoint_enables_without_pip(layer, monkeypatch):
+    from routes.playground import router
+
+    monkeypatch.setattr(package_layer, "get_package_layer", lambda: layer)
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    ok = client.post("/api/playground/install-package", json={"package": "demo-pkg"}).json()
+    assert ok["success"] is True and "demo-pkg" in ok["output"]
+
+    refused = client.post("/api/playground/install-package", json={"package": "left-pad"}).json()
+    assert refused["success"] is False and refused["allowed"] == ["demo-pkg", "numpy"]
+
+    missing = client.post("/api/playground/install-package", json={"package": "numpy"}).json()
+    assert missing["success"] is False and "local package index" in missing["error"]
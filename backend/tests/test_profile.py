@@ -399,3 +399,38 @@ class TestProfilerService:
         mastery = get_mastery_map(db_path, "user-003")
         assert "functions" in mastery
         assert mastery["functions"] == pytest.approx(0.75)
+
+    def test_profile_snapshot(self, initialized_db):
+        """get_profile_snapshot should gather profile, mastery, signals, completions and XP."""
+        from vaathiyaar.profiler import (
+            get_profile_snapshot, get_student_profile, record_signal, update_mastery,
+        )
+
+        conn, db_path = initialized_db
+        conn.execute(
+            "INSERT INTO users (id, username, name, points) VALUES ('user-004', 'snap', 'Snap', 600)"
+        )
+        conn.execute(
+            "INSERT INTO user_profiles (user_id, skill_level) VALUES ('user-004', NULL)"
+        )
+        conn.execute(
+            "INSERT INTO lesson_completions (user_id, lesson_id, xp_awarded) VALUES ('user-004', 'loops_101', 25)"
+        )
+        conn.commit()
+        record_signal(db_path, "user-004", "quiz_score", "loops", {"score": 1})
+        update_mastery(db_path, "user-004", "loops", 0.6)
+
+        snapshot = get_profile_snapshot(db_path, "user-004")
+        assert snapshot is not None
+        assert snapshot.skill_level == "beginner"
+        assert snapshot.mastery == {"loops": pytest.approx(0.6)}
+        assert snapshot.recent_signals[0]["topic"] == "loops"
+        assert snapshot.completed_lessons == [
+            {"lesson_id": "loops_101", "completed_at": snapshot.completed_lessons[0]["completed_at"], "xp": 25}
+        ]
+        assert snapshot.active_path is None
+        assert snapshot.total_xp == 600
+        assert snapshot.rank == "ENGINEER"
+
+        assert get_student_profile(db_path, "user-004") == snapshot.to_dict()
+        assert get_profile_snapshot(db_path, "missing-user") is None
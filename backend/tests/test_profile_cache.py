@@ -0,0 +1,106 @@
+"""
+Tests for the versioned profile cache (vaathiyaar/profile_cache.py) and its
+write-through invalidation from the profiler service.
+"""
+
+import os
+import sys
+import sqlite3
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vaathiyaar.profile_cache import ProfileCache
+
+
+def test_hit_after_put_and_miss_after_invalidate():
+    cache = ProfileCache(max_entries=10, ttl_seconds=60)
+    version = cache.version("u1")
+    assert cache.get("db", "u1") == (False, None)
+
+    cache.put("db", "u1", {"name": "A"}, version)
+    assert cache.get("db", "u1") == (True, {"name": "A"})
+
+    cache.invalidate("u1")
+    assert cache.get("db", "u1") == (False, None)
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["invalidations"] == 1
+
+
+def test_put_with_stale_version_is_dropped():
+    cache = ProfileCache(max_entries=10, ttl_seconds=60)
+    version = cache.version("u1")
+    cache.invalidate("u1")  # a writer landed while we were loading
+    cache.put("db", "u1", {"name": "old"}, version)
+    assert cache.get("db", "u1") == (False, None)
+
+
+def test_version_memory_is_bounded():
+    cache = ProfileCache(max_entries=10, ttl_seconds=60, version_slots=8)
+    for n in range(1000):
+        cache.invalidate(f"user{n}")
+    assert len(cache._versions) == 8
+
+    # Invalidation still reaches the user's cached entry and in-flight loads
+    version = cache.version("u1")
+    cache.put("db", "u1", "fresh", version)
+    cache.invalidate("u1")
+    cache.put("db", "u1", "stale", version)
+    assert cache.get("db", "u1") == (False, None)
+
+
+def test_lru_eviction_and_ttl_expiry():
+    cache = ProfileCache(max_entries=2, ttl_seconds=60)
+    for uid in ("a", "b", "c"):
+        cache.put("db", uid, uid, cache.version(uid))
+    assert cache.get("db", "a") == (False, None)
+    assert cache.get("db", "c") == (True, "c")
+    assert cache.stats()["evictions"] == 1
+
+    short = ProfileCache(max_entries=2, ttl_seconds=0.01)
+    short.put("db", "a", "a", 0)
+    time.sleep(0.02)
+    assert short.get("db", "a") == (False, None)
+
+
+def test_profiler_writers_invalidate_cached_profile(tmp_path):
+    import importlib
+    import main as m
+    from vaathiyaar.profile_cache import profile_cache
+    from vaathiyaar.profiler import get_student_profile, update_mastery
+
+    db_path = str(tmp_path / "cache_test.db")
+    original_db_path = os.environ.get("DB_PATH")
+    os.environ["DB_PATH"] = db_path
+    try:
+        importlib.reload(m)
+        m.init_db()
+    finally:
+        if original_db_path is not None:
+            os.environ["DB_PATH"] = original_db_path
+        else:
+            os.environ.pop("DB_PATH", None)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (id, username, name, points) VALUES ('cache-u', 'c', 'C', 10)")
+    conn.execute("INSERT INTO user_profiles (user_id, skill_level) VALUES ('cache-u', 'beginner')")
+    conn.commit()
+    conn.close()
+
+    first = get_student_profile(db_path, "cache-u")
+    hits_before = profile_cache.stats()["hits"]
+    second = get_student_profile(db_path, "cache-u")
+    assert profile_cache.stats()["hits"] == hits_before + 1
+    assert second == first
+
+    # Returned dicts are copies: callers may mutate them freely
+    second["mastery"]["loops"] = 1.0
+    assert get_student_profile(db_path, "cache-u")["mastery"] == {}
+
+    update_mastery(db_path, "cache-u", "loops", 0.5)
+    assert get_student_profile(db_path, "cache-u")["mastery"] == {"loops": pytest.approx(0.5)}
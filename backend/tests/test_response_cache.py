@@ -0,0 +1,129 @@
+"""
+Tests for the semantic Vaathiyaar response cache (vaathiyaar/response_cache.py)
+and its use from call_vaathiyaar.
+"""
+
+import os
+import sys
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import routes.classroom as classroom
+from vaathiyaar import engine
+from vaathiyaar.response_cache import ResponseCache, is_cacheable, normalize_message
+
+LESSON = {"lesson_id": "list_comprehensions", "phase": "story", "language": "en"}
+ASHA = {"name": "Asha", "skill_level": "beginner", "preferred_language": "en"}
+RAVI = {"name": "Ravi", "skill_level": "beginner", "preferred_language": "en"}
+
+
+def _answer(name):
+    return {"message": f"Great question, {name}! A list comprehension builds a list.", "phase": "story"}
+
+
+def test_normalize_message_ignores_case_punctuation_and_spacing():
+    assert normalize_message("  What is a LIST comprehension?? ") == "what is a list comprehension"
+    assert normalize_message("லிஸ்ட் என்றால் என்ன?") == "லிஸ்ட் என்றால் என்ன"
+
+
+def test_exact_and_semantic_hits_are_personalised():
+    cache = ResponseCache(max_entries=10, ttl_seconds=60, similarity=0.8)
+    cache.put("What is a list comprehension?", ASHA, LESSON, _answer("Asha"))
+
+    exact = cache.get("what is a list comprehension", RAVI, LESSON)
+    assert exact["message"].startswith("Great question, Ravi!")
+
+    similar = cache.get("so what is a list comprehension", RAVI, LESSON)
+    assert similar is not None
+    assert cache.stats()["semantic_hits"] == 1
+
+    assert cache.get("How do decorators work?", RAVI, LESSON) is None
+
+
+def test_scope_separates_lessons_languages_and_skill_levels():
+    cache = ResponseCache(max_entries=10, ttl_seconds=60)
+    cache.put("What is a list comprehension?", ASHA, LESSON, _answer("Asha"))
+
+    assert cache.get("What is a list comprehension?", RAVI, {**LESSON, "phase": "code"}) is None
+    assert cache.get("What is a list comprehension?", {**RAVI, "preferred_language": "ta"}, LESSON) is None
+    assert cache.get("What is a list comprehension?", {**RAVI, "skill_level": "advanced"}, LESSON) is None
+
+
+def test_ttl_and_size_bound():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    for question in ("first question here", "second question here", "third question here"):
+        cache.put(question, ASHA, LESSON, _answer("Asha"))
+    assert cache.stats()["entries"] == 2
+    assert cache.get("first question here", ASHA, LESSON) is None
+
+    short = ResponseCache(max_entries=2, ttl_seconds=0.01)
+    short.put("first question here", ASHA, LESSON, _answer("Asha"))
+    time.sleep(0.02)
+    assert short.get("first question here", ASHA, LESSON) is None
+
+
+def test_stateful_turns_are_not_cacheable():
+    assert is_cacheable("what is a loop", LESSON)
+    assert not is_cacheable("what is a loop", {**LESSON, "code_evaluation": {"success": False}})
+    assert not is_cacheable("what is a loop", {"mode": "playground"})
+    assert not is_cacheable("x" * 1000, LESSON)
+
+
+def test_call_vaathiyaar_serves_repeat_question_from_cache(monkeypatch):
+    calls = []
+
+    class _FakeClient:
+        def chat(self, model, messages, stream=False):
+            calls.append(messages)
+            return {"message": {"content": '{"message": "Hi Asha, loops repeat work.", "phase": "story"}'}}
+
+    monkeypatch.setattr(engine, "get_ollama_client", lambda: _FakeClient())
+    monkeypatch.setattr(engine, "response_cache", ResponseCache(max_entries=10, ttl_seconds=60))
+
+    first = engine.call_vaathiyaar("What is a loop?", ASHA, LESSON, cache=True)
+    second = engine.call_vaathiyaar("what is a loop", RAVI, LESSON, cache=True)
+    assert len(calls) == 1
+    assert first["message"] == "Hi Asha, loops repeat work."
+    assert second["message"] == "Hi Ravi, loops repeat work."
+
+    # Without opting in, every call goes to the model
+    engine.call_vaathiyaar("What is a loop?", ASHA, LESSON)
+    assert len(calls) == 2
+
+
+def test_profile_update_is_not_shared():
+    cache = ResponseCache(max_entries=10, ttl_seconds=60)
+    answer = {**_answer("Asha"), "profile_update": {"topic_practiced": "lists", "struggle_detected": True}}
+    cache.put("What is a list comprehension?", ASHA, LESSON, answer)
+    assert "profile_update" not in cache.get("what is a list comprehension", RAVI, LESSON)
+    assert answer["profile_update"]["topic_practiced"] == "lists"  # the caller's copy is untouched
+
+
+def test_cached_chat_answers_are_not_recorded_for_the_asker(monkeypatch):
+    class _FakeAsyncClient:
+        async def chat(self, model, messages, stream=False):
+            return {"message": {"content": (
+                '{"message": "Hi Asha, loops repeat work.", "phase": "story", '
+                '"profile_update": {"topic_practiced": "loops", "struggle_detected": true}}'
+            )}}
+
+    profiles = iter([ASHA, RAVI])
+    recorded = []
+    monkeypatch.setattr(engine, "get_async_ollama_client", lambda endpoint="primary": _FakeAsyncClient())
+    monkeypatch.setattr(engine, "response_cache", ResponseCache(max_entries=10, ttl_seconds=60))
+    monkeypatch.setattr(classroom, "_chat_context", lambda db_path, request: (next(profiles), dict(LESSON)))
+    monkeypatch.setattr(classroom, "record_training_pair", lambda **kw: recorded.append(("pair", kw["user_message"])))
+    monkeypatch.setattr(classroom, "record_signal", lambda db_path, user_id, **kw: recorded.append(("signal", user_id)))
+    app = FastAPI()
+    app.include_router(classroom.router)
+    client = TestClient(app)
+
+    first = client.post("/api/classroom/chat", json={"user_id": "asha", "message": "What is a loop?"}).json()
+    second = client.post("/api/classroom/chat", json={"user_id": "ravi", "message": "what is a loop"}).json()
+    assert first["message"] == "Hi Asha, loops repeat work."
+    assert second["message"] == "Hi Ravi, loops repeat work."
+    assert recorded == [("pair", "What is a loop?"), ("signal", "asha")]
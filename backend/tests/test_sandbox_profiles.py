@@ -0,0 +1,68 @@
+"""
+Tests for sandbox resource profiles (vaathiyaar/sandbox_profiles.py) as
+applied by the execution worker and the fresh-process fallback.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vaathiyaar import execution, sandbox_profiles
+from vaathiyaar.execution_cache import ExecutionCache
+from vaathiyaar.interpreter_pool import InterpreterPool
+from vaathiyaar.sandbox_profiles import get_profile
+
+posix_only = pytest.mark.skipif(not hasattr(os, "fork"), reason="rlimits need POSIX")
+
+FLOOD = "while True:\n    print('x' * 100)"
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = InterpreterPool(size=1)
+    monkeypatch.setattr(execution, "get_pool", lambda: pool)
+    monkeypatch.setattr(execution, "execution_cache", ExecutionCache(max_bytes=0))
+    yield pool
+    pool.close()
+
+
+def test_profiles_are_named_and_overridable_from_the_environment(monkeypatch):
+    assert get_profile("playground").max_output_bytes > get_profile("classroom").max_output_bytes
+    assert get_profile("no-such-profile") is get_profile("classroom")
+    assert "timeout" not in get_profile("challenge").limits()
+
+    monkeypatch.setenv("SANDBOX_DEMO_MEMORY_MB", "64")
+    profile = sandbox_profiles._profile("demo", timeout=1.0, cpu_seconds=1, memory_mb=512,
+                                        max_open_files=8, max_processes=1, max_file_mb=1,
+                                        max_output_bytes=10)
+    assert profile.memory_mb == 64
+
+
+@posix_only
+def test_output_is_capped_with_a_marker(pool):
+    for profile in ("classroom", "playground"):
+        cap = get_profile(profile).max_output_bytes
+        result = execution.run_code_subprocess(FLOOD, profile=profile)
+        assert result["output"].endswith(sandbox_profiles.truncation_marker(cap))
+        assert len(result["output"]) == cap + len(sandbox_profiles.truncation_marker(cap))
+
+    fresh = execution._run_code_fresh_process(FLOOD, 5, {"max_output_bytes": 1000})
+    assert (len(fresh["output"]), fresh["limit_exceeded"]) == (1000, "output")
+
+
+@posix_only
+def test_memory_and_cpu_limits(pool):
+    hog = "data = bytearray(4 * 1024 ** 3)\nprint(len(data))"
+    result = execution.run_code_subprocess(hog, profile="classroom")
+    assert result["exit_code"] == 1
+    assert "MemoryError" in result["error"]
+
+    spin = pool.run("while True:\n    pass", 5, {"cpu_seconds": 1})
+    assert spin["limit_exceeded"] == "cpu"
+    assert spin["timed_out"] is False
+
+    fresh = execution._run_code_fresh_process("while True:\n    pass", 5, {"cpu_seconds": 1})
+    assert fresh["limit_exceeded"] == "cpu"
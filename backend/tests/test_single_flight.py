@@ -0,0 +1,129 @@
+"""
+Tests for in-flight deduplication of identical LLM calls (vaathiyaar/single_flight.py).
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vaathiyaar import engine
+from vaathiyaar.concurrency import VaathiyaarBusyError
+from vaathiyaar.single_flight import SingleFlight, request_key
+
+MESSAGES = [{"role": "system", "content": "You are Vaathiyaar."}, {"role": "user", "content": "outline closures"}]
+
+
+def test_request_key_covers_prompts_and_sampling():
+    key = request_key("m", MESSAGES, 0.7, 1500)
+    assert key == request_key("m", [dict(m) for m in MESSAGES], 0.7, 1500)
+    assert key != request_key("m", MESSAGES, 0.2, 1500)
+    assert key != request_key("m", MESSAGES, 0.7, 500)
+    assert key != request_key("m", [MESSAGES[0], {"role": "user", "content": "outline loops"}], 0.7, 1500)
+    assert key != request_key("m", [{"role": "system", "content": "Other."}, MESSAGES[1]], 0.7, 1500)
+
+
+def test_concurrent_threads_share_one_call():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "outline"
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        leader = pool.submit(flights.do, "k", upstream)
+        started.wait(5)
+        waiters = [pool.submit(flights.do, "k", upstream) for _ in range(4)]
+        time.sleep(0.05)  # let the waiters join the flight
+        release.set()
+        results = [leader.result(), *(w.result() for w in waiters)]
+
+    assert results == ["outline"] * 5 and len(calls) == 1
+    assert flights.stats() == {"enabled": True, "calls": 5, "upstream": 1, "coalesced": 4, "in_flight": 0}
+
+    # Once landed, the next call goes upstream again
+    assert flights.do("k", lambda: "fresh") == "fresh"
+
+
+def test_errors_are_shared_but_busy_leaders_hand_over():
+    flights = SingleFlight()
+
+    async def scenario():
+        async def failing():
+            await asyncio.sleep(0.02)
+            raise ValueError("upstream 500")
+
+        results = await asyncio.gather(*(flights.ado("k", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+
+        attempts = []
+
+        async def busy_then_ok():
+            attempts.append(1)
+            await asyncio.sleep(0.02)
+            if len(attempts) == 1:
+                raise VaathiyaarBusyError("user u1 has too many calls")
+            return "answer"
+
+        results = await asyncio.gather(flights.ado("k2", busy_then_ok), flights.ado("k2", busy_then_ok),
+                                       return_exceptions=True)
+        assert isinstance(results[0], VaathiyaarBusyError) and results[1] == "answer"
+        assert len(attempts) == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    flights = SingleFlight()
+
+    async def scenario():
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        leader = asyncio.create_task(flights.ado("k", slow))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flights.ado("k", slow))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert await leader == "done"
+
+    asyncio.run(scenario())
+
+
+class _SlowClient:
+    def __init__(self):
+        self.calls = 0
+
+    def chat(self, model, messages, stream=False):
+        self.calls += 1
+        time.sleep(0.1)
+        return {"message": {"content": '{"message": "Closures capture variables.", "phase": "teach"}'}}
+
+
+def test_call_vaathiyaar_coalesces_identical_prompts(monkeypatch):
+    client = _SlowClient()
+    flights = SingleFlight()
+    monkeypatch.setattr(engine, "get_ollama_client", lambda: client)
+    monkeypatch.setattr(engine, "llm_flights", flights)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        answers = list(pool.map(lambda _: engine.call_vaathiyaar("outline closures"), range(3)))
+
+    assert client.calls == 1 and flights.coalesced == 2
+    assert all(a["message"] == "Closures capture variables." for a in answers)
+    answers[0]["phase"] = "changed"  # each caller gets its own dict
+    assert answers[1]["phase"] == "teach"
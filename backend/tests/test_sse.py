@@ -0,0 +1,114 @@
+"""
+Tests for the coalescing SSE writer (sse.py).
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sse import HEARTBEAT, coalesce_events
+
+
+def _collect(events, **options):
+    async def run():
+        return [write async for write in coalesce_events(events, **options)]
+    return asyncio.run(run())
+
+
+def _frames(writes):
+    return [json.loads(line[len("data: "):]) for write in writes for line in write.split("\n") if line.startswith("data: ")]
+
+
+async def _paced(events, delay=0.0):
+    for event in events:
+        if isinstance(event, (int, float)):
+            await asyncio.sleep(event)
+            continue
+        yield event
+        await asyncio.sleep(delay)
+
+
+def test_tokens_within_a_window_share_one_write():
+    tokens = [{"delta": c} for c in "Hello, world"]
+    writes = _collect(_paced(tokens + [{"done": True}]), flush_ms=1000)
+
+    # What is ready goes out at once; the rest are merged with the final event
+    frames = _frames(writes)
+    assert len(writes) == 2 and frames[-1] == {"done": True}
+    assert "".join(f["delta"] for f in frames[:-1]) == "Hello, world"
+
+
+def test_byte_threshold_and_window_flush_early():
+    tokens = [{"delta": "x" * 10}] * 5
+    writes = _collect(_paced(tokens, delay=0.001), flush_ms=10_000, flush_bytes=20)
+    assert "".join(f["delta"] for f in _frames(writes)) == "x" * 50
+    assert len(writes) >= 3
+
+    spaced = _collect(_paced([{"delta": "a"}, 0.05, {"delta": "b"}, 0.05, {"delta": "c"}]), flush_ms=10)
+    assert _frames(spaced) == [{"delta": "a"}, {"delta": "b"}, {"delta": "c"}]
+
+
+def test_only_adjacent_text_of_the_same_kind_is_merged():
+    events = [
+        {"stream": "stdout", "data": "a"}, {"stream": "stdout", "data": "b"},
+        {"stream": "stderr", "data": "E"}, {"stream": "stdout", "data": "c"},
+        {"field": "phase", "value": "teach"}, {"delta": "x"}, {"delta": "y"},
+    ]
+
+    async def burst():
+        for event in events:
+            yield event
+
+    assert _frames(_collect(burst(), flush_ms=1000)) == [
+        {"stream": "stdout", "data": "ab"}, {"stream": "stderr", "data": "E"},
+        {"stream": "stdout", "data": "c"}, {"field": "phase", "value": "teach"}, {"delta": "xy"},
+    ]
+
+
+def test_idle_streams_get_heartbeats():
+    writes = _collect(_paced([0.12, {"done": True}]), heartbeat_seconds=0.05)
+    assert writes[0] == HEARTBEAT and writes.count(HEARTBEAT) >= 2
+    assert _frames(writes) == [{"done": True}]
+
+
+def test_slow_client_pauses_the_producer():
+    produced = []
+
+    async def source():
+        for i in range(100):
+            produced.append(i)
+            yield {"delta": str(i)}
+
+    async def run():
+        stream = coalesce_events(source(), flush_ms=0, max_pending=4)
+        first = await stream.__anext__()
+        await asyncio.sleep(0.05)  # the client is not reading
+        read_ahead = len(produced)
+        rest = [write async for write in stream]
+        return first, read_ahead, rest
+
+    first, read_ahead, rest = asyncio.run(run())
+    # Beyond what was written: the bounded buffer plus the one event waiting to go in
+    assert read_ahead - len(_frames([first])[0]["delta"]) <= 4 + 1
+    text = "".join(f["delta"] for f in _frames([first, *rest]))
+    assert text == "".join(str(i) for i in range(100))
+
+
+def test_producer_errors_surface_after_pending_output():
+    async def failing():
+        yield {"delta": "partial"}
+        raise RuntimeError("model went away")
+
+    async def run():
+        writes = []
+        with pytest.raises(RuntimeError):
+            async for write in coalesce_events(failing(), flush_ms=1000):
+                writes.append(write)
+        return writes
+
+    assert _frames(asyncio.run(run())) == [{"delta": "partial"}]
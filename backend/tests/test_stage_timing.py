@@ -0,0 +1,111 @@
+"""
+Tests for per-stage timing (vaathiyaar/stage_timing.py) and its use in
+POST /api/classroom/evaluate, including deferred feedback.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import routes.classroom as classroom
+from task_queue import TaskQueue
+from vaathiyaar.stage_timing import LatencyHistograms, StageTimer
+
+
+def test_timer_records_stages_and_formats_server_timing():
+    timer = StageTimer()
+    with timer.stage("execute"):
+        pass
+    timer.record("queue_wait", 1.5)
+    timer.record("queue_wait", 1.0)
+
+    timings = timer.as_dict()
+    assert list(timings) == ["execute", "queue_wait", "total"]
+    assert timings["queue_wait"] == 2.5
+    assert "queue_wait;dur=2.5" in timer.header()
+
+
+def test_histograms_bucket_and_estimate_quantiles():
+    histograms = LatencyHistograms(bounds=(10, 100, 1000))
+    for ms in [5] * 90 + [50] * 9 + [5000]:
+        histograms.observe("execute", ms)
+
+    stats = histograms.snapshot()["execute"]
+    assert stats["count"] == 100
+    assert stats["buckets"] == {"le_10": 90, "le_100": 9, "le_1000": 0, "le_inf": 1}
+    assert stats["p50_ms"] == 10 and stats["p95_ms"] == 100
+    assert stats["max_ms"] == 5000
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    histograms = LatencyHistograms()
+    monkeypatch.setattr(classroom, "evaluate_latency", histograms)
+    monkeypatch.setattr(classroom, "get_student_profile", lambda db_path, user_id: {"mastery": {}})
+    # Side effects are queued, not run: nothing starts the queue's worker
+    queue = TaskQueue(db_path=str(tmp_path / "tasks.db"))
+    monkeypatch.setattr(queue, "start", lambda: None)
+    monkeypatch.setattr(classroom, "task_queue", queue)
+    monkeypatch.setattr(classroom, "run_evaluation", lambda code, expected, user_id=None, timer=None: {
+        "success": True, "output": "42\n", "error": "", "queue_ms": 0.0, "blocked": None,
+    })
+    app = FastAPI()
+    app.include_router(classroom.router)
+    return TestClient(app)
+
+
+REQUEST = {"user_id": "u1", "code": "print(42)", "expected_output": "42", "topic": "loops"}
+
+
+def test_evaluate_reports_stage_timings(client, monkeypatch):
+    monkeypatch.setattr(classroom, "evaluation_feedback", lambda *a: {"message": "Nice!"})
+
+    response = client.post("/api/classroom/evaluate", json={**REQUEST, "debug": True})
+    body = response.json()
+    assert body["success"] is True and body["feedback"] == {"message": "Nice!"}
+    for stage in ("profile_load", "llm_feedback", "enqueue_effects", "total"):
+        assert stage in body["timings"]
+        assert f"{stage};dur=" in response.headers["server-timing"]
+    assert "signal_write" not in body["timings"]  # deferred to the task queue
+    assert body["effects_task"]
+
+    stats = client.get("/api/classroom/evaluate/timings").json()["stages"]
+    assert stats["llm_feedback"]["count"] == 1
+
+
+def test_deferred_feedback_returns_at_once_and_streams_later(client, monkeypatch):
+    def no_inline_feedback(*args):
+        raise AssertionError("feedback should be deferred")
+
+    async def fake_stream(messages, user_id=None, kind="chat"):
+        assert "ran successfully" in messages[-1]["content"] and kind == "feedback"
+        for token in ['{"message": "Well ', 'done!", "phase": "feedback"}']:
+            yield token
+
+    monkeypatch.setattr(classroom, "evaluation_feedback", no_inline_feedback)
+    monkeypatch.setattr(classroom, "astream_vaathiyaar", fake_stream)
+    monkeypatch.setattr(classroom, "build_system_prompt", lambda profile, context: "system")
+
+    body = client.post("/api/classroom/evaluate", json={**REQUEST, "feedback": "defer"}).json()
+    assert body["success"] is True and body["feedback"] is None
+    assert body["feedback_stream"].startswith("/api/classroom/evaluate/feedback/")
+
+    stream = client.get(body["feedback_stream"])
+    events = [json.loads(line[len("data: "):]) for line in stream.text.splitlines() if line]
+    assert "".join(e["delta"] for e in events if "delta" in e) == "Well done!"
+    assert {"field": "phase", "value": "feedback"} in events
+    assert events[-1]["done"] is True and events[-1]["message"] == "Well done!"
+
+    assert client.get(body["feedback_stream"]).status_code == 404  # single use
+
+
+def test_feedback_none_skips_the_llm(client, monkeypatch):
+    monkeypatch.setattr(classroom, "evaluation_feedback", lambda *a: pytest.fail("no feedback wanted"))
+    body = client.post("/api/classroom/evaluate", json={**REQUEST, "feedback": "none"}).json()
+    assert body["feedback"] is None and "feedback_stream" not in body
@@ -0,0 +1,96 @@
+"""
+Tests for the incremental Vaathiyaar response parser (vaathiyaar/stream_parser.py)
+and the chat streams that use it.
+"""
+
+import json
+import os
+import random
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vaathiyaar.stream_parser import ResponseStreamParser
+
+RESPONSE = {
+    "message": 'Loops repeat code.\nTry: for i in range(3): print("hi") \\o/ — café 🐍',
+    "phase": "teach",
+    "animation": {"type": "loop", "steps": [1, "}", {"label": "\"]"}]},
+    "practice_challenge": None,
+    "profile_update": {"topic_practiced": "loops", "mastery_delta": 0.1, "struggle_detected": False},
+}
+
+
+def _feed_in_pieces(text, seed):
+    rng = random.Random(seed)
+    parser, events, i = ResponseStreamParser(), [], 0
+    while i < len(text):
+        size = rng.randint(1, 8)
+        events += parser.feed(text[i:i + size])
+        i += size
+    return parser, events
+
+
+@pytest.mark.parametrize("raw", [
+    json.dumps(RESPONSE),
+    json.dumps(RESPONSE, ensure_ascii=True, indent=2),
+    "```json\n" + json.dumps(RESPONSE, separators=(",", ":")) + "\n```",
+], ids=["compact", "ascii-indented", "fenced"])
+def test_any_token_split_yields_the_same_result(raw):
+    for seed in range(50):
+        parser, events = _feed_in_pieces(raw, seed)
+        assert parser.result() == RESPONSE
+        assert "".join(e["delta"] for e in events if "delta" in e) == RESPONSE["message"]
+        fields = [(e["field"], e["value"]) for e in events if "field" in e]
+        assert fields == [(k, v) for k, v in RESPONSE.items() if k != "message"]
+
+
+def test_message_streams_before_the_object_closes():
+    parser = ResponseStreamParser()
+    assert parser.feed('```json\n{"phase": "te') == []
+    assert parser.feed('ach", "message": "Hel') == [{"field": "phase", "value": "teach"}, {"delta": "Hel"}]
+    assert parser.feed('lo\\u00e9') == [{"delta": "loé"}]
+    assert parser.result() is None  # not complete yet
+    parser.feed('"}\n```')
+    assert parser.result() == {"phase": "teach", "message": "Helloé"}
+
+
+def test_plain_text_is_passed_through_as_message():
+    parser = ResponseStreamParser()
+    assert parser.feed("  Sure! ") == [{"delta": "  Sure! "}]
+    assert parser.feed("{not json}") == [{"delta": "{not json}"}]
+    assert parser.result() is None
+    assert parser.message == parser.text == "  Sure! {not json}"
+
+
+def test_malformed_object_has_no_result():
+    parser = ResponseStreamParser()
+    parser.feed('{"message": "ok", "phase": tea}')
+    assert parser.result() is None
+    assert parser.message == "ok"
+
+
+def test_chat_stream_sends_deltas_fields_and_final_message(monkeypatch):
+    import routes.playground as playground
+
+    async def fake_stream(messages, user_id=None):
+        for token in ['{"message": "Hi ', 'there", "phase"', ': "chat"}']:
+            yield token
+
+    monkeypatch.setattr(playground, "astream_vaathiyaar", fake_stream)
+    monkeypatch.setattr(playground, "_start_stream_turn", lambda db_path, request: ("c1", [], {}))
+    monkeypatch.setattr(playground, "build_system_prompt", lambda profile, context: "system")
+    monkeypatch.setattr(playground, "_save_message", lambda *a: None)
+    monkeypatch.setattr(playground, "_increment_prompts_used", lambda *a: None)
+    app = FastAPI()
+    app.include_router(playground.router)
+
+    stream = TestClient(app).post("/api/playground/chat/stream", json={"user_id": "u1", "message": "hi"})
+    events = [json.loads(line[len("data: "):]) for line in stream.text.splitlines() if line]
+    assert "".join(e["delta"] for e in events if "delta" in e) == "Hi there"
+    assert {"field": "phase", "value": "chat"} in events
+    assert events[-1]["done"] is True and events[-1]["message"] == "Hi there"
@@ -0,0 +1,226 @@
+"""
+Tests for the durable background task queue (task_queue.py) and the
+/evaluate side effects it applies.
+"""
+
+import os
+import sqlite3
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import database
+import task_queue as task_queue_mod
+from task_queue import TaskQueue
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    yield path
+    database.close_all()
+
+
+def _queue(db_path, **handlers):
+    queue = TaskQueue(db_path=db_path)
+    queue.start = lambda: None  # run tasks explicitly with run_pending()
+    for kind, fn in handlers.items():
+        queue.handler(kind)(fn)
+    return queue
+
+
+def test_tasks_survive_a_restart_and_run_in_order(db_path):
+    first = _queue(db_path)
+    ids = [first.enqueue("note", {"n": n}) for n in range(3)]
+    assert first.get(ids[0])["status"] == "pending"
+
+    seen = []
+    restarted = _queue(db_path, note=lambda path, payload: seen.append(payload["n"]) or payload["n"] * 10)
+    assert restarted.run_pending() == 3
+    assert seen == [0, 1, 2]
+    assert restarted.get(ids[2]) == {
+        "id": ids[2], "kind": "note", "status": "done", "attempts": 1, "result": 20, "error": None,
+    }
+    assert restarted.run_pending() == 0
+
+
+def test_failed_tasks_retry_with_backoff_then_give_up(db_path, monkeypatch):
+    monkeypatch.setattr(task_queue_mod, "TASK_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(task_queue_mod, "TASK_RETRY_BASE_SECONDS", 0)
+
+    def flaky(path, payload):
+        raise ValueError("nope")
+
+    queue = _queue(db_path, flaky=flaky)
+    task_id = queue.enqueue("flaky", {})
+    queue.run_pending()
+
+    task = queue.get(task_id)
+    assert task["status"] == "failed" and task["attempts"] == 2
+    assert task["error"] == "ValueError: nope"
+    assert queue.failed == 1
+
+
+def test_abandoned_running_task_is_reclaimed_after_its_lease(db_path, monkeypatch):
+    monkeypatch.setattr(task_queue_mod, "TASK_LEASE_SECONDS", 0.05)
+    queue = _queue(db_path, note=lambda path, payload: "ok")
+    task_id = queue.enqueue("note", {})
+    assert queue._claim()[0] == task_id  # claimed by a process that then "crashed"
+    assert queue._claim() is None
+
+    time.sleep(0.1)
+    assert queue.run_pending() == 1
+    assert queue.get(task_id)["status"] == "done"
+
+
+def test_worker_thread_drains_enqueued_tasks(db_path):
+    queue = TaskQueue(db_path=db_path)
+    queue.handler("note")(lambda path, payload: payload["n"])
+    try:
+        task_id = queue.enqueue("note", {"n": 7})
+        deadline = time.time() + 5
+        while queue.get(task_id)["status"] != "done" and time.time() < deadline:
+            time.sleep(0.02)
+        assert queue.get(task_id)["result"] == 7
+    finally:
+        queue.stop()
+
+
+def test_finished_tasks_are_pruned_after_the_retention_window(db_path, monkeypatch):
+    monkeypatch.setattr(task_queue_mod, "TASK_PRUNE_EVERY", 3)
+    monkeypatch.setattr(task_queue_mod, "TASK_MAX_ATTEMPTS", 1)
+
+    def note(path, payload):
+        with database.transaction(path) as conn:
+            queue.mark_applied(conn, payload)
+        if payload.get("fail"):
+            raise ValueError("nope")
+        return payload
+
+    queue = _queue(db_path, note=note)
+    done, failed = queue.enqueue("note", {}), queue.enqueue("note", {"fail": True})
+    assert queue.run_pending() == 2
+    waiting = queue.enqueue("note", {})
+
+    # done / failed long ago; waiting is a retry with effects already recorded
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE background_tasks SET updated_at = 0")
+    conn.execute("UPDATE background_tasks SET run_after = ? WHERE id = ?", [time.time() + 60, waiting])
+    conn.execute("INSERT INTO background_task_effects VALUES (?, NULL, 0)", [waiting])
+    conn.commit()
+    conn.close()
+
+    recent = queue.enqueue("note", {})
+    assert queue.run_pending() == 1  # the third claim prunes
+    assert queue.get(done) is None and queue.get(failed) is None
+    assert queue.get(waiting)["status"] == "pending" and queue.get(recent)["status"] == "done"
+    conn = sqlite3.connect(db_path)
+    effects = {row[0] for row in conn.execute("SELECT task_id FROM background_task_effects")}
+    conn.close()
+    assert effects == {waiting, recent}
+    assert queue.stats()["pruned"] == 2
+
+
+# ---------------------------------------------------------------------------
+# /evaluate side effects
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def classroom_db(db_path, monkeypatch):
+    import routes.classroom as classroom
+
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE users (id TEXT PRIMARY KEY, points INTEGER DEFAULT 0);
+        CREATE TABLE lesson_completions (user_id TEXT, lesson_id TEXT, xp_awarded INTEGER,
+                                         PRIMARY KEY (user_id, lesson_id));
+        CREATE TABLE learning_signals (id TEXT PRIMARY KEY, user_id TEXT, signal_type TEXT, topic TEXT,
+                                       value TEXT, session_id TEXT);
+        CREATE TABLE user_mastery (user_id TEXT, topic TEXT, mastery_level REAL, attempts INTEGER,
+                                   avg_time_seconds REAL, last_practiced TIMESTAMP, struggle_count INTEGER,
+                                   PRIMARY KEY (user_id, topic));
+        INSERT INTO users (id, points) VALUES ('u1', 0);
+    """)
+    conn.commit()
+    conn.close()
+
+    triggers = []
+    monkeypatch.setattr(classroom, "check_triggers", lambda **k: triggers.append(k))
+    monkeypatch.setattr(classroom, "adapt_path", lambda user_id, lesson_id: {"changes": ["advance"]})
+    return classroom, triggers
+
+
+EFFECTS = {"user_id": "u1", "lesson_id": None, "topic": "loops", "success": True, "error": ""}
+
+
+def test_evaluation_effects_apply_in_one_transaction(db_path, classroom_db):
+    classroom, triggers = classroom_db
+
+    applied = classroom._apply_evaluation_effects(db_path, EFFECTS)
+    assert applied == {"xp_earned": 25, "path_adaptation": {"changes": ["advance"]}}
+    assert triggers == [{"user_id": "u1", "signal_type": "code_evaluation", "topic": "loops",
+                         "value": {"success": True}}]
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT points FROM users").fetchone()[0] == 25
+    assert conn.execute("SELECT COUNT(*) FROM learning_signals").fetchone()[0] == 1
+    assert conn.execute("SELECT mastery_level FROM user_mastery").fetchone()[0] == pytest.approx(0.1)
+    conn.close()
+
+    # XP is only awarded once per lesson; mastery keeps accumulating
+    assert "xp_earned" in classroom._apply_evaluation_effects(db_path, EFFECTS)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT points FROM users").fetchone()[0] == 25
+    assert conn.execute("SELECT mastery_level FROM user_mastery").fetchone()[0] == pytest.approx(0.2)
+    conn.close()
+
+
+def test_evaluation_effects_roll_back_together_on_failure(db_path, classroom_db, monkeypatch):
+    classroom, triggers = classroom_db
+
+    def crash(user_id, lesson_id):
+        raise SystemExit("worker killed")  # not swallowed like ordinary errors
+
+    monkeypatch.setattr(classroom, "adapt_path", crash)
+    with pytest.raises(SystemExit):
+        classroom._apply_evaluation_effects(db_path, EFFECTS)
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT points FROM users").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM learning_signals").fetchone()[0] == 0
+    conn.close()
+    assert triggers == []
+
+
+def test_redelivered_evaluation_effects_are_not_applied_twice(db_path, classroom_db, monkeypatch):
+    classroom, triggers = classroom_db
+    monkeypatch.setattr(task_queue_mod, "TASK_LEASE_SECONDS", 0.05)
+    queue = _queue(db_path, evaluation_effects=classroom._apply_evaluation_effects)
+    monkeypatch.setattr(classroom, "task_queue", queue)
+    task_id = queue.enqueue("evaluation_effects", EFFECTS)
+
+    # The effects commit, then the process "dies" before the task is marked done
+    finish = queue._finish
+
+    def crash_once(*args, **kwargs):
+        queue._finish = finish
+        raise SystemExit("worker killed")
+
+    queue._finish = crash_once
+    with pytest.raises(SystemExit):
+        queue.run_pending()
+    assert queue.get(task_id)["status"] == "running"
+
+    time.sleep(0.1)
+    assert queue.run_pending() == 1
+    assert queue.get(task_id)["status"] == "done"
+    assert queue.get(task_id)["result"] == {"xp_earned": 25, "path_adaptation": {"changes": ["advance"]}}
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM learning_signals").fetchone()[0] == 1
+    assert conn.execute("SELECT mastery_level FROM user_mastery").fetchone()[0] == pytest.approx(0.1)
+    conn.close()
+    assert len(triggers) == 2  # the trigger check itself skips topics that already have a job
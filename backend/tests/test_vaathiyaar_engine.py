@@ -15,7 +15,7 @@ import pytest
 # Ensure the backend package root is on sys.path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from vaathiyaar.modelfile import build_system_prompt, ANIMATION_INSTRUCTIONS
+from vaathiyaar.modelfile import build_system_prompt, ANIMATION_INSTRUCTIONS, STATIC_PROMPT_PREFIX
 from vaathiyaar.engine import parse_vaathiyaar_response
 
 
@@ -191,6 +191,27 @@ class TestBuildSystemPromptContainsAnimationInstructions:
             assert phase in prompt, f"Teaching arc phase '{phase}' not found in prompt"
 
 
+# ---------------------------------------------------------------------------
+# build_system_prompt — static prefix and memoized segments
+# ---------------------------------------------------------------------------
+
+class TestBuildSystemPromptPrefix:
+    def test_static_prefix_is_shared_by_every_student(self):
+        for profile, context in [(SAMPLE_PROFILE, SAMPLE_CONTEXT), (None, None), ({"name": "Kavi"}, {"topic": "loops"})]:
+            assert build_system_prompt(profile, context).startswith(STATIC_PROMPT_PREFIX)
+
+    def test_language_voice_and_greeting_segments(self):
+        prompt = build_system_prompt(SAMPLE_PROFILE, SAMPLE_CONTEXT, voice_mode=True, time_of_day="evening")
+        assert "Tamil script" in prompt
+        assert "Voice mode is currently ON" in prompt
+        assert "Good evening, Anbu!" in prompt
+        assert "Voice mode is currently ON" not in build_system_prompt(SAMPLE_PROFILE, SAMPLE_CONTEXT)
+
+    def test_unknown_language_falls_back_to_english_rule(self):
+        prompt = build_system_prompt({"preferred_language": "fr"})
+        assert "respond ENTIRELY in English" in prompt
+
+
 # ---------------------------------------------------------------------------
 # parse_vaathiyaar_response — clean JSON
 # ---------------------------------------------------------------------------
@@ -0,0 +1,443 @@
+"""
+batch_runner.py — Run every test case of a challenge in one sandboxed process.
+
+The student's code is loaded once; each test case is then evaluated against
+the loaded namespace with its own timeout, captured stdout and timing. All
+results come back as one structured dict, instead of one subprocess per case.
+
+Two test case formats are supported:
+
+    routes/challenges.py        {"input": "fib(10)", "expected_output": "55"}
+    content/daily_content.py    {"input": "'hello'", "expected": "'olleh'"}
+
+`input` is either code whose last expression is the value under test
+("fib(10)", "c = LRUCache(2); c.put(1, 1); c.get(1)") or, when it is a
+bare literal such as "'hello'" or "100, 'C'", the arguments to the
+challenge's entry-point function (the first `def` in its starter code).
+For in-place functions that return None, the mutated argument is compared.
+
+`expected` is compared as a Python literal when it parses as one, otherwise
+as text against repr()/str() of the value or the case's stdout. "..." in an
+expected string matches anything (doctest ELLIPSIS style) and "raises X"
+passes when the case raises exception X. Grading happens here, outside the
+sandbox: the student's process only reports what each case returned,
+printed or raised, and never sees the expected values.
+"""
+
+import ast
+import json
+import os
+import re
+import secrets
+import time
+from typing import Optional
+
+from vaathiyaar.execution import check_code_safety, run_program
+
+CHALLENGE_CASE_TIMEOUT = float(os.getenv("CHALLENGE_CASE_TIMEOUT", "2"))
+CHALLENGE_LOAD_TIMEOUT = float(os.getenv("CHALLENGE_LOAD_TIMEOUT", "5"))
+# Longest actual value / stdout reported back per case
+MAX_REPORTED_CHARS = 500
+# Longest value text / stdout the harness sends back for grading
+MAX_COMPARED_CHARS = 20_000
+
+_DEF_RE = re.compile(r"^(?:async\s+)?def\s+([A-Za-z_]\w*)\s*\(", re.MULTILINE)
+
+
+# ---------------------------------------------------------------------------
+# Harness (runs inside the sandboxed process)
+# ---------------------------------------------------------------------------
+
+# Substitutions: __JOB__ (JSON string literal), __NONCE__ (result line prefix).
+# Only lines starting with the per-run nonce are read back, so whatever the
+# student's code prints cannot be mistaken for a result.
+#
+# The harness shares its interpreter with the student's code, so it only
+# reports what each case did (the value's literal form / repr / str, stdout,
+# the exception raised); grading happens in run_test_cases. Expected values
+# never enter the sandbox.
+_HARNESS = r'''
+import ast, asyncio, io, json, signal, sys, time, traceback
+
+_job = json.loads(__JOB__)
+_out = sys.stdout
+_nonce = __NONCE__
+_MAX = _job["max_chars"]
+
+
+class _CaseTimeout(BaseException):
+    pass
+
+
+def _alarm(signum, frame):
+    raise _CaseTimeout()
+
+
+_has_alarm = hasattr(signal, "setitimer")
+if _has_alarm:
+    signal.signal(signal.SIGALRM, _alarm)
+
+
+def _emit(record):
+    _out.write(_nonce + json.dumps(record) + "\n")
+    _out.flush()
+
+
+def _clip(text):
+    return text if len(text) <= _MAX else text[:_MAX] + "..."
+
+
+def _safe_repr(value):
+    try:
+        return repr(value)
+    except Exception as exc:
+        return "<unrepresentable: %s>" % exc
+
+
+_SCALARS = (str, bytes, int, float, complex, bool, type(None))
+
+
+def _literal(value):
+    """repr(value) if it is plain data the grader can rebuild with literal_eval, else None."""
+    def plain(v):
+        t = type(v)
+        if t in _SCALARS:
+            return True
+        if t in (list, tuple, set, frozenset):
+            return all(plain(item) for item in v)
+        if t is dict:
+            return all(plain(k) and plain(item) for k, item in v.items())
+        return False
+    try:
+        text = repr(value) if plain(value) else None
+    except Exception:
+        return None
+    return text if text is None or len(text) <= _MAX else None
+
+
+def _safe_str(value):
+    try:
+        return str(value)
+    except Exception as exc:
+        return "<unprintable: %s>" % exc
+
+
+def _run_case(case, namespace):
+    stmts = case["body"]
+    ns = dict(namespace)
+    if case["call_with_args"]:
+        args = eval(compile(case["args"], "<test>", "eval"), ns)
+        args = args if isinstance(args, tuple) else (args,)
+        value = ns[_job["entry_point"]](*args)
+        if value is None and len(args) == 1:
+            value = args[0]  # in-place functions: compare the mutated argument
+    else:
+        tree = ast.parse(stmts)
+        last = tree.body.pop() if tree.body and isinstance(tree.body[-1], ast.Expr) else None
+        exec(compile(tree, "<test>", "exec"), ns)
+        value = eval(compile(ast.Expression(last.value), "<test>", "eval"), ns) if last else None
+    if asyncio.iscoroutine(value):
+        value = asyncio.run(value)
+    return value
+
+
+def _main():
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    captured = io.StringIO()
+    sys.stdout = captured
+    started = time.perf_counter()
+    load_error = None
+    try:
+        if _has_alarm:
+            signal.setitimer(signal.ITIMER_REAL, _job["load_timeout"])
+        exec(compile(_job["code"], "main.py", "exec"), namespace)
+    except _CaseTimeout:
+        load_error = "Timed out while loading your code."
+    except SystemExit:
+        pass
+    except BaseException as exc:
+        load_error = "".join(traceback.format_exception_only(type(exc), exc)).strip()
+    finally:
+        if _has_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    _emit({"load": True, "time_ms": round((time.perf_counter() - started) * 1000, 3),
+           "stdout": _clip(captured.getvalue()), "error": load_error})
+    if load_error:
+        return
+
+    for index, case in enumerate(_job["cases"]):
+        if case.get("invalid"):
+            continue
+        captured = io.StringIO()
+        sys.stdout = captured
+        record = {"index": index}
+        started = time.perf_counter()
+        try:
+            if _has_alarm:
+                signal.setitimer(signal.ITIMER_REAL, _job["case_timeout"])
+            value = _run_case(case, namespace)
+            if _has_alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+            record["outcome"] = "returned"
+            record["literal"] = _literal(value)
+            record["repr"] = _clip(_safe_repr(value))
+            record["str"] = _clip(_safe_str(value))
+        except _CaseTimeout:
+            record["outcome"] = "timeout"
+            record["error"] = "Timed out after %s seconds." % _job["case_timeout"]
+        except BaseException as exc:
+            if _has_alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+            record["outcome"] = "raised"
+            record["error"] = "".join(traceback.format_exception_only(type(exc), exc)).strip()
+            record["exception_types"] = [cls.__name__ for cls in type(exc).__mro__]
+        record["time_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        record["stdout"] = _clip(captured.getvalue())
+        _emit(record)
+
+
+_main()
+sys.stdout = _out
+'''
+
+
+# ---------------------------------------------------------------------------
+# Preparing cases
+# ---------------------------------------------------------------------------
+
+def entry_point_for(starter_code: str) -> Optional[str]:
+    """Name of the first top-level function in a challenge's starter code."""
+    match = _DEF_RE.search(starter_code or "")
+    return match.group(1) if match else None
+
+
+def _parse(source: str) -> tuple[Optional[ast.Module], str]:
+    """Parse a test input; inputs written with literal \\n escapes are retried unescaped."""
+    for candidate in (source, source.replace("\\n", "\n")):
+        try:
+            return ast.parse(candidate), candidate
+        except SyntaxError:
+            continue
+    return None, source
+
+
+def _is_bare_arguments(tree: ast.Module) -> bool:
+    """True for "'hello'" / "100, 'C'" style inputs: literals only, no calls."""
+    if len(tree.body) != 1 or not isinstance(tree.body[0], ast.Expr):
+        return False
+    try:
+        ast.literal_eval(tree.body[0].value)
+        return True
+    except ValueError:
+        return False
+
+
+def prepare_case(case: dict, entry_point: Optional[str]) -> dict:
+    """Normalise one test case for the harness."""
+    source = str(case.get("input", ""))
+    expected = str(case.get("expected_output", case.get("expected", "")))
+    tree, source = _parse(source)
+    if tree is None or not tree.body:
+        return {"invalid": True, "input": source, "expected": expected}
+    call_with_args = bool(entry_point) and _is_bare_arguments(tree)
+    return {
+        "input": source,
+        "expected": expected,
+        "call_with_args": call_with_args,
+        "args": source if call_with_args else "",
+        "body": "" if call_with_args else source,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Grading (runs here, never in the sandbox)
+# ---------------------------------------------------------------------------
+
+_NUMBERS = (int, float)
+_SCALARS = (str, bytes, int, float, complex, bool, type(None))
+
+
+def _plain(value) -> bool:
+    """Built from literal types only, so == on it is well defined."""
+    if type(value) is tuple:
+        return all(_plain(item) for item in value)
+    return type(value) in _SCALARS
+
+
+def _same(expected, value) -> bool:
+    """
+    expected == value as literals: the value must be of the same built-in
+    type (ints and floats compare with each other), recursively.
+    """
+    if type(expected) in _NUMBERS and type(value) in _NUMBERS:
+        return expected == value
+    if type(value) is not type(expected):
+        return False
+    if type(expected) in (list, tuple):
+        return len(expected) == len(value) and all(_same(e, v) for e, v in zip(expected, value))
+    if type(expected) is dict:
+        return (all(_plain(key) for key in value) and expected.keys() == value.keys()
+                and all(_same(expected[key], value[key]) for key in expected))
+    if type(expected) in (set, frozenset):
+        return all(_plain(item) for item in value) and expected == value
+    return expected == value
+
+
+def _ellipsis_match(expected: str, actual: str) -> bool:
+    pattern = ".*".join(re.escape(part) for part in expected.split("..."))
+    return re.fullmatch(pattern, actual, re.DOTALL) is not None
+
+
+def _as_text(field) -> str:
+    return field if isinstance(field, str) else ""
+
+
+def _grade(expected: str, record: dict) -> str:
+    """Status of one case from what the harness reported about it."""
+    outcome = record.get("outcome")
+    if outcome == "timeout":
+        return "timeout"
+    if outcome == "raised":
+        raises = re.match(r"raises\s+(\w+)", expected.strip())
+        types = record.get("exception_types")
+        return "passed" if raises and isinstance(types, list) and raises.group(1) in types else "error"
+    if outcome != "returned":
+        return "error"
+    if "..." not in expected:
+        try:
+            literal = ast.literal_eval(expected)
+        except Exception:
+            pass
+        else:
+            try:
+                value = ast.literal_eval(_as_text(record.get("literal")))
+            except Exception:
+                return "failed"
+            return "passed" if _same(literal, value) else "failed"
+    texts = [_as_text(record.get(key)) for key in ("repr", "str")]
+    texts.append(_as_text(record.get("stdout")).strip())
+    if "..." in expected:
+        return "passed" if any(_ellipsis_match(expected, text) for text in texts) else "failed"
+    return "passed" if expected.strip() in texts else "failed"
+
+
+def _clip(text: Optional[str]) -> Optional[str]:
+    if not isinstance(text, str):
+        return None
+    return text if len(text) <= MAX_REPORTED_CHARS else text[:MAX_REPORTED_CHARS] + "..."
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def run_test_cases(code: str, test_cases: list[dict], entry_point: Optional[str] = None,
+                   case_timeout: float = CHALLENGE_CASE_TIMEOUT,
+                   load_timeout: float = CHALLENGE_LOAD_TIMEOUT,
+                   user_id: Optional[str] = None) -> dict:
+    """
+    Load `code` once and run every test case against it.
+
+    Returns:
+        {
+          "passed": bool,          # every valid case passed
+          "passed_count": int,
+          "total": int,            # valid (gradable) cases
+          "load_error": str | None,
+          "load_ms": float,
+          "time_ms": float,        # wall time for the whole batch
+          "results": [{"index", "input", "expected", "status", "actual",
+                       "stdout", "error", "time_ms"}, ...],
+        }
+
+    status is one of passed | failed | error | timeout | invalid; invalid
+    cases (inputs that are not valid Python) are reported but not graded.
+    Raises ExecutionBusyError when the execution queue does not admit the run.
+    """
+    cases = [prepare_case(case, entry_point) for case in test_cases]
+    started = time.perf_counter()
+
+    blocked = check_code_safety(code)
+    if blocked:
+        return _summarise(cases, {}, f"Security Error: forbidden operation '{blocked}' detected.",
+                          0.0, started)
+
+    nonce = f"@@{secrets.token_hex(8)}@@"
+    job = {
+        "code": code,
+        "cases": [{key: value for key, value in case.items() if key not in ("input", "expected")}
+                  for case in cases],
+        "entry_point": entry_point,
+        "case_timeout": case_timeout,
+        "load_timeout": load_timeout,
+        "max_chars": MAX_COMPARED_CHARS,
+    }
+    harness = (
+        _HARNESS
+        .replace("__JOB__", repr(json.dumps(job)))
+        .replace("__NONCE__", repr(nonce))
+    )
+    valid = sum(1 for case in cases if not case.get("invalid"))
+    budget = load_timeout + valid * case_timeout + 2
+    run = run_program(harness, budget, user_id, profile="challenge")
+
+    records, load = {}, None
+    for line in run["output"].splitlines():
+        if not line.startswith(nonce):
+            continue
+        try:
+            record = json.loads(line[len(nonce):])
+        except ValueError:
+            continue
+        if not isinstance(record, dict):
+            continue
+        if record.get("load"):
+            load = load or record
+        elif isinstance(record.get("index"), int):
+            records.setdefault(record["index"], record)
+
+    if load is None:
+        load_error = (
+            "Timed out while running your code." if run["timed_out"]
+            else (run["error"].strip().splitlines() or ["Execution failed."])[-1]
+        )
+        return _summarise(cases, records, load_error, 0.0, started)
+    return _summarise(cases, records, load.get("error"), load.get("time_ms", 0.0), started,
+                      missing_status="timeout" if run["timed_out"] else "error")
+
+
+def _summarise(cases: list[dict], records: dict, load_error: Optional[str], load_ms: float,
+               started: float, missing_status: str = "error") -> dict:
+    results = []
+    for index, case in enumerate(cases):
+        record = records.get(index, {})
+        if case.get("invalid"):
+            status, error = "invalid", "Test case input is not valid Python."
+        elif load_error:
+            status, error = "error", load_error
+        elif record:
+            status, error = _grade(case["expected"], record), record.get("error")
+        else:
+            status = missing_status
+            error = "Timed out." if missing_status == "timeout" else "Did not run."
+        results.append({
+            "index": index,
+            "input": case["input"],
+            "expected": case["expected"],
+            "status": status,
+            "actual": _clip(record.get("repr")),
+            "stdout": _clip(record.get("stdout")) or "",
+            "error": error,
+            "time_ms": record.get("time_ms"),
+        })
+    graded = [r for r in results if r["status"] != "invalid"]
+    passed_count = sum(1 for r in graded if r["status"] == "passed")
+    return {
+        "passed": not load_error and passed_count == len(graded),
+        "passed_count": passed_count,
+        "total": len(graded),
+        "load_error": load_error,
+        "load_ms": load_ms,
+        "time_ms": round((time.perf_counter() - started) * 1000, 3),
+        "results": results,
+    }
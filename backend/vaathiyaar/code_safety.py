@@ -0,0 +1,245 @@
+"""
+code_safety.py — Static safety analysis of student code.
+
+The code is parsed once and a single AST pass resolves every name against a
+policy table:
+
+  * imports and aliases    (`import os as o`, `from os import system as s`)
+  * attribute chains       (`o.system` → os.system, `os.path.join`)
+  * builtins               (`eval`, `open`, `__builtins__`)
+  * getattr with constants (`getattr(os, "system")` → os.system); with a
+    computed name (`getattr(os, "sys" + "tem")`) it cannot be checked and
+    is refused, as are `sys.modules` and a module's `__dict__` / `vars()`
+
+so `os.system` is caught however it is spelt, while harmless text such as
+`ast.literal_eval(` or a comment mentioning `open(` no longer is.
+
+analyze_code() returns a CodeAnalysis with the parsed tree (reused by the
+execution cache), structured findings, and any SyntaxError already formatted
+the way the interpreter would print it — so broken code is answered without
+starting a sandbox. Results are memoised, so evaluate_code and
+run_code_subprocess share one parse.
+"""
+
+import ast
+import os
+import tempfile
+import traceback
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional
+
+# Filename the sandbox runs code as (see exec_worker.SCRIPT_NAME)
+SCRIPT_PATH = os.path.join(tempfile.gettempdir(), "main.py")
+
+# ---------------------------------------------------------------------------
+# Policy table
+# ---------------------------------------------------------------------------
+
+# Fully-qualified names that may not be referenced; a prefix entry blocks
+# everything below it ("pathlib" blocks pathlib.Path too).
+BLOCKED_NAMES = frozenset({
+    "subprocess.call", "subprocess.run", "subprocess.Popen",
+    "subprocess.check_call", "subprocess.check_output",
+    "subprocess.getoutput", "subprocess.getstatusoutput",
+    "os.system", "os.popen", "os.remove", "os.rmdir", "os.unlink",
+    "os.removedirs", "os.rename", "os.replace", "os.kill", "os.killpg",
+    "os.fork", "os.execv", "os.execve", "os.execl", "os.execle",
+    "os.execlp", "os.execvp", "os.execvpe", "os.spawnl", "os.spawnv",
+    "os.posix_spawn",
+    "shutil.rmtree", "shutil.move",
+    "pathlib",
+    "importlib.import_module", "importlib.__import__",
+    "builtins.eval", "builtins.exec", "builtins.open", "builtins.__import__",
+    "builtins.__dict__",
+    "io.FileIO", "io.open_code", "_io", "fileinput",
+    # Any module by name, past every check above
+    "sys.modules", "sys.__dict__",
+})
+
+# `<module>.open` and `.fdopen` open files however the module is called
+# (io.open, os.open, os.fdopen, codecs.open, gzip.open, ...)
+FILE_OPENERS = frozenset({"open", "fdopen"})
+
+# Calls that look an attribute up by a computed name; with a non-constant
+# name (getattr(os, "sys" + "tem")) the target cannot be checked
+DYNAMIC_ATTRIBUTE_CALLS = frozenset({"getattr", "setattr", "delattr"})
+
+BLOCKED_BUILTINS = frozenset({"eval", "exec", "open", "__import__"})
+
+# Attributes that lead from ordinary objects back to builtins or frames
+BLOCKED_ATTRIBUTES = frozenset({
+    "__subclasses__", "__globals__", "__builtins__", "__import__",
+})
+
+
+@dataclass(frozen=True)
+class SafetyFinding:
+    rule: str   # "blocked-name" | "blocked-builtin" | "blocked-attribute" | "unanalyzable"
+    name: str   # what was matched, e.g. "os.system"
+    line: int = 0
+    col: int = 0
+
+    @property
+    def message(self) -> str:
+        return f"forbidden operation '{self.name}' detected (line {self.line})"
+
+
+@dataclass
+class CodeAnalysis:
+    tree: Optional[ast.Module] = None
+    syntax_error: Optional[str] = None  # interpreter-style message, if any
+    findings: list = field(default_factory=list)
+
+    @property
+    def blocked(self) -> Optional[SafetyFinding]:
+        return self.findings[0] if self.findings else None
+
+
+def _blocked(qualified: str) -> bool:
+    parts = qualified.split(".")
+    if len(parts) > 1 and parts[-1] in FILE_OPENERS | {"__dict__"}:
+        return True  # a module's __dict__ holds every name in it
+    return any(".".join(parts[:i]) in BLOCKED_NAMES for i in range(1, len(parts) + 1))
+
+
+# ---------------------------------------------------------------------------
+# Visitor
+# ---------------------------------------------------------------------------
+
+class _SafetyVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.aliases: dict[str, str] = {}  # local name -> qualified name
+        self.findings: list[SafetyFinding] = []
+
+    def _flag(self, rule: str, name: str, node: ast.AST):
+        self.findings.append(SafetyFinding(rule, name, getattr(node, "lineno", 0),
+                                           getattr(node, "col_offset", 0)))
+
+    def _check(self, qualified: Optional[str], node: ast.AST) -> bool:
+        if qualified and _blocked(qualified):
+            self._flag("blocked-name", qualified, node)
+            return True
+        return False
+
+    def resolve(self, node: ast.AST) -> Optional[str]:
+        """Qualified name for a Name/Attribute chain, through import aliases."""
+        if isinstance(node, ast.Name):
+            if node.id in self.aliases:
+                return self.aliases[node.id]
+            if node.id in BLOCKED_BUILTINS:
+                return f"builtins.{node.id}"
+            return None
+        if isinstance(node, ast.Attribute):
+            base = self.resolve(node.value)
+            return f"{base}.{node.attr}" if base else None
+        return None
+
+    def run(self, tree: ast.Module):
+        # Imports first, so aliases resolve wherever they are used
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                self._import(node)
+            elif isinstance(node, ast.ImportFrom):
+                self._import_from(node)
+        self.visit(tree)
+
+    # -- imports ----------------------------------------------------------
+
+    def visit_Import(self, node):
+        pass  # handled in run()
+
+    visit_ImportFrom = visit_Import
+
+    def _import(self, node):
+        for alias in node.names:
+            if self._check(alias.name, node):
+                continue
+            if alias.asname:
+                self.aliases[alias.asname] = alias.name
+            else:
+                top = alias.name.split(".")[0]
+                self.aliases[top] = top
+
+    def _import_from(self, node):
+        module = node.module or ""
+        if node.level:
+            return  # relative imports cannot reach the standard library
+        if self._check(module, node):
+            return
+        for alias in node.names:
+            if alias.name == "*":
+                prefix = module + "."
+                if any(name.startswith(prefix) for name in BLOCKED_NAMES):
+                    self._flag("blocked-name", f"{module}.*", node)
+                continue
+            qualified = f"{module}.{alias.name}"
+            if not self._check(qualified, node):
+                self.aliases[alias.asname or alias.name] = qualified
+
+    # -- references -------------------------------------------------------
+
+    def visit_Name(self, node):
+        if not isinstance(node.ctx, ast.Load):
+            return
+        if node.id in BLOCKED_BUILTINS and node.id not in self.aliases:
+            self._flag("blocked-builtin", node.id, node)
+        elif node.id in BLOCKED_ATTRIBUTES:
+            self._flag("blocked-attribute", node.id, node)
+        else:
+            self._check(self.resolve(node), node)
+
+    def visit_Attribute(self, node):
+        if node.attr in BLOCKED_ATTRIBUTES:
+            self._flag("blocked-attribute", node.attr, node)
+            return
+        qualified = self.resolve(node)
+        if qualified is None:
+            self.generic_visit(node)
+        else:
+            self._check(qualified, node)
+
+    def visit_Call(self, node):
+        func = node.func.id if isinstance(node.func, ast.Name) else None
+        if func in DYNAMIC_ATTRIBUTE_CALLS and len(node.args) >= 2:
+            # getattr(os, "system") / getattr(builtins, "eval")
+            name = node.args[1]
+            if not (isinstance(name, ast.Constant) and isinstance(name.value, str)):
+                self._flag("unanalyzable", f"{func} with a computed attribute name", node)
+            elif name.value in BLOCKED_ATTRIBUTES:
+                self._flag("blocked-attribute", name.value, node)
+            else:
+                base = self.resolve(node.args[0])
+                if base:
+                    self._check(f"{base}.{name.value}", node)
+        elif func == "vars" and node.args:
+            # vars(os) is os.__dict__
+            base = self.resolve(node.args[0])
+            if base:
+                self._check(f"{base}.__dict__", node)
+        self.generic_visit(node)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def _format_syntax_error(exc: SyntaxError) -> str:
+    exc.filename = SCRIPT_PATH
+    return "".join(traceback.format_exception_only(type(exc), exc))
+
+
+@lru_cache(maxsize=256)
+def analyze_code(code: str) -> CodeAnalysis:
+    """Parse once and apply the policy table. Results are shared; do not mutate."""
+    try:
+        tree = ast.parse(code, filename=SCRIPT_PATH)
+    except SyntaxError as exc:
+        return CodeAnalysis(syntax_error=_format_syntax_error(exc))
+    except ValueError:
+        # e.g. null bytes: not something we can vet, so not something we run
+        return CodeAnalysis(findings=[SafetyFinding("unanalyzable", "unparseable source")])
+
+    visitor = _SafetyVisitor()
+    visitor.run(tree)
+    return CodeAnalysis(tree=tree, findings=visitor.findings)
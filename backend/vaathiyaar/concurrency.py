@@ -0,0 +1,119 @@
+"""
+concurrency.py — Bounded concurrency for async Vaathiyaar LLM calls.
+
+Async chat handlers hold an LLM call open for many seconds without pinning a
+threadpool worker, so the limit that matters is how many calls we send to
+Ollama at once. LLMLimiter enforces a global cap and a per-user cap; callers
+wait up to VAATHIYAAR_QUEUE_TIMEOUT_SECONDS for a slot and then get
+VaathiyaarBusyError.
+
+asyncio primitives are bound to the event loop that first uses them, so the
+semaphores are kept per running loop (one loop per uvicorn worker in
+production; the test client may start several).
+"""
+
+import asyncio
+import os
+import weakref
+from contextlib import asynccontextmanager
+from typing import Optional
+
+VAATHIYAAR_MAX_CONCURRENT_CALLS = int(os.getenv("VAATHIYAAR_MAX_CONCURRENT_CALLS", "64"))
+VAATHIYAAR_MAX_CALLS_PER_USER = int(os.getenv("VAATHIYAAR_MAX_CALLS_PER_USER", "2"))
+VAATHIYAAR_QUEUE_TIMEOUT_SECONDS = float(os.getenv("VAATHIYAAR_QUEUE_TIMEOUT_SECONDS", "30"))
+
+
+class VaathiyaarBusyError(RuntimeError):
+    """No LLM slot became free within the queue timeout."""
+
+
+class _LoopState:
+    def __init__(self, max_concurrent: int):
+        self.global_slots = asyncio.Semaphore(max_concurrent)
+        self.user_slots: dict[str, asyncio.Semaphore] = {}
+        self.user_waiters: dict[str, int] = {}
+        self.active = 0
+
+
+class LLMLimiter:
+    """Global + per-user semaphores around async LLM calls."""
+
+    def __init__(self, max_concurrent: int = VAATHIYAAR_MAX_CONCURRENT_CALLS,
+                 max_per_user: int = VAATHIYAAR_MAX_CALLS_PER_USER,
+                 timeout: float = VAATHIYAAR_QUEUE_TIMEOUT_SECONDS):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.timeout = timeout
+        self._states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.rejected = 0
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            state = self._states[loop] = _LoopState(self.max_concurrent)
+        return state
+
+    async def _acquire(self, semaphore: asyncio.Semaphore, deadline: float, what: str):
+        remaining = deadline - asyncio.get_running_loop().time()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=max(remaining, 0))
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise VaathiyaarBusyError(f"Vaathiyaar is busy ({what}); please try again shortly.")
+
+    @asynccontextmanager
+    async def slot(self, user_id: Optional[str] = None):
+        """Hold one global slot (and one of user_id's slots) for the block."""
+        state = self._state()
+        deadline = asyncio.get_running_loop().time() + self.timeout
+        key = str(user_id) if user_id is not None else None
+
+        user_slot = None
+        if key is not None and self.max_per_user > 0:
+            user_slot = state.user_slots.get(key)
+            if user_slot is None:
+                user_slot = state.user_slots[key] = asyncio.Semaphore(self.max_per_user)
+            state.user_waiters[key] = state.user_waiters.get(key, 0) + 1
+        try:
+            if user_slot is not None:
+                await self._acquire(user_slot, deadline, "too many requests from this student")
+            try:
+                await self._acquire(state.global_slots, deadline, "server at capacity")
+            except BaseException:
+                if user_slot is not None:
+                    user_slot.release()
+                raise
+            state.active += 1
+            try:
+                yield
+            finally:
+                state.active -= 1
+                state.global_slots.release()
+                if user_slot is not None:
+                    user_slot.release()
+        finally:
+            if user_slot is not None:
+                state.user_waiters[key] -= 1
+                if state.user_waiters[key] == 0:
+                    del state.user_waiters[key]
+                    del state.user_slots[key]
+
+    def stats(self) -> dict:
+        try:
+            state = self._state()
+            active, users = state.active, len(state.user_slots)
+        except RuntimeError:  # no running loop
+            active, users = 0, 0
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_per_user": self.max_per_user,
+            "active": active,
+            "users": users,
+            "rejected": self.rejected,
+        }
+
+
+llm_limiter = LLMLimiter()
@@ -3,13 +3,28 @@ engine.py — Vaathiyaar Engine: Ollama Cloud API integration, response parsing,
 and safe code evaluation.
 """
 
+import asyncio
 import json
 import os
-from typing import Optional
+import time
+import weakref
+from typing import AsyncIterator, Optional
 
+from ollama import AsyncClient as AsyncOllamaClient
 from ollama import Client as OllamaClient
 
+from vaathiyaar.concurrency import llm_limiter
+from vaathiyaar.llm_client import (
+    VAATHIYAAR_CALL_TIMEOUT_SECONDS, VAATHIYAAR_FIRST_TOKEN_TIMEOUT_SECONDS, VaathiyaarTimeoutError,
+    VaathiyaarUnavailableError, local_guard, ollama_guard,
+)
+from vaathiyaar.model_router import (
+    FLAGSHIP, LOCAL, VAATHIYAAR_MODEL_ROUTES, ModelRouter, ModelTier, classify_call, parse_routes,
+)
 from vaathiyaar.modelfile import build_system_prompt
+from vaathiyaar.response_cache import RESPONSE_CACHE_ENABLED, is_cacheable, response_cache
+from vaathiyaar.single_flight import llm_flights, request_key
+from vaathiyaar.stage_timing import NULL_TIMER
 
 # ---------------------------------------------------------------------------
 # Environment configuration
@@ -17,19 +32,94 @@ from vaathiyaar.modelfile import build_system_prompt
 
 OLLAMA_API_KEY = os.getenv("OLLAMA_API_KEY", "")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "qwen3.5")
-
-# Initialize Ollama client using the official SDK
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "https://ollama.com")
+
+# Secondary endpoint and/or model for hedged calls (see vaathiyaar.llm_client);
+# hedging is off unless one of them is set
+OLLAMA_HEDGE_HOST = os.getenv("OLLAMA_HEDGE_HOST", "")
+OLLAMA_HEDGE_MODEL = os.getenv("OLLAMA_HEDGE_MODEL", "")
+OLLAMA_HEDGE_API_KEY = os.getenv("OLLAMA_HEDGE_API_KEY", OLLAMA_API_KEY)
+HEDGING_ENABLED = bool(OLLAMA_HEDGE_HOST or OLLAMA_HEDGE_MODEL)
+
+# Small model for cheap calls (see vaathiyaar.model_router); the local tier
+# is off unless OLLAMA_LOCAL_MODEL is set
+OLLAMA_LOCAL_HOST = os.getenv("OLLAMA_LOCAL_HOST", "http://localhost:11434")
+OLLAMA_LOCAL_MODEL = os.getenv("OLLAMA_LOCAL_MODEL", "")
+OLLAMA_LOCAL_API_KEY = os.getenv("OLLAMA_LOCAL_API_KEY", "")
+
+# Initialize Ollama clients using the official SDK, one per endpoint:
+# "primary" (Ollama Cloud), "hedge" and "local"
 _ollama_client = None
+_hedge_client = None
+_local_client = None
+
+def _client_options(endpoint: str = "primary") -> dict:
+    host, api_key = {
+        "primary": (OLLAMA_HOST, OLLAMA_API_KEY),
+        "hedge": (OLLAMA_HEDGE_HOST or OLLAMA_HOST, OLLAMA_HEDGE_API_KEY),
+        "local": (OLLAMA_LOCAL_HOST, OLLAMA_LOCAL_API_KEY),
+    }[endpoint]
+    return {
+        "host": host,
+        "headers": {"Authorization": f"Bearer {api_key}"} if api_key else {},
+        # Calls are abandoned at the guard's deadline; don't keep the request open much longer
+        "timeout": VAATHIYAAR_CALL_TIMEOUT_SECONDS,
+    }
 
 def get_ollama_client():
     global _ollama_client
     if _ollama_client is None:
-        _ollama_client = OllamaClient(
-            host="https://ollama.com",
-            headers={"Authorization": f"Bearer {OLLAMA_API_KEY}"}
-        )
+        _ollama_client = OllamaClient(**_client_options())
     return _ollama_client
 
+def get_hedge_ollama_client():
+    global _hedge_client
+    if _hedge_client is None:
+        _hedge_client = OllamaClient(**_client_options("hedge"))
+    return _hedge_client
+
+def get_local_ollama_client():
+    global _local_client
+    if _local_client is None:
+        _local_client = OllamaClient(**_client_options("local"))
+    return _local_client
+
+def _sync_client(endpoint: str):
+    if endpoint == "hedge":
+        return get_hedge_ollama_client()
+    if endpoint == "local":
+        return get_local_ollama_client()
+    return get_ollama_client()
+
+
+# The async client's connection pool belongs to the event loop that created it
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = (
+    weakref.WeakKeyDictionary()
+)
+
+def get_async_ollama_client(endpoint: str = "primary") -> AsyncOllamaClient:
+    """AsyncClient for the running event loop and the given endpoint."""
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get(endpoint)
+    if client is None:
+        client = clients[endpoint] = AsyncOllamaClient(**_client_options(endpoint))
+    return client
+
+
+def _build_router() -> ModelRouter:
+    tiers = {
+        FLAGSHIP: ModelTier(FLAGSHIP, [
+            ("primary", OLLAMA_MODEL),
+            ("hedge", OLLAMA_HEDGE_MODEL or OLLAMA_MODEL) if HEDGING_ENABLED else None,
+        ], ollama_guard),
+    }
+    if OLLAMA_LOCAL_MODEL:
+        tiers[LOCAL] = ModelTier(LOCAL, [("local", OLLAMA_LOCAL_MODEL), ("primary", OLLAMA_MODEL)], local_guard)
+    return ModelRouter(tiers, parse_routes(VAATHIYAAR_MODEL_ROUTES))
+
+model_router = _build_router()
+
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
@@ -41,11 +131,19 @@ def call_vaathiyaar(
     lesson_context: Optional[dict] = None,
     temperature: float = 0.7,
     max_tokens: int = 1500,
+    cache: bool = False,
+    kind: Optional[str] = None,
 ) -> dict:
     """
     Build a dynamic system prompt, call the Ollama Cloud API (native /api/chat
     endpoint), and return a parsed Vaathiyaar response dict.
 
+    Identical calls already in flight (same prompts and sampling settings,
+    from any thread or the event loop) share that call's answer instead of
+    sending their own; see vaathiyaar.single_flight. The upstream call has a
+    deadline and sits behind a circuit breaker (vaathiyaar.llm_client).
+    The model is the one of the tier kind is routed to (vaathiyaar.model_router).
+
     Parameters
     ----------
     user_message : str
@@ -58,6 +156,13 @@ def call_vaathiyaar(
         Sampling temperature passed to the model (default 0.7).
     max_tokens : int
         Maximum tokens to generate (default 1500).
+    cache : bool
+        Serve / store the answer through the semantic response cache
+        (vaathiyaar.response_cache). Only pass True for stateless questions;
+        turns that fail is_cacheable() bypass the cache regardless.
+    kind : str, optional
+        Call type for model routing ("chat", "feedback", "diagnostic",
+        "pipeline.<stage>"); classified from lesson_context if omitted.
 
     Returns
     -------
@@ -69,26 +174,193 @@ def call_vaathiyaar(
     ------
     requests.HTTPError
         If the Ollama Cloud API returns a non-2xx status.
+    VaathiyaarUnavailableError
+        If the breaker is open (at once) or no answer came within
+        VAATHIYAAR_CALL_TIMEOUT_SECONDS (VaathiyaarTimeoutError).
     ValueError
         If the API response structure is unexpected.
     """
+    use_cache = _use_cache(cache, user_message, lesson_context)
+    if use_cache:
+        cached = response_cache.get(user_message, student_profile, lesson_context)
+        if cached is not None:
+            return cached
+
     system_prompt = build_system_prompt(student_profile, lesson_context)
+    tier = model_router.route(kind or classify_call(lesson_context))
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message},
+    ]
+
+    def ask(endpoint: str, model: str):
+        def attempt() -> str:
+            response = _sync_client(endpoint).chat(
+                model=model,
+                messages=messages,
+                stream=False,
+            )
+            tier.add_usage(response)
+            return response["message"]["content"]
+        return attempt
+
+    def chat() -> str:
+        with tier.track():
+            return tier.guard.call([attempt and ask(*attempt) for attempt in tier.attempts])
 
-    client = get_ollama_client()
+    raw_content = llm_flights.do(request_key(tier.model, messages, temperature, max_tokens), chat)
+    parsed = parse_vaathiyaar_response(raw_content)
+    if use_cache:
+        response_cache.put(user_message, student_profile, lesson_context, parsed)
+    return parsed
+
+
+def _use_cache(cache: bool, user_message: str, lesson_context: Optional[dict]) -> bool:
+    return cache and RESPONSE_CACHE_ENABLED and is_cacheable(user_message, lesson_context)
+
+
+async def acall_vaathiyaar(
+    user_message: str,
+    student_profile: Optional[dict] = None,
+    lesson_context: Optional[dict] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 1500,
+    user_id: Optional[str] = None,
+    cache: bool = False,
+    kind: Optional[str] = None,
+    return_cached: bool = False,
+):
+    """
+    Async variant of call_vaathiyaar using the Ollama AsyncClient.
+
+    The call holds one slot of the global LLM limiter (and one of user_id's
+    slots) for its duration; raises VaathiyaarBusyError if no slot frees up
+    within VAATHIYAAR_QUEUE_TIMEOUT_SECONDS. Cache hits skip the limiter, and
+    so do calls that join an identical call already in flight. Raises
+    VaathiyaarUnavailableError like call_vaathiyaar.
+
+    With return_cached=True, returns (response, cached) where cached says
+    the answer came from the response cache (another student's turn, so it
+    must not be recorded as this student's).
+    """
+    use_cache = _use_cache(cache, user_message, lesson_context)
+    if use_cache:
+        if response_cache.lookup_blocks:
+            cached = await asyncio.to_thread(response_cache.get, user_message, student_profile, lesson_context)
+        else:
+            cached = response_cache.get(user_message, student_profile, lesson_context)
+        if cached is not None:
+            return (cached, True) if return_cached else cached
+
+    system_prompt = build_system_prompt(student_profile, lesson_context)
+    tier = model_router.route(kind or classify_call(lesson_context))
 
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_message},
     ]
 
-    response = client.chat(
-        model=OLLAMA_MODEL,
-        messages=messages,
-        stream=False,
-    )
+    def ask(endpoint: str, model: str):
+        async def attempt() -> str:
+            async with llm_limiter.slot(user_id):
+                response = await get_async_ollama_client(endpoint).chat(
+                    model=model,
+                    messages=messages,
+                    stream=False,
+                )
+            tier.add_usage(response)
+            return response["message"]["content"]
+        return attempt
+
+    async def chat() -> str:
+        # The breaker is checked before waiting for a limiter slot
+        with tier.track():
+            return await tier.guard.acall([attempt and ask(*attempt) for attempt in tier.attempts])
+
+    raw_content = await llm_flights.ado(request_key(tier.model, messages, temperature, max_tokens), chat)
+    parsed = parse_vaathiyaar_response(raw_content)
+    if use_cache:
+        if response_cache.lookup_blocks:
+            await asyncio.to_thread(response_cache.put, user_message, student_profile, lesson_context, parsed)
+        else:
+            response_cache.put(user_message, student_profile, lesson_context, parsed)
+    return (parsed, False) if return_cached else parsed
+
+
+async def astream_vaathiyaar(
+    messages: list[dict],
+    user_id: Optional[str] = None,
+    kind: str = "chat",
+) -> AsyncIterator[str]:
+    """
+    Stream response tokens for a prepared chat message list, from the model
+    of the tier kind is routed to (the flagship if that tier's breaker is open).
+
+    The limiter slot is held until the stream finishes or the consumer stops
+    iterating (e.g. the client disconnected and the SSE response was cancelled).
+    Raises VaathiyaarUnavailableError if the breaker is open, and
+    VaathiyaarTimeoutError if no token arrives within
+    VAATHIYAAR_FIRST_TOKEN_TIMEOUT_SECONDS.
+    """
+    tier = model_router.route(kind)
+    try:
+        breaker = tier.guard.stream_admit()
+    except VaathiyaarUnavailableError:
+        if tier is model_router.flagship:
+            raise
+        tier = model_router.flagship
+        breaker = tier.guard.stream_admit()
+    async with llm_limiter.slot(user_id):
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        deadline = loop.time() + VAATHIYAAR_FIRST_TOKEN_TIMEOUT_SECONDS
+        first_token_seconds = None
+        try:
+            with tier.track():
+                stream = await asyncio.wait_for(
+                    get_async_ollama_client(tier.endpoint).chat(model=tier.model, messages=messages, stream=True),
+                    VAATHIYAAR_FIRST_TOKEN_TIMEOUT_SECONDS,
+                )
+                chunks = stream.__aiter__()
+                while True:
+                    try:
+                        if first_token_seconds is None:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, deadline - loop.time()))
+                        else:
+                            chunk = await chunks.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    if chunk.get("done"):
+                        tier.add_usage(chunk)
+                    token = chunk.get("message", {}).get("content", "")
+                    if token:
+                        if first_token_seconds is None:
+                            first_token_seconds = time.monotonic() - started
+                        yield token
+        except asyncio.TimeoutError:
+            breaker.record(False)
+            raise VaathiyaarTimeoutError("Vaathiyaar took too long to start answering.")
+        except (asyncio.CancelledError, GeneratorExit):
+            breaker.release_probe()
+            raise
+        except Exception:
+            breaker.record(False)
+            raise
+        breaker.record(True, first_token_seconds, sample=False)
 
-    raw_content = response["message"]["content"]
-    return parse_vaathiyaar_response(raw_content)
+
+_RESPONSE_DEFAULTS = {
+    "phase": "feedback",
+    "animation": None,
+    "practice_challenge": None,
+    "profile_update": {
+        "topic_practiced": None,
+        "struggle_detected": False,
+        "mastery_delta": None,
+        "emotion_signal": "neutral",
+    },
+}
 
 
 def parse_vaathiyaar_response(raw: str) -> dict:
@@ -111,18 +383,6 @@ def parse_vaathiyaar_response(raw: str) -> dict:
         A dict with keys: message, phase, animation, practice_challenge,
         profile_update. All keys are guaranteed to be present.
     """
-    _DEFAULTS = {
-        "phase": "feedback",
-        "animation": None,
-        "practice_challenge": None,
-        "profile_update": {
-            "topic_practiced": None,
-            "struggle_detected": False,
-            "mastery_delta": None,
-            "emotion_signal": "neutral",
-        },
-    }
-
     text = raw.strip()
 
     # Strip markdown code fences if present
@@ -138,59 +398,80 @@ def parse_vaathiyaar_response(raw: str) -> dict:
     # Attempt JSON parse
     try:
         parsed = json.loads(text)
-        if isinstance(parsed, dict):
-            # Ensure all required keys exist with defaults
-            for key, default_val in _DEFAULTS.items():
-                parsed.setdefault(key, default_val)
-            if "message" not in parsed:
-                parsed["message"] = raw  # last resort
-            return parsed
     except json.JSONDecodeError:
-        pass
+        parsed = None
+    return complete_vaathiyaar_response(parsed, raw)
+
+
+def complete_vaathiyaar_response(parsed, raw: str) -> dict:
+    """
+    Fill in the defaults for an already-parsed response (e.g. from
+    stream_parser.ResponseStreamParser.result()); plain text if it is not a dict.
+    """
+    if isinstance(parsed, dict):
+        # Ensure all required keys exist with defaults
+        for key, default_val in _RESPONSE_DEFAULTS.items():
+            parsed.setdefault(key, default_val)
+        if "message" not in parsed:
+            parsed["message"] = raw  # last resort
+        return parsed
 
     # Plain-text fallback: wrap in standard structure
     return {
         "message": raw,
-        **_DEFAULTS,
+        **_RESPONSE_DEFAULTS,
     }
 
 
-def evaluate_code(
+def run_evaluation(
     student_code: str,
     expected_output: str,
-    student_profile: Optional[dict] = None,
-    lesson_context: Optional[dict] = None,
+    user_id: Optional[str] = None,
+    timer=NULL_TIMER,
 ) -> dict:
     """
-    Safely execute student-submitted code, compare output with expected, then
-    call Vaathiyaar for animated feedback.
-
-    Security: a simple forbidden-keyword check blocks the most dangerous
-    operations. In production, replace with a proper container sandbox.
+    The part of evaluate_code that does not involve the LLM: safety check,
+    sandboxed run and output comparison. Stages are recorded on `timer`
+    (a stage_timing.StageTimer) as safety_check, execute and queue_wait.
 
-    Parameters
-    ----------
-    student_code : str
-        The Python source code submitted by the student.
-    expected_output : str
-        The expected stdout output (stripped) for correctness comparison.
-    student_profile : dict, optional
-        Forwarded to call_vaathiyaar for personalised feedback.
-    lesson_context : dict, optional
-        Forwarded to call_vaathiyaar.
-
-    Returns
-    -------
-    dict
-        Keys:
-        - success (bool): True if actual output matches expected_output.
-        - output (str): Captured stdout.
-        - error (str): Captured stderr / exception message, or "".
-        - feedback (dict): Parsed Vaathiyaar response dict.
+    Returns {"success", "output", "error", "queue_ms", "blocked"}, where
+    blocked is the forbidden name if the code was refused without running.
+    Raises ExecutionBusyError when the execution queue does not admit the run.
     """
     from vaathiyaar.execution import run_code_subprocess, check_code_safety
 
-    blocked = check_code_safety(student_code)
+    with timer.stage("safety_check"):
+        blocked = check_code_safety(student_code)
+    if blocked:
+        return {"success": False, "output": "", "error": f"Forbidden: '{blocked}'",
+                "queue_ms": 0.0, "blocked": blocked}
+
+    # Execute code via subprocess
+    with timer.stage("execute"):
+        result = run_code_subprocess(student_code, user_id=user_id)
+    timer.record("queue_wait", result["queue_ms"])
+    actual_output = result["output"]
+    stderr_output = result["error"]
+    exec_error = stderr_output if result["exit_code"] != 0 else ""
+    error_msg = exec_error or stderr_output
+
+    return {
+        "success": actual_output.strip() == expected_output.strip(),
+        "output": actual_output,
+        "error": error_msg,
+        "queue_ms": result["queue_ms"],
+        "blocked": None,
+    }
+
+
+def feedback_prompt(
+    evaluation: dict,
+    student_code: str,
+    expected_output: str,
+    lesson_context: Optional[dict] = None,
+) -> tuple[str, dict]:
+    """The Vaathiyaar prompt and lesson context for commenting on an evaluation."""
+    blocked = evaluation["blocked"]
     if blocked:
         feedback_context = {
             "code_evaluation": {
@@ -202,52 +483,26 @@ def evaluate_code(
         }
         if lesson_context:
             feedback_context.update(lesson_context)
+        return (
+            f"Student used forbidden keyword '{blocked}' in their code. "
+            f"Explain why this is not allowed and guide them.",
+            feedback_context,
+        )
 
-        try:
-            feedback = call_vaathiyaar(
-                f"Student used forbidden keyword '{blocked}' in their code. "
-                f"Explain why this is not allowed and guide them.",
-                student_profile=student_profile,
-                lesson_context=feedback_context,
-            )
-        except Exception:
-            feedback = {
-                "message": f"**Security Error:** `{blocked}` is not allowed in this environment. "
-                           "Try solving the problem without system-level operations.",
-                "phase": "feedback",
-            }
-
-        return {
-            "success": False,
-            "output": "",
-            "error": f"Forbidden: '{blocked}'",
-            "feedback": feedback.get("message", ""),
-            "phase": feedback.get("phase", "feedback"),
-            "animation": feedback.get("animation"),
-        }
-
-    # Execute code via subprocess
-    result = run_code_subprocess(student_code)
-    actual_output = result["output"]
-    stderr_output = result["error"]
-    exec_error = stderr_output if result["exit_code"] != 0 else ""
-    error_msg = exec_error or stderr_output
-
-    success = actual_output.strip() == expected_output.strip()
-
+    actual_output = evaluation["output"]
     # Build a feedback message for Vaathiyaar
-    if success:
-        feedback_prompt = (
+    if evaluation["success"]:
+        prompt = (
             f"The student's code ran successfully and produced the correct output:\n"
             f"```\n{actual_output}\n```\n"
             "Please give encouraging, animated feedback and suggest what to explore next."
         )
     else:
-        feedback_prompt = (
+        prompt = (
             f"The student submitted this code:\n```python\n{student_code}\n```\n"
             f"Expected output: {expected_output!r}\n"
             f"Actual output:   {actual_output!r}\n"
-            f"Error (if any):  {error_msg!r}\n"
+            f"Error (if any):  {evaluation['error']!r}\n"
             "Please provide a hint — do NOT reveal the full solution yet. "
             "Use the Story→Visual→Code arc to guide them."
         )
@@ -255,41 +510,135 @@ def evaluate_code(
     # Add feedback context to lesson_context
     feedback_context = dict(lesson_context or {})
     feedback_context["code_evaluation"] = {
-        "success": success,
+        "success": evaluation["success"],
         "actual_output": actual_output,
         "expected_output": expected_output,
-        "error": error_msg,
+        "error": evaluation["error"],
     }
+    return prompt, feedback_context
+
+
+def feedback_kind(evaluation: dict, feedback_context: dict) -> str:
+    """Routing call type of the feedback on an evaluation (see vaathiyaar.model_router)."""
+    # Explaining a forbidden keyword needs no teaching model
+    return "diagnostic" if evaluation["blocked"] else classify_call(feedback_context)
+
+
+def fallback_feedback(evaluation: dict) -> dict:
+    """Feedback to show when the AI server cannot be reached."""
+    blocked = evaluation["blocked"]
+    if blocked:
+        return {
+            "message": f"**Security Error:** `{blocked}` is not allowed in this environment. "
+                       "Try solving the problem without system-level operations.",
+            "phase": "feedback",
+        }
+    success, error_msg = evaluation["success"], evaluation["error"]
+    return parse_vaathiyaar_response(
+        json.dumps({
+            "message": (
+                "I couldn't reach the AI server right now, but I noticed your code "
+                f"{'ran correctly!' if success else f'needs a small fix. Error: {error_msg}'}"
+            ),
+            "phase": "feedback",
+            "animation": None,
+            "practice_challenge": None,
+            "profile_update": {
+                "topic_practiced": None,
+                "struggle_detected": not success,
+                "mastery_delta": 0.05 if success else None,
+                "emotion_signal": "excited" if success else "confused",
+            },
+        })
+    )
+
 
+def evaluation_feedback(
+    evaluation: dict,
+    student_code: str,
+    expected_output: str,
+    student_profile: Optional[dict] = None,
+    lesson_context: Optional[dict] = None,
+) -> dict:
+    """Vaathiyaar's commentary on a run_evaluation result (fallback text if unreachable)."""
+    prompt, feedback_context = feedback_prompt(evaluation, student_code, expected_output, lesson_context)
     try:
-        feedback = call_vaathiyaar(
-            user_message=feedback_prompt,
+        return call_vaathiyaar(
+            user_message=prompt,
             student_profile=student_profile,
             lesson_context=feedback_context,
+            kind=feedback_kind(evaluation, feedback_context),
         )
-    except Exception as exc:
+    except Exception:
         # If API is unreachable, return a graceful fallback
-        feedback = parse_vaathiyaar_response(
-            json.dumps({
-                "message": (
-                    "I couldn't reach the AI server right now, but I noticed your code "
-                    f"{'ran correctly!' if success else f'needs a small fix. Error: {error_msg}'}"
-                ),
-                "phase": "feedback",
-                "animation": None,
-                "practice_challenge": None,
-                "profile_update": {
-                    "topic_practiced": None,
-                    "struggle_detected": not success,
-                    "mastery_delta": 0.05 if success else None,
-                    "emotion_signal": "excited" if success else "confused",
-                },
-            })
-        )
+        return fallback_feedback(evaluation)
+
 
+def evaluation_response(evaluation: dict, feedback: Optional[dict]) -> dict:
+    """
+    The evaluate_code result for an evaluation and its feedback (None when
+    the feedback is deferred or skipped).
+    """
+    if evaluation["blocked"]:
+        feedback = feedback or {}
+        return {
+            "success": False,
+            "output": "",
+            "error": evaluation["error"],
+            "feedback": feedback.get("message", ""),
+            "phase": feedback.get("phase", "feedback"),
+            "animation": feedback.get("animation"),
+        }
     return {
-        "success": success,
-        "output": actual_output,
-        "error": error_msg,
+        "success": evaluation["success"],
+        "output": evaluation["output"],
+        "error": evaluation["error"],
         "feedback": feedback,
+        "queue_ms": evaluation["queue_ms"],
     }
+
+
+def evaluate_code(
+    student_code: str,
+    expected_output: str,
+    student_profile: Optional[dict] = None,
+    lesson_context: Optional[dict] = None,
+    user_id: Optional[str] = None,
+) -> dict:
+    """
+    Safely execute student-submitted code, compare output with expected, then
+    call Vaathiyaar for animated feedback.
+
+    Security: code is checked by the static safety analyzer (code_safety.py)
+    and run in the resource-limited sandbox.
+
+    Parameters
+    ----------
+    student_code : str
+        The Python source code submitted by the student.
+    expected_output : str
+        The expected stdout output (stripped) for correctness comparison.
+    student_profile : dict, optional
+        Forwarded to call_vaathiyaar for personalised feedback.
+    lesson_context : dict, optional
+        Forwarded to call_vaathiyaar.
+    user_id : str, optional
+        Whose share of the execution queue the run counts against.
+
+    Returns
+    -------
+    dict
+        Keys:
+        - success (bool): True if actual output matches expected_output.
+        - output (str): Captured stdout.
+        - error (str): Captured stderr / exception message, or "".
+        - feedback (dict): Parsed Vaathiyaar response dict.
+        - queue_ms (float): Time the run waited in the execution queue.
+
+    Raises ExecutionBusyError (vaathiyaar.execution_queue) when the execution
+    queue does not admit the run.
+    """
+    evaluation = run_evaluation(student_code, expected_output, user_id=user_id)
+    feedback = evaluation_feedback(evaluation, student_code, expected_output,
+                                   student_profile, lesson_context)
+    return evaluation_response(evaluation, feedback)
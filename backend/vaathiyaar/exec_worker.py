@@ -0,0 +1,399 @@
+"""
+exec_worker.py — Warm interpreter for the code execution pool.
+
+Started by vaathiyaar.interpreter_pool as `python exec_worker.py`. The worker
+pre-imports common modules once, then serves jobs read as JSON lines on
+stdin:
+
+    {"code": "...", "timeout": 10, "limits": {...}, "paths": [...], "stream": false}
+
+`paths` are extra import directories (the package layer's enabled site
+directories, see package_layer.py), placed after the script's own. `limits` (see sandbox_profiles.SandboxProfile.limits) are applied with
+setrlimit in the child; output stops being collected, and the run is
+stopped, once limits["max_output_bytes"] have been produced.
+
+For every job it forks a child from its clean, warm state. The child runs the
+code as `__main__` with fresh stdout/stderr pipes and exits; the worker
+itself never executes student code, so each run starts from the same state
+(fork-server style recycling). The reply is one JSON line on stdout:
+
+    {"output": str, "error": str, "exit_code": int, "timed_out": bool,
+     "limit_exceeded": null | "cpu" | "output"}
+
+With "stream": true the program's stdout is line-buffered and output is
+forwarded while it runs, one line per chunk read, instead of being collected:
+
+    {"stream": "out" | "err", "data": str}
+
+followed by the usual reply, with empty output and error.
+
+This file must stay importable without the backend package on sys.path.
+"""
+
+import codecs
+import io
+import json
+import os
+import selectors
+import signal
+import sys
+import tempfile
+import time
+import types
+from typing import Callable, Optional
+
+SCRIPT_NAME = "main.py"
+
+# The worker's protocol pipe fds; closed in every child so programs cannot
+# read jobs or forge replies.
+_private_fds: list[int] = []
+
+DEFAULT_PRELOAD = (
+    "json,math,random,re,collections,itertools,functools,datetime,string,"
+    "statistics,decimal,fractions,typing,dataclasses,heapq,bisect,time,"
+    "textwrap,copy,operator,enum,abc,traceback,linecache,threading,atexit"
+)
+
+
+def _preload(modules: str):
+    import importlib
+    for name in filter(None, (m.strip() for m in modules.split(","))):
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# Resource limits
+# ---------------------------------------------------------------------------
+
+_MB = 1024 * 1024
+
+
+def _user_tasks() -> int:
+    """Processes + threads owned by this uid (what RLIMIT_NPROC counts)."""
+    uid, count = os.getuid(), 0
+    try:
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    if os.stat(f"/proc/{entry}").st_uid == uid:
+                        count += len(os.listdir(f"/proc/{entry}/task"))
+                except OSError:
+                    continue
+    except OSError:
+        return 0
+    return count
+
+
+def rlimit_settings(limits: dict, count_processes: bool = True) -> list:
+    """[(resource, (soft, hard))] for a profile's limits; empty where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return []
+    settings = []
+
+    def add(name, soft, hard=None):
+        res = getattr(resource, name, None)
+        if res is None or not soft:
+            return
+        hard = soft if hard is None else hard
+        try:
+            _, current_hard = resource.getrlimit(res)
+        except (OSError, ValueError):
+            return
+        if current_hard != resource.RLIM_INFINITY:
+            soft, hard = min(soft, current_hard), min(hard, current_hard)
+        settings.append((res, (soft, hard)))
+
+    cpu = limits.get("cpu_seconds")
+    add("RLIMIT_CPU", cpu, cpu + 1 if cpu else None)  # SIGXCPU first, SIGKILL a second later
+    add("RLIMIT_AS", limits.get("memory_mb", 0) * _MB)
+    add("RLIMIT_NOFILE", limits.get("max_open_files"))
+    add("RLIMIT_FSIZE", limits.get("max_file_mb", 0) * _MB)
+    # Root ignores RLIMIT_NPROC, and the count covers every process of the uid
+    if count_processes and limits.get("max_processes") and os.getuid() != 0:
+        add("RLIMIT_NPROC", _user_tasks() + limits["max_processes"])
+    return settings
+
+
+def apply_limits(settings: list):
+    import resource
+    for res, values in settings:
+        try:
+            resource.setrlimit(res, values)
+        except (OSError, ValueError):
+            pass
+
+
+# ---------------------------------------------------------------------------
+# Child: run one program
+# ---------------------------------------------------------------------------
+
+def _reseed():
+    """Forked children share the worker's RNG state; give each run its own."""
+    random_module = sys.modules.get("random")
+    if random_module is not None:
+        random_module.seed()
+    numpy_module = sys.modules.get("numpy")
+    if numpy_module is not None:
+        try:
+            numpy_module.random.seed()
+        except Exception:
+            pass
+
+
+def _exit_code_for(exc: SystemExit) -> int:
+    code = exc.code
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code & 0xFF
+    try:
+        sys.stderr.write(f"{code}\n")
+    except Exception:
+        pass
+    return 1
+
+
+def _run_program(code: str, paths: Optional[list] = None) -> int:
+    """Execute code like `python main.py` would; returns the exit status."""
+    import linecache
+    import threading
+    import traceback
+
+    filename = os.path.join(tempfile.gettempdir(), SCRIPT_NAME)
+    lines = code.splitlines(keepends=True)
+    # Lets tracebacks show source lines, as they would for a real file
+    linecache.cache[filename] = (len(code), None, lines, filename)
+
+    sys.argv = [filename]
+    sys.path[0] = os.path.dirname(filename)
+    sys.path[1:1] = paths or []
+    # A real __main__ module, as runpy makes one: unittest.main() looks up the
+    # tests there and pickle finds the program's classes through it
+    main_module = types.ModuleType("__main__")
+    main_module.__file__ = filename
+    main_module.__builtins__ = __builtins__
+    sys.modules["__main__"] = main_module
+
+    status = 0
+    try:
+        exec(compile(code, filename, "exec"), main_module.__dict__)
+    except SystemExit as exc:
+        status = _exit_code_for(exc)
+    except BaseException as exc:
+        tb = exc.__traceback__.tb_next if exc.__traceback__ else None
+        if isinstance(exc, SyntaxError):
+            tb = None
+        traceback.print_exception(type(exc), exc, tb)
+        status = 1
+
+    # Interpreter shutdown: wait for non-daemon threads, run atexit handlers
+    try:
+        main_thread = threading.main_thread()
+        for thread in threading.enumerate():
+            if thread is not main_thread and not thread.daemon:
+                thread.join()
+        import atexit
+        atexit._run_exitfuncs()
+    except SystemExit as exc:
+        status = _exit_code_for(exc)
+    except BaseException:
+        pass
+    return status
+
+
+def _child(code: str, out_w: int, err_w: int, limits: dict, paths: Optional[list] = None,
+           line_buffered: bool = False):
+    os.setsid()  # own process group, so a timeout can kill any grandchildren
+    settings = rlimit_settings(limits)
+    if settings:
+        apply_limits(settings)
+    if hasattr(signal, "SIGXFSZ"):
+        signal.signal(signal.SIGXFSZ, signal.SIG_IGN)  # oversized writes raise OSError instead
+    for fd in _private_fds:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(out_w, 1)
+    os.dup2(err_w, 2)
+    for fd in (devnull, out_w, err_w):
+        if fd > 2:
+            os.close(fd)
+
+    sys.stdin = sys.__stdin__ = io.open(0, "r", encoding="utf-8", closefd=False)
+    sys.stdout = sys.__stdout__ = io.open(1, "w", encoding="utf-8", closefd=False,
+                                          buffering=1 if line_buffered else -1)
+    sys.stderr = sys.__stderr__ = io.open(2, "w", encoding="utf-8", errors="backslashreplace",
+                                          closefd=False, buffering=1)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+    _reseed()
+
+    status = 1
+    try:
+        status = _run_program(code, paths)
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+        os._exit(status)
+
+
+# ---------------------------------------------------------------------------
+# Worker: fork, collect output, enforce the timeout
+# ---------------------------------------------------------------------------
+
+def _kill_group(pid: int):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+def _exit_status(status: int) -> int:
+    """waitpid status → subprocess-style returncode (negative for signals)."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def run_job(code: str, timeout: float, limits: Optional[dict] = None,
+            on_output: Optional[Callable[[str, str], None]] = None,
+            paths: Optional[list] = None) -> dict:
+    """
+    Run one program. With on_output, each chunk of output is passed on as
+    on_output("out" | "err", text) as soon as it is read, and the result's
+    output/error are left empty.
+    """
+    limits = limits or {}
+    max_output = limits.get("max_output_bytes") or 0
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(out_r)
+            os.close(err_r)
+            _child(code, out_w, err_w, limits, paths, line_buffered=on_output is not None)
+        finally:
+            os._exit(1)
+
+    os.close(out_w)
+    os.close(err_w)
+    chunks = {out_r: [], err_r: []}
+    names = {out_r: "out", err_r: "err"}
+    # Chunk boundaries can split a UTF-8 character; decode incrementally
+    decoders = {fd: codecs.getincrementaldecoder("utf-8")(errors="replace") for fd in chunks}
+    deadline = time.monotonic() + timeout
+    timed_out = truncated = False
+    produced = 0
+
+    with selectors.DefaultSelector() as selector:
+        selector.register(out_r, selectors.EVENT_READ)
+        selector.register(err_r, selectors.EVENT_READ)
+        open_fds = 2
+        while open_fds:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            for key, _ in selector.select(remaining):
+                data = os.read(key.fd, 65536)
+                if data:
+                    if max_output and produced + len(data) > max_output:
+                        data = data[:max_output - produced]
+                        truncated = True
+                    produced += len(data)
+                    if on_output is None:
+                        chunks[key.fd].append(data)
+                    else:
+                        text = decoders[key.fd].decode(data)
+                        if text:
+                            on_output(names[key.fd], text)
+                else:
+                    selector.unregister(key.fd)
+                    open_fds -= 1
+            if truncated:
+                break  # stop the program rather than buffer (or block) its output
+
+    # The pipes can close before the program exits; wait (without reaping, so
+    # the process group id stays reserved) until it does or time runs out.
+    while not timed_out and not truncated:
+        info = os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT)
+        if info is not None:
+            break
+        if time.monotonic() >= deadline:
+            timed_out = True
+            break
+        time.sleep(0.001)
+
+    # Kill the program (on timeout / too much output) and anything it left
+    # running in its group
+    _kill_group(pid)
+    _, status = os.waitpid(pid, 0)
+    os.close(out_r)
+    os.close(err_r)
+    if on_output is not None:
+        for fd, decoder in decoders.items():
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                on_output(names[fd], tail)
+
+    exit_code = _exit_status(status)
+    limit_exceeded = None
+    if truncated:
+        limit_exceeded = "output"
+    elif not timed_out and exit_code == -getattr(signal, "SIGXCPU", 0):
+        limit_exceeded = "cpu"
+    return {
+        "output": b"".join(chunks[out_r]).decode("utf-8", errors="replace"),
+        "error": b"".join(chunks[err_r]).decode("utf-8", errors="replace"),
+        "exit_code": exit_code,
+        "timed_out": timed_out,
+        "limit_exceeded": limit_exceeded,
+    }
+
+
+def main():
+    _preload(os.environ.get("EXEC_POOL_PRELOAD", DEFAULT_PRELOAD))
+
+    # Keep the protocol pipes private; children get their own stdio
+    requests = os.fdopen(os.dup(0), "rb")
+    replies = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+    _private_fds.extend((requests.fileno(), replies.fileno()))
+
+    def send(message: dict):
+        replies.write(json.dumps(message).encode("utf-8") + b"\n")
+        replies.flush()
+
+    def forward(stream: str, data: str):
+        send({"stream": stream, "data": data})
+
+    replies.write(b'{"ready": true}\n')
+    replies.flush()
+    for line in requests:
+        try:
+            job = json.loads(line)
+            result = run_job(job["code"], float(job.get("timeout", 10)), job.get("limits"),
+                             forward if job.get("stream") else None, job.get("paths"))
+        except Exception as exc:
+            result = {"output": "", "error": f"Execution failed: {exc}", "exit_code": 1,
+                      "timed_out": False, "limit_exceeded": None}
+        send(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,49 +2,300 @@
 Shared Python code execution via subprocess.
 Used by both Classroom evaluation and Playground terminal.
 """
+import asyncio
+import codecs
 import os
+import signal
 import sys
 import tempfile
 import subprocess
+import threading
+from typing import AsyncIterator, Callable, Optional
 
+from vaathiyaar.code_safety import analyze_code
+from vaathiyaar.exec_worker import apply_limits, rlimit_settings
+from vaathiyaar.execution_cache import execution_cache
+from vaathiyaar.execution_queue import execution_scheduler
+from vaathiyaar.interpreter_pool import get_pool
+from vaathiyaar.package_layer import get_package_layer
+from vaathiyaar.sandbox_profiles import DEFAULT_PROFILE, SandboxProfile, get_profile, truncation_marker
 
-BLOCKED_KEYWORDS = [
-    "subprocess.call", "subprocess.run", "subprocess.Popen",
-    "os.system", "os.remove", "os.rmdir", "os.unlink",
-    "shutil.rmtree", "shutil.move",
-    "__import__('os').system",
-    "eval(", "exec(",
-    "open(",
-    "pathlib",
-]
+_SIGXCPU = getattr(signal, "SIGXCPU", None)
 
 
 def check_code_safety(code: str) -> str | None:
     """
-    Check code against blocked keywords.
-    Returns the matched keyword if unsafe, None if safe.
+    Check code against the safety policy (see code_safety.py).
+    Returns the first forbidden name if unsafe, None if safe.
     """
-    for kw in BLOCKED_KEYWORDS:
-        if kw in code:
-            return kw
-    return None
+    finding = analyze_code(code).blocked
+    return finding.name if finding else None
+
+
+def run_code_subprocess(code: str, timeout: Optional[float] = None,
+                        user_id: Optional[str] = None, profile: str = DEFAULT_PROFILE) -> dict:
+    """
+    Execute Python code in an isolated process.
+
+    Runs on a warm pre-forked interpreter (see interpreter_pool.py) when
+    available, otherwise in a fresh subprocess, through the execution queue
+    (execution_queue.py) and under the named sandbox profile's resource
+    limits (sandbox_profiles.py; timeout defaults to the profile's).
+    Results of deterministic programs are served from execution_cache.py
+    without running them again.
+
+    Returns: { "output": str, "error": str, "exit_code": int, "queue_ms": float }
+    Raises ExecutionBusyError when the queue will not take the run.
+    """
+    sandbox = get_profile(profile)
+    timeout = timeout or sandbox.timeout
+    answer, key = _precheck(code, sandbox)
+    if answer is not None:
+        return answer
+    return _finish(key, run_program(code, timeout, user_id, profile), timeout, sandbox)
 
 
-def run_code_subprocess(code: str, timeout: int = 10) -> dict:
+async def arun_code_subprocess(code: str, timeout: Optional[float] = None,
+                               user_id: Optional[str] = None, profile: str = DEFAULT_PROFILE) -> dict:
+    """run_code_subprocess for async routes: waits in the queue without a thread."""
+    sandbox = get_profile(profile)
+    timeout = timeout or sandbox.timeout
+    answer, key = _precheck(code, sandbox)
+    if answer is not None:
+        return answer
+    result, queue_ms = await execution_scheduler.run_async(user_id, _run_now, code, timeout, sandbox)
+    return _finish(key, {**result, "queue_ms": queue_ms}, timeout, sandbox)
+
+
+def stream_code_subprocess(code: str, timeout: Optional[float] = None,
+                           user_id: Optional[str] = None,
+                           profile: str = DEFAULT_PROFILE) -> AsyncIterator[dict]:
     """
-    Execute Python code in an isolated subprocess.
+    run_code_subprocess with output delivered while the program runs, for
+    async routes. Same checks, queue and sandbox profile; output is relayed
+    chunk by chunk and never collected, so at most the profile's output cap
+    is ever buffered (when the client reads more slowly than the program
+    writes).
+
+    Admission happens immediately (ExecutionBusyError is raised here, before
+    anything is streamed). The returned async iterator yields
+
+        {"stream": "stdout" | "stderr", "data": str}    zero or more
+        {"done": True, "exit_code": int, "timed_out": bool,
+         "limit_exceeded": None | "cpu" | "output", "queue_ms": float}
 
-    Returns: { "output": str, "error": str, "exit_code": int }
+    Streamed runs are answered from, but not added to, the execution cache.
+    Must be called from the event loop.
     """
-    blocked = check_code_safety(code)
-    if blocked:
+    sandbox = get_profile(profile)
+    timeout = timeout or sandbox.timeout
+    answer, _ = _precheck(code, sandbox)
+    if answer is not None:
+        return _replay(answer)
+
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def on_output(stream: str, data: str):
+        loop.call_soon_threadsafe(events.put_nowait, {"stream": _STREAM_NAMES[stream], "data": data})
+
+    future = execution_scheduler.submit(user_id, _run_now, code, timeout, sandbox, on_output)
+    # Queued after every chunk, since those are scheduled from the same thread first
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(events.put_nowait, None))
+    return _relay(future, events, timeout, sandbox)
+
+
+_STREAM_NAMES = {"out": "stdout", "err": "stderr"}
+
+
+async def _replay(answer: dict) -> AsyncIterator[dict]:
+    """A precheck answer (or cached result) as stream events."""
+    if answer["output"]:
+        yield {"stream": "stdout", "data": answer["output"]}
+    if answer["error"]:
+        yield {"stream": "stderr", "data": answer["error"]}
+    yield {"done": True, "exit_code": answer["exit_code"], "timed_out": False,
+           "limit_exceeded": None, "queue_ms": answer["queue_ms"]}
+
+
+async def _relay(future, events: asyncio.Queue, timeout: float,
+                 sandbox: SandboxProfile) -> AsyncIterator[dict]:
+    while True:
+        event = await events.get()
+        if event is None:
+            break
+        yield event
+
+    result, queue_ms = future.result()
+    exit_code = result["exit_code"]
+    if result["output"]:  # e.g. a fallback that could not stream
+        yield {"stream": "stdout", "data": result["output"]}
+    if result["error"]:
+        yield {"stream": "stderr", "data": result["error"]}
+    limit = result.get("limit_exceeded")
+    if result["timed_out"]:
+        yield {"stream": "stderr", "data": f"\nExecution timed out after {timeout:g} seconds.\n"}
+        exit_code = 1
+    elif limit == "output":
+        yield {"stream": "stdout", "data": truncation_marker(sandbox.max_output_bytes)}
+    elif limit == "cpu":
+        yield {"stream": "stderr", "data": f"CPU time limit exceeded ({sandbox.cpu_seconds} seconds).\n"}
+        exit_code = 1
+    yield {"done": True, "exit_code": exit_code, "timed_out": result["timed_out"],
+           "limit_exceeded": limit, "queue_ms": queue_ms}
+
+
+def _precheck(code: str, sandbox: SandboxProfile) -> tuple[Optional[dict], Optional[str]]:
+    """(answer without running, None) or (None, cache key)."""
+    analysis = analyze_code(code)
+    if analysis.blocked:
         return {
             "output": "",
-            "error": f"Security Error: forbidden operation '{blocked}' detected.",
+            "error": f"Security Error: forbidden operation '{analysis.blocked.name}' detected.",
             "exit_code": 1,
+            "queue_ms": 0.0,
+        }, None
+    if analysis.syntax_error:
+        # Same message the interpreter would print, without starting it
+        return {"output": "", "error": analysis.syntax_error, "exit_code": 1, "queue_ms": 0.0}, None
+
+    key = execution_cache.key_for(code, analysis.tree, variant=sandbox.name)
+    cached = execution_cache.get(key)
+    if cached is not None:
+        return {**cached, "queue_ms": 0.0}, None
+    return None, key
+
+
+def _finish(key: Optional[str], result: dict, timeout: float, sandbox: SandboxProfile) -> dict:
+    execution_cache.put(key, result)
+    if result["timed_out"]:
+        return {
+            "output": "",
+            "error": f"Execution timed out after {timeout:g} seconds.",
+            "exit_code": 1,
+            "queue_ms": result["queue_ms"],
         }
+    output, error, exit_code = result["output"], result["error"], result["exit_code"]
+    limit = result.get("limit_exceeded")
+    if limit == "output":
+        output += truncation_marker(sandbox.max_output_bytes)
+    elif limit == "cpu":
+        error += f"CPU time limit exceeded ({sandbox.cpu_seconds} seconds).\n"
+        exit_code = 1
+    return {
+        "output": output,
+        "error": error,
+        "exit_code": exit_code,
+        "queue_ms": result["queue_ms"],
+    }
+
+
+def run_program(code: str, timeout: float, user_id: Optional[str] = None,
+                profile: str = DEFAULT_PROFILE) -> dict:
+    """
+    Run a program without the safety check — for harness code that wraps
+    student code which has already been checked. Queued and resource-limited
+    like every run.
+
+    Returns: { "output": str, "error": str, "exit_code": int, "timed_out": bool,
+               "limit_exceeded": None | "cpu" | "output", "queue_ms": float }
+    On a timeout, output/error hold whatever the program wrote before it.
+    """
+    result, queue_ms = execution_scheduler.run(user_id, _run_now, code, timeout, get_profile(profile))
+    return {**result, "queue_ms": queue_ms}
+
+
+def _run_now(code: str, timeout: float, sandbox: SandboxProfile,
+             on_output: Optional[Callable[[str, str], None]] = None) -> dict:
+    limits = sandbox.limits()
+    paths = get_package_layer().sys_paths()
+    pool = get_pool()
+    result = pool.run(code, timeout, limits, on_output, paths) if pool is not None else None
+    if result is None:
+        return _run_code_fresh_process(code, timeout, limits, on_output, paths)
+    return result
+
+
+def _limit_exceeded(truncated: bool, returncode: int) -> Optional[str]:
+    if truncated:
+        return "output"
+    if _SIGXCPU is not None and returncode == -_SIGXCPU:
+        return "cpu"
+    return None
+
 
+def _read_capped(proc: subprocess.Popen, max_output: int, timeout: float,
+                 on_output: Optional[Callable[[str, str], None]] = None) -> tuple:
+    """
+    Read stdout/stderr concurrently, killing the process once max_output
+    bytes have been produced. Returns (stdout, stderr, timed_out, truncated);
+    with on_output, text is passed on as it arrives and stdout/stderr are empty.
+    """
+    chunks = {"out": [], "err": []}
+    state = {"produced": 0, "truncated": False}
+    lock = threading.Lock()
+
+    def pump(stream, name):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        for data in iter(lambda: stream.read1(65536), b""):
+            with lock:
+                if state["truncated"]:
+                    return
+                if max_output and state["produced"] + len(data) > max_output:
+                    data = data[:max_output - state["produced"]]
+                    state["truncated"] = True
+                state["produced"] += len(data)
+                if on_output is None:
+                    chunks[name].append(data)
+                else:
+                    text = decoder.decode(data)
+                    if text:
+                        on_output(name, text)
+                truncated = state["truncated"]
+            if truncated:
+                proc.kill()
+                break
+        if on_output is not None:
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                on_output(name, tail)
+
+    readers = [
+        threading.Thread(target=pump, args=(proc.stdout, "out"), daemon=True),
+        threading.Thread(target=pump, args=(proc.stderr, "err"), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+    timed_out = False
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        proc.kill()
+        proc.wait()
+    for reader in readers:
+        reader.join(timeout=1)
+    return (
+        b"".join(chunks["out"]).decode("utf-8", errors="replace"),
+        b"".join(chunks["err"]).decode("utf-8", errors="replace"),
+        timed_out and not state["truncated"],
+        state["truncated"],
+    )
+
+
+def _run_code_fresh_process(code: str, timeout: float, limits: Optional[dict] = None,
+                            on_output: Optional[Callable[[str, str], None]] = None,
+                            paths: Optional[list] = None) -> dict:
+    """One-off `python file.py` run; used when the pool is unavailable."""
     python_cmd = sys.executable or ("python3" if os.name != "nt" else "python")
+    limits = limits or {}
+    # Computed up front: preexec_fn should do nothing but the setrlimit calls
+    settings = rlimit_settings(limits, count_processes=False)
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    if on_output:
+        env["PYTHONUNBUFFERED"] = "1"
+    if paths:
+        env["PYTHONPATH"] = os.pathsep.join([*paths, *filter(None, [env.get("PYTHONPATH")])])
     temp_path = None
 
     try:
@@ -54,31 +305,34 @@ def run_code_subprocess(code: str, timeout: int = 10) -> dict:
             f.write(code)
             temp_path = f.name
 
-        result = subprocess.run(
+        proc = subprocess.Popen(
             [python_cmd, temp_path],
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-            env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            preexec_fn=(lambda: apply_limits(settings)) if settings else None,
         )
+        with proc:
+            output, error, timed_out, truncated = _read_capped(
+                proc, limits.get("max_output_bytes") or 0, timeout, on_output,
+            )
 
         return {
-            "output": result.stdout,
-            "error": result.stderr,
-            "exit_code": result.returncode,
+            "output": output,
+            "error": error,
+            "exit_code": 1 if timed_out else proc.returncode,
+            "timed_out": timed_out,
+            "limit_exceeded": _limit_exceeded(truncated, proc.returncode),
         }
 
-    except subprocess.TimeoutExpired:
-        return {
-            "output": "",
-            "error": f"Execution timed out after {timeout} seconds.",
-            "exit_code": 1,
-        }
     except Exception as e:
         return {
             "output": "",
             "error": f"Execution failed: {str(e)}",
             "exit_code": 1,
+            "timed_out": False,
+            "limit_exceeded": None,
         }
     finally:
         if temp_path and os.path.exists(temp_path):
@@ -0,0 +1,228 @@
+"""
+execution_cache.py — Content-addressed cache of code execution results.
+
+Students re-run identical code constantly (unchanged starter code, retries,
+the same canonical solution across a cohort). For deterministic programs the
+result of a run is a pure function of the source and the interpreter, so
+run_code_subprocess looks results up here before touching the sandbox.
+
+Key:    blake2b(normalised source) + interpreter version + environment
+        generation (bumped when packages are installed into the sandbox)
+        + sandbox profile.
+Value:  {output, error, exit_code}, size-bounded LRU.
+
+Programs that may behave differently from run to run are not cached:
+
+  * before running — an AST scan for clocks, randomness, the network, the
+    file system, threads/processes, hash()/id() and set iteration order
+    (string hashing is randomised per process); see is_deterministic();
+  * after running — timeouts, hit resource limits, sandbox failures, very
+    large outputs and output that contains memory addresses
+    ("<object at 0x7f...>").
+"""
+
+import ast
+import hashlib
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+EXEC_CACHE_ENABLED = os.getenv("EXEC_CACHE_ENABLED", "1") != "0"
+EXEC_CACHE_MAX_BYTES = int(os.getenv("EXEC_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+EXEC_CACHE_MAX_ENTRY_BYTES = int(os.getenv("EXEC_CACHE_MAX_ENTRY_BYTES", str(256 * 1024)))
+
+INTERPRETER_VERSION = f"{sys.implementation.name}-{sys.version}"
+
+# Top-level modules whose use makes a program's output vary between runs
+NONDETERMINISTIC_MODULES = frozenset({
+    "random", "secrets", "uuid", "time", "datetime", "calendar", "zoneinfo",
+    "os", "sys", "platform", "getpass", "pathlib", "glob", "shutil", "tempfile",
+    "io", "fileinput", "socket", "ssl", "select", "selectors", "urllib",
+    "http", "requests", "httpx", "aiohttp", "smtplib", "ftplib", "asyncio",
+    "threading", "multiprocessing", "concurrent", "subprocess", "signal",
+    "resource", "gc", "tracemalloc", "timeit", "cProfile", "profile",
+    "importlib", "sqlite3", "faker", "numpy", "pandas", "scipy", "sklearn",
+    "torch", "matplotlib",
+})
+
+# Builtins whose results depend on the process (or the outside world)
+NONDETERMINISTIC_BUILTINS = frozenset({
+    "id", "hash", "open", "input", "__import__", "set", "frozenset",
+    "globals", "locals", "vars", "breakpoint",
+})
+
+_ADDRESS_RE = re.compile(r"\bat 0x[0-9a-fA-F]+")
+
+
+# ---------------------------------------------------------------------------
+# Keys and determinism
+# ---------------------------------------------------------------------------
+
+def normalize_code(code: str) -> str:
+    """Source as the interpreter sees it: line endings and trailing blanks ignored."""
+    return code.replace("\r\n", "\n").replace("\r", "\n").rstrip() + "\n"
+
+
+def code_key(code: str, generation: int = 0, variant: str = "") -> str:
+    digest = hashlib.blake2b(normalize_code(code).encode("utf-8"), digest_size=20)
+    digest.update(f"\x00{INTERPRETER_VERSION}\x00{generation}\x00{variant}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+_SET_OPERATORS = (ast.BitOr, ast.BitAnd, ast.Sub, ast.BitXor)
+
+
+def _is_dict_view(node: ast.AST) -> bool:
+    """A `.keys()` / `.items()` call, whose set operators return a plain set."""
+    return (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and node.func.attr in ("keys", "items") and not node.args)
+
+
+class _DeterminismCheck(ast.NodeVisitor):
+    def __init__(self):
+        self.reason: Optional[str] = None
+
+    def _flag(self, reason: str):
+        if self.reason is None:
+            self.reason = reason
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            if alias.name.split(".")[0] in NONDETERMINISTIC_MODULES:
+                self._flag(f"imports {alias.name}")
+
+    def visit_ImportFrom(self, node):
+        if node.level == 0 and (node.module or "").split(".")[0] in NONDETERMINISTIC_MODULES:
+            self._flag(f"imports {node.module}")
+
+    def visit_Name(self, node):
+        if node.id in NONDETERMINISTIC_BUILTINS:
+            self._flag(f"uses {node.id}()")
+
+    def visit_Set(self, node):
+        self._flag("iterates a set")
+        self.generic_visit(node)
+
+    def visit_SetComp(self, node):
+        self._flag("iterates a set")
+        self.generic_visit(node)
+
+    def visit_BinOp(self, node):
+        # d.keys() | e.keys() is a set, ordered by string hashes
+        if isinstance(node.op, _SET_OPERATORS) and any(map(_is_dict_view, (node.left, node.right))):
+            self._flag("iterates a set")
+        self.generic_visit(node)
+
+    def visit_AugAssign(self, node):
+        if isinstance(node.op, _SET_OPERATORS) and _is_dict_view(node.value):
+            self._flag("iterates a set")
+        self.generic_visit(node)
+
+
+def nondeterminism_reason(code: str, tree: Optional[ast.AST] = None) -> Optional[str]:
+    """Why a program may not be repeatable, or None if it looks deterministic."""
+    if tree is None:
+        try:
+            tree = ast.parse(code)
+        except (SyntaxError, ValueError):
+            return None  # the SyntaxError itself is deterministic
+    check = _DeterminismCheck()
+    check.visit(tree)
+    return check.reason
+
+
+def is_deterministic(code: str, tree: Optional[ast.AST] = None) -> bool:
+    return nondeterminism_reason(code, tree) is None
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+class ExecutionCache:
+    """Thread-safe LRU of run results, bounded by total output bytes."""
+
+    def __init__(self, max_bytes: int = EXEC_CACHE_MAX_BYTES,
+                 max_entry_bytes: int = EXEC_CACHE_MAX_ENTRY_BYTES):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: OrderedDict = OrderedDict()  # key -> (size, result)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.evictions = 0
+
+    def key_for(self, code: str, tree: Optional[ast.AST] = None, variant: str = "") -> Optional[str]:
+        """Cache key for code, or None if the program is not repeatable.
+        Pass the already-parsed tree to skip parsing again; variant separates
+        runs under different sandbox profiles."""
+        if self.max_bytes <= 0 or not is_deterministic(code, tree):
+            with self._lock:
+                self.uncacheable += 1
+            return None
+        return code_key(code, self.generation, variant)
+
+    def get(self, key: Optional[str]) -> Optional[dict]:
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, key: Optional[str], result: dict):
+        """Store a finished run; timeouts, hit limits, failures and address-bearing output are skipped."""
+        if key is None or result.get("timed_out") or result.get("limit_exceeded"):
+            return
+        output, error = result.get("output", ""), result.get("error", "")
+        if error.startswith("Execution failed:") or _ADDRESS_RE.search(output) or _ADDRESS_RE.search(error):
+            return
+        size = len(output.encode("utf-8")) + len(error.encode("utf-8")) + 64
+        if size > self.max_entry_bytes:
+            return
+        stored = {"output": output, "error": error, "exit_code": result.get("exit_code", 0)}
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[0]
+            self._entries[key] = (size, stored)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def bump_generation(self):
+        """Invalidate everything, e.g. after the sandbox's installed packages change."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "uncacheable": self.uncacheable,
+                "evictions": self.evictions,
+                "generation": self.generation,
+            }
+
+
+execution_cache = ExecutionCache(max_bytes=EXEC_CACHE_MAX_BYTES if EXEC_CACHE_ENABLED else 0)
@@ -0,0 +1,166 @@
+"""
+execution_queue.py — Scheduler for sandboxed code execution.
+
+Every sandbox run (playground Run, lesson evaluation, challenge grading) goes
+through one ExecutionScheduler:
+
+  * EXEC_QUEUE_WORKERS runs execute at once (default: the interpreter pool
+    size), so a burst of infinite loops cannot pin every CPU;
+  * at most EXEC_QUEUE_MAX runs wait for a worker;
+  * a student may have at most EXEC_MAX_PER_USER runs queued or running;
+  * waiting runs are served round-robin across students, so one student's
+    burst does not delay everyone else.
+
+When a limit is hit, submit() raises ExecutionBusyError carrying a
+Retry-After estimate (from the recent average run time); routes turn it into
+HTTP 429. Each result reports how long it waited in the queue.
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from vaathiyaar.interpreter_pool import EXEC_POOL_SIZE
+
+EXEC_QUEUE_WORKERS = int(os.getenv("EXEC_QUEUE_WORKERS", str(EXEC_POOL_SIZE or os.cpu_count() or 2)))
+EXEC_QUEUE_MAX = int(os.getenv("EXEC_QUEUE_MAX", str(EXEC_QUEUE_WORKERS * 8)))
+EXEC_MAX_PER_USER = int(os.getenv("EXEC_MAX_PER_USER", "2"))
+
+# Key for runs without a user id; they share one round-robin slot and are
+# not subject to the per-user limit.
+_ANONYMOUS = ""
+
+
+class ExecutionBusyError(RuntimeError):
+    """The run was not admitted; retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ExecutionScheduler:
+    """Bounded, per-user fair work queue in front of the sandbox."""
+
+    def __init__(self, workers: int = EXEC_QUEUE_WORKERS, max_queued: int = EXEC_QUEUE_MAX,
+                 max_per_user: int = EXEC_MAX_PER_USER):
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.max_per_user = max_per_user
+        self._cond = threading.Condition()
+        # Students with waiting runs, in round-robin order -> their runs
+        self._waiting: "OrderedDict[str, deque]" = OrderedDict()
+        self._in_flight: dict[str, int] = {}
+        self._queued = 0
+        self._running = 0
+        self._threads: list[threading.Thread] = []
+        self._avg_run_seconds = 1.0
+        self.completed = 0
+        self.rejected = 0
+
+    # -- admission ----------------------------------------------------------
+
+    def _retry_after(self) -> int:
+        backlog = self._queued / self.workers + 1
+        return max(1, math.ceil(self._avg_run_seconds * backlog))
+
+    def submit(self, user_id: Optional[str], fn: Callable, *args) -> Future:
+        """
+        Queue fn(*args). The future resolves to (result, queue_ms).
+        Raises ExecutionBusyError if the queue or the student's share is full.
+        """
+        key = str(user_id) if user_id else _ANONYMOUS
+        future: Future = Future()
+        with self._cond:
+            if key != _ANONYMOUS and self.max_per_user > 0 and self._in_flight.get(key, 0) >= self.max_per_user:
+                self.rejected += 1
+                raise ExecutionBusyError(
+                    "You already have code running; wait for it to finish.", self._retry_after(),
+                )
+            if self._queued >= self.max_queued:
+                self.rejected += 1
+                raise ExecutionBusyError(
+                    "The code runner is busy; please try again shortly.", self._retry_after(),
+                )
+            self._waiting.setdefault(key, deque()).append((future, fn, args, time.monotonic()))
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+            self._queued += 1
+            self._start_workers()
+            self._cond.notify()
+        return future
+
+    def run(self, user_id: Optional[str], fn: Callable, *args):
+        """Blocking submit(): returns (result, queue_ms)."""
+        return self.submit(user_id, fn, *args).result()
+
+    async def run_async(self, user_id: Optional[str], fn: Callable, *args):
+        """submit() awaited without holding a thread: returns (result, queue_ms)."""
+        return await asyncio.wrap_future(self.submit(user_id, fn, *args))
+
+    # -- workers ------------------------------------------------------------
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"exec-queue-{len(self._threads)}",
+                                      daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next(self):
+        """Oldest run of the next student in rotation (caller holds the lock)."""
+        key, runs = next(iter(self._waiting.items()))
+        job = runs.popleft()
+        if runs:
+            self._waiting.move_to_end(key)
+        else:
+            del self._waiting[key]
+        self._queued -= 1
+        self._running += 1
+        return key, job
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._waiting:
+                    self._cond.wait()
+                key, (future, fn, args, enqueued_at) = self._next()
+            started = time.monotonic()
+            try:
+                if future.set_running_or_notify_cancel():
+                    queue_ms = round((started - enqueued_at) * 1000, 3)
+                    try:
+                        future.set_result((fn(*args), queue_ms))
+                    except BaseException as exc:
+                        future.set_exception(exc)
+            finally:
+                elapsed = time.monotonic() - started
+                with self._cond:
+                    self._running -= 1
+                    self.completed += 1
+                    self._avg_run_seconds = 0.8 * self._avg_run_seconds + 0.2 * elapsed
+                    remaining = self._in_flight.get(key, 1) - 1
+                    if remaining > 0:
+                        self._in_flight[key] = remaining
+                    else:
+                        self._in_flight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queued": self._queued,
+                "max_queued": self.max_queued,
+                "users_waiting": len(self._waiting),
+                "avg_run_ms": round(self._avg_run_seconds * 1000, 1),
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+execution_scheduler = ExecutionScheduler()
@@ -0,0 +1,245 @@
+"""
+interpreter_pool.py — Pool of warm, pre-forked interpreters for code execution.
+
+Starting a fresh `python` for every Run costs tens of milliseconds of
+interpreter start-up and imports. The pool keeps EXEC_POOL_SIZE long-lived
+worker processes (vaathiyaar/exec_worker.py) that have already imported the
+common standard-library modules; each job is run in a child forked from a
+worker's clean state and discarded afterwards, so no state leaks between runs.
+
+Workers are replaced when they die, misbehave or have served
+EXEC_POOL_MAX_JOBS jobs. The pool needs os.fork (POSIX); elsewhere, or with
+EXEC_POOL_SIZE=0, execution falls back to one subprocess per run.
+"""
+
+import atexit
+import json
+import os
+import queue
+import selectors
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+EXEC_POOL_SIZE = int(os.getenv("EXEC_POOL_SIZE", str(os.cpu_count() or 2)))
+EXEC_POOL_MAX_JOBS = int(os.getenv("EXEC_POOL_MAX_JOBS", "1000"))
+# How long a run may wait for a free worker before using a one-off subprocess
+EXEC_POOL_ACQUIRE_TIMEOUT = float(os.getenv("EXEC_POOL_ACQUIRE_TIMEOUT", "5"))
+# Extra time a worker gets to report back beyond the job's own timeout
+_REPLY_GRACE_SECONDS = 5.0
+
+_WORKER_SCRIPT = Path(__file__).with_name("exec_worker.py")
+
+
+class WorkerError(RuntimeError):
+    """A worker died or broke protocol; it has been discarded."""
+
+
+class _Worker:
+    """One warm interpreter process speaking JSON lines over stdin/stdout."""
+
+    def __init__(self):
+        self.proc = subprocess.Popen(
+            [sys.executable, "-u", str(_WORKER_SCRIPT)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        )
+        self.jobs = 0
+        self._buffer = b""
+        ready = self._read_line(timeout=30)
+        if json.loads(ready).get("ready") is not True:
+            self.kill()
+            raise WorkerError("worker failed to start")
+
+    def _read_line(self, timeout: float) -> bytes:
+        deadline = time.monotonic() + timeout
+        fd = self.proc.stdout.fileno()
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            while b"\n" not in self._buffer:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not selector.select(remaining):
+                    raise WorkerError("worker did not reply in time")
+                data = os.read(fd, 65536)
+                if not data:
+                    raise WorkerError("worker exited")
+                self._buffer += data
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        return line
+
+    def run(self, code: str, timeout: float, limits: Optional[dict] = None,
+            on_output: Optional[Callable[[str, str], None]] = None,
+            paths: Optional[list] = None) -> dict:
+        self.jobs += 1
+        job = {"code": code, "timeout": timeout, "limits": limits or {}, "paths": paths or [],
+               "stream": on_output is not None}
+        deadline = time.monotonic() + timeout + _REPLY_GRACE_SECONDS
+        try:
+            self.proc.stdin.write(json.dumps(job).encode("utf-8") + b"\n")
+            self.proc.stdin.flush()
+            while True:
+                message = json.loads(self._read_line(deadline - time.monotonic()))
+                if "stream" not in message:
+                    return message
+                if on_output is not None:
+                    on_output(message["stream"], message["data"])
+        except (OSError, ValueError) as e:
+            raise WorkerError(str(e))
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def kill(self):
+        try:
+            self.proc.kill()
+            self.proc.wait(timeout=5)
+        except Exception:
+            pass
+        for stream in (self.proc.stdin, self.proc.stdout):
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+
+class InterpreterPool:
+    """Fixed-size pool of _Worker processes, started lazily."""
+
+    def __init__(self, size: int = EXEC_POOL_SIZE, max_jobs: int = EXEC_POOL_MAX_JOBS):
+        self.size = size
+        self.max_jobs = max_jobs
+        self._idle: "queue.LifoQueue[_Worker]" = queue.LifoQueue()
+        self._workers: set = set()
+        self._starting = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self.jobs = 0
+        self.replaced = 0
+
+    @property
+    def supported(self) -> bool:
+        return self.size > 0 and hasattr(os, "fork") and _WORKER_SCRIPT.exists()
+
+    def _try_spawn(self) -> Optional[_Worker]:
+        """Start a worker if the pool has room; None when full or on failure."""
+        with self._lock:
+            if len(self._workers) + self._starting >= self.size:
+                return None
+            self._starting += 1
+        worker = None
+        try:
+            worker = _Worker()
+        except Exception as e:
+            print(f"Warning: could not start execution worker: {e}")
+        with self._lock:
+            self._starting -= 1
+            if worker is not None:
+                self._workers.add(worker)
+        return worker
+
+    def _discard(self, worker: _Worker):
+        worker.kill()
+        with self._lock:
+            self._workers.discard(worker)
+            self.replaced += 1
+
+    def warm(self):
+        """Start every worker now instead of on first use."""
+        while not self._closed:
+            worker = self._try_spawn()
+            if worker is None:
+                return
+            self._idle.put(worker)
+
+    def _acquire(self, timeout: float) -> Optional[_Worker]:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        worker = self._try_spawn()
+        if worker is not None:
+            return worker
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def run(self, code: str, timeout: float, limits: Optional[dict] = None,
+            on_output: Optional[Callable[[str, str], None]] = None,
+            paths: Optional[list] = None) -> Optional[dict]:
+        """
+        Run code on a warm worker under the given sandbox limits. Returns the
+        worker's reply ({output, error, exit_code, timed_out, limit_exceeded}),
+        or None if no worker could take the job (the caller should fall back
+        to a fresh subprocess).
+
+        With on_output, output is streamed to on_output(stream, text) as it
+        is produced (see exec_worker.py); paths are extra import directories.
+        Once any has been delivered a
+        failing worker is reported as an "Execution failed" result rather
+        than None, so the program is not run a second time.
+        """
+        if self._closed:
+            return None
+        worker = self._acquire(EXEC_POOL_ACQUIRE_TIMEOUT)
+        if worker is None:
+            return None
+        delivered = False
+
+        def forward(stream: str, data: str):
+            nonlocal delivered
+            delivered = True
+            on_output(stream, data)
+
+        try:
+            result = worker.run(code, timeout, limits, forward if on_output else None, paths)
+        except WorkerError as e:
+            self._discard(worker)
+            if not delivered:
+                return None
+            return {"output": "", "error": f"Execution failed: {e}", "exit_code": 1,
+                    "timed_out": False, "limit_exceeded": None}
+        with self._lock:
+            self.jobs += 1
+        if worker.jobs >= self.max_jobs or not worker.alive() or self._closed:
+            self._discard(worker)
+        else:
+            self._idle.put(worker)
+        return result
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.kill()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "workers": len(self._workers),
+                "idle": self._idle.qsize(),
+                "jobs": self.jobs,
+                "replaced": self.replaced,
+            }
+
+
+_pool: Optional[InterpreterPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[InterpreterPool]:
+    """Process-wide pool, or None where pre-forked execution is unsupported."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = InterpreterPool()
+                atexit.register(_pool.close)
+    return _pool if _pool.supported else None
@@ -0,0 +1,370 @@
+"""
+llm_client.py — Deadlines, circuit breaking and hedging for Ollama Cloud calls.
+
+A slow or failing upstream used to hang every classroom request for as long
+as the HTTP client was willing to wait, and evaluate_code only fell back to
+its canned feedback after the full failure. The engine now sends each call
+through an LLMGuard:
+
+    raw = ollama_guard.call([primary_attempt, hedge_attempt])       # threads
+    raw = await ollama_guard.acall([primary_attempt, hedge_attempt])
+
+    - deadline: a call that has not answered within
+      VAATHIYAAR_CALL_TIMEOUT_SECONDS raises VaathiyaarTimeoutError;
+    - circuit breaker (one per endpoint): over the last BREAKER_WINDOW calls,
+      an error rate ≥ BREAKER_ERROR_RATE or a share of calls slower than
+      BREAKER_SLOW_SECONDS ≥ BREAKER_SLOW_RATE opens it. While open, calls
+      fail at once with VaathiyaarUnavailableError, so callers serve their
+      fallback without waiting; after BREAKER_OPEN_SECONDS one probe call is
+      let through (half-open) and its outcome closes or re-opens it;
+    - hedging (only when OLLAMA_HEDGE_HOST or OLLAMA_HEDGE_MODEL is set): if
+      the primary has not answered after its recent p95 latency (at least
+      VAATHIYAAR_HEDGE_MIN_DELAY_SECONDS), the same request is also sent to
+      the secondary endpoint/model and the first answer wins. An open primary
+      breaker sends calls straight to the secondary.
+
+Streams (astream_vaathiyaar) use the primary breaker and a first-token
+deadline (VAATHIYAAR_FIRST_TOKEN_TIMEOUT_SECONDS) but are not hedged.
+Calls routed to the local model tier (vaathiyaar.model_router) go through
+local_guard, which hedges / falls back to the primary endpoint.
+stats() reports each breaker's state for /api/status/llm.
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Optional
+
+from vaathiyaar.concurrency import VaathiyaarBusyError
+
+VAATHIYAAR_CALL_TIMEOUT_SECONDS = float(os.getenv("VAATHIYAAR_CALL_TIMEOUT_SECONDS", "45"))
+VAATHIYAAR_FIRST_TOKEN_TIMEOUT_SECONDS = float(os.getenv("VAATHIYAAR_FIRST_TOKEN_TIMEOUT_SECONDS", "20"))
+VAATHIYAAR_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("VAATHIYAAR_HEDGE_MIN_DELAY_SECONDS", "2"))
+
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_SLOW_SECONDS = float(os.getenv("BREAKER_SLOW_SECONDS", "20"))
+BREAKER_SLOW_RATE = float(os.getenv("BREAKER_SLOW_RATE", "0.8"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+
+# Latencies kept per endpoint for the hedge delay (p95)
+_LATENCY_SAMPLES = 200
+
+
+class VaathiyaarUnavailableError(RuntimeError):
+    """Ollama Cloud is failing or too slow; serve the fallback."""
+
+    def __init__(self, message: str, retry_after: int = 0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class VaathiyaarTimeoutError(VaathiyaarUnavailableError):
+    """No answer within the call deadline."""
+
+
+# ---------------------------------------------------------------------------
+# Circuit breaker
+# ---------------------------------------------------------------------------
+
+class CircuitBreaker:
+    """Error-rate and latency breaker over a window of recent calls (thread-safe)."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, window: int = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 error_rate: float = BREAKER_ERROR_RATE, slow_seconds: float = BREAKER_SLOW_SECONDS,
+                 slow_rate: float = BREAKER_SLOW_RATE, open_seconds: float = BREAKER_OPEN_SECONDS):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_seconds = slow_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self._outcomes: deque = deque(maxlen=window)   # (ok, slow)
+        self._latencies: deque = deque(maxlen=_LATENCY_SAMPLES)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_out = False
+        self.trips = 0
+        self.short_circuited = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_out = False
+        return self._state
+
+    def retry_after(self) -> int:
+        with self._lock:
+            return max(1, math.ceil(self.open_seconds - (time.monotonic() - self._opened_at)))
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (claims the probe when half-open)."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_out:
+                self._probe_out = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record(self, ok: bool, seconds: Optional[float] = None, sample: bool = True):
+        """
+        Outcome of one call. seconds is its latency (time to first token for
+        streams, which pass sample=False to keep it out of the hedge p95).
+        """
+        with self._lock:
+            slow = seconds is not None and seconds >= self.slow_seconds
+            if ok and seconds is not None and sample:
+                self._latencies.append(seconds)
+            if self._state == self.HALF_OPEN:
+                if ok and not slow:
+                    self._state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            self._outcomes.append((ok, slow))
+            calls = len(self._outcomes)
+            if self._state != self.CLOSED or calls < self.min_calls:
+                return
+            errors = sum(1 for o, _ in self._outcomes if not o)
+            slow_calls = sum(1 for _, s in self._outcomes if s)
+            if errors / calls >= self.error_rate or slow_calls / calls >= self.slow_rate:
+                self._open()
+
+    def release_probe(self):
+        """A half-open probe ended without an outcome (e.g. cancelled)."""
+        with self._lock:
+            self._probe_out = False
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.trips += 1
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, math.ceil(0.95 * len(samples)) - 1)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            outcomes = list(self._outcomes)
+        p95 = self.p95()
+        return {
+            "state": state,
+            "recent_calls": len(outcomes),
+            "recent_errors": sum(1 for o, _ in outcomes if not o),
+            "recent_slow": sum(1 for _, s in outcomes if s),
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "trips": self.trips,
+            "short_circuited": self.short_circuited,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Guarded calls
+# ---------------------------------------------------------------------------
+
+class LLMGuard:
+    """
+    Runs an upstream call with a deadline, behind the endpoints' breakers,
+    hedging to the second attempt when one is given.
+    """
+
+    def __init__(self, breakers: list, timeout: float = VAATHIYAAR_CALL_TIMEOUT_SECONDS,
+                 hedge_min_delay: float = VAATHIYAAR_HEDGE_MIN_DELAY_SECONDS, max_threads: int = 32,
+                 local_errors: tuple = (VaathiyaarBusyError,)):
+        self.breakers = breakers
+        self.timeout = timeout
+        self.hedge_min_delay = hedge_min_delay
+        # Raised on our side (e.g. no limiter slot): not the endpoint's fault
+        self.local_errors = local_errors
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="llm-call")
+        self._lock = threading.Lock()
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _plan(self, attempts: list) -> tuple:
+        """
+        ((attempt, breaker) to run first, (attempt, breaker) to hedge with or
+        None). Skips endpoints whose breaker is open; raises if all are.
+        """
+        candidates = [(fn, breaker) for fn, breaker in zip(attempts, self.breakers) if fn is not None]
+        for i, (fn, breaker) in enumerate(candidates):
+            if breaker.allow():
+                rest = candidates[i + 1:]
+                return (fn, breaker), (rest[0] if rest else None)
+        raise VaathiyaarUnavailableError(
+            "Vaathiyaar is temporarily unavailable; please try again shortly.",
+            retry_after=self.breakers[0].retry_after(),
+        )
+
+    def hedge_delay(self, breaker: CircuitBreaker) -> float:
+        """How long to wait for an endpoint before hedging: its recent p95 latency."""
+        p95 = breaker.p95()
+        return max(self.hedge_min_delay, p95 if p95 is not None else self.hedge_min_delay)
+
+    def _outcome(self, breaker: CircuitBreaker, started: float, error: Optional[BaseException]):
+        if error is None:
+            breaker.record(True, time.monotonic() - started)
+        elif isinstance(error, self.local_errors) or isinstance(error, asyncio.CancelledError):
+            breaker.release_probe()
+        else:
+            breaker.record(False)
+
+    # -- from threads ---------------------------------------------------------
+
+    def _timed(self, fn: Callable, breaker: CircuitBreaker) -> Callable:
+        def run():
+            started = time.monotonic()
+            try:
+                result = fn()
+            except BaseException as exc:
+                self._outcome(breaker, started, exc)
+                raise
+            self._outcome(breaker, started, None)
+            return result
+        return run
+
+    def call(self, attempts: list, timeout: Optional[float] = None):
+        """
+        Run attempts[0] (hedged by attempts[1], if given and not None) within
+        the deadline. A call left running past the deadline still reports its
+        outcome to its breaker when it ends.
+        """
+        (fn, breaker), hedge = self._plan(attempts)
+        deadline = time.monotonic() + (timeout or self.timeout)
+        first = self._executor.submit(self._timed(fn, breaker))
+        pending = {first}
+        last_error: Optional[BaseException] = None
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            wait_for = min(remaining, self.hedge_delay(breaker)) if hedge else remaining
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        self._count("hedge_wins")
+                    return future.result()
+                last_error = future.exception()
+            if hedge and (done or wait_for < remaining):
+                # The first endpoint failed or is slower than usual
+                if hedge[1].allow():
+                    pending.add(self._executor.submit(self._timed(*hedge)))
+                    self._count("hedges")
+                hedge = None
+
+        if not pending and last_error is not None:
+            raise last_error
+        self._count("timeouts")
+        raise VaathiyaarTimeoutError("Vaathiyaar took too long to answer.")
+
+    # -- from the event loop --------------------------------------------------
+
+    async def _atimed(self, fn: Callable[[], Awaitable], breaker: CircuitBreaker):
+        started = time.monotonic()
+        try:
+            result = await fn()
+        except BaseException as exc:
+            self._outcome(breaker, started, exc)
+            raise
+        self._outcome(breaker, started, None)
+        return result
+
+    async def acall(self, attempts: list, timeout: Optional[float] = None):
+        """Async call(): attempts are coroutine functions; losers are cancelled."""
+        (fn, breaker), hedge = self._plan(attempts)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        first = asyncio.ensure_future(self._atimed(fn, breaker))
+        breakers = {first: breaker}
+        pending = {first}
+        last_error: Optional[BaseException] = None
+
+        try:
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                wait_for = min(remaining, self.hedge_delay(breaker)) if hedge else remaining
+                done, pending = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self._count("hedge_wins")
+                        return task.result()
+                    last_error = task.exception()
+                if hedge and (done or wait_for < remaining):
+                    if hedge[1].allow():
+                        task = asyncio.ensure_future(self._atimed(*hedge))
+                        breakers[task] = hedge[1]
+                        pending.add(task)
+                        self._count("hedges")
+                    hedge = None
+
+            if not pending and last_error is not None:
+                raise last_error
+            # Deadline: what is still running counts as failed
+            for task in pending:
+                breakers[task].record(False)
+            self._count("timeouts")
+            raise VaathiyaarTimeoutError("Vaathiyaar took too long to answer.")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # -- streams --------------------------------------------------------------
+
+    def stream_admit(self) -> CircuitBreaker:
+        """Breaker check for a stream to the primary endpoint (streams are not hedged)."""
+        breaker = self.breakers[0]
+        if not breaker.allow():
+            raise VaathiyaarUnavailableError(
+                "Vaathiyaar is temporarily unavailable; please try again shortly.",
+                retry_after=breaker.retry_after(),
+            )
+        return breaker
+
+    def stats(self) -> dict:
+        return {
+            "timeout_seconds": self.timeout,
+            "timeouts": self.timeouts,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "breakers": {breaker.name: breaker.stats() for breaker in self.breakers},
+        }
+
+
+primary_breaker = CircuitBreaker("primary")
+hedge_breaker = CircuitBreaker("hedge")
+local_breaker = CircuitBreaker("local")
+ollama_guard = LLMGuard([primary_breaker, hedge_breaker])
+local_guard = LLMGuard([local_breaker, primary_breaker])
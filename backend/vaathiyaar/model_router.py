@@ -0,0 +1,169 @@
+"""
+model_router.py — Routes each Vaathiyaar call to a model tier by call type.
+
+Every call used to go to OLLAMA_MODEL, including cheap ones: the forbidden
+keyword explanation, diagnostic-challenge feedback and the JSON-only stages
+of the module pipeline. Calls are now classified and sent to a tier:
+
+    chat                   classroom / playground conversation
+    feedback               commentary on an /evaluate run
+    diagnostic             forbidden-keyword explanations, /diagnostic runs
+    pipeline.<stage>       module-generation stages (outline, narrative, ...)
+
+Tiers are "flagship" (OLLAMA_MODEL on Ollama Cloud, hedged as configured in
+vaathiyaar.llm_client) and "local" (OLLAMA_LOCAL_MODEL on OLLAMA_LOCAL_HOST,
+falling back to the flagship when it fails or is slower than usual). The
+policy is VAATHIYAAR_MODEL_ROUTES, e.g.
+
+    VAATHIYAAR_MODEL_ROUTES="diagnostic=local,pipeline=local,pipeline.narrative=flagship"
+
+A call type without a route of its own uses its prefix's ("pipeline" for
+"pipeline.outline"), then the flagship; so does a route to a tier that is
+not configured. stats() reports each tier's latency and token usage for
+/api/status/llm.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+FLAGSHIP = "flagship"
+LOCAL = "local"
+
+# Stateless JSON pipeline stages and diagnostics go local; the story and
+# the conversation stay on the flagship (only when a local model is set)
+VAATHIYAAR_MODEL_ROUTES = os.getenv(
+    "VAATHIYAAR_MODEL_ROUTES", "diagnostic=local,pipeline=local,pipeline.narrative=flagship"
+)
+
+# Latencies kept per tier for the percentiles in stats()
+_LATENCY_SAMPLES = 500
+
+
+def classify_call(lesson_context: Optional[dict]) -> str:
+    """Call type of a Vaathiyaar call from its lesson context."""
+    context = lesson_context or {}
+    if context.get("pipeline_stage"):
+        return f"pipeline.{context['pipeline_stage']}"
+    if context.get("challenge_id"):
+        return "diagnostic"
+    if context.get("code_evaluation"):
+        return "feedback"
+    return "chat"
+
+
+def parse_routes(spec: str) -> dict:
+    """{"diagnostic": "local", ...} from "diagnostic=local,..."; malformed entries are skipped."""
+    routes = {}
+    for entry in spec.split(","):
+        kind, sep, tier = entry.partition("=")
+        if sep and kind.strip() and tier.strip():
+            routes[kind.strip()] = tier.strip()
+    return routes
+
+
+def _percentile(samples: list, q: float) -> Optional[float]:
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, math.ceil(q * len(samples)) - 1)], 3)
+
+
+class ModelTier:
+    """
+    A model calls can be routed to. attempts are (endpoint, model) pairs (or
+    None) in the order of guard's breakers: the tier's own model first, then
+    the one to hedge / fall back to.
+    """
+
+    def __init__(self, name: str, attempts: list, guard):
+        self.name = name
+        self.attempts = attempts
+        self.guard = guard
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=_LATENCY_SAMPLES)
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    @property
+    def endpoint(self) -> str:
+        return self.attempts[0][0]
+
+    @property
+    def model(self) -> str:
+        return self.attempts[0][1]
+
+    @contextmanager
+    def track(self):
+        """Counts the upstream call made in the block and its latency."""
+        started = time.monotonic()
+        try:
+            yield
+        except self.guard.local_errors:
+            raise
+        except Exception:
+            with self._lock:
+                self.calls += 1
+                self.errors += 1
+            raise
+        with self._lock:
+            self.calls += 1
+            self._latencies.append(time.monotonic() - started)
+
+    def add_usage(self, response):
+        """Token counts of an Ollama chat response (or a stream's final chunk)."""
+        with self._lock:
+            self.prompt_tokens += response.get("prompt_eval_count") or 0
+            self.completion_tokens += response.get("eval_count") or 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            samples = list(self._latencies)
+            stats = {
+                "model": self.model,
+                "endpoint": self.endpoint,
+                "calls": self.calls,
+                "errors": self.errors,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+        stats["p50_seconds"] = _percentile(samples, 0.5)
+        stats["p95_seconds"] = _percentile(samples, 0.95)
+        stats["guard"] = self.guard.stats()
+        return stats
+
+
+class ModelRouter:
+    """Picks the tier for a call type; tiers is name -> ModelTier and must include FLAGSHIP."""
+
+    def __init__(self, tiers: dict, routes: dict):
+        self.tiers = tiers
+        self.routes = routes
+
+    @property
+    def flagship(self) -> ModelTier:
+        return self.tiers[FLAGSHIP]
+
+    def tier_name(self, kind: str) -> str:
+        """Configured tier for kind: its own route, else its prefix's, else the flagship."""
+        while kind:
+            name = self.routes.get(kind)
+            if name is not None:
+                return name if name in self.tiers else FLAGSHIP
+            kind = kind.rpartition(".")[0]
+        return FLAGSHIP
+
+    def route(self, kind: str) -> ModelTier:
+        return self.tiers[self.tier_name(kind)]
+
+    def stats(self) -> dict:
+        return {
+            "routes": {kind: self.tier_name(kind) for kind in sorted(self.routes)},
+            "tiers": {name: tier.stats() for name, tier in self.tiers.items()},
+        }
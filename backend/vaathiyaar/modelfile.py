@@ -6,6 +6,8 @@ identity strings, animation primitive definitions, and the assembly function tha
 wires them together into a full system prompt tailored to each student.
 """
 
+from functools import lru_cache
+
 # ---------------------------------------------------------------------------
 # Core Identity
 # ---------------------------------------------------------------------------
@@ -427,6 +429,89 @@ Rules:
 - "profile_update" should always be non-null so the profiler can track signals.
 """
 
+# ---------------------------------------------------------------------------
+# Prompt Segments
+# ---------------------------------------------------------------------------
+
+# Everything that never varies between students. Sent first, byte-identical on
+# every call, so the LLM server's prefix/KV cache can be reused across requests.
+STATIC_PROMPT_PREFIX = VAATHIYAAR_IDENTITY + ANIMATION_INSTRUCTIONS + RESPONSE_FORMAT
+
+LANGUAGE_INSTRUCTIONS = {
+    "ta": (
+        "\n## Language Instruction\n\n"
+        "CRITICAL LANGUAGE RULE: You MUST respond ENTIRELY in Tamil script (தமிழ்). "
+        "Every word of the 'message' field must be in Tamil. Do NOT mix English words "
+        "except for Python keywords and code terms. This is non-negotiable. "
+        "All JSON keys and non-message values must remain in English.\n"
+    ),
+    "tanglish": (
+        "\n## Language Instruction\n\n"
+        "CRITICAL LANGUAGE RULE: You MUST respond in Tanglish — a natural mix of Tamil "
+        "(romanised) and English, exactly as spoken by Tamil tech professionals. Every "
+        "sentence in the 'message' field must blend Tamil and English naturally. Do NOT "
+        "write full sentences in pure English alone. Technical terms and code stay in "
+        "English. All JSON keys and non-message values remain in English. This is "
+        "non-negotiable.\n"
+    ),
+    "en": (
+        "\n## Language Instruction\n\n"
+        "CRITICAL LANGUAGE RULE: You MUST respond ENTIRELY in English. Keep responses "
+        "professional and educational. Do NOT mix other languages. Sprinkle Tamil words "
+        "only where they add cultural warmth, always with the English meaning in "
+        "parentheses immediately after. This is non-negotiable.\n"
+    ),
+}
+
+VOICE_MODE_BLOCK = (
+    "\n## Active Mode: Voice\n\n"
+    "IMPORTANT: Voice mode is currently ON. You MUST follow the Voice Mode "
+    "Behaviour guidelines from your identity:\n"
+    "- Keep responses to 2-3 sentences per thought.\n"
+    "- Use contractions and casual phrasing.\n"
+    "- Mark pauses with '...' for natural speech rhythm.\n"
+    "- Avoid long code blocks — describe code verbally.\n"
+    "- Use rhetorical questions to keep the conversation flowing.\n"
+)
+
+GREETING_TEMPLATES = {
+    "morning": (
+        "\n## Session Greeting\n\n"
+        "This is a **morning** session. Open with a warm morning greeting for "
+        "{name}: \"Good morning, {name}! Ready for today's "
+        "learning adventure? Let's start fresh and tackle something exciting.\"\n"
+    ),
+    "afternoon": (
+        "\n## Session Greeting\n\n"
+        "This is an **afternoon** session. Open with: \"Good afternoon, "
+        "{name}! Let's build on what we've been learning. Your brain "
+        "is warmed up — perfect time to go deeper.\"\n"
+    ),
+    "evening": (
+        "\n## Session Greeting\n\n"
+        "This is an **evening** session. Open with: \"Good evening, "
+        "{name}! Perfect time for a focused learning session. The "
+        "world is quieter now — let's make the most of it.\"\n"
+    ),
+}
+
+
+@lru_cache(maxsize=256)
+def _bucket_segment(user_type: str, preferred_language: str, voice_mode: bool) -> str:
+    """Audience, language and voice directives — shared by every student in the bucket."""
+    return (
+        USER_TYPE_ADAPTATIONS.get(user_type, "")
+        + LANGUAGE_INSTRUCTIONS.get(preferred_language, LANGUAGE_INSTRUCTIONS["en"])
+        + (VOICE_MODE_BLOCK if voice_mode else "")
+    )
+
+
+@lru_cache(maxsize=4096)
+def _greeting_segment(time_of_day: str, display_name: str) -> str:
+    template = GREETING_TEMPLATES.get(time_of_day)
+    return template.format(name=display_name) if template else ""
+
+
 # ---------------------------------------------------------------------------
 # Prompt Builder
 # ---------------------------------------------------------------------------
@@ -533,9 +618,8 @@ def build_system_prompt(
 - {mastery_section}{name_instruction}
 """
 
-    # User type adaptation
+    # User type adaptation (rendered in _bucket_segment)
     user_type = student_profile.get("user_type", "") if student_profile else ""
-    user_type_block = USER_TYPE_ADAPTATIONS.get(user_type, "")
 
     # --- Lesson context section ---
     module_id = context.get("module_id", "")
@@ -562,34 +646,6 @@ def build_system_prompt(
     else:
         context_block = "\n## Current Lesson Context\n\n- No specific lesson loaded yet.\n"
 
-    # --- Language instruction ---
-    if preferred_language == "ta":
-        lang_instruction = (
-            "\n## Language Instruction\n\n"
-            "CRITICAL LANGUAGE RULE: You MUST respond ENTIRELY in Tamil script (தமிழ்). "
-            "Every word of the 'message' field must be in Tamil. Do NOT mix English words "
-            "except for Python keywords and code terms. This is non-negotiable. "
-            "All JSON keys and non-message values must remain in English.\n"
-        )
-    elif preferred_language == "tanglish":
-        lang_instruction = (
-            "\n## Language Instruction\n\n"
-            "CRITICAL LANGUAGE RULE: You MUST respond in Tanglish — a natural mix of Tamil "
-            "(romanised) and English, exactly as spoken by Tamil tech professionals. Every "
-            "sentence in the 'message' field must blend Tamil and English naturally. Do NOT "
-            "write full sentences in pure English alone. Technical terms and code stay in "
-            "English. All JSON keys and non-message values remain in English. This is "
-            "non-negotiable.\n"
-        )
-    else:
-        lang_instruction = (
-            "\n## Language Instruction\n\n"
-            "CRITICAL LANGUAGE RULE: You MUST respond ENTIRELY in English. Keep responses "
-            "professional and educational. Do NOT mix other languages. Sprinkle Tamil words "
-            "only where they add cultural warmth, always with the English meaning in "
-            "parentheses immediately after. This is non-negotiable.\n"
-        )
-
     # --- Assemble enhanced context blocks ---
     blocks = []
 
@@ -663,58 +719,20 @@ def build_system_prompt(
                 "- Never re-explain concepts the student has demonstrated mastery in\n"
             )
 
-    # --- Voice mode directive ---
-    voice_block = ""
-    if voice_mode:
-        voice_block = (
-            "\n## Active Mode: Voice\n\n"
-            "IMPORTANT: Voice mode is currently ON. You MUST follow the Voice Mode "
-            "Behaviour guidelines from your identity:\n"
-            "- Keep responses to 2-3 sentences per thought.\n"
-            "- Use contractions and casual phrasing.\n"
-            "- Mark pauses with '...' for natural speech rhythm.\n"
-            "- Avoid long code blocks — describe code verbally.\n"
-            "- Use rhetorical questions to keep the conversation flowing.\n"
-        )
-
     # --- Time-of-day greeting directive ---
-    greeting_block = ""
     display_name = name if name != "the student" else "there"
-    if time_of_day == "morning":
-        greeting_block = (
-            "\n## Session Greeting\n\n"
-            f"This is a **morning** session. Open with a warm morning greeting for "
-            f"{display_name}: \"Good morning, {display_name}! Ready for today's "
-            f"learning adventure? Let's start fresh and tackle something exciting.\"\n"
-        )
-    elif time_of_day == "afternoon":
-        greeting_block = (
-            "\n## Session Greeting\n\n"
-            f"This is an **afternoon** session. Open with: \"Good afternoon, "
-            f"{display_name}! Let's build on what we've been learning. Your brain "
-            f"is warmed up — perfect time to go deeper.\"\n"
-        )
-    elif time_of_day == "evening":
-        greeting_block = (
-            "\n## Session Greeting\n\n"
-            f"This is an **evening** session. Open with: \"Good evening, "
-            f"{display_name}! Perfect time for a focused learning session. The "
-            f"world is quieter now — let's make the most of it.\"\n"
-        )
+    greeting_block = _greeting_segment(time_of_day, display_name)
 
     # --- Assemble full prompt ---
-    full_prompt = (
-        VAATHIYAAR_IDENTITY
-        + profile_block
-        + user_type_block
-        + context_block
-        + lang_instruction
-        + voice_block
-        + greeting_block
-        + enhanced_context
-        + journey_block
-        + ANIMATION_INSTRUCTIONS
-        + RESPONSE_FORMAT
-    )
-
-    return full_prompt
+    # Static prefix first (identical bytes on every call, so the model server
+    # can reuse its cached prefix), then the memoized per-bucket segment, then
+    # the per-student parts.
+    return "".join((
+        STATIC_PROMPT_PREFIX,
+        _bucket_segment(user_type, preferred_language, voice_mode),
+        profile_block,
+        context_block,
+        greeting_block,
+        enhanced_context,
+        journey_block,
+    ))
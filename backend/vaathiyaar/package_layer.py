@@ -0,0 +1,277 @@
+"""
+package_layer.py — Managed, pre-installed packages for the sandbox.
+
+Playground "installs" used to run `pip install` into the server's own
+interpreter inside the request. Instead, the ALLOWED_PACKAGES set is served
+from a package layer under PACKAGE_LAYER_DIR:
+
+    wheels/          local index: wheels for the allowed packages
+    site/<name>/     one read-only site directory per package (with its
+                     dependencies), installed from wheels/ without network
+    enabled.json     packages currently mounted into the sandbox
+
+Build step (run at image build time; the only part that uses the network):
+
+    python -m vaathiyaar.package_layer [--offline] [--enable] [PACKAGE ...]
+
+downloads wheels for the packages (default: all of ALLOWED_PACKAGES) into
+wheels/ and installs each into its site directory. Enabling a package is then
+a constant-time change of the sandbox's import path (sys_paths(), added to
+sys.path of every run); a package that is in the local index but not yet
+installed is installed from it once, offline, on first enable.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+PACKAGE_LAYER_DIR = Path(os.getenv(
+    "PACKAGE_LAYER_DIR", str(Path(__file__).resolve().parent.parent / "sandbox_packages"),
+))
+PACKAGE_WHEELHOUSE = Path(os.getenv("PACKAGE_WHEELHOUSE", str(PACKAGE_LAYER_DIR / "wheels")))
+# How long installing one package from the local index may take
+PACKAGE_BUILD_TIMEOUT = float(os.getenv("PACKAGE_BUILD_TIMEOUT", "300"))
+
+ALLOWED_PACKAGES = frozenset({
+    "numpy", "pandas", "matplotlib", "seaborn", "scipy", "scikit-learn",
+    "requests", "beautifulsoup4", "flask", "fastapi", "django",
+    "pillow", "opencv-python", "torch", "tensorflow", "transformers",
+    "langchain", "openai", "anthropic", "chromadb", "faiss-cpu",
+    "pytest", "black", "isort", "rich", "typer", "click",
+    "pydantic", "sqlalchemy", "aiohttp", "httpx", "boto3",
+    "redis", "celery", "PyPDF2", "openpyxl", "python-dotenv",
+    "tiktoken", "nltk", "spacy", "networkx", "sympy",
+})
+
+
+class PackageUnavailableError(RuntimeError):
+    """The package is allowed but cannot be provided from the local index."""
+
+
+def normalize_name(name: str) -> str:
+    """PEP 503 project name: case-insensitive, runs of -_. are equivalent."""
+    return re.sub(r"[-_.]+", "-", name.strip()).lower()
+
+
+def _pip(*args: str, timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-m", "pip", "--disable-pip-version-check", "--no-input", *args],
+        capture_output=True, text=True, timeout=timeout,
+    )
+
+
+def _make_read_only(root: Path):
+    for directory, _, files in os.walk(root):
+        for name in files:
+            os.chmod(os.path.join(directory, name), 0o444)
+        os.chmod(directory, 0o555)
+
+
+class PackageLayer:
+    """The package layer rooted at one directory; see the module docstring."""
+
+    def __init__(self, root: Path = PACKAGE_LAYER_DIR, wheelhouse: Optional[Path] = None,
+                 allowed: Iterable[str] = ALLOWED_PACKAGES):
+        self.root = Path(root)
+        self.wheelhouse = Path(wheelhouse) if wheelhouse else self.root / "wheels"
+        self.site = self.root / "site"
+        self._state_path = self.root / "enabled.json"
+        self._allowed = {normalize_name(name): name for name in allowed}
+        self._lock = threading.Lock()
+        self._build_locks: dict[str, threading.Lock] = {}
+        self._enabled = self._load_enabled()
+        self._paths = self._compute_paths()
+
+    # -- state ----------------------------------------------------------------
+
+    def _load_enabled(self) -> set:
+        try:
+            names = json.loads(self._state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return set()
+        return {normalize_name(n) for n in names if normalize_name(n) in self._allowed}
+
+    def _save_enabled(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(sorted(self._enabled)), encoding="utf-8")
+        os.replace(tmp, self._state_path)
+
+    def _compute_paths(self) -> list:
+        return [str(self.site / name) for name in sorted(self._enabled) if self.is_installed(name)]
+
+    # -- queries --------------------------------------------------------------
+
+    def canonical(self, package: str) -> Optional[str]:
+        """Normalised name if the package is allowed, else None."""
+        name = normalize_name(package)
+        return name if name in self._allowed else None
+
+    @property
+    def allowed(self) -> list:
+        return sorted(self._allowed.values(), key=str.lower)
+
+    def is_installed(self, name: str) -> bool:
+        return (self.site / normalize_name(name)).is_dir()
+
+    def enabled(self) -> list:
+        with self._lock:
+            return sorted(self._enabled)
+
+    def sys_paths(self) -> list:
+        """Site directories of the enabled packages, for the sandbox's sys.path."""
+        return self._paths
+
+    # -- changes --------------------------------------------------------------
+
+    def install(self, name: str) -> bool:
+        """
+        Install an allowed package into its site directory from the local
+        index, without network access. Returns False if it already was.
+        """
+        name = normalize_name(name)
+        with self._lock:
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+        with build_lock:
+            target = self.site / name
+            if target.is_dir():
+                return False
+            if not self.wheelhouse.is_dir():
+                raise PackageUnavailableError(
+                    f"Package '{self._allowed.get(name, name)}' is not available: "
+                    "the package layer has not been built."
+                )
+            self.site.mkdir(parents=True, exist_ok=True)
+            staging = Path(tempfile.mkdtemp(prefix=f".{name}-", dir=self.site))
+            try:
+                result = _pip(
+                    "install", "--no-index", "--find-links", str(self.wheelhouse),
+                    "--target", str(staging), "--no-warn-script-location", self._allowed.get(name, name),
+                    timeout=PACKAGE_BUILD_TIMEOUT,
+                )
+                if result.returncode != 0:
+                    raise PackageUnavailableError(
+                        f"Package '{self._allowed.get(name, name)}' is not in the local package index."
+                    )
+                _make_read_only(staging)
+                os.rename(staging, target)
+            except subprocess.TimeoutExpired:
+                raise PackageUnavailableError(f"Installing '{name}' from the local index timed out.")
+            finally:
+                if staging.exists():
+                    shutil.rmtree(staging, ignore_errors=True)
+            return True
+
+    def enable(self, package: str) -> dict:
+        """
+        Mount an allowed package into the sandbox. Constant time when the
+        package is already installed in the layer.
+
+        Returns {"package", "changed", "installed_now"}.
+        Raises ValueError if the package is not allowed and
+        PackageUnavailableError if the layer cannot provide it.
+        """
+        name = self.canonical(package)
+        if name is None:
+            raise ValueError(f"Package '{package}' is not allowed.")
+        installed_now = self.install(name) if not self.is_installed(name) else False
+        with self._lock:
+            changed = name not in self._enabled
+            if changed:
+                self._enabled.add(name)
+                self._save_enabled()
+            self._paths = self._compute_paths()
+        return {"package": self._allowed[name], "changed": changed, "installed_now": installed_now}
+
+    def disable(self, package: str) -> bool:
+        name = normalize_name(package)
+        with self._lock:
+            if name not in self._enabled:
+                return False
+            self._enabled.discard(name)
+            self._save_enabled()
+            self._paths = self._compute_paths()
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            enabled = sorted(self._enabled)
+        installed = []
+        if self.site.is_dir():
+            installed = sorted(p.name for p in self.site.iterdir() if p.is_dir() and not p.name.startswith("."))
+        return {"root": str(self.root), "installed": installed, "enabled": enabled}
+
+
+# ---------------------------------------------------------------------------
+# Process-wide layer
+# ---------------------------------------------------------------------------
+
+_layer: Optional[PackageLayer] = None
+_layer_lock = threading.Lock()
+
+
+def get_package_layer() -> PackageLayer:
+    global _layer
+    if _layer is None:
+        with _layer_lock:
+            if _layer is None:
+                _layer = PackageLayer(PACKAGE_LAYER_DIR, PACKAGE_WHEELHOUSE)
+    return _layer
+
+
+# ---------------------------------------------------------------------------
+# Build step
+# ---------------------------------------------------------------------------
+
+def build_layer(layer: PackageLayer, packages: Iterable[str], offline: bool = False,
+                enable: bool = False) -> list:
+    """Fetch wheels (unless offline) and install each package; returns the failures."""
+    names = [layer.canonical(p) or p for p in packages]
+    failed = []
+    for name in names:
+        if layer.canonical(name) is None:
+            print(f"Skipping {name}: not in ALLOWED_PACKAGES")
+            failed.append(name)
+            continue
+        if not offline:
+            layer.wheelhouse.mkdir(parents=True, exist_ok=True)
+            result = _pip("wheel", "--wheel-dir", str(layer.wheelhouse), layer._allowed[name])
+            if result.returncode != 0:
+                print(f"Could not fetch {name}: {result.stderr.strip().splitlines()[-1:]}")
+                failed.append(name)
+                continue
+        try:
+            layer.enable(name) if enable else layer.install(name)
+            print(f"Installed {name}")
+        except PackageUnavailableError as e:
+            print(f"Could not install {name}: {e}")
+            failed.append(name)
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the sandbox package layer.")
+    parser.add_argument("packages", nargs="*", help="default: every allowed package")
+    parser.add_argument("--offline", action="store_true",
+                        help="install from the existing wheels/ only")
+    parser.add_argument("--enable", action="store_true",
+                        help="also mount the packages into the sandbox")
+    args = parser.parse_args()
+    layer = get_package_layer()
+    failed = build_layer(layer, args.packages or layer.allowed, args.offline, args.enable)
+    if failed:
+        print(f"{len(failed)} package(s) not built: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
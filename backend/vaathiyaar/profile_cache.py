@@ -0,0 +1,112 @@
+"""
+profile_cache.py — Bounded, versioned in-process cache for student profiles.
+
+get_student_profile() is called several times inside a single request flow
+(evaluate → feedback → pipeline stages …). Entries are keyed by
+(database file, user_id), expire after a TTL and are evicted LRU-first once
+the cache is full. Every writer that touches profile data calls
+invalidate_profile(user_id), which bumps that user's version so any cached
+entry — and any load that was already in flight — is discarded. Versions
+are kept per slot (users hashed into PROFILE_CACHE_VERSION_SLOTS counters),
+so they take fixed memory; users sharing a slot only invalidate each other.
+
+The cache is per process: with several uvicorn workers, a write served by
+one worker is seen by the others after at most PROFILE_CACHE_TTL_SECONDS.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "1024"))
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "30"))
+PROFILE_CACHE_VERSION_SLOTS = int(os.getenv("PROFILE_CACHE_VERSION_SLOTS", "4096"))
+
+
+class ProfileCache:
+    """Thread-safe LRU + TTL cache with per-user-slot version counters."""
+
+    def __init__(self, max_entries: int = PROFILE_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = PROFILE_CACHE_TTL_SECONDS,
+                 version_slots: int = PROFILE_CACHE_VERSION_SLOTS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # (db_path, user_id) -> (expires_at, version, value)
+        self._versions = [0] * max(1, version_slots)  # slot -> int
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def _slot(self, user_id: str) -> int:
+        return hash(user_id) % len(self._versions)
+
+    def version(self, user_id) -> int:
+        """Current version for user_id; capture it before loading from the DB."""
+        return self._versions[self._slot(str(user_id))]
+
+    def get(self, db_path: str, user_id):
+        """Return (hit, value). A hit may carry None for 'no profile yet'."""
+        key = (db_path, str(user_id))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, version, value = entry
+                if expires_at > now and version == self._versions[self._slot(key[1])]:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, db_path: str, user_id, value, version: int):
+        """Store value loaded at `version`; dropped if a writer bumped it since."""
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        key = (db_path, str(user_id))
+        with self._lock:
+            if version != self._versions[self._slot(key[1])]:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        """Bump the user's version so every cached copy becomes stale."""
+        slot = self._slot(str(user_id))
+        with self._lock:
+            self._versions[slot] += 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+
+profile_cache = ProfileCache()
+
+
+def invalidate_profile(user_id):
+    """Call after any write to a user's profile, mastery, signals, XP or path."""
+    if user_id is not None:
+        profile_cache.invalidate(user_id)
@@ -7,7 +7,11 @@ recording, mastery tracking, and profile retrieval.
 
 import json
 import uuid
-import sqlite3
+from dataclasses import dataclass, field, fields
+from typing import Optional
+
+import database
+from vaathiyaar.profile_cache import profile_cache, invalidate_profile
 
 
 def _compute_skill_level(user_type: str, prior_experience: str) -> str:
@@ -55,7 +59,7 @@ def save_onboarding(db_path: str, user_id: str, data: dict) -> dict:
 
     Returns {"onboarding_completed": True, "user_id": user_id}.
     """
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         cursor = conn.cursor()
         preferred_language = data.get("preferred_language", "en")
@@ -113,6 +117,7 @@ def save_onboarding(db_path: str, user_id: str, data: dict) -> dict:
 
     finally:
         conn.close()
+    invalidate_profile(user_id)
 
     return {"onboarding_completed": True, "user_id": user_id}
 
@@ -130,7 +135,7 @@ def record_signal(
 
     value is serialised via json.dumps before storage.
     """
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         cursor = conn.cursor()
         signal_id = str(uuid.uuid4())
@@ -143,6 +148,7 @@ def record_signal(
         conn.commit()
     finally:
         conn.close()
+    invalidate_profile(user_id)
 
 
 def update_mastery(
@@ -159,7 +165,7 @@ def update_mastery(
     increments struggle_count when level < 0.4.
     If no row exists: inserts with attempts=1.
     """
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         cursor = conn.cursor()
         cursor.execute("""
@@ -205,13 +211,14 @@ def update_mastery(
         conn.commit()
     finally:
         conn.close()
+    invalidate_profile(user_id)
 
 
 def get_mastery_map(db_path: str, user_id: str) -> dict:
     """
     Return {topic: mastery_level} dict for the given user from user_mastery.
     """
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         cursor = conn.cursor()
         cursor.execute("""
@@ -225,122 +232,181 @@ def get_mastery_map(db_path: str, user_id: str) -> dict:
         conn.close()
 
 
-def get_student_profile(db_path: str, user_id: str) -> dict:
+# ---------------------------------------------------------------------------
+# Profile snapshot
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class StudentProfile:
     """
-    Return the full student profile for a user, including their mastery map.
+    Everything the tutor needs to know about a student, read in one go.
+
+    Frozen because snapshots are shared through the profile cache; use
+    to_dict() for a copy that callers may modify.
+    """
+
+    user_id: str
+    motivation: Optional[str]
+    prior_experience: Optional[str]
+    known_languages: Optional[str]
+    learning_style: Optional[str]
+    goal: Optional[str]
+    time_commitment: Optional[str]
+    preferred_language: Optional[str]
+    skill_level: str
+    diagnostic_score: Optional[float]
+    onboarding_completed: Optional[int]
+    created_at: Optional[str]
+    username: Optional[str]
+    name: Optional[str]
+    user_type: Optional[str]
+    mastery: dict = field(default_factory=dict)
+    recent_signals: list = field(default_factory=list)
+    completed_lessons: list = field(default_factory=list)
+    active_path: Optional[dict] = None
+    recent_playground_topics: list = field(default_factory=list)
+    total_xp: int = 0
+    rank: str = "CADET"
+
+    def to_dict(self) -> dict:
+        """Dict in the shape get_student_profile has always returned."""
+        data = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if isinstance(value, (dict, list)):
+                value = value.copy()
+            data[f.name] = value
+        return data
+
+
+# Child collections come back as JSON arrays built by the json1 helpers, so the
+# whole profile except the mastery map is one statement. Mastery is read
+# separately (same transaction) because json1 renders REALs with 15 digits.
+_SNAPSHOT_SQL = """
+    SELECT up.user_id, up.motivation, up.prior_experience, up.known_languages,
+           up.learning_style, up.goal, up.time_commitment, up.preferred_language,
+           up.skill_level, up.diagnostic_score, up.onboarding_completed, up.created_at,
+           u.username, u.name, up.user_type, u.points,
+           (SELECT json_group_array(json_array(signal_type, topic, created_at))
+              FROM (SELECT signal_type, topic, created_at FROM learning_signals
+                    WHERE user_id = up.user_id
+                    ORDER BY created_at DESC LIMIT 10)),
+           (SELECT json_group_array(json_array(lesson_id, completed_at, xp_awarded))
+              FROM (SELECT lesson_id, completed_at, xp_awarded FROM lesson_completions
+                    WHERE user_id = up.user_id
+                    ORDER BY completed_at DESC LIMIT 20)),
+           (SELECT json_array(lp.name, ulp.current_position,
+                              json_array_length(COALESCE(lp.lesson_sequence, '[]')), ulp.status)
+              FROM user_learning_paths ulp
+              JOIN learning_paths lp ON ulp.path_id = lp.id
+              WHERE ulp.user_id = up.user_id AND ulp.status = 'active'
+              LIMIT 1),
+           (SELECT json_group_array(title)
+              FROM (SELECT title FROM playground_conversations
+                    WHERE user_id = up.user_id
+                    ORDER BY updated_at DESC LIMIT 5))
+    FROM user_profiles up
+    LEFT JOIN users u ON u.id = up.user_id
+    WHERE up.user_id = ?
+"""
+
+
+def _rank_for_xp(total_xp: int) -> str:
+    return "ARCHITECT" if total_xp > 1000 else "ENGINEER" if total_xp > 500 else "CADET"
+
+
+def get_profile_snapshot(db_path: str, user_id: str) -> Optional[StudentProfile]:
+    """
+    Return the cached profile snapshot for user_id, loading it on a miss.
 
     Returns None if no profile exists for user_id.
     """
-    conn = sqlite3.connect(db_path)
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT up.user_id, up.motivation, up.prior_experience, up.known_languages,
-                   up.learning_style, up.goal, up.time_commitment, up.preferred_language,
-                   up.skill_level, up.diagnostic_score, up.onboarding_completed, up.created_at,
-                   u.username, u.name, up.user_type
-            FROM user_profiles up
-            LEFT JOIN users u ON u.id = up.user_id
-            WHERE up.user_id = ?
-        """, [user_id])
-        row = cursor.fetchone()
-
-        if row is None:
-            return None
-
-        profile = {
-            "user_id": row[0],
-            "motivation": row[1],
-            "prior_experience": row[2],
-            "known_languages": row[3],
-            "learning_style": row[4],
-            "goal": row[5],
-            "time_commitment": row[6],
-            "preferred_language": row[7],
-            "skill_level": row[8],
-            "diagnostic_score": row[9],
-            "onboarding_completed": row[10],
-            "created_at": row[11],
-            "username": row[12],
-            "name": row[13],
-            "user_type": row[14],
-        }
-        profile["skill_level"] = profile.get("skill_level") or "beginner"
-    finally:
-        conn.close()
+    version = profile_cache.version(user_id)
+    hit, snapshot = profile_cache.get(db_path, user_id)
+    if hit:
+        return snapshot
+    snapshot = _load_profile_snapshot(db_path, user_id)
+    profile_cache.put(db_path, user_id, snapshot, version)
+    return snapshot
 
-    profile["mastery"] = get_mastery_map(db_path, user_id)
 
-    # Add recent learning signals
-    conn = sqlite3.connect(db_path)
+def _load_profile_snapshot(db_path: str, user_id: str) -> Optional[StudentProfile]:
+    """
+    Load a student's profile, mastery map, recent signals, completions,
+    active path, playground topics and XP on one connection inside a single
+    read transaction (two statements).
+    """
+    conn = database.connect(db_path)
     try:
-        signals = conn.execute(
-            "SELECT signal_type, topic, created_at FROM learning_signals WHERE user_id = ? ORDER BY created_at DESC LIMIT 10",
-            [user_id],
-        ).fetchall()
-        profile["recent_signals"] = [
-            {"signal_type": s[0], "topic": s[1], "created_at": s[2]} for s in signals
-        ]
+        conn.execute("BEGIN")
+        row = conn.execute(_SNAPSHOT_SQL, [user_id]).fetchone()
+        mastery_rows = []
+        if row is not None:
+            mastery_rows = conn.execute(
+                "SELECT topic, mastery_level FROM user_mastery WHERE user_id = ?",
+                [user_id],
+            ).fetchall()
+        conn.commit()
     finally:
         conn.close()
 
-    # Add completed lessons
-    conn = sqlite3.connect(db_path)
-    try:
-        comp_rows = conn.execute(
-            "SELECT lesson_id, completed_at, xp_awarded FROM lesson_completions WHERE user_id = ? ORDER BY completed_at DESC LIMIT 20",
-            [user_id],
-        ).fetchall()
-        profile["completed_lessons"] = [
-            {"lesson_id": r[0], "completed_at": r[1], "xp": r[2]} for r in comp_rows
-        ]
-    finally:
-        conn.close()
+    if row is None:
+        return None
 
-    # Add active learning path
-    conn = sqlite3.connect(db_path)
-    try:
-        path_row = conn.execute(
-            """SELECT lp.name, ulp.current_position, lp.lesson_sequence, ulp.status
-               FROM user_learning_paths ulp
-               JOIN learning_paths lp ON ulp.path_id = lp.id
-               WHERE ulp.user_id = ? AND ulp.status = 'active'
-               LIMIT 1""",
-            [user_id],
-        ).fetchone()
-        if path_row:
-            import json as _json
-            seq = _json.loads(path_row[2]) if path_row[2] else []
-            profile["active_path"] = {
-                "name": path_row[0],
-                "position": path_row[1] or 0,
-                "total_lessons": len(seq),
-                "status": path_row[3],
-            }
-        else:
-            profile["active_path"] = None
-    finally:
-        conn.close()
+    signals_json, completions_json, path_json, playground_json = row[16:20]
 
-    # Add recent playground conversation topics
-    conn = sqlite3.connect(db_path)
-    try:
-        pg_rows = conn.execute(
-            "SELECT title FROM playground_conversations WHERE user_id = ? ORDER BY updated_at DESC LIMIT 5",
-            [user_id],
-        ).fetchall()
-        profile["recent_playground_topics"] = [r[0] for r in pg_rows if r[0] and r[0] != "New conversation"]
-    finally:
-        conn.close()
+    active_path = None
+    if path_json:
+        name, position, total_lessons, status = json.loads(path_json)
+        active_path = {
+            "name": name,
+            "position": position or 0,
+            "total_lessons": total_lessons or 0,
+            "status": status,
+        }
+
+    total_xp = row[15] or 0
+
+    return StudentProfile(
+        user_id=row[0],
+        motivation=row[1],
+        prior_experience=row[2],
+        known_languages=row[3],
+        learning_style=row[4],
+        goal=row[5],
+        time_commitment=row[6],
+        preferred_language=row[7],
+        skill_level=row[8] or "beginner",
+        diagnostic_score=row[9],
+        onboarding_completed=row[10],
+        created_at=row[11],
+        username=row[12],
+        name=row[13],
+        user_type=row[14],
+        mastery={r[0]: r[1] for r in mastery_rows},
+        recent_signals=[
+            {"signal_type": s[0], "topic": s[1], "created_at": s[2]}
+            for s in json.loads(signals_json or "[]")
+        ],
+        completed_lessons=[
+            {"lesson_id": c[0], "completed_at": c[1], "xp": c[2]}
+            for c in json.loads(completions_json or "[]")
+        ],
+        active_path=active_path,
+        recent_playground_topics=[
+            t for t in json.loads(playground_json or "[]")
+            if t and t != "New conversation"
+        ],
+        total_xp=total_xp,
+        rank=_rank_for_xp(total_xp),
+    )
 
-    # Add XP and rank
-    conn = sqlite3.connect(db_path)
-    try:
-        pts_row = conn.execute("SELECT points FROM users WHERE id = ?", [user_id]).fetchone()
-        total_xp = pts_row[0] if pts_row else 0
-        profile["total_xp"] = total_xp
-        profile["rank"] = "ARCHITECT" if total_xp > 1000 else "ENGINEER" if total_xp > 500 else "CADET"
-    finally:
-        conn.close()
 
-    return profile
+def get_student_profile(db_path: str, user_id: str) -> dict:
+    """
+    Return the full student profile for a user, including their mastery map.
+
+    Returns None if no profile exists for user_id.
+    """
+    snapshot = get_profile_snapshot(db_path, user_id)
+    return snapshot.to_dict() if snapshot else None
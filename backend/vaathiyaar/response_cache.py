@@ -0,0 +1,286 @@
+"""
+response_cache.py — Semantic response cache in front of call_vaathiyaar.
+
+Many classroom questions are near-identical across students on the same
+lesson ("what is a list comprehension?" in lesson X, phase Y, English).
+Answers are cached per scope (lesson_id, phase, language, skill_level,
+user_type) and looked up by:
+
+    1. the normalised message text (exact match), then
+    2. cosine similarity of message embeddings within the same scope,
+       ≥ RESPONSE_CACHE_SIMILARITY.
+
+Embeddings come from a hashed bag-of-words (unigrams + bigrams, feature-hashed
+into RESPONSE_CACHE_DIMENSIONS buckets). When RESPONSE_CACHE_EMBED_MODEL is
+set, a local Ollama embedding model at RESPONSE_CACHE_EMBED_HOST is used
+instead, falling back to the hashed vectors if it is unreachable.
+
+Vaathiyaar addresses students by name, so the originating student's name is
+replaced with a placeholder before storing and the asking student's name is
+substituted on a hit. The profile_update is the originating student's
+signal and is not stored. Turns that depend on student state (code evaluation,
+attempt counts, chat history) are not cacheable — see is_cacheable().
+"""
+
+import copy
+import math
+import os
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") != "0"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(24 * 3600)))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.9"))
+RESPONSE_CACHE_DIMENSIONS = int(os.getenv("RESPONSE_CACHE_DIMENSIONS", "4096"))
+RESPONSE_CACHE_EMBED_MODEL = os.getenv("RESPONSE_CACHE_EMBED_MODEL", "")
+RESPONSE_CACHE_EMBED_HOST = os.getenv("RESPONSE_CACHE_EMBED_HOST", "http://localhost:11434")
+
+# Longer messages are usually pasted code or very specific questions
+MAX_CACHEABLE_MESSAGE_CHARS = 400
+
+_NAME_PLACEHOLDER = "\x00student\x00"
+_MIN_NAME_CHARS = 3
+
+_STOPWORDS = frozenset({
+    "a", "an", "the", "is", "are", "was", "be", "to", "of", "in", "on", "for",
+    "and", "or", "it", "this", "that", "me", "i", "you", "can", "please", "do",
+    "does", "pls", "plz",
+})
+
+
+# ---------------------------------------------------------------------------
+# Normalisation and embeddings
+# ---------------------------------------------------------------------------
+
+def normalize_message(text: str) -> str:
+    """Case-fold, drop punctuation/symbols and collapse whitespace (any script)."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    chars = [
+        " " if unicodedata.category(ch)[0] in "PSZC" else ch
+        for ch in text
+    ]
+    return " ".join("".join(chars).split())
+
+
+def _hashed_embedding(normalized: str, dimensions: int = RESPONSE_CACHE_DIMENSIONS) -> dict[int, float]:
+    """L2-normalised sparse bag of unigrams + bigrams, feature-hashed."""
+    words = [w for w in normalized.split() if w not in _STOPWORDS] or normalized.split()
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vector: dict[int, float] = {}
+    for feature in features:
+        bucket = zlib.crc32(feature.encode("utf-8")) % dimensions
+        vector[bucket] = vector.get(bucket, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    if norm:
+        for bucket in vector:
+            vector[bucket] /= norm
+    return vector
+
+
+def _cosine(a: dict[int, float], b: dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(bucket, 0.0) for bucket, value in a.items())
+
+
+class _OllamaEmbedder:
+    """Dense embeddings from a local Ollama embedding model."""
+
+    def __init__(self, model: str, host: str):
+        from ollama import Client
+        self.model = model
+        self._client = Client(host=host, timeout=2.0)
+
+    def __call__(self, text: str) -> Optional[dict[int, float]]:
+        try:
+            response = self._client.embed(model=self.model, input=text)
+            values = response["embeddings"][0]
+        except Exception:
+            return None
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return {i: v / norm for i, v in enumerate(values)}
+
+
+# ---------------------------------------------------------------------------
+# Cacheability and personalisation
+# ---------------------------------------------------------------------------
+
+def is_cacheable(user_message: str, lesson_context: Optional[dict]) -> bool:
+    """False for turns whose answer depends on the student's own state."""
+    context = lesson_context or {}
+    if context.get("code_evaluation") or context.get("attempt_count"):
+        return False
+    if context.get("mode") == "playground":
+        return False
+    message = user_message.strip()
+    return bool(message) and len(message) <= MAX_CACHEABLE_MESSAGE_CHARS
+
+
+def student_name(student_profile: Optional[dict]) -> str:
+    """The name build_system_prompt tells Vaathiyaar to address the student by."""
+    profile = student_profile or {}
+    username = profile.get("username") or ""
+    name = profile.get("name") or username
+    if name in ("Learner", "learner") and username:
+        name = username
+    return name or ""
+
+
+def cache_scope(student_profile: Optional[dict], lesson_context: Optional[dict]) -> tuple:
+    profile = student_profile or {}
+    context = lesson_context or {}
+    return (
+        context.get("lesson_id") or context.get("module_id") or context.get("topic") or "",
+        context.get("phase") or "",
+        profile.get("preferred_language") or context.get("language") or "en",
+        profile.get("skill_level") or "beginner",
+        profile.get("user_type") or "",
+    )
+
+
+def _swap_name(response: dict, old: str, new: str) -> dict:
+    response = copy.deepcopy(response)
+    message = response.get("message")
+    if old and isinstance(message, str):
+        response["message"] = message.replace(old, new)
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+class ResponseCache:
+    """Thread-safe LRU + TTL cache of Vaathiyaar responses with similarity lookup."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+                 similarity: float = RESPONSE_CACHE_SIMILARITY,
+                 embed_model: str = RESPONSE_CACHE_EMBED_MODEL,
+                 embed_host: str = RESPONSE_CACHE_EMBED_HOST):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self._embedder = _OllamaEmbedder(embed_model, embed_host) if embed_model else None
+        # (scope, normalised message) -> (expires_at, embedding, response)
+        self._entries: OrderedDict = OrderedDict()
+        self._by_scope: dict[tuple, set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def lookup_blocks(self) -> bool:
+        """True when lookups make a network call (run them off the event loop)."""
+        return self._embedder is not None
+
+    def _embed(self, normalized: str) -> tuple[str, dict[int, float]]:
+        """(kind, vector); vectors of different kinds are never compared."""
+        if self._embedder is not None:
+            vector = self._embedder(normalized)
+            if vector is not None:
+                return "model", vector
+        return "hashed", _hashed_embedding(normalized)
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        keys = self._by_scope.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_scope[key[0]]
+
+    def get(self, user_message: str, student_profile: Optional[dict],
+            lesson_context: Optional[dict]) -> Optional[dict]:
+        """Cached response for this question in this scope, personalised, or None."""
+        normalized = normalize_message(user_message)
+        scope = cache_scope(student_profile, lesson_context)
+        key = (scope, normalized)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._drop(key)
+                entry = None
+            search = entry is None and self.similarity < 1.0 and scope in self._by_scope
+
+        semantic = False
+        if search:
+            vector = self._embed(normalized)  # may be a network call: outside the lock
+            with self._lock:
+                best_score = self.similarity
+                for candidate in self._by_scope.get(scope, ()):
+                    candidate_entry = self._entries[candidate]
+                    if candidate_entry[0] <= now:
+                        continue
+                    if candidate_entry[1][0] != vector[0]:
+                        continue
+                    score = _cosine(vector[1], candidate_entry[1][1])
+                    if score >= best_score:
+                        key, entry, best_score = candidate, candidate_entry, score
+                semantic = entry is not None
+
+        name = student_name(student_profile)
+        with self._lock:
+            if entry is None or (not name and _NAME_PLACEHOLDER in str(entry[2].get("message", ""))):
+                self.misses += 1
+                return None
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+            self.semantic_hits += semantic
+        return _swap_name(entry[2], _NAME_PLACEHOLDER, name)
+
+    def put(self, user_message: str, student_profile: Optional[dict],
+            lesson_context: Optional[dict], response: dict):
+        """Store a response, with the asking student's name replaced by a placeholder."""
+        if self.max_entries <= 0 or self.ttl_seconds <= 0 or not isinstance(response, dict):
+            return
+        normalized = normalize_message(user_message)
+        scope = cache_scope(student_profile, lesson_context)
+        key = (scope, normalized)
+        name = student_name(student_profile)
+        if len(name) < _MIN_NAME_CHARS and name and name in str(response.get("message", "")):
+            return  # too short to replace safely without mangling the answer
+        stored = _swap_name(response, name, _NAME_PLACEHOLDER)
+        stored.pop("profile_update", None)  # the asking student's signal, not the answer's
+        vector = self._embed(normalized)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, vector, stored)
+            self._by_scope.setdefault(scope, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_scope.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "embedder": "ollama" if self._embedder is not None else "hashed-bow",
+            }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,84 @@
+"""
+sandbox_profiles.py — Named resource limits for sandboxed code runs.
+
+Each caller picks a profile:
+
+    classroom   lesson evaluation and diagnostics (small, strict)
+    playground  the free-form terminal (more memory, more output)
+    challenge   weekly challenge grading (many test cases in one run)
+
+Limits are applied with setrlimit in the process that runs the code (POSIX
+only): CPU seconds, address space, open files, file size and — when the
+sandbox does not run as root, which ignores it — process count. Output is
+read incrementally and the run is stopped once max_output_bytes have been
+produced, with a truncation marker appended.
+
+Every value can be overridden per profile from the environment, e.g.
+SANDBOX_PLAYGROUND_MEMORY_MB=1024 or SANDBOX_CLASSROOM_TIMEOUT=5.
+"""
+
+import os
+from dataclasses import asdict, dataclass
+
+MB = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class SandboxProfile:
+    name: str
+    timeout: float          # wall-clock seconds
+    cpu_seconds: int
+    memory_mb: int          # address space (RLIMIT_AS)
+    max_open_files: int
+    max_processes: int      # extra processes/threads the program may start
+    max_file_mb: int        # largest file the program may write
+    max_output_bytes: int   # stdout + stderr
+
+    def limits(self) -> dict:
+        """The rlimit / output settings sent to the execution worker."""
+        values = asdict(self)
+        values.pop("name")
+        values.pop("timeout")
+        return values
+
+
+def _env(name: str, field: str, default):
+    raw = os.getenv(f"SANDBOX_{name.upper()}_{field.upper()}")
+    if raw is None:
+        return default
+    try:
+        return type(default)(raw)
+    except ValueError:
+        print(f"Warning: ignoring invalid SANDBOX_{name.upper()}_{field.upper()}={raw!r}")
+        return default
+
+
+def _profile(name: str, **defaults) -> SandboxProfile:
+    return SandboxProfile(name=name, **{k: _env(name, k, v) for k, v in defaults.items()})
+
+
+PROFILES: dict[str, SandboxProfile] = {
+    "classroom": _profile(
+        "classroom", timeout=10.0, cpu_seconds=10, memory_mb=512, max_open_files=64,
+        max_processes=8, max_file_mb=1, max_output_bytes=64 * 1024,
+    ),
+    "playground": _profile(
+        "playground", timeout=10.0, cpu_seconds=10, memory_mb=1024, max_open_files=128,
+        max_processes=16, max_file_mb=16, max_output_bytes=1 * MB,
+    ),
+    "challenge": _profile(
+        "challenge", timeout=30.0, cpu_seconds=30, memory_mb=512, max_open_files=64,
+        max_processes=8, max_file_mb=1, max_output_bytes=256 * 1024,
+    ),
+}
+
+DEFAULT_PROFILE = "classroom"
+
+
+def get_profile(name: str) -> SandboxProfile:
+    """Profile by name; unknown names fall back to the strictest (classroom)."""
+    return PROFILES.get(name) or PROFILES[DEFAULT_PROFILE]
+
+
+def truncation_marker(max_output_bytes: int) -> str:
+    return f"\n[output truncated: limit of {max_output_bytes} bytes reached]\n"
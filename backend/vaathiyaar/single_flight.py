@@ -0,0 +1,155 @@
+"""
+single_flight.py — In-flight deduplication of identical LLM requests.
+
+The module-generation pipeline, the trigger engine and classroom chats can
+send byte-identical prompts at the same moment (two students whose struggle
+on one topic triggers the same stage-1 outline). SingleFlight lets the first
+such call go upstream and makes every identical call that arrives while it
+is in flight wait for, and share, its result:
+
+    key = request_key(OLLAMA_MODEL, messages, temperature, max_tokens)
+    raw = llm_flights.do(key, lambda: client.chat(...))          # threads
+    raw = await llm_flights.ado(key, lambda: aclient.chat(...))  # event loop
+
+Sync and async callers share flights (a thread can wait on a call made from
+the event loop and vice versa). Errors are shared too, except the leader's
+own VaathiyaarBusyError (its user's slots were full) and cancellation: then
+the call is handed to one of its waiters instead.
+Nothing is kept once the call lands — repeat questions are the response
+cache's job.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable
+
+from vaathiyaar.concurrency import VaathiyaarBusyError
+
+VAATHIYAAR_SINGLE_FLIGHT = os.getenv("VAATHIYAAR_SINGLE_FLIGHT", "1") != "0"
+
+
+class _Abandoned(Exception):
+    """The leader stopped without a result; a waiter should take over."""
+
+
+def request_key(model: str, messages: list, temperature: float, max_tokens: int) -> str:
+    """Identity of an upstream chat request: system prompt hash + the rest of the call."""
+    system = "".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    rest = [m for m in messages if m.get("role") != "system"]
+    payload = json.dumps(
+        [model, hashlib.sha256(system.encode("utf-8")).hexdigest(), rest, temperature, max_tokens],
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """Shares one in-flight call per key among concurrent callers."""
+
+    def __init__(self, enabled: bool = VAATHIYAAR_SINGLE_FLIGHT,
+                 private_errors: tuple = (VaathiyaarBusyError,)):
+        self.enabled = enabled
+        self.private_errors = private_errors
+        self._lock = threading.Lock()
+        self._flights: dict[str, Future] = {}
+        self.calls = 0        # calls made through do()/ado()
+        self.upstream = 0     # calls that actually ran
+        self.coalesced = 0    # calls answered by another call's flight
+
+    def _join(self, key: str) -> tuple:
+        """(future, is_leader) for key."""
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                return future, False
+            future = self._flights[key] = Future()
+            self.upstream += 1
+            return future, True
+
+    def _land(self, key: str, future: Future, result=None, error: BaseException = None):
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+        if error is None:
+            future.set_result(result)
+        elif isinstance(error, Exception) and not isinstance(error, self.private_errors):
+            future.set_exception(error)
+        else:
+            # The leader's own business (cancelled, interrupted, over its quota)
+            future.set_exception(_Abandoned())
+
+    def _count(self, coalesced: bool):
+        with self._lock:
+            self.calls += 1
+            if coalesced:
+                self.coalesced += 1
+
+    def do(self, key: str, fn: Callable[[], object]):
+        """Run fn() once per in-flight key; identical concurrent calls share the result."""
+        if not self.enabled:
+            self._count(False)
+            return fn()
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    result = future.result()
+                except _Abandoned:
+                    continue
+                except Exception:
+                    self._count(True)
+                    raise
+                self._count(True)
+                return result
+            self._count(False)
+            try:
+                result = fn()
+            except BaseException as exc:
+                self._land(key, future, error=exc)
+                raise
+            self._land(key, future, result)
+            return result
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable]):
+        """Async do(): fn() returns the awaitable to share."""
+        if not self.enabled:
+            self._count(False)
+            return await fn()
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    # shield: a waiter that goes away must not cancel the shared call
+                    result = await asyncio.shield(asyncio.wrap_future(future))
+                except _Abandoned:
+                    continue
+                except Exception:
+                    self._count(True)
+                    raise
+                self._count(True)
+                return result
+            self._count(False)
+            try:
+                result = await fn()
+            except BaseException as exc:
+                self._land(key, future, error=exc)
+                raise
+            self._land(key, future, result)
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "calls": self.calls,
+                "upstream": self.upstream,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._flights),
+            }
+
+
+llm_flights = SingleFlight()
@@ -0,0 +1,129 @@
+"""
+stage_timing.py — Per-stage latency for multi-step request handlers.
+
+A StageTimer records how long each named stage of one request took:
+
+    timer = StageTimer()
+    with timer.stage("profile_load"):
+        profile = get_student_profile(...)
+    ...
+    timer.observe(evaluate_latency)              # feed the histograms
+    response.headers["Server-Timing"] = timer.header()
+
+and LatencyHistograms aggregates stages across requests into fixed buckets,
+so the share of each stage (and its tail) can be read from a stats endpoint
+without an external metrics system.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Upper bounds (ms) of the histogram buckets; a final bucket catches the rest
+BUCKET_BOUNDS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class StageTimer:
+    """Durations (ms) of the stages of one request, in the order they ran."""
+
+    def __init__(self):
+        self.stages: dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+    def record(self, name: str, ms: float):
+        """Add a duration measured elsewhere (repeated stages accumulate)."""
+        self.stages[name] = round(self.stages.get(name, 0.0) + ms, 3)
+
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self._started) * 1000, 3)
+
+    def as_dict(self) -> dict:
+        return {**self.stages, "total": self.total_ms()}
+
+    def header(self) -> str:
+        """Server-Timing header value, e.g. `execute;dur=12.5, total;dur=40.1`."""
+        return ", ".join(f"{name};dur={ms:g}" for name, ms in self.as_dict().items())
+
+    def observe(self, histograms: "LatencyHistograms", prefix: str = ""):
+        for name, ms in self.as_dict().items():
+            histograms.observe(prefix + name, ms)
+
+
+class _NullTimer:
+    """StageTimer stand-in for callers that do not measure."""
+
+    @contextmanager
+    def stage(self, name: str):
+        yield
+
+    def record(self, name: str, ms: float):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class LatencyHistograms:
+    """Thread-safe fixed-bucket latency histograms, one per stage."""
+
+    def __init__(self, bounds: tuple = BUCKET_BOUNDS_MS):
+        self.bounds = tuple(bounds)
+        self._lock = threading.Lock()
+        self._stages: dict[str, dict] = {}
+
+    def observe(self, stage: str, ms: float):
+        index = bisect.bisect_left(self.bounds, ms)
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = {
+                    "count": 0, "sum_ms": 0.0, "max_ms": 0.0, "buckets": [0] * (len(self.bounds) + 1),
+                }
+            entry["count"] += 1
+            entry["sum_ms"] += ms
+            entry["max_ms"] = max(entry["max_ms"], ms)
+            entry["buckets"][index] += 1
+
+    def _quantile(self, entry: dict, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (max_ms for the last)."""
+        rank = q * entry["count"]
+        seen = 0
+        for i, count in enumerate(entry["buckets"]):
+            seen += count
+            if count and seen >= rank:
+                return float(self.bounds[i]) if i < len(self.bounds) else entry["max_ms"]
+        return None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = {name: {**entry, "buckets": list(entry["buckets"])} for name, entry in self._stages.items()}
+        labels = [f"le_{bound:g}" for bound in self.bounds] + ["le_inf"]
+        return {
+            name: {
+                "count": entry["count"],
+                "mean_ms": round(entry["sum_ms"] / entry["count"], 3),
+                "p50_ms": self._quantile(entry, 0.5),
+                "p95_ms": self._quantile(entry, 0.95),
+                "max_ms": round(entry["max_ms"], 3),
+                "buckets": dict(zip(labels, entry["buckets"])),
+            }
+            for name, entry in stages.items()
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+# Stages of POST /api/classroom/evaluate (and its deferred feedback stream)
+evaluate_latency = LatencyHistograms()
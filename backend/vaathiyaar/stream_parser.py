@@ -0,0 +1,301 @@
+"""
+stream_parser.py — Incremental parser for streamed Vaathiyaar responses.
+
+Vaathiyaar answers with one JSON object ({"message": ..., "phase": ...,
+"animation": {...}, ...}), optionally inside ``` fences. Streaming routes
+used to concatenate every token and json.loads the whole text at the end,
+so the student saw nothing readable until the last token. Instead:
+
+    parser = ResponseStreamParser()
+    async for token in astream_vaathiyaar(...):
+        for event in parser.feed(token):
+            ...   # {"delta": "..."} or {"field": "phase", "value": "teach"}
+    parser.result()    # the parsed dict, or None if it was not JSON
+
+feed() returns the text added to "message" as soon as it arrives, and every
+other top-level field once its value closes. Each value is decoded once, as
+it completes, so the final dict is built without a second parse. A response
+that is not a JSON object is passed through as message text.
+"""
+
+import json
+import re
+from typing import Optional
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_WHITESPACE = " \t\r\n"
+_MESSAGE_SPECIAL = re.compile(r'["\\]')
+
+# Parser states
+_PREAMBLE = "preamble"      # before the object: whitespace and an opening ``` fence
+_TEXT = "text"              # not JSON: everything is message text
+_KEY = "key"                # expecting a key, "," or "}"
+_KEY_STRING = "key_string"
+_COLON = "colon"
+_VALUE = "value"            # expecting the start of a value
+_MESSAGE = "message"        # inside the "message" string
+_RAW_VALUE = "raw_value"    # inside any other value (captured, decoded on close)
+_AFTER_VALUE = "after_value"
+_END = "end"                # object closed; trailing fence/whitespace is ignored
+_INVALID = "invalid"
+
+
+class ResponseStreamParser:
+    """Push parser for one streamed response; see the module docstring."""
+
+    def __init__(self, message_key: str = "message"):
+        self.message_key = message_key
+        self.fields: dict = {}
+        self._chunks: list[str] = []
+        self._state = _PREAMBLE
+        self._preamble = ""
+        self._key: list[str] = []
+        self._key_escape = False
+        self._current_key = ""
+        # "message" string decoding
+        self._message: list[str] = []
+        self._escape: Optional[str] = None   # None, "\\", or "u" + hex digits so far
+        self._high_surrogate: Optional[int] = None
+        self._delta: list[str] = []          # message text not yet returned by feed()
+        # other values
+        self._raw: list[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._string_escape = False
+
+    # -- public ---------------------------------------------------------------
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far, verbatim."""
+        return "".join(self._chunks)
+
+    @property
+    def message(self) -> str:
+        """Message text decoded so far (the raw text if the response is not JSON)."""
+        if self._state == _TEXT:
+            return self.text
+        return "".join(self._message)
+
+    def feed(self, token: str) -> list:
+        """Consume one streamed token; returns the events it completed."""
+        if not token:
+            return []
+        self._chunks.append(token)
+        if self._state == _TEXT:
+            return [{"delta": token}]
+        events: list = []
+
+        if self._state == _PREAMBLE:
+            token = self._consume_preamble(token)
+            if self._state == _TEXT:
+                return [{"delta": token}] if token else []
+
+        i, n = 0, len(token)
+        while i < n:
+            state = self._state
+            if state == _MESSAGE and self._escape is None:
+                # Plain message text up to the next quote or escape, in one slice
+                special = _MESSAGE_SPECIAL.search(token, i)
+                end = special.start() if special else n
+                if end > i:
+                    self._emit(token[i:end])
+                    i = end
+                    continue
+            ch = token[i]
+            i += 1
+            if state == _MESSAGE:
+                self._message_char(ch)
+            elif state == _RAW_VALUE:
+                self._raw_char(ch, events)
+            elif state in (_END, _INVALID):
+                break
+            else:
+                self._structure_char(ch, events)
+
+        self._flush_delta(events)
+        return events
+
+    def result(self) -> Optional[dict]:
+        """The complete response object, or None if the stream was not one JSON object."""
+        return self.fields if self._state == _END else None
+
+    # -- preamble -------------------------------------------------------------
+
+    def _consume_preamble(self, token: str) -> str:
+        """Skip leading whitespace and a ``` fence line; returns what is left of the token."""
+        self._preamble += token
+        stripped = self._preamble.lstrip(_WHITESPACE)
+        if not stripped:
+            return ""
+        if stripped.startswith("`"):
+            if len(stripped) < 3 and "```".startswith(stripped):
+                return ""  # fence may still be arriving
+            if stripped.startswith("```"):
+                newline = stripped.find("\n")
+                if newline == -1:
+                    return ""  # e.g. "```json" without its newline yet
+                rest = stripped[newline + 1:].lstrip(_WHITESPACE)
+                if not rest:
+                    self._preamble = "```\n"
+                    return ""
+                stripped = rest
+        if stripped.startswith("{"):
+            self._state = _KEY
+            self._preamble = ""
+            return stripped[1:]
+        self._state = _TEXT
+        text, self._preamble = self._preamble, ""
+        return text
+
+    # -- object structure -----------------------------------------------------
+
+    def _structure_char(self, ch: str, events: list):
+        state = self._state
+        if state == _KEY_STRING:
+            if self._key_escape:
+                self._key.append(ch)
+                self._key_escape = False
+            elif ch == "\\":
+                self._key.append(ch)
+                self._key_escape = True
+            elif ch == '"':
+                try:
+                    self._current_key = json.loads('"' + "".join(self._key) + '"')
+                except ValueError:
+                    self._state = _INVALID
+                    return
+                self._key = []
+                self._state = _COLON
+            else:
+                self._key.append(ch)
+            return
+        if ch in _WHITESPACE:
+            return
+        if state == _KEY:
+            if ch == '"':
+                self._state = _KEY_STRING
+            elif ch == "}":
+                self._state = _END
+            elif ch != ",":
+                self._state = _INVALID
+        elif state == _COLON:
+            self._state = _VALUE if ch == ":" else _INVALID
+        elif state == _VALUE:
+            if ch == '"' and self._current_key == self.message_key:
+                self._message = []
+                self._state = _MESSAGE
+            else:
+                self._raw = []
+                self._depth = 0
+                self._in_string = False
+                self._state = _RAW_VALUE
+                self._raw_char(ch, events)
+        elif state == _AFTER_VALUE:
+            if ch == ",":
+                self._state = _KEY
+            elif ch == "}":
+                self._state = _END
+            else:
+                self._state = _INVALID
+
+    # -- the message string ---------------------------------------------------
+
+    def _message_char(self, ch: str):
+        escape = self._escape
+        if escape is None:
+            if ch == "\\":
+                self._escape = "\\"
+            elif ch == '"':
+                self.fields[self.message_key] = "".join(self._message)
+                self._state = _AFTER_VALUE
+            else:
+                self._emit(ch)
+        elif escape == "\\":
+            if ch == "u":
+                self._escape = "u"
+            else:
+                self._escape = None
+                self._emit(_ESCAPES.get(ch, ch))
+        else:
+            escape += ch
+            if len(escape) < 5:
+                self._escape = escape
+                return
+            self._escape = None
+            try:
+                code = int(escape[1:], 16)
+            except ValueError:
+                self._state = _INVALID
+                return
+            if 0xD800 <= code < 0xDC00:
+                self._high_surrogate = code
+                return
+            if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+                code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+                self._high_surrogate = None
+            self._emit(chr(code))
+
+    def _emit(self, text: str):
+        if self._high_surrogate is not None:
+            # Unpaired high surrogate: keep it, as json.loads would
+            text = chr(self._high_surrogate) + text
+            self._high_surrogate = None
+        self._message.append(text)
+        self._delta.append(text)
+
+    def _flush_delta(self, events: list):
+        if self._delta:
+            events.append({"delta": "".join(self._delta)})
+            self._delta = []
+
+    # -- other values ---------------------------------------------------------
+
+    def _raw_char(self, ch: str, events: list):
+        if self._in_string:
+            self._raw.append(ch)
+            if self._string_escape:
+                self._string_escape = False
+            elif ch == "\\":
+                self._string_escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._depth == 0:
+                    self._close_value(events)
+            return
+
+        if ch in "{[":
+            self._depth += 1
+        elif ch in "}]":
+            if self._depth == 0:
+                # End of a bare scalar, closed by the object's own brace
+                self._close_value(events)
+                if self._state == _AFTER_VALUE:
+                    self._state = _END
+                return
+            self._depth -= 1
+        elif ch == '"':
+            self._in_string = True
+        elif self._depth == 0 and (ch == "," or ch in _WHITESPACE):
+            if not self._raw:
+                return
+            self._close_value(events)
+            if ch == "," and self._state == _AFTER_VALUE:
+                self._state = _KEY
+            return
+
+        self._raw.append(ch)
+        if self._depth == 0 and ch in "}]":
+            self._close_value(events)
+
+    def _close_value(self, events: list):
+        try:
+            value = json.loads("".join(self._raw))
+        except ValueError:
+            self._state = _INVALID
+            return
+        self._raw = []
+        self.fields[self._current_key] = value
+        self._flush_delta(events)
+        events.append({"field": self._current_key, "value": value})
+        self._state = _AFTER_VALUE
@@ -10,6 +10,7 @@ from datetime import datetime
 
 import sqlite3
 
+import database
 from vaathiyaar.modelfile import build_system_prompt
 
 
@@ -49,7 +50,7 @@ def record_training_pair(
     profile_json = json.dumps(student_profile or {}, ensure_ascii=False)
     context_json = json.dumps(lesson_context or {}, ensure_ascii=False)
 
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         cursor = conn.cursor()
         cursor.execute(
@@ -92,7 +93,7 @@ def export_training_data(
     int
         Number of training examples exported.
     """
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         cursor = conn.cursor()
         if min_quality is not None:
@@ -141,7 +142,7 @@ def get_training_stats(db_path: str) -> dict:
     dict
         Keys: total_pairs, avg_quality_score, min_date, max_date.
     """
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     try:
         cursor = conn.cursor()
         cursor.execute(
@@ -169,7 +170,7 @@ def get_training_stats(db_path: str) -> dict:
 def export_training_data(output_path: str = "training_export.jsonl", min_quality: float = 0.5) -> int:
     """Export training data as JSONL for fine-tuning. Returns count."""
     db_path = os.environ.get("DB_PATH", "pymasters.db")
-    conn = sqlite3.connect(db_path)
+    conn = database.connect(db_path)
     conn.row_factory = sqlite3.Row
 
     rows = conn.execute(
@@ -940,11 +940,13 @@ export default function Classroom() {
                 topic: currentLesson?.topic ?? currentLesson?.id ?? '',
                 user_id: user?.id,
                 language,
+                feedback: 'defer',
             });
             const elapsed = Math.round(performance.now() - startTime);
             setExecutionTime(elapsed);
             const result = res.data?.result ?? res.data;
             setEvalResult(result);
+            if (result?.feedback_stream) streamEvaluationFeedback(result.feedback_stream);
             // Show output in the terminal
             const out = result?.output || '';
             const err = result?.error || '';
@@ -960,6 +962,43 @@ export default function Classroom() {
         }
     };
 
+    // Vaathiyaar's commentary on a run arrives after the pass/fail result
+    const streamEvaluationFeedback = async (streamPath) => {
+        try {
+            const { parseSSELine } = await import('../utils/streaming');
+            const response = await fetch(`${api.defaults.baseURL}${streamPath.replace(/^\/api/, '')}`, {
+                headers: { ...getAuthHeaders() },
+            });
+            if (!response.ok || !response.body) return;
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let pending = '';
+            let messageText = '';
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                pending += decoder.decode(value, { stream: true });
+                const lines = pending.split('\n');
+                pending = lines.pop();
+                for (const line of lines) {
+                    const data = parseSSELine(line);
+                    if (!data) continue;
+                    if (data.delta) {
+                        messageText += data.delta;
+                        const display = messageText;
+                        setEvalResult((prev) => prev && { ...prev, feedback: { message: display } });
+                    }
+                    if (data.done) {
+                        setEvalResult((prev) => prev && { ...prev, feedback: data.feedback });
+                    }
+                }
+            }
+        } catch (err) {
+            console.error('[Classroom feedback stream]', err);
+        }
+    };
+
     const handleHint = () => {
         const hints = currentLesson?.practice_challenges?.[0]?.hints ?? [];
         if (hints.length === 0) return;
@@ -984,7 +1023,7 @@ export default function Classroom() {
             if (streamControllerRef.current) streamControllerRef.current.abort();
             streamControllerRef.current = new AbortController();
 
-            const { parseSSELine, extractMessageFromJSON } = await import('../utils/streaming');
+            const { parseSSELine } = await import('../utils/streaming');
 
             const response = await fetch(`${api.defaults.baseURL}/classroom/chat/stream`, {
                 method: 'POST',
@@ -1011,29 +1050,31 @@ export default function Classroom() {
 
             const reader = response.body.getReader();
             const decoder = new TextDecoder();
-            let rawText = '';
+            let messageText = '';
+            let pending = '';
 
             while (true) {
                 const { done, value } = await reader.read();
                 if (done) break;
 
-                const chunk = decoder.decode(value, { stream: true });
+                // Frames can span reads: keep the incomplete last line for the next one
+                pending += decoder.decode(value, { stream: true });
+                const lines = pending.split('\n');
+                pending = lines.pop();
 
-                for (const line of chunk.split('\n')) {
+                for (const line of lines) {
                     const data = parseSSELine(line);
                     if (!data) continue;
 
-                    if (data.token) {
-                        rawText += data.token;
-                        const display = extractMessageFromJSON(rawText) || '';
-                        if (display) {
-                            setChatMessages((prev) =>
-                                prev.map((m) => m._isStreaming ? { ...m, content: display } : m)
-                            );
-                        }
+                    if (data.delta) {
+                        messageText += data.delta;
+                        const display = messageText;
+                        setChatMessages((prev) =>
+                            prev.map((m) => m._isStreaming ? { ...m, content: display } : m)
+                        );
                     }
                     if (data.done) {
-                        const finalMsg = data.message || extractMessageFromJSON(rawText) || rawText;
+                        const finalMsg = data.message || messageText;
                         setChatMessages((prev) =>
                             prev.map((m) => m._isStreaming ? { role: 'assistant', content: finalMsg } : m)
                         );
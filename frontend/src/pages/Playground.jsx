@@ -256,7 +256,7 @@ export default function Playground() {
             if (streamControllerRef.current) streamControllerRef.current.abort();
             streamControllerRef.current = new AbortController();
 
-            const { parseSSELine, extractMessageFromJSON } = await import('../utils/streaming');
+            const { parseSSELine } = await import('../utils/streaming');
 
             const response = await fetch(`${api.defaults.baseURL}/playground/chat/stream`, {
                 method: 'POST',
@@ -288,29 +288,31 @@ export default function Playground() {
 
             const reader = response.body.getReader();
             const decoder = new TextDecoder();
-            let rawText = '';
+            let messageText = '';
+            let pending = '';
 
             while (true) {
                 const { done, value } = await reader.read();
                 if (done) break;
 
-                const chunk = decoder.decode(value, { stream: true });
+                // Frames can span reads: keep the incomplete last line for the next one
+                pending += decoder.decode(value, { stream: true });
+                const lines = pending.split('\n');
+                pending = lines.pop();
 
-                for (const line of chunk.split('\n')) {
+                for (const line of lines) {
                     const data = parseSSELine(line);
                     if (!data) continue;
 
-                    if (data.token) {
-                        rawText += data.token;
-                        const display = extractMessageFromJSON(rawText) || '';
-                        if (display) {
-                            setMessages((prev) =>
-                                prev.map((m) => m._isStreaming ? { ...m, content: display } : m)
-                            );
-                        }
+                    if (data.delta) {
+                        messageText += data.delta;
+                        const display = messageText;
+                        setMessages((prev) =>
+                            prev.map((m) => m._isStreaming ? { ...m, content: display } : m)
+                        );
                     }
                     if (data.done) {
-                        const finalMsg = data.message || extractMessageFromJSON(rawText) || rawText;
+                        const finalMsg = data.message || messageText;
                         setMessages((prev) =>
                             prev.map((m) => m._isStreaming ? { role: 'assistant', content: finalMsg } : m)
                         );
@@ -351,21 +353,48 @@ export default function Playground() {
         setExecutionTime(null);
         const startTime = performance.now();
         try {
-            const res = await api.post('/playground/execute', {
-                user_id: user?.id,
-                code: code,
+            const { parseSSELine } = await import('../utils/streaming');
+            const response = await fetch(`${api.defaults.baseURL}/playground/execute/stream`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json', ...getAuthHeaders() },
+                body: JSON.stringify({ user_id: user?.id, code }),
             });
-            const elapsed = Math.round(performance.now() - startTime);
-            setExecutionTime(elapsed);
-            const result = res.data;
+            if (!response.ok) {
+                const body = await response.json().catch(() => ({}));
+                throw new Error(body.detail || `Server error: ${response.status}`);
+            }
+
+            // Output is shown as it arrives; events can be split across reads
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let pending = '';
             let out = '';
-            if (result.output) out += result.output;
-            if (result.error) out += (out ? '\n' : '') + result.error;
-            if (!out) out = '(no output)';
-            setOutput(out);
+            let finished = false;
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                pending += decoder.decode(value, { stream: true });
+                const lines = pending.split('\n');
+                pending = lines.pop();
+                for (const line of lines) {
+                    const data = parseSSELine(line);
+                    if (!data) continue;
+                    if (data.stream) {
+                        out += data.data;
+                        setOutput(out);
+                    }
+                    if (data.error) {
+                        out += (out ? '\n' : '') + data.error;
+                        setOutput(out);
+                    }
+                    if (data.done) finished = true;
+                }
+            }
+            setExecutionTime(Math.round(performance.now() - startTime));
+            if (!out) setOutput(finished ? '(no output)' : 'Execution error: connection closed');
         } catch (err) {
             setExecutionTime(Math.round(performance.now() - startTime));
-            setOutput(`Execution error: ${safeErrorMsg(err, 'Unknown error')}`);
+            setOutput(`Execution error: ${err.message || 'Unknown error'}`);
         } finally {
             setRunning(false);
         }
@@ -1,6 +1,7 @@
 /**
  * Shared SSE streaming utilities for Vaathiyaar chat.
- * Replaces the duplicated, fragile extractMessage() parsers.
+ * The server parses Vaathiyaar's JSON as it streams and sends the message
+ * text as {delta} events, so clients only concatenate.
  */
 
 export function parseSSELine(line) {
@@ -11,23 +12,3 @@ export function parseSSELine(line) {
         return null;
     }
 }
-
-export function extractMessageFromJSON(rawText) {
-    try {
-        const parsed = JSON.parse(rawText);
-        if (typeof parsed === 'object' && parsed.message) return parsed.message;
-        if (typeof parsed === 'string') return parsed;
-        return JSON.stringify(parsed);
-    } catch {
-        const lastBrace = rawText.lastIndexOf('}');
-        if (lastBrace === -1) return null;
-        const firstBrace = rawText.lastIndexOf('{', lastBrace);
-        if (firstBrace === -1) return null;
-        try {
-            const parsed = JSON.parse(rawText.substring(firstBrace, lastBrace + 1));
-            return parsed.message || null;
-        } catch {
-            return null;
-        }
-    }
-}